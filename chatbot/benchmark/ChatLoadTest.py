@@ -0,0 +1,478 @@
+import asyncio
+import datetime
+import json
+import os
+import resource
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from chatbot.config import Configuration
+from chatbot.dependencies.utils.path_utils import project_path
+from chatbot.logger import logger
+
+Asgi = Callable[..., Awaitable[None]]
+
+
+class RequestTiming:
+    """
+    The timings of a single chat request.
+    """
+
+    def __init__(self, status: int, ttft: Optional[float], total: float, characters: int):
+        """
+        Initializes the timing.
+
+        Args:
+            status (int): The HTTP status of the response.
+            ttft (Optional[float]): The time to the first body chunk, None without a body.
+            total (float): The time to the end of the response.
+            characters (int): The size of the body.
+        """
+        self.status = status
+        self.ttft = ttft
+        self.total = total
+        self.characters = characters
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300 and self.ttft is not None
+
+
+class ChatLoadTest:
+    """
+    Drives `/chat/prompt` at a fixed concurrency and reports latency, throughput and memory.
+
+    Requests go to an ASGI application in process, or to a running server when `url` is
+    set. Requests are anonymous, so they take the public path of the pipeline and need no
+    database. The first `warmup` requests are sent before measuring.
+
+    The report is compared with a JSON baseline: time to first token, end-to-end latency
+    and peak memory may grow, and throughput may drop, by at most `tolerance` (a fraction)
+    before the run counts as a regression.
+    """
+
+    PATH = "/api/v1/chat/prompt"
+
+    # (metric path, whether higher is worse)
+    COMPARED = (
+        ("ttft.p50", True),
+        ("ttft.p95", True),
+        ("ttft.p99", True),
+        ("latency.p95", True),
+        ("throughput_rps", False),
+        ("memory.peak_rss_mb", True),
+    )
+
+    def __init__(
+        self,
+        questions: list[str],
+        app: Optional[Asgi] = None,
+        url: Optional[str] = None,
+        concurrency: int = 16,
+        requests: int = 200,
+        warmup: int = 10,
+        path: str = PATH,
+    ):
+        """
+        Initializes the load test.
+
+        Args:
+            questions (list[str]): The messages sent, in turn.
+            app (Optional[Asgi]): The application tested in process.
+            url (Optional[str]): The base URL of the server tested over HTTP.
+            concurrency (int): The number of requests in flight.
+            requests (int): The number of measured requests.
+            warmup (int): The number of requests sent before measuring.
+            path (str): The path of the chat endpoint.
+        """
+        if (app is None) == (url is None):
+            raise ValueError("Give either an application or a URL to load test.")
+
+        self._questions = questions
+        self._app = app
+        self._url = url
+        self._concurrency = concurrency
+        self._requests = requests
+        self._warmup = warmup
+        self._path = path
+
+    @staticmethod
+    def _body(message: str) -> bytes:
+        """
+        Build the body of a chat request.
+
+        Args:
+            message (str): The message.
+
+        Returns:
+            bytes: The JSON body.
+        """
+        return json.dumps({"message": message, "history": "[]"}).encode("utf-8")
+
+    async def _request_asgi(self, message: str) -> RequestTiming:
+        """
+        Send a chat request to the in-process application.
+
+        Args:
+            message (str): The message.
+
+        Returns:
+            RequestTiming: The timing of the request.
+        """
+        body = self._body(message)
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": self._path,
+            "raw_path": self._path.encode("utf-8"),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"host", b"benchmark"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("benchmark", 80),
+        }
+        finished = asyncio.Event()
+        received = False
+        status = 0
+        ttft: Optional[float] = None
+        characters = 0
+        started = time.perf_counter()
+
+        async def receive() -> dict:
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            nonlocal status, ttft, characters
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and message.get("body"):
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                characters += len(message["body"].decode("utf-8", errors="ignore"))
+
+        try:
+            await self._app(scope, receive, send)
+        finally:
+            finished.set()
+        return RequestTiming(status, ttft, time.perf_counter() - started, characters)
+
+    async def _request_http(self, client: Any, message: str) -> RequestTiming:
+        """
+        Send a chat request to the server over HTTP.
+
+        Args:
+            client (httpx.AsyncClient): The HTTP client.
+            message (str): The message.
+
+        Returns:
+            RequestTiming: The timing of the request.
+        """
+        ttft: Optional[float] = None
+        characters = 0
+        started = time.perf_counter()
+        async with client.stream(
+            "POST",
+            self._path,
+            content=self._body(message),
+            headers={"content-type": "application/json"},
+        ) as response:
+            async for chunk in response.aiter_text():
+                if not chunk:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                characters += len(chunk)
+        return RequestTiming(response.status_code, ttft, time.perf_counter() - started, characters)
+
+    async def _drive(self, count: int, offset: int, client: Any) -> list[RequestTiming]:
+        """
+        Send requests with `concurrency` of them in flight.
+
+        Args:
+            count (int): The number of requests.
+            offset (int): The index of the first question.
+            client (Optional[httpx.AsyncClient]): The HTTP client, None in process.
+
+        Returns:
+            list[RequestTiming]: The timings, in completion order.
+        """
+        timings: list[RequestTiming] = []
+        next_request = 0
+
+        async def worker() -> None:
+            nonlocal next_request
+            while next_request < count:
+                index = next_request
+                next_request += 1
+                message = self._questions[(offset + index) % len(self._questions)]
+                try:
+                    if client is None:
+                        timing = await self._request_asgi(message)
+                    else:
+                        timing = await self._request_http(client, message)
+                except Exception as e:
+                    logger.warning(f"Benchmark request failed: {e!r}")
+                    timing = RequestTiming(0, None, 0.0, 0)
+                timings.append(timing)
+
+        await asyncio.gather(*(worker() for _ in range(min(self._concurrency, count))))
+        return timings
+
+    @staticmethod
+    def percentile(values: list[float], q: float) -> Optional[float]:
+        """
+        Get a percentile with linear interpolation.
+
+        Args:
+            values (list[float]): The values.
+            q (float): The percentile, between 0 and 1.
+
+        Returns:
+            Optional[float]: The percentile, None without values.
+        """
+        if not values:
+            return None
+        ordered = sorted(values)
+        position = (len(ordered) - 1) * q
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+    @classmethod
+    def _summary(cls, values: list[float]) -> dict:
+        """
+        Summarize latencies.
+
+        Args:
+            values (list[float]): The latencies in seconds.
+
+        Returns:
+            dict: The mean and percentiles.
+        """
+        return {
+            "mean": sum(values) / len(values) if values else None,
+            "p50": cls.percentile(values, 0.5),
+            "p95": cls.percentile(values, 0.95),
+            "p99": cls.percentile(values, 0.99),
+        }
+
+    @staticmethod
+    def memory() -> dict:
+        """
+        Get the memory used by this process.
+
+        Returns:
+            dict: The current and peak resident set size in MB.
+        """
+        rss_mb = None
+        try:
+            with open("/proc/self/statm") as f:
+                rss_mb = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+        except (OSError, ValueError):
+            pass
+        return {
+            "rss_mb": rss_mb,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+
+    async def run(self) -> dict:
+        """
+        Run the load test.
+
+        Returns:
+            dict: The report.
+        """
+        client = None
+        if self._url is not None:
+            import httpx
+
+            client = httpx.AsyncClient(
+                base_url=self._url,
+                timeout=None,
+                limits=httpx.Limits(max_connections=self._concurrency),
+            )
+
+        try:
+            if self._warmup:
+                await self._drive(self._warmup, 0, client)
+            started = time.perf_counter()
+            timings = await self._drive(self._requests, self._warmup, client)
+            duration = time.perf_counter() - started
+        finally:
+            if client is not None:
+                await client.aclose()
+
+        succeeded = [timing for timing in timings if timing.ok]
+        return {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "target": self._url or "in-process",
+            "concurrency": self._concurrency,
+            "requests": len(timings),
+            "errors": len(timings) - len(succeeded),
+            "duration_seconds": duration,
+            "throughput_rps": len(succeeded) / duration if duration else None,
+            "throughput_chars_per_second": (
+                sum(timing.characters for timing in succeeded) / duration if duration else None
+            ),
+            "ttft": self._summary([timing.ttft for timing in succeeded]),
+            "latency": self._summary([timing.total for timing in succeeded]),
+            "memory": self.memory() if self._url is None else {},
+        }
+
+    @staticmethod
+    def _metric(report: dict, path: str) -> Optional[float]:
+        """
+        Get a metric of a report by its dotted path.
+
+        Args:
+            report (dict): The report.
+            path (str): The path, e.g. `ttft.p95`.
+
+        Returns:
+            Optional[float]: The metric, None when it is missing.
+        """
+        value: Any = report
+        for key in path.split("."):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value if isinstance(value, (int, float)) else None
+
+    @classmethod
+    def compare(cls, report: dict, baseline: dict, tolerance: float = 0.2) -> list[str]:
+        """
+        Compare a report with a baseline.
+
+        Args:
+            report (dict): The report of this run.
+            baseline (dict): The report of the baseline run.
+            tolerance (float): The relative change allowed before a regression.
+
+        Returns:
+            list[str]: The regressions, empty when the run is within the tolerance.
+        """
+        regressions: list[str] = []
+        if report.get("errors"):
+            regressions.append(f"errors: {report['errors']} failed requests")
+
+        for path, higher_is_worse in cls.COMPARED:
+            current, previous = cls._metric(report, path), cls._metric(baseline, path)
+            if current is None or not previous:
+                continue
+            change = (current - previous) / previous
+            if (change > tolerance) if higher_is_worse else (change < -tolerance):
+                regressions.append(f"{path}: {previous:.4g} -> {current:.4g} ({change:+.0%})")
+        return regressions
+
+    @staticmethod
+    def offline_app(config: dict) -> Asgi:
+        """
+        Build the chat server on fake models and a synthetic corpus.
+
+        The models of the pipeline are replaced by the `benchmark.models` entries of the
+        model garden, and the indexes are built under `benchmark.index_dir` instead of the
+        real `faiss/` directory. Must run before the routers are imported.
+
+        Args:
+            config (dict): The `benchmark` settings.
+
+        Returns:
+            Asgi: The server.
+        """
+        from chatbot.benchmark.SyntheticCorpus import SyntheticCorpus
+        from chatbot.dependencies.IntentClassifier import Intent
+        from chatbot.dependencies.ModelLoader import ModelLoader
+        from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
+
+        models = config.get("models") or {}
+        settings = Configuration.get_all()
+        overrides = {
+            ("intent_classifier", "model"): models.get("intent_classifier"),
+            ("response_generator", "generator_model"): models.get("response_generator"),
+            ("title_generator", "model"): models.get("response_generator"),
+            ("history_compactor", "model"): models.get("response_generator"),
+            ("document_embedder", "embedding_model"): models.get("embeddings"),
+        }
+        for (section, key), model_name in overrides.items():
+            if model_name:
+                settings[section][key] = model_name
+
+        FaissIndexRegistry.root = project_path(config.get("index_dir", "benchmark/faiss"))
+        FaissIndexRegistry.invalidate()
+        embedder = ModelLoader.load_model(settings["document_embedder"]["embedding_model"])
+        SyntheticCorpus.from_config(config.get("corpus")).build(
+            embedder.model,
+            FaissIndexRegistry.root,
+            [intent.value for intent in Intent if intent != Intent.OTHER],
+            private=False,
+        )
+
+        from chatbot.main import setup_server
+
+        return setup_server()
+
+    @classmethod
+    def main(
+        cls,
+        url: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        requests: Optional[int] = None,
+        update_baseline: bool = False,
+    ) -> int:
+        """
+        Run the benchmark configured under `benchmark` and check it against the baseline.
+
+        Args:
+            url (Optional[str]): The base URL of a running server. Runs in process on fake
+                models and a synthetic corpus when None.
+            concurrency (Optional[int]): Overrides the configured concurrency.
+            requests (Optional[int]): Overrides the configured number of requests.
+            update_baseline (bool): Whether to store this run as the new baseline.
+
+        Returns:
+            int: 1 when the run regressed against the baseline, 0 otherwise.
+        """
+        from chatbot.benchmark.SyntheticCorpus import SyntheticCorpus
+
+        config = Configuration.get("benchmark") or {}
+        corpus = SyntheticCorpus.from_config(config.get("corpus"))
+        load_test = cls(
+            corpus.questions(config.get("questions", 500)),
+            app=cls.offline_app(config) if url is None else None,
+            url=url,
+            concurrency=concurrency or config.get("concurrency", 16),
+            requests=requests or config.get("requests", 200),
+            warmup=config.get("warmup", 10),
+        )
+        report = asyncio.run(load_test.run())
+        report["corpus"] = {
+            "chunks_per_intent": corpus.chunks_per_intent,
+            "words_per_chunk": corpus.words_per_chunk,
+        }
+        print(json.dumps(report, indent=2))
+
+        baseline_path = project_path(config.get("baseline", "benchmark/baseline.json"))
+        if update_baseline or not baseline_path.exists():
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+            logger.info(f"Benchmark baseline written to {baseline_path}.")
+            return 0
+
+        regressions = cls.compare(
+            report, json.loads(baseline_path.read_text()), config.get("tolerance", 0.2)
+        )
+        for regression in regressions:
+            logger.error(f"Benchmark regression: {regression}")
+        return 1 if regressions else 0
@@ -0,0 +1,282 @@
+import json
+import time
+from typing import Iterable, Optional
+
+import faiss
+import numpy as np
+
+from chatbot.benchmark.ChatLoadTest import ChatLoadTest
+from chatbot.config import Configuration
+from chatbot.dependencies.vectorstore.FaissIndexFactory import FaissIndexFactory
+from chatbot.logger import logger
+
+
+class IndexTuningReport:
+    """
+    Recall-vs-latency report of FAISS index types against the exact flat baseline.
+
+    Every index type is built once on the same vectors, then searched with each value of
+    its search knob (`nprobe` for IVF indexes, `efSearch` for HNSW ones). Queries are run
+    one at a time, like the retriever does, and every row reports the recall@k against an
+    exact `Flat` search, the per query latency and the serialized size of the index.
+
+    Each run can also be repeated on vectors truncated to fewer dimensions and
+    renormalized, which is what the `dimensions` parameter of the `text-embedding-3`
+    models returns, and can report the recall after re-ranking the candidates against the
+    full precision vectors, as the retriever does with `rerank_factor`.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        queries: np.ndarray,
+        k: int = 4,
+        index_types: Iterable[str] = ("Flat", "HNSW32", "IVF{nlist},Flat", "SQ8"),
+        nprobe: Iterable[int] = (1, 4, 16, 64),
+        ef_search: Iterable[int] = (16, 32, 64, 128),
+        dimensions: Iterable[Optional[int]] = (None,),
+        rerank_factor: Optional[int] = None,
+    ):
+        """
+        Initializes the report.
+
+        Args:
+            vectors (np.ndarray): The indexed vectors.
+            queries (np.ndarray): The query vectors.
+            k (int): The number of neighbours retrieved per query.
+            index_types (Iterable[str]): The `faiss.index_factory` strings to compare.
+            nprobe (Iterable[int]): The `nprobe` values tried on IVF indexes.
+            ef_search (Iterable[int]): The `efSearch` values tried on HNSW indexes.
+            dimensions (Iterable[Optional[int]]): The numbers of dimensions the vectors are
+                truncated to, None for the full vectors.
+            rerank_factor (Optional[int]): Also report the recall of approximate indexes
+                after re-ranking `rerank_factor * k` candidates. No re-ranking when None.
+        """
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.queries = np.ascontiguousarray(queries, dtype=np.float32)
+        self.k = k
+        self.index_types = list(index_types)
+        self.nprobe = list(nprobe)
+        self.ef_search = list(ef_search)
+        self.dimensions = list(dimensions)
+        self.rerank_factor = rerank_factor
+
+    @staticmethod
+    def truncate(vectors: np.ndarray, dimensions: Optional[int]) -> np.ndarray:
+        """
+        Keep the first dimensions of vectors and renormalize them.
+
+        Args:
+            vectors (np.ndarray): The vectors.
+            dimensions (Optional[int]): The number of dimensions to keep, None for all.
+
+        Returns:
+            np.ndarray: The truncated vectors.
+        """
+        if dimensions is None or dimensions >= vectors.shape[1]:
+            return vectors
+        truncated = np.ascontiguousarray(vectors[:, :dimensions])
+        norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+        return truncated / np.where(norms == 0, 1, norms)
+
+    @staticmethod
+    def _knob(index: faiss.Index) -> Optional[str]:
+        """
+        Get the search parameter of an index type.
+
+        Args:
+            index (faiss.Index): The index.
+
+        Returns:
+            Optional[str]: `nprobe`, `efSearch` or None for indexes without a knob.
+        """
+        try:
+            faiss.extract_index_ivf(index)
+            return "nprobe"
+        except RuntimeError:
+            pass
+        return "efSearch" if hasattr(index, "hnsw") else None
+
+    def _search(
+        self,
+        index: faiss.Index,
+        queries: np.ndarray,
+        full_vectors: Optional[np.ndarray] = None,
+    ) -> tuple[np.ndarray, list[float]]:
+        """
+        Search every query on its own.
+
+        Args:
+            index (faiss.Index): The index.
+            queries (np.ndarray): The query vectors.
+            full_vectors (Optional[np.ndarray]): The full precision vectors to re-rank the
+                candidates against. No re-ranking when None.
+
+        Returns:
+            tuple[np.ndarray, list[float]]: The neighbour positions per query and the
+                latency of every query in seconds.
+        """
+        neighbours = np.full((len(queries), self.k), -1, dtype=np.int64)
+        latencies: list[float] = []
+        for i, query in enumerate(queries):
+            started = time.perf_counter()
+            if full_vectors is None:
+                _, positions = index.search(query.reshape(1, -1), self.k)
+                found = positions[0]
+            else:
+                found, _ = FaissIndexFactory.rerank(
+                    index, full_vectors, query, self.k, self.rerank_factor * self.k
+                )
+            latencies.append(time.perf_counter() - started)
+            neighbours[i, : len(found)] = found
+        return neighbours, latencies
+
+    def _recall(self, neighbours: np.ndarray, truth: np.ndarray) -> float:
+        """
+        Get the share of the exact neighbours that were retrieved.
+
+        Args:
+            neighbours (np.ndarray): The retrieved positions per query.
+            truth (np.ndarray): The exact positions per query.
+
+        Returns:
+            float: The recall@k.
+        """
+        hits = sum(len(set(found) & set(exact)) for found, exact in zip(neighbours, truth))
+        return hits / truth.size if truth.size else 1.0
+
+    def run(self) -> list[dict]:
+        """
+        Build and search every index type at every number of dimensions.
+
+        Returns:
+            list[dict]: A row per number of dimensions, index type and knob value.
+        """
+        flat = FaissIndexFactory().build(self.vectors)
+        truth, _ = self._search(flat, self.queries)
+
+        rows: list[dict] = []
+        for dimensions in self.dimensions:
+            vectors = self.truncate(self.vectors, dimensions)
+            queries = self.truncate(self.queries, dimensions)
+            for index_type in self.index_types:
+                rows.extend(self._measure(index_type, vectors, queries, truth))
+            logger.info(
+                f"Measured {vectors.shape[1]} dimensions on {len(vectors)} vectors."
+            )
+        return rows
+
+    def _measure(
+        self, index_type: str, vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray
+    ) -> list[dict]:
+        """
+        Build an index type and search it with every value of its knob.
+
+        Args:
+            index_type (str): The `faiss.index_factory` string.
+            vectors (np.ndarray): The indexed vectors.
+            queries (np.ndarray): The query vectors.
+            truth (np.ndarray): The exact neighbours of the queries at full size.
+
+        Returns:
+            list[dict]: A row per knob value.
+        """
+        factory = FaissIndexFactory(index_type)
+        started = time.perf_counter()
+        index = factory.build(vectors)
+        build_seconds = time.perf_counter() - started
+        memory_mb = faiss.serialize_index(index).nbytes / 2**20
+
+        knob = self._knob(index)
+        values: list[Optional[int]] = [None]
+        if knob == "nprobe":
+            nlist = faiss.extract_index_ivf(index).nlist
+            values = [v for v in self.nprobe if v <= nlist] or [nlist]
+        elif knob == "efSearch":
+            values = self.ef_search
+
+        rows: list[dict] = []
+        for value in values:
+            if knob is not None:
+                faiss.ParameterSpace().set_index_parameter(index, knob, value)
+            neighbours, latencies = self._search(index, queries)
+            row = {
+                "dimensions": vectors.shape[1],
+                "type": index_type,
+                "params": {knob: value} if knob is not None else {},
+                f"recall@{self.k}": round(self._recall(neighbours, truth), 4),
+                "latency_ms": self._latency_ms(latencies),
+                "memory_mb": round(memory_mb, 3),
+                "build_seconds": round(build_seconds, 3),
+            }
+            if self.rerank_factor and not isinstance(index, faiss.IndexFlat):
+                neighbours, latencies = self._search(index, queries, vectors)
+                row[f"reranked_recall@{self.k}"] = round(self._recall(neighbours, truth), 4)
+                row["reranked_latency_ms"] = self._latency_ms(latencies)
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def _latency_ms(latencies: list[float]) -> dict:
+        """
+        Summarize query latencies.
+
+        Args:
+            latencies (list[float]): The latencies in seconds.
+
+        Returns:
+            dict: The p50 and p95 latencies in milliseconds.
+        """
+        return {
+            "p50": ChatLoadTest.percentile(latencies, 0.5) * 1000,
+            "p95": ChatLoadTest.percentile(latencies, 0.95) * 1000,
+        }
+
+    @classmethod
+    def main(cls, intent_value: Optional[str] = None, public: bool = False) -> int:
+        """
+        Print the report configured under `benchmark.index_tuning`.
+
+        Args:
+            intent_value (Optional[str]): The intent whose stored vectors are indexed. Uses
+                the synthetic benchmark corpus embedded with the fake embeddings when None.
+            public (bool): Whether to read the public index of the intent.
+
+        Returns:
+            int: 0
+        """
+        from chatbot.benchmark.SyntheticCorpus import SyntheticCorpus
+        from chatbot.dependencies.ModelLoader import ModelLoader
+        from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
+
+        config = Configuration.get("benchmark") or {}
+        settings = config.get("index_tuning") or {}
+        corpus = SyntheticCorpus.from_config(config.get("corpus"))
+        queries = corpus.questions(settings.get("queries", 200))
+
+        if intent_value is None:
+            embeddings = ModelLoader.load_model(
+                (config.get("models") or {}).get("embeddings", "fake_embeddings")
+            ).model
+            vectors = np.array(embeddings.embed_documents(corpus.chunks("benchmark")))
+        else:
+            embeddings = ModelLoader.load_model(
+                Configuration.get("document_embedder.embedding_model")
+            ).model
+            db = FaissIndexFactory.load_flat(
+                FaissIndexRegistry.index_dir(intent_value, public), embeddings
+            )
+            vectors = FaissIndexFactory.vectors(db.index)
+
+        report = cls(
+            vectors,
+            np.array(embeddings.embed_documents(queries)),
+            k=settings.get("k", 4),
+            index_types=settings.get("types", ["Flat", "HNSW32", "IVF{nlist},Flat", "SQ8"]),
+            nprobe=settings.get("nprobe", [1, 4, 16, 64]),
+            ef_search=settings.get("ef_search", [16, 32, 64, 128]),
+            dimensions=settings.get("dimensions", [None]),
+            rerank_factor=settings.get("rerank_factor"),
+        )
+        print(json.dumps(report.run(), indent=2))
+        return 0
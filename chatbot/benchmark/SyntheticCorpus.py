@@ -0,0 +1,134 @@
+import pathlib
+import random
+from typing import Iterable, Optional
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
+from chatbot.logger import logger
+
+
+class SyntheticCorpus:
+    """
+    Randomly generated chunks standing in for the documents of every intent.
+
+    The chunks are drawn from a campus vocabulary, so questions built from them retrieve
+    plausible neighbours. The corpus is seeded: the same settings always produce the same
+    chunks and questions, which keeps benchmark runs comparable.
+    """
+
+    _WORDS = (
+        "mahasiswa dosen jadwal kuliah krs khs semester ujian nilai transkrip beasiswa ukt "
+        "pembayaran registrasi cuti akademik wisuda skripsi sidang pembimbing laboratorium "
+        "perpustakaan peminjaman buku ruang kelas gedung fakultas jurusan program studi "
+        "kurikulum mata sks prasyarat remedial yudisium ijazah legalisir surat keterangan "
+        "aktif portal akun email password reset wifi kampus layanan helpdesk tiket bantuan "
+        "asrama parkir kartu identitas organisasi kegiatan seminar magang kerja praktik "
+        "pengumuman kalender libur pendaftaran seleksi penerimaan dokumen syarat formulir "
+        "verifikasi validasi batas waktu tanggal pukul hari minggu bulan tahun biaya denda"
+    ).split()
+
+    def __init__(self, chunks_per_intent: int = 1000, words_per_chunk: int = 80, seed: int = 0):
+        """
+        Initializes the synthetic corpus.
+
+        Args:
+            chunks_per_intent (int): The number of chunks of every intent index.
+            words_per_chunk (int): The number of words of a chunk.
+            seed (int): The seed of the generated text.
+        """
+        self.chunks_per_intent = chunks_per_intent
+        self.words_per_chunk = words_per_chunk
+        self.seed = seed
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "SyntheticCorpus":
+        """
+        Create a corpus from the `benchmark.corpus` settings.
+
+        Args:
+            config (Optional[dict]): The corpus settings.
+
+        Returns:
+            SyntheticCorpus: The corpus.
+        """
+        config = config or {}
+        return cls(
+            chunks_per_intent=config.get("chunks_per_intent", 1000),
+            words_per_chunk=config.get("words_per_chunk", 80),
+            seed=config.get("seed", 0),
+        )
+
+    def chunks(self, intent_value: str) -> list[str]:
+        """
+        Generate the chunks of an intent.
+
+        Args:
+            intent_value (str): The value of the intent.
+
+        Returns:
+            list[str]: The chunks.
+        """
+        rng = random.Random(f"{self.seed}:{intent_value}")
+        return [
+            " ".join(rng.choices(self._WORDS, k=self.words_per_chunk))
+            for _ in range(self.chunks_per_intent)
+        ]
+
+    def questions(self, count: int) -> list[str]:
+        """
+        Generate questions about the corpus.
+
+        Args:
+            count (int): The number of questions.
+
+        Returns:
+            list[str]: The questions.
+        """
+        rng = random.Random(f"{self.seed}:questions")
+        return [
+            f"Bagaimana {' '.join(rng.choices(self._WORDS, k=rng.randint(4, 10)))}?"
+            for _ in range(count)
+        ]
+
+    def build(
+        self,
+        embeddings: Embeddings,
+        root: pathlib.Path,
+        intent_values: Iterable[str],
+        public: bool = True,
+        private: bool = True,
+    ) -> dict[str, int]:
+        """
+        Embed the corpus and save an index per intent under `root`.
+
+        Args:
+            embeddings (Embeddings): The embedding function of the indexes.
+            root (pathlib.Path): The directory of the indexes.
+            intent_values (Iterable[str]): The intents to build an index for.
+            public (bool): Whether to build the public indexes.
+            private (bool): Whether to build the internal indexes.
+
+        Returns:
+            dict[str, int]: The number of chunks per index directory name.
+        """
+        sizes: dict[str, int] = {}
+        for intent_value in intent_values:
+            chunks = self.chunks(intent_value)
+            vectors = embeddings.embed_documents(chunks)
+            names = ([intent_value] if private else []) + (
+                [f"{intent_value}_public"] if public else []
+            )
+            for name in names:
+                db = FAISS.from_embeddings(
+                    list(zip(chunks, vectors)),
+                    embeddings,
+                    metadatas=[
+                        {"source": f"synthetic/{intent_value}/{i}"} for i in range(len(chunks))
+                    ],
+                )
+                FaissIndexRegistry.save(db, root / name)
+                sizes[name] = len(chunks)
+            logger.info(f"Built synthetic index for {intent_value}: {len(chunks)} chunks.")
+        return sizes
@@ -44,6 +44,87 @@ class ChatbotApplication:
         command.upgrade(alembic_cfg, "head")
         return 0
 
+    def worker(self, concurrency: int = None):
+        """
+        Runs the ingestion worker, embedding queued documents and questions.
+
+        Args:
+            concurrency (int): The number of jobs run at once. Defaults to the configuration.
+        """
+        from chatbot.config import Configuration
+        from chatbot.dependencies.IngestionWorker import IngestionWorker
+        from chatbot.logger import configure_logging
+
+        configure_logging()
+
+        config = Configuration.get("ingestion_queue") or {}
+        if config.get("nice"):
+            # Yield the CPU to API processes sharing the machine.
+            os.nice(config["nice"])
+
+        IngestionWorker.from_config(config, concurrency).run()
+        return 0
+
+    def benchmark(
+        self,
+        url: str = None,
+        concurrency: int = None,
+        requests: int = None,
+        update_baseline: bool = False,
+    ):
+        """
+        Load tests `/chat/prompt` and compares the run with the benchmark baseline.
+
+        Args:
+            url (str): The base URL of a running server. Runs in process on fake models and
+                a synthetic corpus when not given.
+            concurrency (int): The number of requests in flight. Defaults to the configuration.
+            requests (int): The number of measured requests. Defaults to the configuration.
+            update_baseline (bool): Whether to store this run as the new baseline.
+        """
+        from chatbot.benchmark.ChatLoadTest import ChatLoadTest
+        from chatbot.logger import configure_logging
+
+        configure_logging()
+        return ChatLoadTest.main(url, concurrency, requests, update_baseline)
+
+    def benchmark_index(self, intent: str = None, public: bool = False):
+        """
+        Prints the recall-vs-latency report of the FAISS index types against a flat index.
+
+        Args:
+            intent (str): The intent whose index vectors are used. Uses the synthetic
+                benchmark corpus when not given.
+            public (bool): Whether to use the public index of the intent.
+        """
+        from chatbot.benchmark.IndexTuningReport import IndexTuningReport
+        from chatbot.logger import configure_logging
+
+        configure_logging()
+        return IndexTuningReport.main(intent, public)
+
+    def compact(self):
+        """
+        Folds the appended segments of every FAISS index into its main index.
+        """
+        from chatbot.config import Configuration
+        from chatbot.dependencies.ModelLoader import ModelLoader
+        from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
+        from chatbot.dependencies.vectorstore.FaissIndexWriter import FaissIndexWriter
+
+        embedding_model = ModelLoader.load_model(
+            Configuration.get("document_embedder.embedding_model")
+        )
+
+        faiss_root_dir = FaissIndexRegistry.root
+        if not faiss_root_dir.exists():
+            return 0
+
+        for faiss_dir in faiss_root_dir.iterdir():
+            if faiss_dir.is_dir():
+                FaissIndexWriter(faiss_dir, embedding_model.model).compact()
+        return 0
+
 
 def cli():
     fire.Fire(ChatbotApplication)
@@ -1,23 +1,84 @@
 import os
 
 from sqlalchemy import Column, DateTime, func
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 
-# engine = create_async_engine(db_url, pool_size=100, max_overflow=0)
-engine = create_engine(
-    os.getenv("DATABASE_URL"),
-    pool_size=10,  # Increase pool size
-    max_overflow=20,  # Increase overflow limit
-    pool_timeout=30,  # Adjust timeout as needed
-)
+ASYNC_DRIVERS = {
+    "mysql": "aiomysql",
+    "mariadb": "aiomysql",
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+"""The async driver used for each database backend."""
+
+
+def async_database_url(url: str) -> str:
+    """
+    Converts a database URL to the same database behind an async driver.
+
+    `mysql+mysqlconnector://...` becomes `mysql+aiomysql://...`, `sqlite://...` becomes
+    `sqlite+aiosqlite://...`. URLs that already name an async driver are kept.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        str: The database URL with an async driver.
+    """
+    parsed = make_url(url)
+    if parsed.get_dialect().is_async:
+        return url
+
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver known for {parsed.get_backend_name()}.")
+
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(
+        hide_password=False
+    )
+
 
+def pool_options(url: str) -> dict:
+    """
+    Gets the connection pool settings of an engine.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        dict: The keyword arguments of the engine.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+
+    return {
+        "pool_size": 10,  # Increase pool size
+        "max_overflow": 20,  # Increase overflow limit
+        "pool_timeout": 30,  # Adjust timeout as needed
+        "pool_pre_ping": True,
+    }
+
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+
+# Used by the ingestion worker, the CLI and the migrations.
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Used by the API, so queries never block the event loop.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP
+from sqlalchemy import Column, Integer, String, TIMESTAMP, Text
 from chatbot.database import Base, TimeStampMixin
 
 
@@ -11,3 +11,6 @@ class Conversation(Base, TimeStampMixin):
     user_id = Column(Integer, nullable=False)
     user_type = Column(Integer, nullable=False)
     start_time = Column(TIMESTAMP, nullable=False)
+    # Rolling summary of the turns up to and including message `summary_message_id`.
+    summary = Column(Text, nullable=True)
+    summary_message_id = Column(Integer, nullable=True)
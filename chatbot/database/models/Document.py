@@ -1,4 +1,13 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, Boolean, ForeignKey
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    TIMESTAMP,
+    Boolean,
+    ForeignKey,
+    JSON,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship, mapped_column, Mapped
 
 from chatbot.database import Base, TimeStampMixin
@@ -7,6 +16,16 @@ from chatbot.database import Base, TimeStampMixin
 
 class Document(Base, TimeStampMixin):
     __tablename__ = "documents"
+    # Serves the duplicate lookup of uploads, and makes the later of two concurrent uploads
+    # of the same content fail instead of inserting it twice.
+    __table_args__ = (
+        UniqueConstraint(
+            "content_hash",
+            "intent",
+            "public",
+            name="uq_documents_content_hash_intent_public",
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     uuid = Column(String(length=255), nullable=False, unique=True)
@@ -18,6 +37,11 @@ class Document(Base, TimeStampMixin):
     intent = Column(String(length=255), nullable=False)
     public = Column(Boolean, nullable=False, default=False)
     file_path = Column(String(length=500), nullable=True)
+    content_hash = Column(String(length=64), nullable=True)
+    # Ids of the chunks the document added, per FAISS index directory name.
+    vector_ids = Column(JSON, nullable=True)
+    # Seconds spent in each stage of the last ingestion (parse, split, embed, write, ...).
+    ingestion_timings = Column(JSON, nullable=True)
 
     def __repr__(self):
         return f"<Document(id={self.id}, uuid={self.uuid}, name={self.name}, uploader_id={self.uploader_id}, embedded={self.embedded})>"
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON
+
+from chatbot.database import Base, TimeStampMixin
+
+
+class Job(Base, TimeStampMixin):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(length=64), nullable=False)
+    payload = Column(JSON, nullable=False)
+    # queued, running, succeeded or failed
+    status = Column(String(length=32), nullable=False, default="queued", index=True)
+    # Comma separated FAISS index directory names; jobs sharing an index run in id order.
+    index_keys = Column(String(length=1000), nullable=False, default="")
+
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(DateTime, nullable=True)
+    locked_by = Column(String(length=255), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+
+    stage = Column(String(length=64), nullable=True)
+    progress = Column(Float, nullable=False, default=0.0)
+    error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+
+    def __repr__(self):
+        return f"<Job(id={self.id}, kind={self.kind}, status={self.status}, attempts={self.attempts})>"
+
+    def __str__(self):
+        return f"Job(id={self.id}, kind={self.kind}, status={self.status}, attempts={self.attempts})"
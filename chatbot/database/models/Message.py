@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, Enum, Text
+from sqlalchemy import Column, Integer, String, TIMESTAMP, Enum, Text, Index
 from chatbot.database import Base, TimeStampMixin
 
 
 class Message(Base, TimeStampMixin):
     __tablename__ = "messages"
+    # Serves the "latest turns of a conversation" query of ConversationHistory, which
+    # orders by id: MySQL reads the last rows of the index instead of sorting them all.
+    __table_args__ = (Index("ix_messages_conversation_id_id", "conversation_id", "id"),)
 
     id = Column(Integer, primary_key=True)
     conversation_id = Column(Integer, nullable=False)
@@ -1,6 +1,7 @@
-from typing import Type, List
+from typing import Type, List, Optional
 
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, relationship, Mapped
 
 from chatbot.database import Base, TimeStampMixin
@@ -24,3 +25,10 @@ class Staff(Base, TimeStampMixin):
         cls, session: Session, staff_number: str
     ) -> Type["Staff"]:
         return session.query(cls).filter_by(staff_number=staff_number).first()
+
+    @classmethod
+    async def get_user_by_staff_number_async(
+        cls, session: AsyncSession, staff_number: str
+    ) -> Optional["Staff"]:
+        result = await session.execute(select(cls).filter_by(staff_number=staff_number))
+        return result.scalars().first()
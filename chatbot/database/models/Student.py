@@ -1,6 +1,7 @@
-from typing import Type
+from typing import Optional, Type
 
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from chatbot.database import Base, TimeStampMixin
@@ -30,3 +31,20 @@ class Student(Base, TimeStampMixin):
             Student: The user with the given student number.
         """
         return db.query(cls).filter_by(student_number=student_number).first()
+
+    @classmethod
+    async def get_user_by_student_number_async(
+        cls, db: AsyncSession, student_number: str
+    ) -> Optional["Student"]:
+        """
+        Returns the user with the given student number, without blocking the event loop.
+
+        Args:
+            db (AsyncSession): The async database session.
+            student_number (str): The student number of the user.
+
+        Returns:
+            Student: The user with the given student number.
+        """
+        result = await db.execute(select(cls).filter_by(student_number=student_number))
+        return result.scalars().first()
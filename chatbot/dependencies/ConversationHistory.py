@@ -0,0 +1,374 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from chatbot.database import AsyncSessionLocal
+from chatbot.database.models.Conversation import Conversation
+from chatbot.database.models.Message import Message
+from chatbot.dependencies.HistoryCompactor import HistoryCompactor
+from chatbot.dependencies.utils.PrincipalCache import Principal
+from chatbot.logger import logger
+
+
+class CachedConversation:
+    """
+    The recent turns and the rolling summary of a conversation, as cached in memory.
+    """
+
+    def __init__(
+        self,
+        conversation_id: int,
+        owner: tuple[int, int],
+        turns: deque,
+        summary: Optional[str],
+        summary_message_id: Optional[int],
+    ):
+        """
+        Initializes the cached conversation.
+
+        Args:
+            conversation_id (int): The id of the conversation.
+            owner (tuple[int, int]): The user id and user type of the owner.
+            turns (deque): The recent `(message id, turn)` pairs, oldest first.
+            summary (Optional[str]): The rolling summary of the conversation.
+            summary_message_id (Optional[int]): The last message folded into the summary.
+        """
+        self.loaded_at = time.monotonic()
+        self.conversation_id = conversation_id
+        self.owner = owner
+        self.turns = turns
+        self.summary = summary
+        self.summary_message_id = summary_message_id
+
+    def pending(self) -> list[tuple[int, dict]]:
+        """
+        Get the turns that are not folded into the summary yet.
+
+        Returns:
+            list[tuple[int, dict]]: The `(message id, turn)` pairs, oldest first.
+        """
+        last = self.summary_message_id or 0
+        return [(message_id, turn) for message_id, turn in self.turns if message_id > last]
+
+
+class ConversationHistory:
+    """
+    Recent turns of conversations, served from memory.
+
+    The last `max_turns` turns of a conversation are read once, with a single query in
+    insertion order, and kept parsed in a least-recently-used cache together with the
+    owner and the rolling summary of the conversation. Stored turns are written to the
+    database and to the cache at once, so a chat turn usually needs no history query.
+    Entries expire after `ttl_seconds`, which bounds how stale a conversation continued on
+    another worker process can be.
+
+    Once `2 * keep_turns` turns are not summarized yet, all but the last `keep_turns` of
+    them are folded into the summary of the conversation by the `HistoryCompactor`, in the
+    background.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 8,
+        keep_turns: int = 4,
+        token_budget: int = 2000,
+        cache_size: int = 1024,
+        ttl_seconds: float = 300.0,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        compactor: Optional[HistoryCompactor] = None,
+    ):
+        """
+        Initializes the conversation history.
+
+        Args:
+            max_turns (int): The maximum number of recent turns kept per conversation.
+            keep_turns (int): The number of recent turns never folded into the summary.
+            token_budget (int): The maximum estimated number of tokens of the returned turns.
+            cache_size (int): The maximum number of cached conversations.
+            ttl_seconds (float): How long a cached conversation stays valid.
+            session_factory (Callable[[], AsyncSession]): The factory of database sessions.
+            compactor (Optional[HistoryCompactor]): Summarizes old turns. None disables
+                summaries.
+        """
+        self._max_turns = max_turns
+        self._keep_turns = keep_turns
+        self._token_budget = token_budget
+        self._cache_size = cache_size
+        self._ttl_seconds = ttl_seconds
+        self._session_factory = session_factory
+        self._compactor = compactor
+        self._entries: OrderedDict[str, CachedConversation] = OrderedDict()
+        self._lock = threading.Lock()
+        self._folding: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[dict], compactor: Optional[HistoryCompactor] = None
+    ) -> "ConversationHistory":
+        """
+        Create a conversation history from the `conversation_history` settings.
+
+        Args:
+            config (Optional[dict]): The history settings.
+            compactor (Optional[HistoryCompactor]): Summarizes old turns.
+
+        Returns:
+            ConversationHistory: The conversation history.
+        """
+        return cls(**(config or {}), compactor=compactor)
+
+    @staticmethod
+    def _owner(user: Principal) -> tuple[int, int]:
+        """
+        Get the owner key of the conversations of a user.
+
+        Args:
+            user (Principal): The user.
+
+        Returns:
+            tuple[int, int]: The user id and the user type stored on its conversations.
+        """
+        return user.id, user.type.value
+
+    async def recent(
+        self, conversation_uuid: str, user: Principal
+    ) -> Optional[tuple[Optional[str], list[dict]]]:
+        """
+        Get the summary and the recent turns of a conversation.
+
+        Only the turns that are not folded into the summary and fit the token budget are
+        returned.
+
+        Args:
+            conversation_uuid (str): The UUID of the conversation.
+            user (Principal): The user the conversation must belong to.
+
+        Returns:
+            Optional[tuple[Optional[str], list[dict]]]: The summary and the turns, oldest
+                first, as `{"U": ..., "A": ...}`. None if the user has no such conversation.
+        """
+        entry = self._get(conversation_uuid)
+        if entry is None:
+            entry = await self._load(conversation_uuid)
+            if entry is None:
+                return None
+
+        if entry.owner != self._owner(user):
+            return None
+
+        with self._lock:
+            turns = [turn for _, turn in entry.pending()]
+            summary = entry.summary
+
+        return summary, HistoryCompactor.fit(turns, self._token_budget)
+
+    async def append(
+        self, conversation_uuid: str, user: Principal, user_message: str, assistant_message: str
+    ) -> bool:
+        """
+        Store a turn of a conversation, in the database and in the cache.
+
+        Args:
+            conversation_uuid (str): The UUID of the conversation.
+            user (Principal): The user the conversation must belong to.
+            user_message (str): The message of the user.
+            assistant_message (str): The answer of the assistant.
+
+        Returns:
+            bool: False if the user has no such conversation.
+        """
+        turn = {"U": user_message, "A": assistant_message}
+        entry = self._get(conversation_uuid)
+
+        async with self._session_factory() as db:
+            if entry is not None:
+                conversation_id, owner = entry.conversation_id, entry.owner
+            else:
+                conversation = await db.scalar(
+                    select(Conversation).filter_by(uuid=conversation_uuid)
+                )
+                if conversation is None:
+                    return False
+                conversation_id = conversation.id
+                owner = (conversation.user_id, conversation.user_type)
+
+            if owner != self._owner(user):
+                return False
+
+            message = Message()
+            message.conversation_id = conversation_id
+            message.text = json.dumps(turn)
+
+            db.add(message)
+            await db.commit()
+
+        if entry is not None:
+            with self._lock:
+                entry.turns.append((message.id, turn))
+            self._schedule_fold(conversation_uuid, entry)
+
+        return True
+
+    def _get(self, conversation_uuid: str) -> Optional[CachedConversation]:
+        """
+        Get a cached conversation.
+
+        Args:
+            conversation_uuid (str): The UUID of the conversation.
+
+        Returns:
+            Optional[CachedConversation]: The cached conversation, None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(conversation_uuid)
+            if entry is not None and time.monotonic() - entry.loaded_at <= self._ttl_seconds:
+                self._entries.move_to_end(conversation_uuid)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[conversation_uuid]
+
+            self.misses += 1
+            return None
+
+    async def _load(self, conversation_uuid: str) -> Optional[CachedConversation]:
+        """
+        Read a conversation and its recent turns, and cache them.
+
+        Args:
+            conversation_uuid (str): The UUID of the conversation.
+
+        Returns:
+            Optional[CachedConversation]: The cached conversation, None if it does not exist.
+        """
+        async with self._session_factory() as db:
+            conversation = await db.scalar(
+                select(Conversation).filter_by(uuid=conversation_uuid)
+            )
+            if conversation is None:
+                return None
+
+            rows = (
+                await db.execute(
+                    select(Message.id, Message.text)
+                    .filter_by(conversation_id=conversation.id)
+                    # Ids grow with every insert; timestamps can tie or come from skewed
+                    # clocks and would reorder turns.
+                    .order_by(Message.id.desc())
+                    .limit(self._max_turns)
+                )
+            ).all()
+
+        entry = CachedConversation(
+            conversation.id,
+            (conversation.user_id, conversation.user_type),
+            deque(
+                ((message_id, json.loads(text)) for message_id, text in reversed(rows)),
+                maxlen=self._max_turns,
+            ),
+            conversation.summary,
+            conversation.summary_message_id,
+        )
+
+        with self._lock:
+            self._entries[conversation_uuid] = entry
+            self._entries.move_to_end(conversation_uuid)
+            while len(self._entries) > self._cache_size:
+                self._entries.popitem(last=False)
+
+        logger.debug(f"Loaded {len(rows)} turns of conversation {conversation_uuid}")
+        return entry
+
+    def _schedule_fold(self, conversation_uuid: str, entry: CachedConversation) -> None:
+        """
+        Fold old turns into the summary in the background once enough of them piled up.
+
+        Args:
+            conversation_uuid (str): The UUID of the conversation.
+            entry (CachedConversation): The cached conversation.
+
+        Returns:
+            None
+        """
+        if self._compactor is None:
+            return
+
+        with self._lock:
+            threshold = min(2 * self._keep_turns, self._max_turns)
+            if len(entry.pending()) < threshold or conversation_uuid in self._folding:
+                return
+            self._folding.add(conversation_uuid)
+
+        task = asyncio.create_task(self._fold(conversation_uuid, entry))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fold(self, conversation_uuid: str, entry: CachedConversation) -> None:
+        """
+        Fold all but the last `keep_turns` pending turns into the summary.
+
+        Args:
+            conversation_uuid (str): The UUID of the conversation.
+            entry (CachedConversation): The cached conversation.
+
+        Returns:
+            None
+        """
+        try:
+            with self._lock:
+                pending = entry.pending()
+                summary = entry.summary
+            folded = pending[: len(pending) - self._keep_turns]
+            if not folded:
+                return
+
+            summary = await self._compactor.summarize(summary, [turn for _, turn in folded])
+            last_message_id = folded[-1][0]
+
+            async with self._session_factory() as db:
+                await db.execute(
+                    update(Conversation)
+                    .where(
+                        Conversation.id == entry.conversation_id,
+                        or_(
+                            Conversation.summary_message_id.is_(None),
+                            Conversation.summary_message_id < last_message_id,
+                        ),
+                    )
+                    .values(summary=summary, summary_message_id=last_message_id)
+                )
+                await db.commit()
+
+            with self._lock:
+                entry.summary = summary
+                entry.summary_message_id = last_message_id
+
+            logger.debug(f"Folded {len(folded)} turns of conversation {conversation_uuid}")
+        except Exception as e:
+            logger.error(f"Error summarizing conversation {conversation_uuid}: {e}")
+        finally:
+            with self._lock:
+                self._folding.discard(conversation_uuid)
+
+    def invalidate(self, conversation_uuid: str) -> None:
+        """
+        Drop a cached conversation.
+
+        Args:
+            conversation_uuid (str): The UUID of the conversation.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.pop(conversation_uuid, None)
@@ -1,15 +1,22 @@
 import importlib
+import pathlib
+import uuid
+from typing import Callable
 
 from langchain_community import document_loaders
 from langchain_community.document_loaders.base import BaseLoader
 from langchain_core.documents import Document
 from langchain_text_splitters import TextSplitter
 
+from .EmbeddingPipeline import EmbeddingPipeline
+from .IngestionJob import IngestionJob
 from .IntentClassifier import Intent
 from .ModelLoader import ModelLoader
 from .contracts.TextEmbedder import TextEmbedder
-from .utils.path_utils import project_path
+from .vectorstore.ChunkStore import ChunkStore
+from .vectorstore.FaissIndexRegistry import FaissIndexRegistry
 from ..config import Configuration
+from ..logger import logger
 
 
 class DocumentEmbedder:
@@ -42,6 +49,17 @@ class DocumentEmbedder:
             "document_embedder.text_splitter"
         )
         self._text_splitter: TextSplitter = self._get_text_splitter()
+        self._ingestion_config: dict = (
+            Configuration.get("document_embedder.ingestion") or {}
+        )
+        self._embedding_pipeline: EmbeddingPipeline = EmbeddingPipeline.from_config(
+            self._embedding_model.model,
+            Configuration.get("document_embedder.embedding_pipeline"),
+        )
+        self._chunk_store: ChunkStore | None = ChunkStore.from_config(
+            Configuration.get("document_embedder.chunk_store"),
+            self._embedding_model.model_name,
+        )
 
     @staticmethod
     def __new__(cls, *args, **kwargs):
@@ -64,12 +82,85 @@ class DocumentEmbedder:
             RuntimeError: document can't be saved.
         """
         try:
-            raw_doc = self._load_document(doc_path)
-            documents = self._split_raw_document(raw_doc)
-            self._save_to_faiss_index(documents, doc_category)
+            IngestionJob(self, doc_path, [self._index_dir(doc_category)]).run()
         except Exception as e:
             raise RuntimeError(f"Error saving document to vectorstore: {e}")
 
+    def ingest(
+        self,
+        doc_path: str,
+        doc_categories: list[Intent],
+        public: bool = False,
+        previous_vector_ids: dict[str, list[str]] | None = None,
+        on_stage: Callable[[str, float], None] | None = None,
+    ) -> IngestionJob:
+        """
+        Saves a document to the vectorstorage of every given category in a single pass.
+
+        The document is loaded, split and embedded once; the same vectors are then written
+        to the index of each category, and to its public index too when `public` is set.
+        When `previous_vector_ids` is given, the chunks of the previous version of the
+        document are removed afterwards, so chunks both versions share never disappear
+        from the indexes.
+
+        Args:
+            doc_path (str): The path to the document.
+            doc_categories (list[Intent]): The types of the document.
+            public (bool): Whether the document is public.
+            previous_vector_ids (dict[str, list[str]] | None): The chunk ids of the previous
+                version of the document, per index directory name.
+            on_stage (Callable[[str, float], None] | None): Called when each stage starts,
+                with its name and the share of the job done.
+
+        Returns:
+            IngestionJob: The finished job, with the chunk ids and the stage timings.
+
+        Raises:
+            RuntimeError: document can't be saved.
+        """
+        faiss_dirs = [
+            FaissIndexRegistry.root / name for name in self.index_names(doc_categories, public)
+        ]
+
+        try:
+            return IngestionJob(
+                self, doc_path, faiss_dirs, previous_vector_ids, on_stage
+            ).run()
+        except Exception as e:
+            raise RuntimeError(f"Error saving document to vectorstore: {e}")
+
+    def delete_from_vectorstores(self, vector_ids: dict[str, list[str]] | None) -> None:
+        """
+        Removes the chunks of a document from the vectorstorage.
+
+        Chunks are removed by appending tombstones to their indexes. With the chunk store
+        enabled, a chunk is only removed once no other document references it.
+
+        Args:
+            vector_ids (dict[str, list[str]] | None): The chunk ids, per index directory name.
+
+        Returns:
+            None
+
+        Raises:
+            RuntimeError: the chunks can't be removed.
+        """
+        if not vector_ids:
+            return
+
+        try:
+            for index_name, ids in vector_ids.items():
+                if self._chunk_store is not None:
+                    ids = self._chunk_store.remove_members(index_name, ids)
+                if not ids:
+                    continue
+
+                self._embedding_model.delete_from_faiss_index(
+                    ids, FaissIndexRegistry.root / index_name, self._compact_after_segments()
+                )
+        except Exception as e:
+            raise RuntimeError(f"Error deleting document from vectorstore: {e}")
+
     def save_public_document_to_vectorstore(
         self, doc_path: str, doc_category: Intent
     ) -> None:
@@ -87,9 +178,7 @@ class DocumentEmbedder:
             RuntimeError: document can't be saved.
         """
         try:
-            raw_doc = self._load_document(doc_path)
-            documents = self._split_raw_document(raw_doc)
-            self._save_public_to_faiss_index(documents, doc_category)
+            IngestionJob(self, doc_path, [self._index_dir(doc_category, public=True)]).run()
         except Exception as e:
             raise RuntimeError(f"Error saving document to vectorstore: {e}")
 
@@ -142,45 +231,197 @@ class DocumentEmbedder:
         """
         return self._text_splitter.split_documents(raw_doc)
 
-    def _save_to_faiss_index(self, documents: list[Document], category: Intent) -> None:
+    def _embed_documents(
+        self, documents: list[Document]
+    ) -> tuple[list[Document], list[list[float]], list[str]]:
+        """
+        Embeds document chunks in provider sized, concurrent batches.
+
+        With the chunk store enabled, duplicate chunks are dropped and only chunks that were
+        never embedded before are sent to the provider; the chunk hashes become the ids of
+        the chunks in the indexes. Without it the chunks get random ids.
+
+        Args:
+            documents (list[Document]): The document chunks.
+
+        Returns:
+            tuple[list[Document], list[list[float]], list[str]]: The unique chunks, their
+                embeddings and their ids.
+        """
+        if self._chunk_store is None:
+            vectors = self._embedding_pipeline.embed([doc.page_content for doc in documents])
+            return documents, vectors, [uuid.uuid4().hex for _ in documents]
+
+        unique: dict[str, Document] = {}
+        for doc in documents:
+            unique.setdefault(self._chunk_store.chunk_hash(doc.page_content), doc)
+        ids = list(unique)
+
+        vectors = self._chunk_store.get_vectors(ids)
+        missing = [_id for _id in ids if _id not in vectors]
+        if missing:
+            embedded = self._embedding_pipeline.embed(
+                [unique[_id].page_content for _id in missing]
+            )
+            self._chunk_store.put_vectors(
+                [
+                    (_id, unique[_id].page_content, vector)
+                    for _id, vector in zip(missing, embedded)
+                ]
+            )
+            vectors.update(zip(missing, embedded))
+
+        logger.debug(
+            f"Embedded {len(missing)} new chunks, reused {len(ids) - len(missing)} "
+            f"and dropped {len(documents) - len(ids)} duplicates."
+        )
+        return list(unique.values()), [vectors[_id] for _id in ids], ids
+
+    def _save_to_faiss_index(
+        self,
+        documents: list[Document],
+        category: Intent,
+        vectors: list[list[float]],
+        ids: list[str],
+    ) -> None:
         """
         Saves a document to the FAISS index.
 
         Args:
             documents (list[Document]): The document to be saved.
+            category (Intent): The type of the document.
+            vectors (list[list[float]]): The embeddings of the document chunks.
+            ids (list[str]): The ids of the document chunks.
 
         Returns:
             None
         """
-        faiss_root_dir = project_path("faiss")
-        faiss_category_dir = faiss_root_dir / category.value
-
-        if not faiss_category_dir.exists():
-            self._embedding_model.save_to_faiss_index(documents, faiss_category_dir)
-            return
+        faiss_category_dir = self._index_dir(category)
 
-        self._embedding_model.add_data_to_faiss_index(documents, faiss_category_dir)
+        self._write_to_faiss_index(documents, vectors, ids, faiss_category_dir)
 
     def _save_public_to_faiss_index(
-        self, documents: list[Document], category: Intent
+        self,
+        documents: list[Document],
+        category: Intent,
+        vectors: list[list[float]],
+        ids: list[str],
     ) -> None:
         """
         Saves a public document to the FAISS index.
 
         Args:
             documents (list[Document]): The document to be saved.
+            category (Intent): The type of the document.
+            vectors (list[list[float]]): The embeddings of the document chunks.
+            ids (list[str]): The ids of the document chunks.
 
         Returns:
             None
         """
-        faiss_root_dir = project_path("faiss")
-        faiss_category_dir = faiss_root_dir / (category.value + "_public")
+        faiss_category_dir = self._index_dir(category, public=True)
 
-        if not faiss_category_dir.exists():
-            self._embedding_model.save_to_faiss_index(documents, faiss_category_dir)
-            return
+        self._write_to_faiss_index(documents, vectors, ids, faiss_category_dir)
+
+    @staticmethod
+    def index_names(doc_categories: list[Intent], public: bool = False) -> list[str]:
+        """
+        Gets the names of the FAISS indexes a document of the given categories is written to.
+
+        Args:
+            doc_categories (list[Intent]): The types of the document.
+            public (bool): Whether the document is public.
+
+        Returns:
+            list[str]: The names of the index directories.
+        """
+        names = []
+        for doc_category in doc_categories:
+            if public:
+                names.append(DocumentEmbedder._index_dir(doc_category, public=True).name)
+            names.append(DocumentEmbedder._index_dir(doc_category).name)
+        return names
+
+    @staticmethod
+    def _index_dir(category: Intent, public: bool = False) -> pathlib.Path:
+        """
+        Gets the directory of the FAISS index of a category.
+
+        Args:
+            category (Intent): The type of the documents.
+            public (bool): Whether to get the public index.
+
+        Returns:
+            pathlib.Path: The directory of the FAISS index.
+        """
+        return FaissIndexRegistry.index_dir(category.value, public)
+
+    def _compact_after_segments(self) -> int | None:
+        """
+        Gets the number of index segments that triggers a compaction.
+
+        In `rewrite` mode every write is compacted into the main index right away.
+
+        Returns:
+            int | None: The number of segments.
+        """
+        if self._ingestion_config.get("mode", "incremental") == "incremental":
+            return self._ingestion_config.get("compact_after_segments", 20)
+        return 1
+
+    def _write_to_faiss_index(
+        self,
+        documents: list[Document],
+        vectors: list[list[float]],
+        ids: list[str],
+        faiss_dir: pathlib.Path,
+    ) -> None:
+        """
+        Writes embedded documents to a FAISS index using the configured ingestion mode.
+
+        In `incremental` mode the documents are appended as a new segment of the index;
+        in `rewrite` mode the whole index is loaded, extended and saved again. Chunks the
+        index already contains according to the chunk store are skipped, but still gain a
+        reference.
+
+        Args:
+            documents (list[Document]): The documents to be saved.
+            vectors (list[list[float]]): The embeddings of the documents.
+            ids (list[str]): The ids of the documents.
+            faiss_dir (pathlib.Path): The directory of the FAISS index.
+
+        Returns:
+            None
+        """
+        new = list(range(len(ids)))
+        if self._chunk_store is not None:
+            if FaissIndexRegistry.read_version(faiss_dir) is None:
+                # The index was removed, so none of the chunks it had are there anymore.
+                self._chunk_store.clear_members(faiss_dir.name)
+
+            existing = self._chunk_store.members(faiss_dir.name, ids)
+            new = [i for i, _id in enumerate(ids) if _id not in existing]
+
+        if not new:
+            logger.debug(f"All {len(ids)} chunks are already in {faiss_dir}.")
+        elif self._ingestion_config.get("mode", "incremental") == "incremental":
+            self._embedding_model.append_to_faiss_index(
+                [documents[i] for i in new],
+                faiss_dir,
+                self._compact_after_segments(),
+                vectors=[vectors[i] for i in new],
+                ids=[ids[i] for i in new],
+            )
+        else:
+            self._embedding_model.add_embeddings_to_faiss_index(
+                [documents[i] for i in new],
+                [vectors[i] for i in new],
+                faiss_dir,
+                ids=[ids[i] for i in new],
+            )
 
-        self._embedding_model.add_data_to_faiss_index(documents, faiss_category_dir)
+        if self._chunk_store is not None:
+            self._chunk_store.add_members(faiss_dir.name, ids)
 
     def save_question_answer_to_vectorstore(
         self, question: str, answer: str, category: Intent
@@ -202,7 +443,8 @@ class DocumentEmbedder:
         try:
             data = str({"question.py": question, "answer": answer})
             documents = self._split_raw_document([Document(data)])
-            self._save_to_faiss_index(documents, category)
+            documents, vectors, ids = self._embed_documents(documents)
+            self._save_to_faiss_index(documents, category, vectors, ids)
         except Exception as e:
             raise RuntimeError(
                 f"Error saving question.py and answer to vectorstore: {e}"
@@ -228,7 +470,8 @@ class DocumentEmbedder:
         try:
             data = str({"question.py": question, "answer": answer})
             documents = self._split_raw_document([Document(data)])
-            self._save_public_to_faiss_index(documents, category)
+            documents, vectors, ids = self._embed_documents(documents)
+            self._save_public_to_faiss_index(documents, category, vectors, ids)
         except Exception as e:
             raise RuntimeError(
                 f"Error saving question.py and answer to vectorstore: {e}"
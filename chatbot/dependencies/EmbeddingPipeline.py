@@ -0,0 +1,285 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from langchain_core.embeddings import Embeddings
+
+from chatbot.logger import logger
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Concurrency limit that backs off when the provider rate limits us.
+
+    The limit is halved and every worker pauses on a rate limit response, then grows back
+    by one slot per successful request up to the configured maximum.
+    """
+
+    def __init__(self, max_concurrency: int):
+        """
+        Initializes the limiter.
+
+        Args:
+            max_concurrency (int): The maximum number of concurrent requests.
+        """
+        self._max_concurrency = max_concurrency
+        self._limit = max_concurrency
+        self._active = 0
+        self._resume_at = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """
+        Get the current concurrency limit.
+
+        Returns:
+            int: The current limit.
+        """
+        return self._limit
+
+    def acquire(self) -> None:
+        """
+        Wait until a request may be sent.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            while True:
+                pause = self._resume_at - time.monotonic()
+                if pause > 0:
+                    self._condition.wait(pause)
+                    continue
+                if self._active < self._limit:
+                    self._active += 1
+                    return
+                self._condition.wait()
+
+    def release(self) -> None:
+        """
+        Give a request slot back.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        """
+        Grow the limit back after a successful request.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            if self._limit < self._max_concurrency:
+                self._limit += 1
+                self._condition.notify_all()
+
+    def on_rate_limit(self, pause: float) -> None:
+        """
+        Halve the limit and pause every worker after a rate limit response.
+
+        Args:
+            pause (float): The number of seconds to pause.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            self._limit = max(1, self._limit // 2)
+            self._resume_at = max(self._resume_at, time.monotonic() + pause)
+
+
+class EmbeddingPipeline:
+    """
+    Embeds large lists of document chunks efficiently.
+
+    Texts are grouped into batches bounded by `batch_size` inputs and an estimated
+    `max_batch_tokens`, batches are sent concurrently up to `max_concurrency`, and rate
+    limit responses trigger an exponential, jittered backoff shared by every worker.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int = 256,
+        max_batch_tokens: int = 250_000,
+        max_concurrency: int = 4,
+        max_retries: int = 6,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        """
+        Initializes the embedding pipeline.
+
+        Args:
+            embeddings (Embeddings): The embeddings used for every batch.
+            batch_size (int): The maximum number of texts per request.
+            max_batch_tokens (int): The maximum estimated number of tokens per request.
+            max_concurrency (int): The maximum number of concurrent requests.
+            max_retries (int): How many times a rate limited batch is retried.
+            initial_backoff (float): The first backoff in seconds.
+            max_backoff (float): The maximum backoff in seconds.
+        """
+        self._embeddings = embeddings
+        self._batch_size = batch_size
+        self._max_batch_tokens = max_batch_tokens
+        self._max_concurrency = max_concurrency
+        self._max_retries = max_retries
+        self._initial_backoff = initial_backoff
+        self._max_backoff = max_backoff
+
+    @classmethod
+    def from_config(cls, embeddings: Embeddings, config: Optional[dict]) -> "EmbeddingPipeline":
+        """
+        Create an embedding pipeline from the `document_embedder.embedding_pipeline` settings.
+
+        Args:
+            embeddings (Embeddings): The embeddings used for every batch.
+            config (Optional[dict]): The pipeline settings.
+
+        Returns:
+            EmbeddingPipeline: The embedding pipeline.
+        """
+        return cls(embeddings, **(config or {}))
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """
+        Roughly estimate the number of tokens of a text.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            int: The estimated number of tokens.
+        """
+        return len(text) // 4 + 1
+
+    def _batches(self, texts: list[str]) -> list[tuple[int, list[str]]]:
+        """
+        Split texts into batches that fit the provider limits.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list[tuple[int, list[str]]]: The offset of each batch and its texts.
+        """
+        batches = []
+        start, batch, tokens = 0, [], 0
+        for i, text in enumerate(texts):
+            text_tokens = self.estimate_tokens(text)
+            if batch and (
+                len(batch) >= self._batch_size
+                or tokens + text_tokens > self._max_batch_tokens
+            ):
+                batches.append((start, batch))
+                start, batch, tokens = i, [], 0
+            batch.append(text)
+            tokens += text_tokens
+        if batch:
+            batches.append((start, batch))
+        return batches
+
+    @staticmethod
+    def _is_rate_limit(error: Exception) -> bool:
+        """
+        Check whether an error is a rate limit response.
+
+        Args:
+            error (Exception): The error raised by the provider client.
+
+        Returns:
+            bool: True if the request was rate limited.
+        """
+        return (
+            getattr(error, "status_code", None) == 429
+            or type(error).__name__ == "RateLimitError"
+        )
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """
+        Get the delay requested by the provider, if any.
+
+        Args:
+            error (Exception): The rate limit error.
+
+        Returns:
+            Optional[float]: The requested delay in seconds.
+        """
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    def _embed_batch(
+        self, texts: list[str], limiter: AdaptiveConcurrencyLimiter
+    ) -> list[list[float]]:
+        """
+        Embed one batch, retrying with backoff while it is rate limited.
+
+        Args:
+            texts (list[str]): The texts of the batch.
+            limiter (AdaptiveConcurrencyLimiter): The limiter shared by the batches.
+
+        Returns:
+            list[list[float]]: The embeddings of the batch.
+        """
+        backoff = self._initial_backoff
+        for attempt in range(self._max_retries + 1):
+            limiter.acquire()
+            try:
+                vectors = self._embeddings.embed_documents(texts)
+                limiter.on_success()
+                return vectors
+            except Exception as e:
+                if not self._is_rate_limit(e) or attempt == self._max_retries:
+                    raise
+                pause = self._retry_after(e) or backoff * (1 + random.random())
+                logger.warning(
+                    f"Embedding batch rate limited, retrying in {pause:.1f}s "
+                    f"(attempt {attempt + 1}/{self._max_retries})."
+                )
+                limiter.on_rate_limit(pause)
+                backoff = min(backoff * 2, self._max_backoff)
+            finally:
+                limiter.release()
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embed texts in concurrent, provider sized batches.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list[list[float]]: The embeddings, in the order of the texts.
+        """
+        if not texts:
+            return []
+
+        batches = self._batches(texts)
+        limiter = AdaptiveConcurrencyLimiter(self._max_concurrency)
+        vectors: list[Optional[list[float]]] = [None] * len(texts)
+
+        with ThreadPoolExecutor(max_workers=min(self._max_concurrency, len(batches))) as pool:
+            futures = {
+                pool.submit(self._embed_batch, batch, limiter): start
+                for start, batch in batches
+            }
+            for future, start in futures.items():
+                for offset, vector in enumerate(future.result()):
+                    vectors[start + offset] = vector
+
+        logger.debug(f"Embedded {len(texts)} texts in {len(batches)} batches.")
+        return vectors
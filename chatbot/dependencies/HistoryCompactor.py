@@ -0,0 +1,150 @@
+from typing import Optional
+
+from chatbot.config import Configuration
+from chatbot.dependencies.EmbeddingPipeline import EmbeddingPipeline
+from chatbot.dependencies.ModelLoader import ModelLoader
+from chatbot.dependencies.PromptManager import PromptManager
+from chatbot.dependencies.contracts.TextGenerator import TextGenerator
+from chatbot.dependencies.contracts.message import Message, SystemMessage, UserMessage
+
+
+class HistoryCompactor:
+    """
+    Keeps the conversation history handed to the models within token budgets.
+
+    Every consumer of the history (the intent classifier, the retriever query and the
+    response generator) has its own budget in `history_compactor.budgets`. The most recent
+    turns are kept verbatim while they fit; older turns are represented by the rolling
+    summary of the conversation, which `summarize` extends as turns age out.
+    """
+
+    CLASSIFIER = "classifier"
+    RETRIEVER = "retriever"
+    GENERATOR = "generator"
+
+    def __init__(self):
+        """
+        Initializes the history compactor. The summarization model is loaded on first use.
+        """
+        self._config: dict = Configuration.get("history_compactor") or {}
+        self._model: Optional[TextGenerator] = None
+
+    @staticmethod
+    def budget(consumer: str) -> Optional[int]:
+        """
+        Get the token budget of a consumer of the history.
+
+        Args:
+            consumer (str): The consumer, e.g. `HistoryCompactor.GENERATOR`.
+
+        Returns:
+            Optional[int]: The budget, None when it is unbounded.
+        """
+        budgets = Configuration.get("history_compactor.budgets") or {}
+        return budgets.get(consumer)
+
+    @staticmethod
+    def turn_tokens(turn: dict) -> int:
+        """
+        Roughly estimate the number of tokens of a turn.
+
+        Args:
+            turn (dict): The turn, as `{"U": ..., "A": ...}`.
+
+        Returns:
+            int: The estimated number of tokens.
+        """
+        return EmbeddingPipeline.estimate_tokens(
+            turn["U"]
+        ) + EmbeddingPipeline.estimate_tokens(turn["A"])
+
+    @classmethod
+    def fit(cls, history: list[dict], budget: Optional[int]) -> list[dict]:
+        """
+        Keep the most recent turns whose estimated size fits a token budget.
+
+        Args:
+            history (list[dict]): The turns, oldest first.
+            budget (Optional[int]): The token budget. None keeps every turn.
+
+        Returns:
+            list[dict]: The kept turns, oldest first.
+        """
+        if budget is None:
+            return history
+
+        kept, tokens = [], 0
+        for turn in reversed(history):
+            tokens += cls.turn_tokens(turn)
+            if tokens > budget:
+                break
+            kept.append(turn)
+
+        kept.reverse()
+        return kept
+
+    @classmethod
+    def compact(
+        cls, history: list[dict], summary: Optional[str], consumer: str
+    ) -> tuple[Optional[str], list[dict]]:
+        """
+        Fit the history and the summary into the budget of a consumer.
+
+        The summary may take up to half the budget; the recent turns get the rest.
+
+        Args:
+            history (list[dict]): The turns, oldest first.
+            summary (Optional[str]): The summary of the earlier turns.
+            consumer (str): The consumer, e.g. `HistoryCompactor.GENERATOR`.
+
+        Returns:
+            tuple[Optional[str], list[dict]]: The summary, None if it does not fit, and the
+                kept turns.
+        """
+        budget = cls.budget(consumer)
+        if budget is None:
+            return summary, history
+
+        if summary:
+            summary_tokens = EmbeddingPipeline.estimate_tokens(summary)
+            if summary_tokens <= budget // 2:
+                budget -= summary_tokens
+            else:
+                summary = None
+
+        return summary, cls.fit(history, budget)
+
+    @property
+    def model(self) -> TextGenerator:
+        """
+        Get the summarization model.
+
+        Returns:
+            TextGenerator: The model.
+        """
+        if self._model is None:
+            self._model = ModelLoader.load_model(self._config.get("model"))
+        return self._model
+
+    async def summarize(self, summary: Optional[str], turns: list[dict]) -> str:
+        """
+        Fold turns into the rolling summary of a conversation.
+
+        Args:
+            summary (Optional[str]): The current summary.
+            turns (list[dict]): The turns to fold, oldest first.
+
+        Returns:
+            str: The new summary.
+        """
+        transcript = "\n".join(f"User: {turn['U']}\nAssistant: {turn['A']}" for turn in turns)
+        messages: list[Message] = [
+            SystemMessage(PromptManager.get_prompt("history_compactor", "main_prompt")),
+            UserMessage(f"Ringkasan:\n{summary or '-'}\n\nPercakapan:\n{transcript}"),
+        ]
+
+        response = await self.model.generate_async(
+            messages, self._config.get("model_settings")
+        )
+
+        return response.strip()
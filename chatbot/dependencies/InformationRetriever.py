@@ -1,9 +1,19 @@
+import asyncio
+from typing import Awaitable, Callable, Iterable, Optional
+
 from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
 
 from chatbot.config import Configuration
 from chatbot.dependencies.IntentClassifier import Intent
 from chatbot.dependencies.ModelLoader import ModelLoader
+from chatbot.dependencies.RetrievalExecutor import RetrievalExecutor
+from chatbot.dependencies.SpeculativeRetrieval import SpeculativeRetrieval
 from chatbot.dependencies.contracts.TextEmbedder import TextEmbedder
+from chatbot.dependencies.utils.EmbeddingCache import EmbeddingCache
+from chatbot.dependencies.utils.Tracer import tracer
+from chatbot.dependencies.vectorstore.FaissIndexFactory import FaissIndexFactory
+from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
 from chatbot.logger import logger
 
 
@@ -24,6 +34,10 @@ class InformationRetriever:
         self._retriever_settings: dict = Configuration.get(
             "information_retriever.retriever_settings"
         )
+        self._executor: RetrievalExecutor = RetrievalExecutor.from_config(
+            Configuration.get("information_retriever.executor")
+        )
+        self.speculative: bool = bool(Configuration.get("information_retriever.speculative"))
 
     def retrieve(self, message: str, intent: Intent) -> str:
         """Retrieve the relevant information from the documents based on the intent of the message.
@@ -41,11 +55,42 @@ class InformationRetriever:
             str: The relevant information from the documents based on the intent of the message.
         """
         _db = self._embedding_model.load_intent_faiss_index(intent.value)
-        _result = self._similarity_search(message, _db, k=self._retriever_settings["k"])
+        _result = self._similarity_search(
+            message,
+            _db,
+            k=self._retriever_settings["k"],
+            fetch_k=self._retriever_settings.get("fetch_k"),
+        )
         return _result
 
     @staticmethod
-    def _similarity_search(query: str, faiss_index: FAISS, k: int = 3, **kwargs) -> str:
+    def _collapse_duplicates(documents: list[Document], k: int) -> list[Document]:
+        """
+        Drops hits whose normalized text was already returned, keeping the best ranked one.
+
+        Parameters:
+            documents (list[Document]): The hits, best first.
+            k (int): The number of hits to keep.
+
+        Returns:
+            list[Document]: At most `k` distinct hits.
+        """
+        seen = set()
+        unique = []
+        for document in documents:
+            text = EmbeddingCache.normalize(document.page_content)
+            if text in seen:
+                continue
+            seen.add(text)
+            unique.append(document)
+            if len(unique) == k:
+                break
+        return unique
+
+    @staticmethod
+    def _similarity_search(
+        query: str, faiss_index: FAISS, k: int = 3, fetch_k: int | None = None, **kwargs
+    ) -> str:
         """
         Handles the similarity search using the FAISS index.
 
@@ -53,13 +98,18 @@ class InformationRetriever:
             query (str): The query to search for.
             faiss_index (FAISS): The FAISS index to search in.
             k (int, optional): The number of results to return. Defaults to 3.
+            fetch_k (int | None, optional): The number of hits fetched before duplicates are
+                collapsed. Defaults to `2 * k`.
 
         Returns:
             str: The results of the similarity search.
         """
         try:
-            _result = faiss_index.similarity_search_with_relevance_scores(query, k, **kwargs)
-            _str = "\n".join([x[0].page_content for x in _result])
+            _result = faiss_index.similarity_search_with_relevance_scores(
+                query, fetch_k or 2 * k, **kwargs
+            )
+            _documents = InformationRetriever._collapse_duplicates([x[0] for x in _result], k)
+            _str = "\n".join([x.page_content for x in _documents])
             return _str
         except Exception as e:
             logger.error(f"Error in similarity search: {e}")
@@ -81,10 +131,10 @@ class InformationRetriever:
             str: The relevant information from the documents based on the intent of the message.
         """
         try:
-            _db = self._embedding_model.load_intent_faiss_index(intent.value)
-            _result = await self._similarity_search_async(message, _db, k=self._retriever_settings["k"])
-            return _result
-        except RuntimeError as e:
+            return await self._retrieve_with_executor(
+                message, self._embedding_model.load_intent_faiss_index, intent
+            )
+        except (RuntimeError, FileNotFoundError) as e:
             logger.warning(f"Error in similarity search: {e}")
             return "Tidak ditemukan informasi untuk ini."
 
@@ -104,29 +154,167 @@ class InformationRetriever:
             str: The relevant information from the documents based on the intent of the message.
         """
         try:
-            _db = self._embedding_model.load_public_intent_faiss_index(intent.value)
-            _result = await self._similarity_search_async(message, _db, k=self._retriever_settings["k"], public=True)
-            return _result
-        except RuntimeError as e:
+            return await self._retrieve_with_executor(
+                message, self._embedding_model.load_public_intent_faiss_index, intent
+            )
+        except (RuntimeError, FileNotFoundError) as e:
             logger.warning(f"Error in similarity search: {e}")
             return "Tidak ditemukan informasi untuk ini."
 
+    async def embed_query_async(self, message: str) -> list[float]:
+        """
+        Embed a message with the retrieval embedding model.
+
+        Parameters:
+            message (str): The message.
+
+        Returns:
+            list[float]: The embedding of the message.
+        """
+        return await tracer.traced(
+            "retriever.embed", self._embedding_model.model.aembed_query(message)
+        )
+
+    def speculate(
+        self, message: str, intents: Optional[Iterable[Intent]] = None, public: bool = False
+    ) -> SpeculativeRetrieval:
+        """
+        Start retrieving the information of a message from every intent index at once.
+
+        Meant to run while the intent of the message is still being classified; the
+        message is embedded a single time for all the searches.
+
+        Parameters:
+            message (str): The message to retrieve information based on.
+            intents (Optional[Iterable[Intent]]): The intents to search. Defaults to every
+                intent but `Intent.OTHER`, which does not retrieve.
+            public (bool): Whether to search the public intent indexes.
+
+        Returns:
+            SpeculativeRetrieval: The running retrieval.
+        """
+        load_index = (
+            self._embedding_model.load_public_intent_faiss_index
+            if public
+            else self._embedding_model.load_intent_faiss_index
+        )
+
+        async def search(intent: Intent, embedding: Awaitable[list[float]]) -> str:
+            try:
+                return await self._search_intent(embedding, load_index, intent)
+            except (RuntimeError, FileNotFoundError) as e:
+                logger.warning(f"Error in similarity search: {e}")
+                return "Tidak ditemukan informasi untuk ini."
+
+        return SpeculativeRetrieval(
+            lambda: tracer.traced(
+                "retriever.embed", self._embedding_model.model.aembed_query(message)
+            ),
+            search,
+            intents if intents is not None else [i for i in Intent if i != Intent.OTHER],
+        )
+
+    async def _retrieve_with_executor(
+        self, message: str, load_index: Callable[[str], FAISS], intent: Intent
+    ) -> str:
+        """
+        Embeds the message and searches the intent index without blocking the event loop.
+
+        The query is embedded with the native async client while the index is fetched in the
+        retrieval pool; the FAISS search itself also runs in the pool.
+
+        Parameters:
+            message (str): The message to retrieve information based on.
+            load_index (Callable[[str], FAISS]): The loader of the intent index.
+            intent (Intent): The intent of the message.
+
+        Returns:
+            str: The results of the similarity search.
+        """
+        return await self._search_intent(
+            tracer.traced("retriever.embed", self._embedding_model.model.aembed_query(message)),
+            load_index,
+            intent,
+        )
+
+    async def _search_intent(
+        self,
+        embedding: Awaitable[list[float]],
+        load_index: Callable[[str], FAISS],
+        intent: Intent,
+    ) -> str:
+        """
+        Searches the intent index once the embedding of the query is ready.
+
+        The index is fetched in the retrieval pool while the embedding is awaited.
+
+        Parameters:
+            embedding (Awaitable[list[float]]): The pending embedding of the query.
+            load_index (Callable[[str], FAISS]): The loader of the intent index.
+            intent (Intent): The intent whose index is searched.
+
+        Returns:
+            str: The results of the similarity search.
+        """
+        with tracer.span("retriever.search", intent=intent.value):
+            embedding, _db = await asyncio.gather(
+                embedding,
+                tracer.traced(
+                    "retriever.load_index", self._executor.run(load_index, intent.value)
+                ),
+            )
+            return await tracer.traced(
+                "retriever.similarity_search",
+                self._executor.run(
+                    self._similarity_search_by_vector,
+                    embedding,
+                    _db,
+                    k=self._retriever_settings["k"],
+                    fetch_k=self._retriever_settings.get("fetch_k"),
+                    rerank_factor=self._retriever_settings.get("rerank_factor"),
+                ),
+            )
+
     @staticmethod
-    async def _similarity_search_async(query: str, faiss_index: FAISS, k: int = 3, **kwargs) -> str:
+    def _similarity_search_by_vector(
+        embedding: list[float],
+        faiss_index: FAISS,
+        k: int = 3,
+        fetch_k: int | None = None,
+        rerank_factor: int | None = None,
+    ) -> str:
         """
-        Handles the similarity search using the FAISS index.
+        Handles the similarity search of an already embedded query using the FAISS index.
 
         Parameters:
-            query (str): The query to search for.
+            embedding (list[float]): The embedded query.
             faiss_index (FAISS): The FAISS index to search in.
             k (int, optional): The number of results to return. Defaults to 3.
+            fetch_k (int | None, optional): The number of hits fetched before duplicates are
+                collapsed. Defaults to `2 * k`.
+            rerank_factor (int | None, optional): When the index is approximate (quantized
+                or reduced) and its full precision vectors are stored, fetch
+                `rerank_factor * fetch_k` candidates and re-rank them exactly. Defaults to
+                no re-ranking.
 
         Returns:
             str: The results of the similarity search.
         """
         try:
-            _result = await faiss_index.asimilarity_search_with_relevance_scores(query, k, **kwargs)
-            _str = "\n".join([x[0].page_content for x in _result])
+            fetch_k = fetch_k or 2 * k
+            full_vectors = (
+                FaissIndexRegistry.full_precision(faiss_index) if rerank_factor else None
+            )
+            if full_vectors is not None:
+                _result = FaissIndexFactory.search_reranked(
+                    faiss_index, full_vectors, embedding, fetch_k, rerank_factor * fetch_k
+                )
+            else:
+                _result = faiss_index.similarity_search_with_score_by_vector(
+                    embedding, fetch_k
+                )
+            _documents = InformationRetriever._collapse_duplicates([x[0] for x in _result], k)
+            _str = "\n".join([x.page_content for x in _documents])
             return _str
         except Exception as e:
             logger.error(f"Error in similarity search: {e}")
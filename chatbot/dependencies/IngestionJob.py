@@ -0,0 +1,104 @@
+import pathlib
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterator, Optional
+
+from chatbot.logger import logger
+
+if TYPE_CHECKING:
+    from chatbot.dependencies.DocumentEmbedder import DocumentEmbedder
+
+
+class IngestionJob:
+    """
+    Ingestion of one file into every FAISS index it belongs to.
+
+    The file is parsed, split and embedded exactly once, whatever the number of target
+    indexes; the same chunks and vectors are then written to each of them. The duration of
+    every stage is recorded in `timings`, and the ids of the written chunks in `vector_ids`.
+    """
+
+    STAGE_PROGRESS = {"parse": 0.0, "split": 0.1, "embed": 0.2, "write": 0.8, "cleanup": 0.95}
+    """The share of the job done when each stage starts."""
+
+    def __init__(
+        self,
+        embedder: "DocumentEmbedder",
+        doc_path: str,
+        faiss_dirs: list[pathlib.Path],
+        previous_vector_ids: dict[str, list[str]] | None = None,
+        on_stage: Optional[Callable[[str, float], None]] = None,
+    ):
+        """
+        Initializes the ingestion job.
+
+        Args:
+            embedder (DocumentEmbedder): The document embedder doing the work.
+            doc_path (str): The path to the document.
+            faiss_dirs (list[pathlib.Path]): The directories of the target FAISS indexes.
+            previous_vector_ids (dict[str, list[str]] | None): The chunk ids of a previous
+                version of the document, removed once the new chunks are written.
+            on_stage (Optional[Callable[[str, float], None]]): Called with the name of each
+                stage and the share of the job done when it starts.
+        """
+        self._embedder = embedder
+        self.doc_path = doc_path
+        self.faiss_dirs = faiss_dirs
+        self.previous_vector_ids = previous_vector_ids
+        self._on_stage = on_stage
+
+        self.timings: dict[str, float] = {}
+        self.vector_ids: dict[str, list[str]] = {}
+        self.chunks = 0
+
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        """
+        Time a stage of the job.
+
+        Args:
+            name (str): The name of the stage.
+
+        Yields:
+            None
+        """
+        if self._on_stage is not None:
+            self._on_stage(name, self.STAGE_PROGRESS[name])
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 4)
+
+    def run(self) -> "IngestionJob":
+        """
+        Run every stage of the job.
+
+        Returns:
+            IngestionJob: The finished job.
+        """
+        start = time.perf_counter()
+
+        with self._stage("parse"):
+            raw_doc = self._embedder._load_document(self.doc_path)
+        with self._stage("split"):
+            documents = self._embedder._split_raw_document(raw_doc)
+        with self._stage("embed"):
+            documents, vectors, ids = self._embedder._embed_documents(documents)
+        with self._stage("write"):
+            for faiss_dir in self.faiss_dirs:
+                self._embedder._write_to_faiss_index(documents, vectors, ids, faiss_dir)
+                self.vector_ids[faiss_dir.name] = ids
+        if self.previous_vector_ids:
+            with self._stage("cleanup"):
+                self._embedder.delete_from_vectorstores(self.previous_vector_ids)
+
+        self.chunks = len(ids)
+        self.timings["total"] = round(time.perf_counter() - start, 4)
+
+        logger.info(
+            f"Ingested {self.doc_path} ({self.chunks} chunks) into "
+            f"{len(self.faiss_dirs)} indexes: {self.timings}"
+        )
+        return self
@@ -0,0 +1,263 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from chatbot.database import SessionLocal
+from chatbot.database.models.Document import Document
+from chatbot.database.models.Job import Job
+from chatbot.dependencies.DocumentEmbedder import DocumentEmbedder
+from chatbot.dependencies.IntentClassifier import Intent
+from chatbot.dependencies.JobQueue import JobQueue, LeaseLostError
+from chatbot.logger import logger
+
+
+class IngestionWorker:
+    """
+    Runs the jobs of the `JobQueue` outside of the API process.
+
+    Every worker thread claims one job at a time, runs the handler registered for its kind
+    and reports the outcome back to the queue. Running ingestion in its own process keeps
+    PDF parsing, embedding and index writes from competing with chat streaming.
+
+    While a job runs, a heartbeat renews its lease every third of `lease_seconds`, so a
+    long stage, e.g. embedding a large PDF, is not handed out to a second worker. A job
+    whose lease was lost anyway stops at its next stage boundary and records nothing.
+    """
+
+    EMBED_DOCUMENT = "embed_document"
+    REMOVE_DOCUMENT = "remove_document"
+    EMBED_QUESTION = "embed_question"
+
+    def __init__(self, queue: JobQueue, concurrency: int = 2, poll_interval: float = 1.0):
+        """
+        Initializes the worker.
+
+        Args:
+            queue (JobQueue): The queue to take jobs from.
+            concurrency (int): The number of jobs run at once.
+            poll_interval (float): How long an idle thread waits before polling again.
+        """
+        self._queue = queue
+        self._concurrency = concurrency
+        self._poll_interval = poll_interval
+        self._worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers: dict[str, Callable[[Job], Optional[dict]]] = {
+            self.EMBED_DOCUMENT: self._embed_document,
+            self.REMOVE_DOCUMENT: self._remove_document,
+            self.EMBED_QUESTION: self._embed_question,
+        }
+
+    @classmethod
+    def from_config(
+        cls, config: Optional[dict], concurrency: Optional[int] = None
+    ) -> "IngestionWorker":
+        """
+        Create a worker from the `ingestion_queue` settings.
+
+        Args:
+            config (Optional[dict]): The queue settings.
+            concurrency (Optional[int]): Overrides the configured concurrency.
+
+        Returns:
+            IngestionWorker: The worker.
+        """
+        config = config or {}
+        return cls(
+            JobQueue.from_config(config),
+            concurrency=concurrency or config.get("concurrency", 2),
+            poll_interval=config.get("poll_interval", 1.0),
+        )
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """
+        Run jobs until `stop` is set.
+
+        Args:
+            stop (Optional[threading.Event]): Stops the worker once set. Runs forever when None.
+
+        Returns:
+            None
+        """
+        stop = stop or threading.Event()
+        logger.info(
+            f"Ingestion worker {self._worker_id} started with {self._concurrency} threads."
+        )
+
+        threads = [
+            threading.Thread(
+                target=self._loop, args=(stop, i == 0), name=f"ingestion-{i}", daemon=True
+            )
+            for i in range(self._concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _loop(self, stop: threading.Event, reaper: bool) -> None:
+        """
+        Claim and run jobs until `stop` is set.
+
+        Args:
+            stop (threading.Event): Stops the loop once set.
+            reaper (bool): Whether this thread also requeues jobs of dead workers.
+
+        Returns:
+            None
+        """
+        while not stop.is_set():
+            try:
+                if reaper:
+                    self._queue.requeue_stale()
+                if not self.run_once():
+                    stop.wait(self._poll_interval)
+            except Exception as e:
+                logger.error(f"Ingestion worker error: {e}")
+                stop.wait(self._poll_interval)
+
+    def run_once(self) -> bool:
+        """
+        Claim and run a single job.
+
+        Returns:
+            bool: True if a job was run.
+        """
+        job = self._queue.claim(self._worker_id)
+        if job is None:
+            return False
+
+        handler = self._handlers.get(job.kind)
+        start = time.perf_counter()
+        finished = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job.id, finished), daemon=True
+        )
+        heartbeat.start()
+        try:
+            if handler is None:
+                raise RuntimeError(f"Unknown job kind {job.kind}.")
+            result = handler(job)
+        except LeaseLostError as e:
+            logger.warning(f"{job} stopped: {e}")
+            return True
+        except Exception as e:
+            self._queue.fail(job.id, self._worker_id, str(e))
+            return True
+        finally:
+            finished.set()
+            heartbeat.join()
+
+        if self._queue.complete(job.id, self._worker_id, result):
+            logger.info(f"{job} done in {time.perf_counter() - start:.2f}s.")
+        return True
+
+    def _heartbeat(self, job_id: int, finished: threading.Event) -> None:
+        """
+        Renew the lease of a running job until it finishes or the lease is lost.
+
+        Args:
+            job_id (int): The id of the job.
+            finished (threading.Event): Set once the job finished.
+
+        Returns:
+            None
+        """
+        interval = self._queue.lease_seconds / 3
+        while not finished.wait(interval):
+            try:
+                if not self._queue.heartbeat(job_id, self._worker_id):
+                    # The job stops at its next stage, see `JobQueue.set_progress`.
+                    return
+            except Exception as e:
+                logger.error(f"Could not renew the lease of job {job_id}: {e}")
+
+    def _embed_document(self, job: Job) -> dict:
+        """
+        Embed an uploaded document, replacing its previous version when there is one.
+
+        Args:
+            job (Job): The job, with `document_id`, `document_path`, `intent`, `public` and
+                optionally `previous_vector_ids` and `previous_path` in its payload.
+
+        Returns:
+            dict: The stage timings.
+        """
+        payload = job.payload
+        intents = [Intent(intent.strip()) for intent in payload["intent"].split(",")]
+
+        ingestion = DocumentEmbedder().ingest(
+            payload["document_path"],
+            intents,
+            payload["public"],
+            payload.get("previous_vector_ids"),
+            on_stage=lambda stage, progress: self._queue.set_progress(
+                job.id, self._worker_id, stage, progress
+            ),
+        )
+
+        with SessionLocal() as db:
+            updated = (
+                db.query(Document)
+                .filter(Document.id == payload["document_id"])
+                .update(
+                    {
+                        Document.embedded: True,
+                        Document.vector_ids: ingestion.vector_ids,
+                        Document.ingestion_timings: ingestion.timings,
+                    }
+                )
+            )
+            db.commit()
+
+        if not updated:
+            # The document was deleted while it was being embedded.
+            DocumentEmbedder().delete_from_vectorstores(ingestion.vector_ids)
+
+        previous_path = payload.get("previous_path")
+        if previous_path and os.path.exists(previous_path):
+            os.remove(previous_path)
+
+        return {"timings": ingestion.timings, "chunks": ingestion.chunks}
+
+    def _remove_document(self, job: Job) -> None:
+        """
+        Remove the chunks and the file of a deleted document.
+
+        Args:
+            job (Job): The job, with `vector_ids` and `document_path` in its payload.
+
+        Returns:
+            None
+        """
+        payload = job.payload
+        DocumentEmbedder().delete_from_vectorstores(payload.get("vector_ids"))
+
+        document_path = payload.get("document_path")
+        if document_path and os.path.exists(document_path):
+            os.remove(document_path)
+
+    def _embed_question(self, job: Job) -> None:
+        """
+        Save an answered question to the vectorstorage.
+
+        Args:
+            job (Job): The job, with `question`, `answer`, `intent` and `public` in its payload.
+
+        Returns:
+            None
+        """
+        payload = job.payload
+        document_embedder = DocumentEmbedder()
+        category = Intent(payload["intent"])
+
+        if payload["public"]:
+            document_embedder.save_public_question_answer_to_vectorstore(
+                payload["question"], payload["answer"], category
+            )
+        else:
+            document_embedder.save_question_answer_to_vectorstore(
+                payload["question"], payload["answer"], category
+            )
@@ -1,6 +1,8 @@
 import asyncio
 from typing import Optional
 from chatbot.config import Configuration
+from chatbot.dependencies.HistoryCompactor import HistoryCompactor
+from chatbot.dependencies.LocalIntentClassifier import LocalIntentClassifier
 from chatbot.dependencies.ModelLoader import ModelLoader
 from chatbot.dependencies.PromptManager import PromptManager
 from chatbot.dependencies.contracts.TextGenerator import TextGenerator
@@ -11,6 +13,8 @@ from chatbot.dependencies.contracts.message import (
     AssistantMessage,
 )
 from chatbot.dependencies.utils.StringEnum import StringEnum
+from chatbot.dependencies.utils.Tracer import tracer
+from chatbot.logger import logger
 
 
 class Intent(StringEnum):
@@ -86,6 +90,11 @@ class IntentDescription:
 class IntentClassifier:
     """
     This class is used to classify the intent of a message.
+
+    Messages are first given to the `LocalIntentClassifier`; the LLM is only called when
+    the local tier is disabled or not confident enough. Messages with a conversation
+    history or summary always go to the LLM: the local tier only sees the message, and a
+    follow-up like "kalau untuk beasiswa?" takes its intent from the conversation.
     """
 
     def __init__(self):
@@ -95,6 +104,51 @@ class IntentClassifier:
         self._intent_classifier_config: dict = Configuration.get("intent_classifier")
         self._model: TextGenerator = self._load_model()
         self._prompt_template: str = self._get_prompt_template()
+        self._local: Optional[LocalIntentClassifier] = LocalIntentClassifier.from_config(
+            self._intent_classifier_config.get("local")
+        )
+
+        self.local_hits = 0
+        self.llm_calls = 0
+
+    def stats(self) -> dict:
+        """
+        Get the number of messages classified by each tier.
+
+        Returns:
+            dict: The tier counters.
+        """
+        total = self.local_hits + self.llm_calls
+        return {
+            "local": self.local_hits,
+            "llm": self.llm_calls,
+            "local_hit_rate": self.local_hits / total if total else 0.0,
+        }
+
+    def _classify_locally(
+        self, message: str, has_context: bool = False
+    ) -> Optional[Intent]:
+        """
+        Helper method to classify a message with the local tier.
+
+        Parameters:
+            message (str): The message to be classified.
+            has_context (bool): Whether the message comes with a history or summary, which
+                the local tier cannot take into account.
+
+        Returns:
+            Optional[Intent]: The intent, None when the LLM has to decide.
+        """
+        intent = None
+        if self._local is not None and not has_context:
+            intent = self._local.predict(message)
+        if intent is not None:
+            self.local_hits += 1
+        else:
+            self.llm_calls += 1
+
+        logger.debug(f"Intent classifier tiers: {self.stats()}")
+        return intent
 
     @staticmethod
     def _get_prompt_template() -> str:
@@ -152,29 +206,44 @@ class IntentClassifier:
         Returns:
             str: The intent of the message.
         """
-        prompts: list[Message] = self._build_prompt_with_examples(message)
+        with tracer.span("intent_classifier.classify") as span:
+            intent = self._classify_locally(message)
+            if intent is not None:
+                span.set(tier="local", intent=intent.value)
+                return intent
 
-        intent_str = await self._model.generate_async(
-            prompts, self._intent_classifier_config.get("model_settings")
-        )
+            prompts: list[Message] = self._build_prompt_with_examples(message)
 
-        return Intent(intent_str.strip())
+            intent_str = await self._model.generate_async(
+                prompts, self._intent_classifier_config.get("model_settings")
+            )
+
+            span.set(tier="llm", intent=intent_str.strip())
+            return Intent(intent_str.strip())
 
     def _build_history_messages(
-        self, message: str, history: list[dict]
+        self, message: str, history: list[dict], summary: Optional[str] = None
     ) -> list[Message]:
         """
         Helper method to build the history messages.
 
+        The history is compacted to the classifier budget of the `HistoryCompactor`.
+
         Parameters:
             message (str): The message to be classified.
             history (list[dict]): The history list.
+            summary (Optional[str]): The summary of the earlier conversation.
 
         Returns:
             list[Message]: The list of messages.
         """
+        summary, history = HistoryCompactor.compact(
+            history, summary, HistoryCompactor.CLASSIFIER
+        )
         prompts: list[Message] = [SystemMessage(self._prompt_template)]
 
+        if summary:
+            prompts.append(UserMessage(f"Ringkasan percakapan sebelumnya: {summary}"))
         for msg in history:
             prompts.append(UserMessage(msg["U"]))
             prompts.append(UserMessage(msg["A"]))
@@ -182,7 +251,9 @@ class IntentClassifier:
 
         return prompts
 
-    async def classify_with_history(self, message: str, history: list[dict]) -> Intent:
+    async def classify_with_history(
+        self, message: str, history: list[dict], summary: Optional[str] = None
+    ) -> Intent:
         """Classify the intent of the given message with history.
 
         This function takes a message and a history as input and returns the intent of the message as a string.
@@ -190,14 +261,22 @@ class IntentClassifier:
         Parameters:
             message (str): The message to be classified.
             history (list[dict]): The history list.
+            summary (Optional[str]): The summary of the earlier conversation.
 
         Returns:
             str: The intent of the message.
         """
-        prompts: list[Message] = self._build_history_messages(message, history)
+        with tracer.span("intent_classifier.classify", history=len(history)) as span:
+            intent = self._classify_locally(message, bool(history or summary))
+            if intent is not None:
+                span.set(tier="local", intent=intent.value)
+                return intent
 
-        intent_str = await self._model.generate_async(
-            prompts, self._intent_classifier_config.get("model_settings")
-        )
+            prompts: list[Message] = self._build_history_messages(message, history, summary)
+
+            intent_str = await self._model.generate_async(
+                prompts, self._intent_classifier_config.get("model_settings")
+            )
 
-        return Intent(intent_str.strip())
+            span.set(tier="llm", intent=intent_str.strip())
+            return Intent(intent_str.strip())
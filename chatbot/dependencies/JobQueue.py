@@ -0,0 +1,397 @@
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session
+
+from chatbot.database import AsyncSessionLocal, SessionLocal
+from chatbot.database.models.Job import Job
+from chatbot.dependencies.utils.StringEnum import StringEnum
+from chatbot.logger import logger
+
+
+class JobStatus(StringEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class LeaseLostError(Exception):
+    """
+    Raised when a worker reports on a job whose lease expired and that was handed out to
+    another worker.
+    """
+
+
+class JobQueue:
+    """
+    Durable queue of ingestion jobs stored in the `ingestion_jobs` table.
+
+    Jobs survive restarts of the API and of the workers. A worker claims a job with a
+    conditional update, so two workers never run the same job. Jobs touching the same FAISS
+    index run in the order they were enqueued: a job is only claimed once every earlier,
+    unfinished job sharing one of its `index_keys` has finished. Failed jobs are retried
+    with exponential backoff up to `max_attempts`, and jobs of a worker that died are
+    handed out again once their lease expires.
+
+    A running job is owned by the worker that claimed it: progress, results and failures
+    are only recorded for the worker still holding the lease, which renews it with
+    `heartbeat` while the job runs. A worker that lost its lease gets a `LeaseLostError`
+    or False back instead of overwriting the state of the job's new owner.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_attempts: int = 5,
+        retry_backoff: float = 30.0,
+        lease_seconds: float = 600.0,
+        scan_limit: int = 100,
+        async_session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        """
+        Initializes the job queue.
+
+        Args:
+            session_factory (Callable[[], Session]): The factory of database sessions.
+            max_attempts (int): How many times a job is attempted before it fails.
+            retry_backoff (float): The delay before the first retry, doubled on each retry.
+            lease_seconds (float): How long a claimed job may run before it is handed out again.
+            scan_limit (int): The maximum number of unfinished jobs inspected per claim.
+            async_session_factory (Callable[[], AsyncSession]): The factory of async database
+                sessions, used to enqueue from the API.
+        """
+        self._session_factory = session_factory
+        self._async_session_factory = async_session_factory
+        self._max_attempts = max_attempts
+        self._retry_backoff = retry_backoff
+        self._lease_seconds = lease_seconds
+        self._scan_limit = scan_limit
+
+    @property
+    def lease_seconds(self) -> float:
+        """
+        Get how long a claimed job may run without renewing its lease.
+
+        Returns:
+            float: The lease duration in seconds.
+        """
+        return self._lease_seconds
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "JobQueue":
+        """
+        Create a job queue from the `ingestion_queue` settings.
+
+        Args:
+            config (Optional[dict]): The queue settings.
+
+        Returns:
+            JobQueue: The job queue.
+        """
+        config = config or {}
+        return cls(
+            max_attempts=config.get("max_attempts", 5),
+            retry_backoff=config.get("retry_backoff", 30.0),
+            lease_seconds=config.get("lease_seconds", 600.0),
+        )
+
+    def enqueue(self, kind: str, payload: dict, index_keys: list[str]) -> int:
+        """
+        Add a job to the queue.
+
+        Args:
+            kind (str): The kind of the job, selecting its handler.
+            payload (dict): The JSON arguments of the handler.
+            index_keys (list[str]): The names of the FAISS indexes the job writes to.
+
+        Returns:
+            int: The id of the job.
+        """
+        with self._session_factory() as db:
+            job = self._new_job(kind, payload, index_keys)
+            db.add(job)
+            db.commit()
+
+            logger.debug(f"Enqueued {job}")
+            return job.id
+
+    async def enqueue_async(self, kind: str, payload: dict, index_keys: list[str]) -> int:
+        """
+        Add a job to the queue without blocking the event loop.
+
+        Args:
+            kind (str): The kind of the job, selecting its handler.
+            payload (dict): The JSON arguments of the handler.
+            index_keys (list[str]): The names of the FAISS indexes the job writes to.
+
+        Returns:
+            int: The id of the job.
+        """
+        async with self._async_session_factory() as db:
+            job = self._new_job(kind, payload, index_keys)
+            db.add(job)
+            await db.commit()
+
+            logger.debug(f"Enqueued {job}")
+            return job.id
+
+    def _new_job(self, kind: str, payload: dict, index_keys: list[str]) -> Job:
+        """
+        Build a queued job.
+
+        Args:
+            kind (str): The kind of the job, selecting its handler.
+            payload (dict): The JSON arguments of the handler.
+            index_keys (list[str]): The names of the FAISS indexes the job writes to.
+
+        Returns:
+            Job: The job, not added to any session yet.
+        """
+        job = Job()
+        job.kind = kind
+        job.payload = payload
+        job.status = JobStatus.QUEUED.value
+        job.index_keys = ",".join(sorted(set(index_keys)))
+        job.attempts = 0
+        job.max_attempts = self._max_attempts
+        job.progress = 0.0
+        job.run_after = datetime.now()
+        return job
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        """
+        Claim the next runnable job.
+
+        Args:
+            worker_id (str): The identifier of the claiming worker.
+
+        Returns:
+            Optional[Job]: The claimed job, None when no job can run right now.
+        """
+        now = datetime.now()
+
+        with self._session_factory() as db:
+            unfinished = (
+                db.query(Job.id, Job.status, Job.index_keys, Job.run_after)
+                .filter(Job.status.in_([JobStatus.QUEUED.value, JobStatus.RUNNING.value]))
+                .order_by(Job.id)
+                .limit(self._scan_limit)
+                .all()
+            )
+
+            busy: set[str] = set()
+            for job_id, status, index_keys, run_after in unfinished:
+                keys = set(filter(None, index_keys.split(",")))
+                runnable = (
+                    status == JobStatus.QUEUED.value
+                    and (run_after is None or run_after <= now)
+                    and not keys & busy
+                )
+                if runnable and self._try_claim(db, job_id, worker_id, now):
+                    return db.get(Job, job_id)
+                busy |= keys
+
+        return None
+
+    @staticmethod
+    def _try_claim(db: Session, job_id: int, worker_id: str, now: datetime) -> bool:
+        """
+        Atomically move a queued job to running.
+
+        Args:
+            db (Session): The database session.
+            job_id (int): The id of the job.
+            worker_id (str): The identifier of the claiming worker.
+            now (datetime): The current time.
+
+        Returns:
+            bool: True if this worker won the job.
+        """
+        claimed = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status == JobStatus.QUEUED.value)
+            .update(
+                {
+                    Job.status: JobStatus.RUNNING.value,
+                    Job.locked_by: worker_id,
+                    Job.locked_at: now,
+                    Job.attempts: Job.attempts + 1,
+                    Job.stage: None,
+                    Job.progress: 0.0,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return claimed == 1
+
+    @staticmethod
+    def _owned(db: Session, job_id: int, worker_id: str) -> Query:
+        """
+        Query a running job, only if it is still leased by a worker.
+
+        Args:
+            db (Session): The database session.
+            job_id (int): The id of the job.
+            worker_id (str): The identifier of the worker.
+
+        Returns:
+            Query: The query of the job.
+        """
+        return db.query(Job).filter(
+            Job.id == job_id,
+            Job.status == JobStatus.RUNNING.value,
+            Job.locked_by == worker_id,
+        )
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """
+        Renew the lease of a running job.
+
+        Args:
+            job_id (int): The id of the job.
+            worker_id (str): The identifier of the worker running the job.
+
+        Returns:
+            bool: False if the worker lost the lease.
+        """
+        with self._session_factory() as db:
+            renewed = self._owned(db, job_id, worker_id).update(
+                {Job.locked_at: datetime.now()}, synchronize_session=False
+            )
+            db.commit()
+        return renewed == 1
+
+    def set_progress(
+        self, job_id: int, worker_id: str, stage: str, progress: float
+    ) -> None:
+        """
+        Record the progress of a running job and renew its lease.
+
+        Args:
+            job_id (int): The id of the job.
+            worker_id (str): The identifier of the worker running the job.
+            stage (str): The current stage.
+            progress (float): The progress, between 0 and 1.
+
+        Returns:
+            None
+
+        Raises:
+            LeaseLostError: The worker lost the lease, the job must stop.
+        """
+        with self._session_factory() as db:
+            updated = self._owned(db, job_id, worker_id).update(
+                {Job.stage: stage, Job.progress: progress, Job.locked_at: datetime.now()},
+                synchronize_session=False,
+            )
+            db.commit()
+
+        if not updated:
+            raise LeaseLostError(f"Worker {worker_id} lost the lease of job {job_id}.")
+
+    def complete(self, job_id: int, worker_id: str, result: Optional[dict] = None) -> bool:
+        """
+        Mark a job as succeeded.
+
+        Args:
+            job_id (int): The id of the job.
+            worker_id (str): The identifier of the worker running the job.
+            result (Optional[dict]): The JSON result of the job.
+
+        Returns:
+            bool: False if the worker lost the lease and nothing was recorded.
+        """
+        with self._session_factory() as db:
+            completed = self._owned(db, job_id, worker_id).update(
+                {
+                    Job.status: JobStatus.SUCCEEDED.value,
+                    Job.progress: 1.0,
+                    Job.result: result,
+                    Job.error: None,
+                    Job.locked_by: None,
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+
+        if not completed:
+            logger.warning(f"Worker {worker_id} lost the lease of job {job_id}.")
+        return completed == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """
+        Record a failed attempt, scheduling a retry while attempts are left.
+
+        Args:
+            job_id (int): The id of the job.
+            worker_id (str): The identifier of the worker running the job.
+            error (str): The error of the attempt.
+
+        Returns:
+            bool: False if the worker lost the lease and nothing was recorded.
+        """
+        with self._session_factory() as db:
+            job = self._owned(db, job_id, worker_id).with_for_update().one_or_none()
+            if job is None:
+                logger.warning(f"Worker {worker_id} lost the lease of job {job_id}.")
+                return False
+
+            job.error = error
+            job.locked_by = None
+            if job.attempts >= job.max_attempts:
+                job.status = JobStatus.FAILED.value
+                logger.error(f"{job} failed for good: {error}")
+            else:
+                delay = self._retry_backoff * 2 ** (job.attempts - 1)
+                job.status = JobStatus.QUEUED.value
+                job.run_after = datetime.now() + timedelta(seconds=delay)
+                logger.warning(f"{job} failed, retrying in {delay:.0f}s: {error}")
+            db.commit()
+        return True
+
+    def requeue_stale(self) -> int:
+        """
+        Hand out again the running jobs whose lease expired, e.g. after a worker crash.
+
+        Returns:
+            int: The number of requeued jobs.
+        """
+        expired = datetime.now() - timedelta(seconds=self._lease_seconds)
+        with self._session_factory() as db:
+            stale = db.query(Job).filter(
+                Job.status == JobStatus.RUNNING.value, Job.locked_at < expired
+            )
+            # A job that keeps killing its worker must not be handed out forever.
+            stale.filter(Job.attempts >= Job.max_attempts).update(
+                {
+                    Job.status: JobStatus.FAILED.value,
+                    Job.locked_by: None,
+                    Job.error: "Lease expired on the last attempt.",
+                },
+                synchronize_session=False,
+            )
+            requeued = stale.update(
+                {Job.status: JobStatus.QUEUED.value, Job.locked_by: None},
+                synchronize_session=False,
+            )
+            db.commit()
+
+        if requeued:
+            logger.warning(f"Requeued {requeued} ingestion jobs with an expired lease.")
+        return requeued
+
+    def get(self, job_id: int) -> Optional[Job]:
+        """
+        Get a job.
+
+        Args:
+            job_id (int): The id of the job.
+
+        Returns:
+            Optional[Job]: The job, None if it does not exist.
+        """
+        with self._session_factory() as db:
+            return db.get(Job, job_id)
@@ -0,0 +1,355 @@
+import math
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from chatbot.logger import logger
+
+if TYPE_CHECKING:
+    from chatbot.dependencies.IntentClassifier import Intent
+
+
+class LocalIntentClassifier:
+    """
+    TF-IDF nearest-centroid intent classifier running in process.
+
+    Every intent is represented by the normalized mean of the TF-IDF vectors of its
+    examples: the labelled questions answered by staff and the sentences of the intent
+    descriptions. `other` is trained on off-topic sentences, so small talk and unrelated
+    questions land there instead of on the nearest knowledge intent. Stop words are not
+    terms: a message sharing only words like "bagaimana cara saya" with the examples has
+    no similarity to any intent.
+
+    A message is classified in well under a millisecond by its cosine similarity to each
+    centroid; the prediction is only trusted when the best similarity reaches `min_score`
+    and beats the runner-up by `min_margin`, so the LLM classifier still handles ambiguous
+    messages. `calibrate` picks both thresholds from cross-validated predictions on the
+    labelled examples.
+    """
+
+    TOKEN_PATTERN = re.compile(r"\w+")
+
+    STOP_WORDS = frozenset(
+        """
+        ada adalah agar akan aku anda apa apakah atau bagaimana bagi bahwa banyak baru
+        belum berapa bisa boleh buat cara dalam dan dapat dari dengan di dia harus hari
+        ingin ini itu jadi jika juga kalau kami kamu kapan karena ke kenapa ketika kita
+        lagi lain mana mau mengapa menjadi mereka nya oleh pada para perlu saat saja saya
+        sebagai sedang seperti siapa sini situ sudah supaya tahu tapi tentang tersebut
+        tidak untuk yang
+        a an and are can do does how i in is it me my of on or the to what when where
+        which who why with you
+        """.split()
+    )
+
+    OTHER_EXAMPLES = [
+        "Halo, apa kabar?",
+        "Selamat pagi, semoga harimu menyenangkan",
+        "Terima kasih banyak atas bantuannya",
+        "Bagaimana cara memasak nasi goreng yang enak?",
+        "Resep kue coklat tanpa oven",
+        "Di mana toko roti yang enak di dekat sini?",
+        "Rekomendasi restoran murah untuk makan malam",
+        "Siapa pemenang piala dunia tahun lalu?",
+        "Jadwal pertandingan sepak bola malam ini",
+        "Film apa yang sedang tayang di bioskop?",
+        "Ceritakan lelucon yang lucu",
+        "Bagaimana cuaca besok di Surabaya?",
+        "Harga tiket pesawat ke Bali",
+        "Tips menurunkan berat badan dengan cepat",
+        "Lagu apa yang sedang populer sekarang?",
+        "Berapa harga emas hari ini?",
+    ]
+
+    def __init__(self, min_score: float = 0.3, min_margin: float = 0.1):
+        """
+        Initializes the local intent classifier.
+
+        Args:
+            min_score (float): The minimum cosine similarity of a trusted prediction.
+            min_margin (float): The minimum lead of the best intent over the runner-up.
+        """
+        self._min_score = min_score
+        self._min_margin = min_margin
+        self._vocabulary: dict[str, int] = {}
+        self._idf: Optional[np.ndarray] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._intents: list["Intent"] = []
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> Optional["LocalIntentClassifier"]:
+        """
+        Create and train a local classifier from the `intent_classifier.local` settings.
+
+        Args:
+            config (Optional[dict]): The local classifier settings.
+
+        Returns:
+            Optional[LocalIntentClassifier]: The trained classifier, None when it is
+                disabled or there is nothing to train on.
+        """
+        if not config or not config.get("enabled", True):
+            return None
+
+        classifier = cls(
+            min_score=config.get("min_score", 0.3),
+            min_margin=config.get("min_margin", 0.1),
+        )
+        examples = cls.description_examples() + cls.labelled_questions()
+        if not examples:
+            return None
+
+        classifier.fit(examples)
+        logger.info(
+            f"Local intent classifier trained on {len(examples)} examples, "
+            f"{len(classifier._vocabulary)} terms."
+        )
+
+        min_precision = config.get("min_precision")
+        if min_precision is not None:
+            calibration = classifier.calibrate(examples, min_precision)
+            if calibration is None:
+                logger.warning(
+                    f"No thresholds of the local intent classifier reach a precision of "
+                    f"{min_precision}, leaving every message to the LLM."
+                )
+                return None
+            logger.info(f"Local intent classifier calibrated: {calibration}")
+        return classifier
+
+    @classmethod
+    def description_examples(cls) -> list[tuple[str, "Intent"]]:
+        """
+        Get training examples from the sentences of the intent descriptions, and the
+        off-topic examples of `other`.
+
+        Returns:
+            list[tuple[str, Intent]]: The examples.
+        """
+        from chatbot.dependencies.IntentClassifier import Intent, IntentDescription
+
+        examples = []
+        for intent, description in IntentDescription._describe.items():
+            # The description of `other` tells the LLM what to do, it is not an example.
+            if intent == Intent.OTHER:
+                continue
+            for sentence in re.split(r"[\n.?!]+", description):
+                if sentence.strip():
+                    examples.append((sentence.strip(), intent))
+        examples.extend((sentence, Intent.OTHER) for sentence in cls.OTHER_EXAMPLES)
+        return examples
+
+    @staticmethod
+    def labelled_questions() -> list[tuple[str, "Intent"]]:
+        """
+        Get training examples from the questions staff labelled with an intent.
+
+        Returns:
+            list[tuple[str, Intent]]: The examples, empty when the database is unavailable.
+        """
+        from chatbot.dependencies.IntentClassifier import Intent
+
+        try:
+            from chatbot.database import SessionLocal
+            from chatbot.database.models.Questions import Question
+
+            with SessionLocal() as db:
+                rows = (
+                    db.query(Question.prompt, Question.intent)
+                    .filter(Question.intent.isnot(None))
+                    .all()
+                )
+        except Exception as e:
+            logger.warning(f"Could not load labelled questions: {e}")
+            return []
+
+        examples = []
+        for prompt, intent in rows:
+            if prompt and intent in Intent.list():
+                examples.append((prompt, Intent(intent)))
+        return examples
+
+    @classmethod
+    def tokenize(cls, text: str) -> list[str]:
+        """
+        Split a text into its terms: lowercased words and word bigrams, without stop words.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            list[str]: The terms.
+        """
+        words = [
+            word
+            for word in cls.TOKEN_PATTERN.findall(text.lower())
+            if word not in cls.STOP_WORDS
+        ]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def fit(self, examples: list[tuple[str, "Intent"]]) -> "LocalIntentClassifier":
+        """
+        Train the classifier.
+
+        Args:
+            examples (list[tuple[str, Intent]]): The texts and their intents.
+
+        Returns:
+            LocalIntentClassifier: The trained classifier.
+        """
+        documents = [Counter(self.tokenize(text)) for text, _ in examples]
+
+        document_frequency: Counter = Counter()
+        for terms in documents:
+            document_frequency.update(terms.keys())
+
+        self._vocabulary = {term: i for i, term in enumerate(sorted(document_frequency))}
+        self._idf = np.array(
+            [
+                math.log((1 + len(documents)) / (1 + document_frequency[term])) + 1
+                for term in sorted(document_frequency)
+            ],
+            dtype=np.float32,
+        )
+
+        self._intents = sorted({intent for _, intent in examples}, key=lambda i: i.value)
+        sums = np.zeros((len(self._intents), len(self._vocabulary)), dtype=np.float32)
+        for terms, (_, intent) in zip(documents, examples):
+            sums[self._intents.index(intent)] += self._vectorize(terms)
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        self._centroids = sums / np.maximum(norms, 1e-12)
+        return self
+
+    def _vectorize(self, terms: Counter) -> np.ndarray:
+        """
+        Build the normalized TF-IDF vector of a text.
+
+        Args:
+            terms (Counter): The term counts of the text.
+
+        Returns:
+            np.ndarray: The vector.
+        """
+        vector = np.zeros(len(self._vocabulary), dtype=np.float32)
+        for term, count in terms.items():
+            index = self._vocabulary.get(term)
+            if index is not None:
+                vector[index] = (1 + math.log(count)) * self._idf[index]
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def scores(self, message: str) -> dict["Intent", float]:
+        """
+        Get the cosine similarity of a message to every intent.
+
+        Args:
+            message (str): The message.
+
+        Returns:
+            dict[Intent, float]: The similarity per intent.
+        """
+        similarities = self._centroids @ self._vectorize(Counter(self.tokenize(message)))
+        return {intent: float(score) for intent, score in zip(self._intents, similarities)}
+
+    def predict(self, message: str) -> Optional["Intent"]:
+        """
+        Classify a message when the classifier is confident enough.
+
+        Args:
+            message (str): The message.
+
+        Returns:
+            Optional[Intent]: The intent, None when the prediction is not trusted.
+        """
+        ranked = self._rank(message)
+        if ranked is None:
+            return None
+
+        best_intent, best, margin = ranked
+        if best < self._min_score or margin < self._min_margin:
+            return None
+        return best_intent
+
+    def _rank(self, message: str) -> Optional[tuple["Intent", float, float]]:
+        """
+        Get the closest intent of a message.
+
+        Args:
+            message (str): The message.
+
+        Returns:
+            Optional[tuple[Intent, float, float]]: The intent, its similarity and its lead
+                over the runner-up; None without intents.
+        """
+        ranked = sorted(self.scores(message).items(), key=lambda item: item[1], reverse=True)
+        if not ranked:
+            return None
+
+        best_intent, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return best_intent, best, best - runner_up
+
+    def calibrate(
+        self,
+        examples: list[tuple[str, "Intent"]],
+        min_precision: float = 0.95,
+        folds: int = 5,
+    ) -> Optional[dict]:
+        """
+        Pick the loosest `min_score` and `min_margin` whose predictions reach a precision.
+
+        Every example is predicted by a classifier trained on the other folds; among the
+        threshold pairs whose trusted predictions are at least `min_precision` correct, the
+        one trusting the most predictions is kept.
+
+        Args:
+            examples (list[tuple[str, Intent]]): The labelled texts.
+            min_precision (float): The minimum share of correct trusted predictions.
+            folds (int): The number of cross-validation folds.
+
+        Returns:
+            Optional[dict]: The thresholds and their precision and coverage, None when no
+                pair reaches the precision; the thresholds are left unchanged then.
+        """
+        predictions: list[tuple[float, float, bool]] = []
+        for fold in range(folds):
+            train = [example for i, example in enumerate(examples) if i % folds != fold]
+            held_out = [example for i, example in enumerate(examples) if i % folds == fold]
+            if not held_out or len({intent for _, intent in train}) < 2:
+                continue
+
+            model = LocalIntentClassifier().fit(train)
+            for text, intent in held_out:
+                ranked = model._rank(text)
+                if ranked is not None:
+                    predictions.append((ranked[1], ranked[2], ranked[0] == intent))
+
+        best: Optional[dict] = None
+        for min_score in np.arange(0.05, 0.8, 0.05):
+            for min_margin in np.arange(0.0, 0.5, 0.05):
+                trusted = [
+                    correct
+                    for score, margin, correct in predictions
+                    if score >= min_score and margin >= min_margin
+                ]
+                if not trusted or sum(trusted) / len(trusted) < min_precision:
+                    continue
+                if best is None or len(trusted) > best["trusted"]:
+                    best = {
+                        "min_score": round(float(min_score), 2),
+                        "min_margin": round(float(min_margin), 2),
+                        "precision": sum(trusted) / len(trusted),
+                        "trusted": len(trusted),
+                    }
+
+        if best is None:
+            return None
+
+        self._min_score = best["min_score"]
+        self._min_margin = best["min_margin"]
+        best["coverage"] = best.pop("trusted") / len(predictions)
+        return best
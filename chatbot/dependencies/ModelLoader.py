@@ -99,6 +99,17 @@ class ModelLoader:
 
         cls._loaded_models[model_name] = model
 
+    @classmethod
+    def loaded_models(cls) -> dict[str, Union[TextGenerator, TextEmbedder]]:
+        """
+        Gets the models loaded so far.
+
+        Returns:
+            dict[str, Union[TextGenerator, TextEmbedder]]: The loaded models by name.
+        """
+
+        return dict(cls._loaded_models)
+
     @classmethod
     def _is_model_exists(cls, model_name: str) -> bool:
         """
@@ -5,14 +5,105 @@ from jinja2 import Template
 import yaml
 
 
+class CompiledPrompt:
+    """
+    A prompt template rendered ahead of time around its single variable.
+
+    The template is rendered once with a marker in place of the variable and split there,
+    so the static text before and after the variable is built a single time and a request
+    only concatenates its value in between. Templates that use the variable more than once
+    or in a condition are rendered by Jinja as usual.
+    """
+
+    _MARKER = "\x00{0}\x00"
+
+    def __init__(self, template: Template, variable: str = "information"):
+        """
+        Initializes the compiled prompt.
+
+        Args:
+            template (Template): The prompt template.
+            variable (str): The name of the variable filled per request.
+        """
+        self._template = template
+        self._variable = variable
+        self._empty: str = template.render()
+        self._parts: Optional[tuple[str, str]] = None
+
+        first = template.render(**{variable: self._MARKER.format(1)})
+        second = template.render(**{variable: self._MARKER.format(2)})
+        parts = first.split(self._MARKER.format(1))
+        if len(parts) == 2 and parts[0] + self._MARKER.format(2) + parts[1] == second:
+            self._parts = (parts[0], parts[1])
+
+    @property
+    def template(self) -> Template:
+        """
+        Get the prompt template.
+
+        Returns:
+            Template: The prompt template.
+        """
+        return self._template
+
+    @property
+    def is_split(self) -> bool:
+        """
+        Check whether the prompt is rendered by concatenation.
+
+        Returns:
+            bool: False when every render goes through Jinja.
+        """
+        return self._parts is not None
+
+    def render(self, value: Optional[str] = None) -> str:
+        """
+        Render the prompt.
+
+        Args:
+            value (Optional[str]): The value of the variable. None renders the template
+                without it.
+
+        Returns:
+            str: The rendered prompt.
+        """
+        if value is None:
+            return self._empty
+        if self._parts is None or not value:
+            return self._template.render(**{self._variable: value})
+        return self._parts[0] + value + self._parts[1]
+
+    def render_parts(self, value: Optional[str] = None) -> list[str]:
+        """
+        Render the prompt as its static part followed by the part holding the value.
+
+        Joined, the parts equal `render(value)`. The static part is the same for every
+        value, so a model provider can cache it.
+
+        Args:
+            value (Optional[str]): The value of the variable.
+
+        Returns:
+            list[str]: The non-empty parts of the prompt.
+        """
+        if value is None or self._parts is None or not value or not self._parts[0]:
+            return [self.render(value)]
+        return [self._parts[0], value + self._parts[1]]
+
+
 class PromptManager:
     _prompts_dir: Optional[str] = None
+    _prompt_files: dict[str, dict] = {}
+    _templates: dict[tuple[str, str], Template] = {}
+    _compiled: dict[tuple[str, str, str], CompiledPrompt] = {}
 
     @classmethod
     def _read_prompt_file(cls, prompt_name: str) -> dict:
         """
         A method to read a prompt file based on the prompt name.
 
+        Prompt files are parsed once and kept for the lifetime of the process.
+
         Args:
             cls: The class reference.
             prompt_name (str): The name of the prompt file to read.
@@ -23,15 +114,21 @@ class PromptManager:
         Raises:
             FileNotFoundError: If the prompt file with the given name is not found.
         """
+        if prompt_name in cls._prompt_files:
+            return cls._prompt_files[prompt_name]
+
         if cls._prompts_dir is None:
             cls._prompts_dir = Configuration.get("prompts").get("directory")
 
         try:
             with open(f"{cls._prompts_dir}/{prompt_name}.yaml", "r") as f:
-                return yaml.safe_load(f)
+                prompt_file = yaml.safe_load(f)
         except FileNotFoundError:
             raise FileNotFoundError(f"Prompt '{prompt_name}' not found.")
 
+        cls._prompt_files[prompt_name] = prompt_file
+        return prompt_file
+
     @classmethod
     def get_prompt(cls, prompt_filename: str, prompt_name: str, context: Optional[dict] = None) -> str:
         """
@@ -49,25 +146,20 @@ class PromptManager:
         Raises:
             KeyError: If the prompt name is not found in the prompt file.
         """
-        try:
-            prompt_file = cls._read_prompt_file(prompt_filename)
-            template_string = Template(prompt_file[prompt_name])
-
-            if context:
-                return template_string.render(**context)
-            else:
-                return template_string.render()
+        template_string = cls.get_prompt_template(prompt_filename, prompt_name)
 
-        except KeyError:
-            raise KeyError(f"Prompt '{prompt_name}' not found in '{prompt_filename}' file.")
-        except Exception as e:
-            raise e
+        if context:
+            return template_string.render(**context)
+        else:
+            return template_string.render()
 
     @classmethod
     def get_prompt_template(cls, prompt_filename: str, prompt_name: str) -> Template:
         """
         A method to get a prompt template based on the prompt filename and prompt name.
 
+        Templates are compiled once and shared.
+
         Args:
             cls: The class reference.
             prompt_filename (str): The filename of the prompt.
@@ -79,14 +171,60 @@ class PromptManager:
         Raises:
             KeyError: If the prompt name is not found in the prompt file.
         """
+        key = (prompt_filename, prompt_name)
+        if key in cls._templates:
+            return cls._templates[key]
+
         try:
             prompt_file = cls._read_prompt_file(prompt_filename)
             template_string = Template(prompt_file[prompt_name])
-            return template_string
         except KeyError:
             raise KeyError(f"Prompt '{prompt_name}' not found in '{prompt_filename}' file.")
-        except Exception as e:
-            raise e
+
+        cls._templates[key] = template_string
+        return template_string
+
+    @classmethod
+    def get_compiled_prompt(
+        cls, prompt_filename: str, prompt_name: str, variable: str = "information"
+    ) -> CompiledPrompt:
+        """
+        A method to get a prompt template rendered ahead of time around one variable.
+
+        Args:
+            cls: The class reference.
+            prompt_filename (str): The filename of the prompt.
+            prompt_name (str): The name of the prompt.
+            variable (str, optional): The variable filled per request. Defaults to "information".
+
+        Returns:
+            CompiledPrompt: The compiled prompt.
+
+        Raises:
+            KeyError: If the prompt name is not found in the prompt file.
+        """
+        key = (prompt_filename, prompt_name, variable)
+        if key not in cls._compiled:
+            cls._compiled[key] = CompiledPrompt(
+                cls.get_prompt_template(prompt_filename, prompt_name), variable
+            )
+        return cls._compiled[key]
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """
+        A method to drop the parsed prompt files and compiled templates, e.g. after the
+        prompt files were edited.
+
+        Args:
+            cls: The class reference.
+
+        Returns:
+            None
+        """
+        cls._prompt_files.clear()
+        cls._templates.clear()
+        cls._compiled.clear()
 
     @classmethod
     def give_context_to_template(cls, prompt_template: Template, context: dict) -> str:
@@ -0,0 +1,312 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Optional
+
+import numpy as np
+
+from chatbot.logger import logger
+
+if TYPE_CHECKING:
+    from chatbot.dependencies.IntentClassifier import Intent
+
+
+class CachedAnswer:
+    """
+    An answer cached for a question, with the normalized embedding of the question.
+    """
+
+    def __init__(self, embedding: np.ndarray, answer: str):
+        """
+        Initializes the cached answer.
+
+        Args:
+            embedding (np.ndarray): The normalized embedding of the question.
+            answer (str): The full answer.
+        """
+        self.created_at = time.monotonic()
+        self.embedding = embedding
+        self.answer = answer
+        self.hits = 0
+
+
+class ResponseCache:
+    """
+    Semantic cache of complete answers to standalone questions.
+
+    Answers are grouped per intent and visibility, and a question is answered from the
+    cache when its embedding has a cosine similarity of at least `threshold` to a cached
+    question. Every group remembers the version stamp of the FAISS index its answers were
+    retrieved from; once the index is rewritten the group is dropped, so documents that
+    changed are never answered from stale retrievals. Each group keeps at most
+    `max_entries` answers, evicted in least-recently-used order.
+
+    Only questions asked without history are cached, as follow-up questions depend on the
+    conversation.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 256,
+        ttl_seconds: Optional[float] = None,
+        disabled_intents: Optional[list[str]] = None,
+        chunk_size: int = 64,
+        index_version: Optional[Callable[[str, bool], Optional[str]]] = None,
+    ):
+        """
+        Initializes the response cache.
+
+        Args:
+            threshold (float): The minimum cosine similarity of a cache hit.
+            max_entries (int): The maximum number of answers per intent and visibility.
+            ttl_seconds (Optional[float]): How long an answer stays valid. None never expires.
+            disabled_intents (Optional[list[str]]): The values of the intents never cached.
+            chunk_size (int): The number of characters per chunk of a replayed answer.
+            index_version (Optional[Callable[[str, bool], Optional[str]]]): Reads the
+                version stamp of the index of an intent value and visibility. Defaults to
+                the stamp on disk.
+        """
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._disabled_intents = set(disabled_intents or [])
+        self._chunk_size = chunk_size
+        self._index_version = index_version or self.read_index_version
+        self._groups: dict[tuple[str, bool], tuple[Optional[str], OrderedDict]] = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+        self.hits: dict[str, int] = {}
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> Optional["ResponseCache"]:
+        """
+        Create a response cache from the `response_cache` settings.
+
+        Args:
+            config (Optional[dict]): The cache settings.
+
+        Returns:
+            Optional[ResponseCache]: The response cache, None when it is disabled.
+        """
+        if not config or not config.get("enabled", False):
+            return None
+
+        return cls(
+            threshold=config.get("threshold", 0.95),
+            max_entries=config.get("max_entries", 256),
+            ttl_seconds=config.get("ttl_seconds"),
+            disabled_intents=config.get("disabled_intents"),
+            chunk_size=config.get("chunk_size", 64),
+        )
+
+    @staticmethod
+    def read_index_version(intent_value: str, public: bool) -> Optional[str]:
+        """
+        Read the version stamp of the FAISS index of an intent.
+
+        Args:
+            intent_value (str): The value of the intent.
+            public (bool): Whether to read the public index.
+
+        Returns:
+            Optional[str]: The version stamp, None if the intent has no index.
+        """
+        from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
+
+        return FaissIndexRegistry.read_version(
+            FaissIndexRegistry.index_dir(intent_value, public)
+        )
+
+    def enabled_for(self, intent: "Intent") -> bool:
+        """
+        Check whether answers of an intent are cached.
+
+        Args:
+            intent (Intent): The intent.
+
+        Returns:
+            bool: False when the intent opted out.
+        """
+        return intent.value not in self._disabled_intents
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        """
+        Normalize an embedding to unit length.
+
+        Args:
+            embedding (list[float]): The embedding.
+
+        Returns:
+            np.ndarray: The normalized embedding.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _group(self, intent_value: str, public: bool) -> OrderedDict:
+        """
+        Get the answers of an intent and visibility, dropping them if the index changed.
+
+        Must be called with the lock held.
+
+        Args:
+            intent_value (str): The value of the intent.
+            public (bool): The visibility.
+
+        Returns:
+            OrderedDict: The cached answers, by id.
+        """
+        key = (intent_value, public)
+        version = self._index_version(intent_value, public)
+        group = self._groups.get(key)
+        if group is None or group[0] != version:
+            if group is not None and group[1]:
+                self.invalidations += 1
+                logger.debug(f"Index of {intent_value} changed, dropping cached answers.")
+            group = (version, OrderedDict())
+            self._groups[key] = group
+        return group[1]
+
+    def lookup(
+        self, embedding: list[float], intents: list["Intent"], public: bool = False
+    ) -> Optional[tuple["Intent", str]]:
+        """
+        Find the cached answer of the most similar question.
+
+        Args:
+            embedding (list[float]): The embedding of the question.
+            intents (list[Intent]): The intents to look in.
+            public (bool): Whether the question was asked by a non-authenticated user.
+
+        Returns:
+            Optional[tuple[Intent, str]]: The intent and the answer, None on a miss.
+        """
+        query = self._normalize(embedding)
+        best: Optional[tuple[float, "Intent", int, OrderedDict]] = None
+
+        with self._lock:
+            for intent in intents:
+                if not self.enabled_for(intent):
+                    continue
+
+                group = self._group(intent.value, public)
+                for answer_id, cached in list(group.items()):
+                    if (
+                        self._ttl_seconds is not None
+                        and time.monotonic() - cached.created_at > self._ttl_seconds
+                    ):
+                        del group[answer_id]
+                        continue
+
+                    score = float(cached.embedding @ query)
+                    if score >= self._threshold and (best is None or score > best[0]):
+                        best = (score, intent, answer_id, group)
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            _, intent, answer_id, group = best
+            group.move_to_end(answer_id)
+            cached = group[answer_id]
+            cached.hits += 1
+            self.hits[intent.value] = self.hits.get(intent.value, 0) + 1
+            return intent, cached.answer
+
+    def store(
+        self, embedding: list[float], intent: "Intent", answer: str, public: bool = False
+    ) -> None:
+        """
+        Cache the answer to a question.
+
+        Args:
+            embedding (list[float]): The embedding of the question.
+            intent (Intent): The intent of the question.
+            answer (str): The full answer.
+            public (bool): Whether the question was asked by a non-authenticated user.
+
+        Returns:
+            None
+        """
+        if not answer or not self.enabled_for(intent):
+            return
+
+        with self._lock:
+            group = self._group(intent.value, public)
+            group[self._next_id] = CachedAnswer(self._normalize(embedding), answer)
+            self._next_id += 1
+            while len(group) > self._max_entries:
+                group.popitem(last=False)
+
+    async def replay(self, answer: str) -> AsyncIterator[str]:
+        """
+        Stream a cached answer in chunks, like a generated one.
+
+        Args:
+            answer (str): The cached answer.
+
+        Yields:
+            str: The chunks of the answer.
+        """
+        for start in range(0, len(answer), self._chunk_size):
+            yield answer[start : start + self._chunk_size]
+
+    async def record(
+        self,
+        stream: AsyncIterator[str],
+        embedding: list[float],
+        intent: "Intent",
+        public: bool = False,
+    ) -> AsyncIterator[str]:
+        """
+        Pass a generated answer through and cache it once it streamed completely.
+
+        Args:
+            stream (AsyncIterator[str]): The generated answer.
+            embedding (list[float]): The embedding of the question.
+            intent (Intent): The intent of the question.
+            public (bool): Whether the question was asked by a non-authenticated user.
+
+        Yields:
+            str: The chunks of the answer.
+        """
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+
+        self.store(embedding, intent, "".join(chunks), public)
+
+    def stats(self) -> dict:
+        """
+        Get the hit and miss counters of the cache.
+
+        Returns:
+            dict: The cache counters, with the hits per intent.
+        """
+        with self._lock:
+            hits = sum(self.hits.values())
+            lookups = hits + self.misses
+            return {
+                "size": sum(len(group[1]) for group in self._groups.values()),
+                "hits": hits,
+                "hits_per_intent": dict(self.hits),
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        """
+        Drop every cached answer.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._groups.clear()
@@ -1,7 +1,10 @@
+import logging
 from typing import Optional, Generator, AsyncGenerator, AsyncIterator
 
 from chatbot.config import Configuration
+from chatbot.dependencies.HistoryCompactor import HistoryCompactor
 from chatbot.dependencies.ModelLoader import ModelLoader
+from chatbot.dependencies.PromptManager import CompiledPrompt
 from chatbot.dependencies.contracts.TextGenerator import TextGenerator
 from chatbot.dependencies.contracts.message import (
     Message,
@@ -9,40 +12,75 @@ from chatbot.dependencies.contracts.message import (
     UserMessage,
     AssistantMessage,
 )
+from chatbot.dependencies.utils.Tracer import tracer
 from chatbot.logger import logger
 
 
 class ResponseGenerator:
     """
     This class represents the response generator.
+
+    A generator built from a `CompiledPrompt` is meant to be long-lived, e.g. one per
+    intent handler: the configuration and the model are resolved once and the system
+    prompt of a request only fills the retrieved information into the pre-rendered prompt.
     """
 
-    def __init__(self, prompt_template: str):
+    def __init__(self, prompt_template: str | CompiledPrompt):
         """
         Initialize the response generator.
 
         Parameters:
-            prompt_template (str): The prompt template.
+            prompt_template (str | CompiledPrompt): The rendered prompt, or the compiled
+                prompt rendered with the information of every request.
         """
-        self._prompt_template: str = prompt_template
+        self._prompt_template: str | CompiledPrompt = prompt_template
         self._config: dict = Configuration.get("response_generator")
         self._model: TextGenerator = ModelLoader.load_model(
             self._config.get("generator_model")
         )
 
     @staticmethod
-    def with_prompt_template(prompt_template: str) -> "ResponseGenerator":
+    def with_prompt_template(prompt_template: str | CompiledPrompt) -> "ResponseGenerator":
         """
         Create a response generator with a prompt template.
 
         Parameters:
-            prompt_template (str): The prompt template.
+            prompt_template (str | CompiledPrompt): The prompt template.
 
         Returns:
             ResponseGenerator: The response generator.
         """
         return ResponseGenerator(prompt_template)
 
+    def system_prompt(self, information: Optional[str] = None) -> str:
+        """
+        Build the system prompt of a request.
+
+        Parameters:
+            information (Optional[str]): The retrieved information. Ignored by a generator
+                built from a rendered prompt.
+
+        Returns:
+            str: The system prompt.
+        """
+        return "".join(self.system_prompts(information))
+
+    def system_prompts(self, information: Optional[str] = None) -> list[str]:
+        """
+        Build the system prompt of a request as its static instructions followed by the
+        retrieved information, so the static part can be cached by the model provider.
+
+        Parameters:
+            information (Optional[str]): The retrieved information. Ignored by a generator
+                built from a rendered prompt.
+
+        Returns:
+            list[str]: The parts of the system prompt.
+        """
+        if isinstance(self._prompt_template, CompiledPrompt):
+            return self._prompt_template.render_parts(information)
+        return [self._prompt_template]
+
     def _build_prompt_with_examples(self, message: str) -> list[Message]:
         """
         Helper method to build the prompt with example.
@@ -54,25 +92,41 @@ class ResponseGenerator:
             list[Message]: The list of messages.
         """
         prompts: list[Message] = [
-            SystemMessage(self._prompt_template),
+            SystemMessage(self.system_prompt()),
             UserMessage(message),
         ]
 
         return prompts
 
     def _build_history_messages(
-        self, user_prompt: str, history: list[dict]
+        self,
+        user_prompt: str,
+        history: list[dict],
+        summary: Optional[str] = None,
+        information: Optional[str] = None,
     ) -> list[Message]:
         """
         Helper method to build the history messages.
 
+        The history is compacted to the generator budget of the `HistoryCompactor`.
+
         Parameters:
             history (list[dict]): The history list.
+            summary (Optional[str]): The summary of the earlier conversation.
+            information (Optional[str]): The retrieved information.
 
         Returns:
             list[Message]: The list of messages.
         """
-        prompts: list[Message] = [SystemMessage(self._prompt_template)]
+        summary, history = HistoryCompactor.compact(
+            history, summary, HistoryCompactor.GENERATOR
+        )
+        prompts: list[Message] = [
+            SystemMessage(part) for part in self.system_prompts(information)
+        ]
+
+        if summary:
+            prompts.append(SystemMessage(f"Ringkasan percakapan sebelumnya: {summary}"))
 
         for msg in history:
             prompts.append(UserMessage(msg["U"]))
@@ -82,7 +136,11 @@ class ResponseGenerator:
         return prompts
 
     async def response_async(
-        self, message: str, history: list[dict] | None
+        self,
+        message: str,
+        history: list[dict] | None,
+        summary: Optional[str] = None,
+        information: Optional[str] = None,
     ) -> AsyncIterator[str]:
         """
         Generate a response based on the input.
@@ -92,6 +150,8 @@ class ResponseGenerator:
         Parameters:
             message (str): The input string.
             history (list[dict]): The history list.
+            summary (Optional[str]): The summary of the earlier conversation.
+            information (Optional[str]): The retrieved information.
 
         Yields:
             str: The response string.
@@ -99,20 +159,31 @@ class ResponseGenerator:
         if history is None:
             history = []
 
-        prompts: list[Message] = self._build_history_messages(message, history)
+        with tracer.span("response_generator.prompt", history=len(history)) as span:
+            prompts: list[Message] = self._build_history_messages(
+                message, history, summary, information
+            )
+            span.set(messages=len(prompts))
 
-        logger.debug(f"Prompts: {[str(prompt) for prompt in prompts]} ")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug(f"Prompts: {[str(prompt) for prompt in prompts]} ")
 
-        async_res = self._model.stream_async(
-            prompts, self._config.get("model_settings")
+        async_res = tracer.stream(
+            "response_generator.stream",
+            self._model.stream_async(prompts, self._config.get("model_settings")),
         )
 
-        response_text = ""
+        chunks: list[str] = []
 
         async for chunk in aiter(async_res):
-            response_text += chunk
+            chunks.append(chunk)
             yield chunk
 
+        if not debug:
+            return
+
+        response_text = "".join(chunks)
         if len(response_text) > 100:
             logger.debug(f"Response: {response_text[:100]} ... {response_text[-10:]}")
         else:
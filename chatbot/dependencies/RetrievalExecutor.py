@@ -0,0 +1,118 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from chatbot.logger import logger
+
+
+class RetrievalOverloadedError(RuntimeError):
+    """
+    Raised when the retrieval pool stays saturated for longer than the acquire timeout.
+    """
+
+
+class RetrievalExecutor:
+    """
+    Runs blocking retrieval work (index loads and FAISS searches) off the event loop.
+
+    Work is submitted to a dedicated thread pool, so a slow retrieval never stalls other
+    requests served by the same worker. At most `max_pending` calls may be queued or
+    running at once; further callers wait up to `acquire_timeout` seconds for a slot and
+    then fail fast with `RetrievalOverloadedError` instead of piling up.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_pending: int = 32,
+        acquire_timeout: Optional[float] = 5.0,
+    ):
+        """
+        Initializes the retrieval executor.
+
+        Args:
+            max_workers (int): The number of threads of the pool.
+            max_pending (int): The maximum number of calls queued or running at once.
+            acquire_timeout (Optional[float]): How long to wait for a free slot. None waits forever.
+        """
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="retrieval"
+        )
+        self._max_pending = max_pending
+        self._acquire_timeout = acquire_timeout
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "RetrievalExecutor":
+        """
+        Create a retrieval executor from the `information_retriever.executor` settings.
+
+        Args:
+            config (Optional[dict]): The executor settings.
+
+        Returns:
+            RetrievalExecutor: The retrieval executor.
+        """
+        config = config or {}
+        return cls(
+            max_workers=config.get("max_workers", 4),
+            max_pending=config.get("max_pending", 32),
+            acquire_timeout=config.get("acquire_timeout", 5.0),
+        )
+
+    @property
+    def pending(self) -> int:
+        """
+        Get the number of calls currently queued or running.
+
+        Returns:
+            int: The number of pending calls.
+        """
+        return self._pending
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking function in the retrieval pool.
+
+        Args:
+            fn (Callable): The function to run.
+            *args: The positional arguments of the function.
+            **kwargs: The keyword arguments of the function.
+
+        Returns:
+            Any: The return value of the function.
+
+        Raises:
+            RetrievalOverloadedError: No slot became free within the acquire timeout.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_pending)
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self._acquire_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Retrieval pool saturated ({self._max_pending} pending calls), rejecting call."
+            )
+            raise RetrievalOverloadedError("Retrieval pool is saturated.")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._pool, functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self._pending -= 1
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        """
+        Shut the thread pool down, waiting for running calls to finish.
+
+        Returns:
+            None
+        """
+        self._pool.shutdown(wait=True)
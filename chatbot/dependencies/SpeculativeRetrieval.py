@@ -0,0 +1,79 @@
+import asyncio
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterable, Optional
+
+from chatbot.logger import logger
+
+if TYPE_CHECKING:
+    from chatbot.dependencies.IntentClassifier import Intent
+
+
+class SpeculativeRetrieval:
+    """
+    Retrieval of a query from every intent index, started before the intent is known.
+
+    The query is embedded once and every intent index is searched with that embedding,
+    concurrently with the intent classification. `result` keeps the search of the winning
+    intent and cancels the others. The work only starts once the caller suspends, so a
+    classification answered without suspending (the local tier of the `IntentClassifier`)
+    cancels the losing searches before they ran.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[], Awaitable[list[float]]],
+        search: Callable[["Intent", Awaitable[list[float]]], Awaitable[str]],
+        intents: Iterable["Intent"],
+    ):
+        """
+        Starts the speculative retrieval.
+
+        Args:
+            embed (Callable[[], Awaitable[list[float]]]): Embeds the query.
+            search (Callable[[Intent, Awaitable[list[float]]], Awaitable[str]]): Searches
+                the index of an intent with the awaitable embedding of the query.
+            intents (Iterable[Intent]): The intents whose indexes are searched.
+        """
+        self._embedding: asyncio.Future = asyncio.ensure_future(embed())
+        self._searches: dict["Intent", asyncio.Task] = {
+            intent: asyncio.create_task(search(intent, asyncio.shield(self._embedding)))
+            for intent in intents
+        }
+
+    async def result(self, intent: "Intent") -> Optional[str]:
+        """
+        Get the retrieved information of the winning intent, cancelling the other searches.
+
+        Args:
+            intent (Intent): The classified intent.
+
+        Returns:
+            Optional[str]: The retrieved information, None when the intent was not searched
+                or its search failed.
+        """
+        search = self._searches.pop(intent, None)
+        self.cancel(keep_embedding=search is not None)
+        if search is None:
+            return None
+
+        try:
+            return await search
+        except Exception as e:
+            logger.warning(f"Speculative retrieval of {intent} failed: {e}")
+            return None
+
+    def cancel(self, keep_embedding: bool = False) -> None:
+        """
+        Cancel the pending searches, e.g. when the classification failed.
+
+        Args:
+            keep_embedding (bool): Whether the embedding of the query is still needed.
+
+        Returns:
+            None
+        """
+        for search in self._searches.values():
+            search.cancel()
+        self._searches.clear()
+
+        if not keep_embedding:
+            self._embedding.cancel()
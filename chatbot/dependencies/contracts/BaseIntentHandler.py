@@ -4,9 +4,10 @@ from typing import Optional, AsyncIterator, List
 from jinja2 import Template
 
 from chatbot.Application import Application
+from chatbot.dependencies.HistoryCompactor import HistoryCompactor
 from chatbot.dependencies.InformationRetriever import InformationRetriever
 from chatbot.dependencies.IntentClassifier import Intent
-from chatbot.dependencies.PromptManager import PromptManager
+from chatbot.dependencies.PromptManager import CompiledPrompt, PromptManager
 from chatbot.dependencies.ResponseGenerator import ResponseGenerator
 from chatbot.dependencies.contracts.message import Message
 from chatbot.logger import logger
@@ -22,6 +23,9 @@ class BaseIntentHandler(ABC):
         self._application: Optional[Application] = None
         self._prompt_template: Optional[Template] = None
         self._public_prompt_template: Optional[Template] = None
+        self._compiled_prompt: Optional[CompiledPrompt] = None
+        self._public_compiled_prompt: Optional[CompiledPrompt] = None
+        self._response_generator: Optional[ResponseGenerator] = None
         self._history: Optional[List[Message]] = None
 
     @property
@@ -64,6 +68,18 @@ class BaseIntentHandler(ABC):
         """
         return self._application.information_retriever
 
+    @property
+    def response_generator(self) -> ResponseGenerator:
+        """
+        Gets the response generator of the intent, created on first use and then reused.
+
+        Returns:
+            ResponseGenerator: The response generator.
+        """
+        if self._response_generator is None:
+            self._response_generator = ResponseGenerator(self._compiled_prompt)
+        return self._response_generator
+
     def with_app(self, application: Application) -> "BaseIntentHandler":
         """
         Sets the application instance.
@@ -87,16 +103,16 @@ class BaseIntentHandler(ABC):
         Returns:
             str: The prompt template.
         """
-        _prompt_template_no_context = PromptManager.get_prompt_template(
+        self._compiled_prompt = PromptManager.get_compiled_prompt(
             "response_generator", intent.name
         )
-
-        _public_prompt_template_no_context = PromptManager.get_prompt_template(
+        self._public_compiled_prompt = PromptManager.get_compiled_prompt(
             "public_response_generator", intent.name
         )
 
-        self._prompt_template = _prompt_template_no_context
-        self._public_prompt_template = _public_prompt_template_no_context
+        self._prompt_template = self._compiled_prompt.template
+        self._public_prompt_template = self._public_compiled_prompt.template
+        self._response_generator = None
         return self
 
     def build_prompt_with_information(self, information: str | None) -> str:
@@ -109,9 +125,7 @@ class BaseIntentHandler(ABC):
         Returns:
             str: The prompt with information.
         """
-        if information is None:
-            return self._prompt_template.render()
-        return self._prompt_template.render(information=information)
+        return self._compiled_prompt.render(information)
 
     def build_public_prompt_with_information(
         self, information: str | None = None
@@ -125,9 +139,7 @@ class BaseIntentHandler(ABC):
         Returns:
             str: The prompt with information.
         """
-        if information is None:
-            return self._public_prompt_template.render()
-        return self._public_prompt_template.render(information=information)
+        return self._public_compiled_prompt.render(information)
 
     def build_prompt(self, context: Optional[dict] = None) -> str:
         """
@@ -143,8 +155,40 @@ class BaseIntentHandler(ABC):
             context = {}
         return self._prompt_template.render(**context)
 
+    @staticmethod
+    def build_retrieval_query(message: str, history: list[dict] | None) -> str:
+        """
+        Builds the retrieval query of a message.
+
+        Only the recent turns that fit the retriever budget of the `HistoryCompactor` are
+        prepended to the message, so the size of the query does not grow with the
+        conversation.
+
+        Parameters:
+            message (str): The message.
+            history (list[dict] | None): The history list.
+
+        Returns:
+            str: The retrieval query.
+        """
+        history = HistoryCompactor.fit(
+            history or [], HistoryCompactor.budget(HistoryCompactor.RETRIEVER)
+        )
+        if not history:
+            return message
+
+        return (
+            "\n".join([f"{turn['U']}\n{turn['A']}" for turn in history])
+            + "\n"
+            + message
+        )
+
     async def handle(
-        self, message: str, history: list[dict] | None = None
+        self,
+        message: str,
+        history: list[dict] | None = None,
+        summary: Optional[str] = None,
+        information: Optional[str] = None,
     ) -> AsyncIterator[str]:
         """
         Handles the intent of the message.
@@ -154,6 +198,9 @@ class BaseIntentHandler(ABC):
         Parameters:
             message (str): The message to be handled.
             history (list[dict]): The history list.
+            summary (Optional[str]): The summary of the earlier conversation.
+            information (Optional[str]): The information already retrieved for the message,
+                e.g. speculatively. Retrieved here when None.
 
         Returns:
             str: The response to the message.
@@ -163,25 +210,25 @@ class BaseIntentHandler(ABC):
 
         logger.debug(f"Handling intent: {self._intent}")
 
-        message_with_history = (
-            "\n".join([f"{message['U']}\n{message['A']}" for message in history])
-            + "\n"
-            + message
-        )
+        if information is None:
+            message_with_history = self.build_retrieval_query(message, history)
 
-        logger.debug(f"Message with history: {message_with_history}")
+            logger.debug(f"Message with history: {message_with_history}")
 
-        information = await self.information_retriever.retrieve_async(
-            message_with_history, self._intent
+            information = await self.information_retriever.retrieve_async(
+                message_with_history, self._intent
+            )
+        response = self.response_generator.response_async(
+            message, history, summary, information
         )
-        prompt_template = self.build_prompt_with_information(information)
-        response_generator = ResponseGenerator.with_prompt_template(prompt_template)
-        response = response_generator.response_async(message, history)
 
         return response
 
     async def handle_public(
-        self, message: str, history: list[dict] | None = None
+        self,
+        message: str,
+        history: list[dict] | None = None,
+        information: Optional[str] = None,
     ) -> AsyncIterator[str]:
         """
         Handles the intent of the message.
@@ -190,6 +237,9 @@ class BaseIntentHandler(ABC):
 
         Parameters:
             message (str): The message to be handled.
+            history (list[dict]): The history list.
+            information (Optional[str]): The information already retrieved for the message,
+                e.g. speculatively. Retrieved here when None.
 
         Returns:
             str: The response to the message.
@@ -212,23 +262,16 @@ class BaseIntentHandler(ABC):
 
         logger.debug(f"Handling public intent: {self._intent}")
 
-        message_with_history = (
-            (
-                "\n".join([f"{message['U']}\n{message['A']}" for message in history])
-                + "\n"
-                + message
-            )
-            if history
-            else message
-        )
+        if information is None:
+            message_with_history = self.build_retrieval_query(message, history)
 
-        logger.debug(f"Message with history: {message_with_history}")
+            logger.debug(f"Message with history: {message_with_history}")
 
-        information = await self.information_retriever.retrieve_public_async(
-            message_with_history, self._intent
+            information = await self.information_retriever.retrieve_public_async(
+                message_with_history, self._intent
+            )
+        response = self.response_generator.response_async(
+            message, history, information=information
         )
-        prompt_template = self.build_prompt_with_information(information)
-        response_generator = ResponseGenerator.with_prompt_template(prompt_template)
-        response = response_generator.response_async(message, history)
 
         return response
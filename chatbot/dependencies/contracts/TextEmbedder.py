@@ -1,9 +1,14 @@
+import uuid
 from abc import ABC, abstractmethod
+from pathlib import Path
 
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
 
-from ..utils.path_utils import project_path
+from ..vectorstore.FaissIndexFactory import FaissIndexFactory
+from ..vectorstore.FaissIndexRegistry import FaissIndexRegistry
+from ..vectorstore.FaissIndexWriter import FaissIndexWriter
+from ..vectorstore.SegmentLog import SegmentLog
 from ...logger import logger
 
 
@@ -38,6 +43,16 @@ class TextEmbedder(ABC):
         """
         pass
 
+    @property
+    def model_name(self) -> str:
+        """
+        Get the name of the embedding model, used to address chunks embedded by it.
+
+        Returns:
+            str: The name of the model.
+        """
+        return type(self).__name__
+
     def save_to_faiss_index(self, documents: list[Document], faiss_dir: str):
         """
         Save the internal model to FAISS index.
@@ -56,7 +71,8 @@ class TextEmbedder(ABC):
         """
         try:
             db: FAISS = FAISS.from_documents(documents, self.model)
-            db.save_local(f"{faiss_dir}")
+            with FaissIndexWriter.exclusive(faiss_dir):
+                FaissIndexRegistry.save(db, faiss_dir)
             logger.debug(
                 f"Saved {len(documents)} documents to {faiss_dir} FAISS index."
             )
@@ -79,11 +95,60 @@ class TextEmbedder(ABC):
             Exception: Error adding data to FAISS index.
         """
         try:
-            db: FAISS = FAISS.load_local(
-                f"{faiss_dir}", self.model, allow_dangerous_deserialization=True
+            with FaissIndexWriter.exclusive(faiss_dir):
+                db: FAISS = FaissIndexFactory.load_flat(faiss_dir, self.model)
+                db.add_documents(documents)
+                FaissIndexRegistry.save(db, faiss_dir)
+            logger.debug(
+                f"Added {len(documents)} documents to {faiss_dir} FAISS index."
             )
-            db.add_documents(documents)
-            db.save_local(f"{faiss_dir}")
+        except Exception as e:
+            logger.error(f"Error adding data to FAISS index: {e}")
+            raise Exception(f"Error adding data to FAISS index: {e}")
+
+    def add_embeddings_to_faiss_index(
+        self,
+        documents: list[Document],
+        vectors: list[list[float]],
+        faiss_dir: str,
+        ids: list[str] | None = None,
+    ):
+        """
+        Add already embedded data to the FAISS index, creating it when it does not exist.
+
+        The whole index is loaded, extended and saved again. Documents whose id is already
+        in the index are skipped.
+
+        Args:
+            documents (list[Document]): The documents to be added to the FAISS index.
+            vectors (list[list[float]]): The embeddings of the documents.
+            faiss_dir (str): The directory to the FAISS index.
+            ids (list[str] | None): The docstore ids of the documents. Random when None.
+
+        Returns:
+            None
+
+        Raises:
+            Exception: Error adding data to FAISS index.
+        """
+        records = [
+            {
+                "op": "add",
+                "id": _id if ids is not None else uuid.uuid4().hex,
+                "text": doc.page_content,
+                "metadata": doc.metadata,
+                "vector": SegmentLog.encode_vector(vector),
+            }
+            for _id, doc, vector in zip(ids or [None] * len(documents), documents, vectors)
+        ]
+        try:
+            with FaissIndexWriter.exclusive(faiss_dir):
+                db: FAISS | None = None
+                if (Path(faiss_dir) / "index.faiss").exists():
+                    db = FaissIndexFactory.load_flat(faiss_dir, self.model)
+                db = SegmentLog.apply(db, records, self.model)
+                if db is not None:
+                    FaissIndexRegistry.save(db, faiss_dir)
             logger.debug(
                 f"Added {len(documents)} documents to {faiss_dir} FAISS index."
             )
@@ -91,10 +156,80 @@ class TextEmbedder(ABC):
             logger.error(f"Error adding data to FAISS index: {e}")
             raise Exception(f"Error adding data to FAISS index: {e}")
 
+    def append_to_faiss_index(
+        self,
+        documents: list[Document],
+        faiss_dir: str,
+        compact_after_segments: int | None = 20,
+        vectors: list[list[float]] | None = None,
+        ids: list[str] | None = None,
+    ) -> list[str]:
+        """
+        Append data to the FAISS index without rewriting it.
+
+        The documents are written as a new segment of the index; the segments are folded
+        into the main index once `compact_after_segments` of them exist.
+
+        Args:
+            documents (list[Document]): The documents to be added to the FAISS index.
+            faiss_dir (str): The directory to the FAISS index.
+            compact_after_segments (int | None): The number of segments that triggers a compaction.
+            vectors (list[list[float]] | None): The embeddings of the documents, embedded here when None.
+            ids (list[str] | None): The docstore ids of the documents. Random when None.
+
+        Returns:
+            list[str]: The docstore ids of the added documents.
+
+        Raises:
+            Exception: Error appending data to FAISS index.
+        """
+        try:
+            if vectors is None:
+                vectors = self.model.embed_documents([doc.page_content for doc in documents])
+            writer = FaissIndexWriter(faiss_dir, self.model, compact_after_segments)
+            return writer.append(documents, vectors, ids)
+        except Exception as e:
+            logger.error(f"Error appending data to FAISS index: {e}")
+            raise Exception(f"Error appending data to FAISS index: {e}")
+
+    def delete_from_faiss_index(
+        self,
+        ids: list[str],
+        faiss_dir: str,
+        compact_after_segments: int | None = 20,
+    ):
+        """
+        Remove data from the FAISS index.
+
+        Tombstones are appended as a new segment of the index; the data is dropped from the
+        main index once `compact_after_segments` segments exist.
+
+        Args:
+            ids (list[str]): The docstore ids of the data to remove.
+            faiss_dir (str): The directory to the FAISS index.
+            compact_after_segments (int | None): The number of segments that triggers a compaction.
+
+        Returns:
+            None
+
+        Raises:
+            Exception: Error deleting data from FAISS index.
+        """
+        try:
+            writer = FaissIndexWriter(faiss_dir, self.model, compact_after_segments)
+            writer.delete(ids)
+            logger.debug(f"Deleted {len(ids)} documents from {faiss_dir} FAISS index.")
+        except Exception as e:
+            logger.error(f"Error deleting data from FAISS index: {e}")
+            raise Exception(f"Error deleting data from FAISS index: {e}")
+
     def load_intent_faiss_index(self, intent_value: str) -> FAISS:
         """
         Load the FAISS index for the intent.
 
+        The index is served from the process-wide `FaissIndexRegistry`, so it is only read
+        from disk on first use and after it has been rewritten.
+
         Args:
             intent_value (str): The value of the intent.
 
@@ -105,13 +240,7 @@ class TextEmbedder(ABC):
             Exception: Error loading the FAISS index.
         """
         try:
-            faiss_root_dir = project_path("faiss")
-            faiss_intent_dir = faiss_root_dir / intent_value
-            return FAISS.load_local(
-                f"{faiss_intent_dir}",
-                self.model,
-                allow_dangerous_deserialization=True,
-            )
+            return FaissIndexRegistry.get(intent_value, self.model)
         except FileNotFoundError:
             logger.error(f"FAISS index for {intent_value} not found.")
             raise FileNotFoundError(f"FAISS index for {intent_value} not found.")
@@ -122,6 +251,9 @@ class TextEmbedder(ABC):
         """
         Load the public FAISS index for the intent.
 
+        The index is served from the process-wide `FaissIndexRegistry`, so it is only read
+        from disk on first use and after it has been rewritten.
+
         Args:
             intent_value (str): The value of the intent.
 
@@ -132,12 +264,9 @@ class TextEmbedder(ABC):
             Exception: Error loading the public FAISS index.
         """
         try:
-            faiss_root_dir = project_path("faiss")
-            faiss_intent_dir = faiss_root_dir / (intent_value + "_public")
-            return FAISS.load_local(
-                f"{faiss_intent_dir}",
-                self.model,
-                allow_dangerous_deserialization=True,
-            )
+            return FaissIndexRegistry.get(intent_value, self.model, public=True)
         except FileNotFoundError:
             logger.error(f"Public FAISS index for {intent_value} not found.")
+            raise FileNotFoundError(f"Public FAISS index for {intent_value} not found.")
+        except Exception as e:
+            raise Exception(f"Error loading the public FAISS index: {e}")
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import re
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from ..contracts.TextEmbedder import TextEmbedder
+
+
+class HashedEmbeddings(Embeddings):
+    """
+    Deterministic LangChain embeddings built from hashed words.
+
+    Every word adds a signed unit to the dimension its hash points at, and the result is
+    L2-normalized: texts sharing words are close, identical texts are equal. Each call
+    waits `latency` seconds to stand in for the round trip to an embedding API.
+    """
+
+    _WORD = re.compile(r"\w+")
+
+    def __init__(self, dimensions: int = 3072, latency: float = 0.0):
+        """
+        Initializes the hashed embeddings.
+
+        Args:
+            dimensions (int): The number of dimensions of a vector.
+            latency (float): The duration of an embedding call.
+        """
+        self.dimensions = dimensions
+        self.latency = latency
+
+    def _embed(self, text: str) -> list[float]:
+        """
+        Embed a single text.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            list[float]: The embedding.
+        """
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in self._WORD.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if value & (1 << 63) else -1.0
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        time.sleep(self.latency)
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        await asyncio.sleep(self.latency)
+        return self._embed(text)
+
+
+class FakeEmbeddings(TextEmbedder):
+    """
+    Offline text embedder for benchmarks and load tests, backed by `HashedEmbeddings`.
+    """
+
+    def __init__(self, dimensions: int = 3072, latency: float = 0.05):
+        """
+        Initializes the fake embedder.
+
+        Args:
+            dimensions (int): The number of dimensions of a vector.
+            latency (float): The duration of an embedding call.
+
+        Returns:
+            None
+        """
+        self._model = HashedEmbeddings(dimensions, latency)
+
+    @property
+    def model(self) -> Embeddings:
+        """
+        Get the internal model.
+        """
+        return self._model
+
+    @property
+    def model_name(self) -> str:
+        """
+        Get the name of the embedding model.
+        """
+        return f"fake-embeddings-{self._model.dimensions}"
+
+    def get_embedding(self, text: str) -> list[float]:
+        """
+        Embed a text into a vector.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            list[float]: The embedding.
+        """
+        return self._model.embed_query(text)
@@ -0,0 +1,139 @@
+import asyncio
+import random
+import time
+from typing import AsyncIterator, Generator, Optional
+
+from chatbot.dependencies.contracts.TextGenerator import TextGenerator
+from chatbot.dependencies.contracts.message import Message
+
+
+class FakeTextGenerator(TextGenerator):
+    """
+    Offline text generator with a scripted reply and configurable latency.
+
+    Meant for benchmarks and load tests: it needs no API key and its timing is controlled,
+    so the time spent in the pipeline itself can be measured. A generation answers with
+    `reply` after `latency` seconds; a stream yields its first chunk after
+    `first_token_latency` seconds and the remaining `chunks - 1` chunks every
+    `chunk_interval` seconds. Every delay is spread by up to `jitter` of its value.
+    """
+
+    def __init__(
+        self,
+        reply: str = "Ini adalah jawaban contoh dari asisten kampus.",
+        latency: float = 0.3,
+        first_token_latency: float = 0.3,
+        chunk_interval: float = 0.02,
+        chunks: int = 20,
+        jitter: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initializes the fake text generator.
+
+        Args:
+            reply (str): The generated text.
+            latency (float): The duration of a generation.
+            first_token_latency (float): The delay before the first chunk of a stream.
+            chunk_interval (float): The delay between two chunks of a stream.
+            chunks (int): The number of chunks the reply is streamed in.
+            jitter (float): The relative spread of the delays, between 0 and 1.
+            seed (Optional[int]): The seed of the jitter.
+        """
+        self._reply = reply
+        self._latency = latency
+        self._first_token_latency = first_token_latency
+        self._chunk_interval = chunk_interval
+        self._chunks = max(1, chunks)
+        self._jitter = jitter
+        self._random = random.Random(seed)
+
+    def _delay(self, seconds: float) -> float:
+        """
+        Spread a delay by the jitter.
+
+        Args:
+            seconds (float): The delay.
+
+        Returns:
+            float: The jittered delay.
+        """
+        if not self._jitter:
+            return seconds
+        return max(0.0, seconds * self._random.uniform(1 - self._jitter, 1 + self._jitter))
+
+    def _split(self) -> list[str]:
+        """
+        Split the reply into the chunks of a stream.
+
+        Returns:
+            list[str]: The chunks.
+        """
+        size = max(1, -(-len(self._reply) // self._chunks))
+        return [self._reply[i : i + size] for i in range(0, len(self._reply), size)] or [""]
+
+    def generate(self, prompt: list[Message], config: Optional[dict] = None) -> str:
+        """
+        Generate a text based on the input.
+
+        Parameters:
+            prompt (list[Message]): The input messages.
+            config (dict, optional): The generation config.
+
+        Returns:
+            str: The generated text.
+        """
+        time.sleep(self._delay(self._latency))
+        return self._reply
+
+    async def generate_async(self, prompt: list[Message], config: Optional[dict] = None) -> str:
+        """
+        Generate a text based on the input.
+
+        Parameters:
+            prompt (list[Message]): The input messages.
+            config (dict, optional): The generation config.
+
+        Returns:
+            str: The generated text.
+        """
+        await asyncio.sleep(self._delay(self._latency))
+        return self._reply
+
+    def stream(
+        self, prompt: list[Message], config: Optional[dict] = None
+    ) -> Generator[str, None, None]:
+        """
+        Generate a text stream based on the input.
+
+        Parameters:
+            prompt (list[Message]): The input messages.
+            config (dict, optional): The generation config.
+
+        Yields:
+            str: The generated text stream.
+        """
+        time.sleep(self._delay(self._first_token_latency))
+        for i, chunk in enumerate(self._split()):
+            if i:
+                time.sleep(self._delay(self._chunk_interval))
+            yield chunk
+
+    async def stream_async(
+        self, prompt: list[Message], config: Optional[dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate a text stream based on the input.
+
+        Parameters:
+            prompt (list[Message]): The input messages.
+            config (dict, optional): The generation config.
+
+        Yields:
+            str: The generated text stream.
+        """
+        await asyncio.sleep(self._delay(self._first_token_latency))
+        for i, chunk in enumerate(self._split()):
+            if i:
+                await asyncio.sleep(self._delay(self._chunk_interval))
+            yield chunk
@@ -1,8 +1,10 @@
+import asyncio
 import json
 import os
 import re
+from collections import OrderedDict
 from contextlib import asynccontextmanager
-from typing import Generator, Optional, Union, AsyncGenerator, AsyncIterator
+from typing import Any, Generator, Optional, Union, AsyncGenerator, AsyncIterator
 
 from chatbot.dependencies.contracts.message import (
     AssistantMessage,
@@ -10,8 +12,10 @@ from chatbot.dependencies.contracts.message import (
     Message,
     SystemMessage,
 )
+from chatbot.dependencies.utils.Tracer import Span, tracer
 from chatbot.logger import logger
 from ..contracts.TextGenerator import TextGenerator
+from .GeminiContextCache import GeminiContextCache
 import google.generativeai as genai
 from google.generativeai import GenerationConfig
 from google.generativeai.types import (
@@ -61,7 +65,22 @@ class Gemini(TextGenerator):
         def __str__(self):
             return self.response
 
-    def __init__(self, model_name: str = "gemini-1.0-pro"):
+    def __init__(
+        self,
+        model_name: str = "gemini-1.0-pro",
+        context_cache: Optional[dict] = None,
+        max_models: int = 64,
+    ):
+        """
+        Initializes the Gemini text generator.
+
+        Args:
+            model_name (str): The name of the Gemini model.
+            context_cache (Optional[dict]): The settings of the `GeminiContextCache`. Static
+                system instructions are sent inline when None.
+            max_models (int): The maximum number of model objects kept per system
+                instruction.
+        """
         harm_categories = {
             HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
             HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
@@ -69,78 +88,229 @@ class Gemini(TextGenerator):
             HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
         }
         genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        self._model_name = model_name
+        self._safety_settings = harm_categories
         self.model = genai.GenerativeModel(model_name, safety_settings=harm_categories)
+        self._models: OrderedDict[str, genai.GenerativeModel] = OrderedDict()
+        self._max_models = max_models
+        self._context_cache: Optional[GeminiContextCache] = GeminiContextCache.from_config(
+            model_name, context_cache
+        )
+
+    def stats(self) -> dict:
+        """
+        Get the counters of the context cache.
+
+        Returns:
+            dict: The context cache counters, empty without a context cache.
+        """
+        if self._context_cache is None:
+            return {}
+        return {"context_cache": self._context_cache.stats()}
+
+    _ROLES: dict[type, str] = {
+        UserMessage: "user",
+        AssistantMessage: "model",
+        SystemMessage: "system",
+    }
 
     @staticmethod
-    def _gemini_messages_to_str(messages: list[Message]) -> str:
+    def _message_role(message: Message) -> Optional[str]:
         """
-        Convert a list of messages to a string.
+        Get the role of a message in the Gemini contents.
+
+        Args:
+            message: The message.
+
+        Returns:
+            The role, or None for an unknown kind of message.
+        """
+        role = Gemini._ROLES.get(type(message))
+        if role is not None:
+            return role
+
+        for message_type, role in Gemini._ROLES.items():
+            if isinstance(message, message_type):
+                return role
+        return None
+
+    @staticmethod
+    def _to_contents(messages: list[Message]) -> tuple[Optional[str], list[dict]]:
+        """
+        Convert a list of messages to a system instruction and multi-turn contents.
+
+        The first system message becomes the system instruction, so the static prompt of
+        an intent can be cached on the Gemini side. Later system messages, such as the
+        retrieved information or the conversation summary, change per request and are sent
+        as user parts. Consecutive messages of the same role are merged into one turn.
 
         Args:
             messages: The list of messages to convert.
 
         Returns:
-            The string representation of the messages.
+            The system instruction, None when there is no system message, and the contents.
         """
-        casted_messages: list[str] = []
-        try:
-            for MSG in messages:
-                if isinstance(MSG, UserMessage):
-                    casted_messages.append(str(Gemini.GeminiUserMessage(MSG.message)))
-                elif isinstance(MSG, AssistantMessage):
-                    casted_messages.append(
-                        str(Gemini.GeminiAssistantMessage(MSG.message))
-                    )
-                elif isinstance(MSG, SystemMessage):
-                    casted_messages.append(str(Gemini.GeminiSystemMessage(MSG.message)))
-
-            casted_messages.append(str(Gemini.GeminiAssistantMessage(None)))
-            return "\n".join([MSG for MSG in casted_messages])
-        except Exception as e:
-            logger.error(e)
+        system_instruction: Optional[str] = None
+        contents: list[dict] = []
+
+        for MSG in messages:
+            role = Gemini._message_role(MSG)
+            if role is None or not MSG.message:
+                continue
+
+            if role == "system":
+                if system_instruction is None and not contents:
+                    system_instruction = MSG.message
+                    continue
+                role = "user"
+
+            if contents and contents[-1]["role"] == role:
+                contents[-1]["parts"].append(MSG.message)
+            else:
+                contents.append({"role": role, "parts": [MSG.message]})
+
+        if not contents and system_instruction is not None:
+            return None, [{"role": "user", "parts": [system_instruction]}]
+
+        return system_instruction, contents
+
+    def _model_for(
+        self, system_instruction: Optional[str], cached_content: Optional[Any] = None
+    ) -> genai.GenerativeModel:
+        """
+        Get the model object serving a system instruction.
+
+        Args:
+            system_instruction: The system instruction.
+            cached_content: The `CachedContent` of the system instruction, if any.
+
+        Returns:
+            The model object.
+        """
+        if cached_content is not None:
+            return genai.GenerativeModel.from_cached_content(
+                cached_content, safety_settings=self._safety_settings
+            )
+        if system_instruction is None:
+            return self.model
+
+        model = self._models.get(system_instruction)
+        if model is None:
+            model = genai.GenerativeModel(
+                self._model_name,
+                safety_settings=self._safety_settings,
+                system_instruction=system_instruction,
+            )
+            self._models[system_instruction] = model
+            while len(self._models) > self._max_models:
+                self._models.popitem(last=False)
+        else:
+            self._models.move_to_end(system_instruction)
+        return model
+
+    def _cached_content(self, system_instruction: Optional[str]) -> Optional[Any]:
+        """
+        Get the `CachedContent` of a system instruction, creating it when needed.
+
+        Args:
+            system_instruction: The system instruction.
+
+        Returns:
+            The `CachedContent`, None when the instruction is sent inline.
+        """
+        if self._context_cache is None or system_instruction is None:
+            return None
+        return self._context_cache.get(system_instruction)
+
+    async def _cached_content_async(self, system_instruction: Optional[str]) -> Optional[Any]:
+        """
+        Get the `CachedContent` of a system instruction without blocking the event loop.
+
+        Args:
+            system_instruction: The system instruction.
+
+        Returns:
+            The `CachedContent`, None when the instruction is sent inline.
+        """
+        if self._context_cache is None or system_instruction is None:
+            return None
+
+        cached_content = self._context_cache.cached(system_instruction)
+        span = tracer.current()
+        if span is not None:
+            span.set(cache_hit=cached_content is not None)
+        if cached_content is None and self._context_cache.eligible(system_instruction):
+            cached_content = await asyncio.to_thread(self._context_cache.get, system_instruction)
+        return cached_content
 
     def _generate(
-        self, prompt: str, config: GenerationConfig, **kwargs
+        self, prompt: list[Message], config: GenerationConfig, **kwargs
     ) -> generation_types.GenerateContentResponse:
         """
         Generate text using the Google Generative AI model.
 
         Args:
-            prompt: The text to generate from.
+            prompt: The messages to generate from.
             config: The generation config.
 
         Returns:
             The generated text.
 
         """
+        system_instruction, contents = self._to_contents(prompt)
+        cached_content = self._cached_content(system_instruction)
+
+        try:
+            return self._model_for(system_instruction, cached_content).generate_content(
+                contents, generation_config=config, **kwargs
+            )
+        except Exception as e:
+            if cached_content is None:
+                logger.error(e)
+                raise RuntimeError("[Generation failed] " + str(e))
+            logger.warning(f"Generation from cached context failed, sending it inline: {e}")
+            self._context_cache.invalidate(system_instruction)
+
         try:
-            res = self.model.generate_content(
-                prompt, generation_config=config, **kwargs
+            return self._model_for(system_instruction).generate_content(
+                contents, generation_config=config, **kwargs
             )
-            return res
         except Exception as e:
             logger.error(e)
             raise RuntimeError("[Generation failed] " + str(e))
 
     async def _generate_async(
-        self, prompt: str, config: GenerationConfig, **kwargs
+        self, prompt: list[Message], config: GenerationConfig, **kwargs
     ) -> generation_types.AsyncGenerateContentResponse:
         """
         Generate text using the Google Generative AI model.
 
         Args:
-            prompt: The text to generate from.
+            prompt: The messages to generate from.
             config: The generation config.
 
         Returns:
             The generated text.
 
         """
+        system_instruction, contents = self._to_contents(prompt)
+        cached_content = await self._cached_content_async(system_instruction)
+
+        try:
+            return await self._model_for(
+                system_instruction, cached_content
+            ).generate_content_async(contents, generation_config=config, **kwargs)
+        except Exception as e:
+            if cached_content is None:
+                logger.error(e)
+                raise RuntimeError("[Generation failed] " + str(e))
+            logger.warning(f"Generation from cached context failed, sending it inline: {e}")
+            self._context_cache.invalidate(system_instruction)
+
         try:
-            res = await self.model.generate_content_async(
-                prompt, generation_config=config, **kwargs
+            return await self._model_for(system_instruction).generate_content_async(
+                contents, generation_config=config, **kwargs
             )
-            return res
         except Exception as e:
             logger.error(e)
             raise RuntimeError("[Generation failed] " + str(e))
@@ -158,7 +328,6 @@ class Gemini(TextGenerator):
 
         """
         config = GenerationConfig() if config is None else GenerationConfig(**config)
-        prompt = self._gemini_messages_to_str(prompt)
         res = self._generate(prompt, config)
         try:
             res.resolve()
@@ -186,7 +355,6 @@ class Gemini(TextGenerator):
             ValueError: If the response is not valid.
         """
         config = GenerationConfig() if config is None else GenerationConfig(**config)
-        prompt = self._gemini_messages_to_str(prompt)
         res = self._generate(prompt, config, stream=True)
         try:
             for chunk in res:
@@ -211,16 +379,17 @@ class Gemini(TextGenerator):
 
         """
         config = GenerationConfig() if config is None else GenerationConfig(**config)
-        prompt = self._gemini_messages_to_str(prompt)
-        res = await self._generate_async(prompt, config)
-        try:
-            await res.resolve()
-            text = Gemini.GeminiResponse(res.text)
-            logger.debug(f"[Generated]: {text}")
-            return str(text)
-        except ValueError as e:
-            logger.error(e)
-            return self._handle_value_error(e, res)
+        with tracer.span("gemini.generate", model=self._model_name) as span:
+            res = await self._generate_async(prompt, config)
+            try:
+                await res.resolve()
+                self._record_usage(span, res)
+                text = Gemini.GeminiResponse(res.text)
+                logger.debug(f"[Generated]: {text}")
+                return str(text)
+            except ValueError as e:
+                logger.error(e)
+                return self._handle_value_error(e, res)
 
     async def stream_async(
         self, prompt: list[Message], config: Optional[dict] = None
@@ -238,17 +407,56 @@ class Gemini(TextGenerator):
         Raises:
             ValueError: If the response is not valid.
         """
+        async for chunk in tracer.stream(
+            "gemini.stream", self._stream_chunks_async(prompt, config), model=self._model_name
+        ):
+            yield chunk
+
+    async def _stream_chunks_async(
+        self, prompt: list[Message], config: Optional[dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate text stream using the Google Generative AI model, recording its token usage
+        in the current span.
+
+        Args:
+            prompt: The text to generate from.
+            config: The generation config.
+
+        Returns:
+            The generated text stream.
+        """
         config = GenerationConfig() if config is None else GenerationConfig(**config)
-        prompt = self._gemini_messages_to_str(prompt)
         res = await self._generate_async(prompt, config, stream=True)
         try:
             async for chunk in res:
+                self._record_usage(tracer.current(), chunk)
                 yield str(Gemini.GeminiResponse(chunk.text))
 
         except ValueError as e:
             logger.warning(e)
             yield self._handle_value_error(e, res)
 
+    @staticmethod
+    def _record_usage(span: Optional[Span], response: Any) -> None:
+        """
+        Record the token counts of a response, or of the last chunk of a stream, in a span.
+
+        Args:
+            span: The span of the generation.
+            response: The response or chunk.
+
+        Returns:
+            None
+        """
+        usage = getattr(response, "usage_metadata", None)
+        if span is None or usage is None or not getattr(usage, "prompt_token_count", 0):
+            return
+        span.set(
+            prompt_tokens=int(usage.prompt_token_count),
+            completion_tokens=int(getattr(usage, "candidates_token_count", 0)),
+        )
+
     @staticmethod
     def _handle_value_error(
         e: ValueError,
@@ -0,0 +1,228 @@
+import datetime
+import hashlib
+import threading
+import time
+from typing import Any, Optional
+
+from chatbot.logger import logger
+
+try:
+    from google.generativeai import caching
+except ImportError:  # google-generativeai < 0.7 has no context caching
+    caching = None
+
+
+class GeminiContextCache:
+    """
+    Local handles of system instructions cached on the Gemini side.
+
+    A system instruction of at least `min_tokens` estimated tokens is uploaded once as
+    `CachedContent`, so later requests only send the dynamic turns and the model does not
+    prefill the static prompt again. Handles are kept per instruction and their TTL is
+    extended once less than `refresh_margin` seconds are left. An instruction whose cache
+    could not be created is sent inline for `retry_after` seconds before trying again.
+
+    Context caching needs an explicitly versioned model name, e.g. `gemini-1.5-flash-001`,
+    and google-generativeai 0.7 or newer.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        ttl_seconds: float = 3600.0,
+        refresh_margin: float = 300.0,
+        min_tokens: int = 32768,
+        retry_after: float = 300.0,
+    ):
+        """
+        Initializes the context cache.
+
+        Args:
+            model_name (str): The name of the model the contents are cached for.
+            ttl_seconds (float): The TTL of a cached content on the Gemini side.
+            refresh_margin (float): How long before its expiry a cached content is extended.
+            min_tokens (int): The minimum estimated size of a cached system instruction.
+            retry_after (float): How long a failed instruction is not cached again.
+        """
+        self._model_name = (
+            model_name if model_name.startswith("models/") else f"models/{model_name}"
+        )
+        self._ttl_seconds = ttl_seconds
+        self._refresh_margin = refresh_margin
+        self._min_tokens = min_tokens
+        self._retry_after = retry_after
+        self._handles: dict[str, tuple[float, Any]] = {}
+        self._failed: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.refreshed = 0
+        self.failures = 0
+
+    @classmethod
+    def from_config(
+        cls, model_name: str, config: Optional[dict]
+    ) -> Optional["GeminiContextCache"]:
+        """
+        Create a context cache from the `context_cache` parameters of a Gemini model.
+
+        Args:
+            model_name (str): The name of the model.
+            config (Optional[dict]): The context cache settings.
+
+        Returns:
+            Optional[GeminiContextCache]: The context cache, None when it is disabled or
+                not supported by the installed client.
+        """
+        if not config or not config.get("enabled", False):
+            return None
+
+        if caching is None:
+            logger.warning(
+                "Gemini context caching needs google-generativeai >= 0.7, sending prompts inline."
+            )
+            return None
+
+        return cls(
+            model_name,
+            ttl_seconds=config.get("ttl_seconds", 3600.0),
+            refresh_margin=config.get("refresh_margin", 300.0),
+            min_tokens=config.get("min_tokens", 32768),
+            retry_after=config.get("retry_after", 300.0),
+        )
+
+    @staticmethod
+    def key(system_instruction: str) -> str:
+        """
+        Build the key of a system instruction.
+
+        Args:
+            system_instruction (str): The system instruction.
+
+        Returns:
+            str: The key.
+        """
+        return hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """
+        Roughly estimate the number of tokens of a text.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            int: The estimated number of tokens.
+        """
+        return len(text) // 4 + 1
+
+    def cached(self, system_instruction: str) -> Optional[Any]:
+        """
+        Get the handle of a cached instruction without any network call.
+
+        Args:
+            system_instruction (str): The system instruction.
+
+        Returns:
+            Optional[Any]: The `CachedContent`, None when it is missing or due for refresh.
+        """
+        with self._lock:
+            entry = self._handles.get(self.key(system_instruction))
+        if entry is None or entry[0] - time.monotonic() <= self._refresh_margin:
+            return None
+        return entry[1]
+
+    def eligible(self, system_instruction: str) -> bool:
+        """
+        Check whether an instruction should be cached on the Gemini side.
+
+        Args:
+            system_instruction (str): The system instruction.
+
+        Returns:
+            bool: False when it is too small or failed to be cached recently.
+        """
+        if self.estimate_tokens(system_instruction) < self._min_tokens:
+            return False
+
+        with self._lock:
+            failed_at = self._failed.get(self.key(system_instruction))
+        return failed_at is None or time.monotonic() - failed_at > self._retry_after
+
+    def get(self, system_instruction: str) -> Optional[Any]:
+        """
+        Get the handle of an instruction, creating or extending its cached content.
+
+        This call may block on the Gemini API.
+
+        Args:
+            system_instruction (str): The system instruction.
+
+        Returns:
+            Optional[Any]: The `CachedContent`, None when the instruction is sent inline.
+        """
+        handle = self.cached(system_instruction)
+        if handle is not None or not self.eligible(system_instruction):
+            return handle
+
+        key = self.key(system_instruction)
+        ttl = datetime.timedelta(seconds=self._ttl_seconds)
+
+        with self._lock:
+            entry = self._handles.get(key)
+
+        try:
+            if entry is not None and entry[0] > time.monotonic():
+                entry[1].update(ttl=ttl)
+                handle = entry[1]
+                self.refreshed += 1
+            else:
+                handle = caching.CachedContent.create(
+                    model=self._model_name,
+                    display_name=f"chatbot-{key[:16]}",
+                    system_instruction=system_instruction,
+                    ttl=ttl,
+                )
+                self.created += 1
+        except Exception as e:
+            logger.warning(f"Could not cache Gemini context: {e}")
+            self.failures += 1
+            with self._lock:
+                self._handles.pop(key, None)
+                self._failed[key] = time.monotonic()
+            return None
+
+        with self._lock:
+            self._handles[key] = (time.monotonic() + self._ttl_seconds, handle)
+            self._failed.pop(key, None)
+        return handle
+
+    def invalidate(self, system_instruction: str) -> None:
+        """
+        Forget the handle of an instruction, e.g. after it expired on the Gemini side.
+
+        Args:
+            system_instruction (str): The system instruction.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._handles.pop(self.key(system_instruction), None)
+
+    def stats(self) -> dict:
+        """
+        Get the counters of the context cache.
+
+        Returns:
+            dict: The cache counters.
+        """
+        with self._lock:
+            size = len(self._handles)
+        return {
+            "size": size,
+            "created": self.created,
+            "refreshed": self.refreshed,
+            "failures": self.failures,
+        }
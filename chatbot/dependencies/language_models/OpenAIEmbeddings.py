@@ -1,29 +1,80 @@
+from typing import Optional
+
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings as LangChainOpenAIEmbeddings
 
 from ..contracts.TextEmbedder import TextEmbedder
+from ..utils.EmbeddingCache import EmbeddingCache, CachedEmbeddings
+from ..utils.path_utils import project_path
 
 
 class OpenAIEmbeddings(TextEmbedder):
 
-    def __init__(self, model_name: str = "text-embedding-3-large"):
+    def __init__(
+        self,
+        model_name: str = "text-embedding-3-large",
+        cache: Optional[dict] = None,
+        dimensions: Optional[int] = None,
+    ):
         """
         Initializes the OpenAIEmbeddings object.
 
         Args:
             model_name (str): The name of the model to use for embeddings.
+            cache (Optional[dict]): The settings of the query embedding cache
+                (`max_size`, `ttl_seconds`, `persist_path`). No cache when None.
+            dimensions (Optional[int]): The number of dimensions the API shortens the
+                embeddings to, for the `text-embedding-3` models. Full size when None.
+                Changing it requires re-embedding every index.
 
         Returns:
             None
         """
-        self._model = LangChainOpenAIEmbeddings(model=model_name)
+        # Vectors of different sizes must never share cache entries or chunk store rows.
+        self._model_name = (
+            model_name if dimensions is None else f"{model_name}@{dimensions}"
+        )
+        self._model: Embeddings = LangChainOpenAIEmbeddings(
+            model=model_name, dimensions=dimensions
+        )
+
+        if cache is not None:
+            persist_path = cache.get("persist_path")
+            self._model = CachedEmbeddings(
+                self._model,
+                EmbeddingCache(
+                    self._model_name,
+                    max_size=cache.get("max_size", 4096),
+                    ttl_seconds=cache.get("ttl_seconds"),
+                    persist_path=str(project_path(persist_path)) if persist_path else None,
+                ),
+            )
 
     @property
-    def model(self) -> LangChainOpenAIEmbeddings:
+    def model(self) -> Embeddings:
         """
         Get the internal model.
         """
         return self._model
 
+    @property
+    def model_name(self) -> str:
+        """
+        Get the name of the embedding model.
+        """
+        return self._model_name
+
+    def stats(self) -> dict:
+        """
+        Get the counters of the query embedding cache.
+
+        Returns:
+            dict: The cache counters, empty without a cache.
+        """
+        if isinstance(self._model, CachedEmbeddings):
+            return {"embedding_cache": self._model.cache.stats()}
+        return {}
+
     def get_embedding(self, text: str) -> list[float]:
         """
         Embed a text into a vector.
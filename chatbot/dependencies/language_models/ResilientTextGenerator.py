@@ -0,0 +1,646 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Generator, Optional, TypeVar
+
+from chatbot.dependencies.contracts.TextGenerator import TextGenerator
+from chatbot.dependencies.contracts.message import Message
+from chatbot.logger import logger
+
+T = TypeVar("T")
+
+
+class GeneratorOverloadedError(RuntimeError):
+    """
+    Raised when no concurrency slot of a model became free within the slot timeout.
+    """
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised when the circuit breaker of a model rejects a call.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops calling a model after `failure_threshold` consecutive failures.
+
+    Once open, calls are rejected for `reset_timeout` seconds; then a single trial call is
+    let through (half open). Its success closes the breaker again, its failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initializes the circuit breaker.
+
+        Args:
+            failure_threshold (int): The number of consecutive failures opening the breaker.
+            reset_timeout (float): How long the breaker stays open before a trial call.
+        """
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        Get the state of the breaker.
+
+        Returns:
+            str: `closed`, `open` or `half_open`.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return self.CLOSED
+            if time.monotonic() - self._opened_at < self._reset_timeout:
+                return self.OPEN
+            return self.HALF_OPEN
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go through, claiming the trial call when half open.
+
+        Returns:
+            bool: False when the call is rejected.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self._reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        """
+        Record a successful call, closing the breaker.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def abandon(self) -> None:
+        """
+        Record a call that was cancelled before it succeeded or failed.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """
+        Record a failed call, opening the breaker once the threshold is reached.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self._failure_threshold:
+                if self._opened_at is None or self._trial_running:
+                    logger.warning(f"Circuit breaker opened after {self._failures} failures.")
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class LatencyWindow:
+    """
+    The latencies of the most recent successful calls.
+    """
+
+    def __init__(self, size: int = 200):
+        """
+        Initializes the latency window.
+
+        Args:
+            size (int): The number of latencies kept.
+        """
+        self._latencies: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def add(self, seconds: float) -> None:
+        """
+        Record a latency.
+
+        Args:
+            seconds (float): The latency.
+
+        Returns:
+            None
+        """
+        self._latencies.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Get a percentile of the recorded latencies.
+
+        Args:
+            q (float): The percentile, between 0 and 1.
+
+        Returns:
+            Optional[float]: The percentile, None when nothing was recorded.
+        """
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientTextGenerator(TextGenerator):
+    """
+    Wraps a text generator of the model garden with limits, deadlines and a fallback.
+
+    - At most `max_concurrency` calls run per model; a call waits up to `slot_timeout`
+      seconds for a slot and fails with `GeneratorOverloadedError` otherwise.
+    - A stream must yield its first chunk within `first_token_timeout` seconds and a
+      generation must complete within `total_timeout` seconds.
+    - Failed calls are retried `max_retries` times with jittered exponential backoff.
+      A stream is only retried until its first chunk was yielded.
+    - With hedging enabled, a second identical request is sent when the first one has not
+      answered (or yielded its first chunk) after the `percentile` latency of recent calls;
+      the first to answer wins and the other one is cancelled.
+    - Consecutive failures open a `CircuitBreaker`, and calls go to the `fallback` model
+      until it closes again.
+
+    The wrapped models are referenced by their `model_garden` names and loaded on first use.
+    """
+
+    def __init__(
+        self,
+        primary: str | TextGenerator,
+        fallback: Optional[str | TextGenerator] = None,
+        max_concurrency: int = 16,
+        slot_timeout: Optional[float] = 5.0,
+        first_token_timeout: Optional[float] = 20.0,
+        total_timeout: Optional[float] = 90.0,
+        max_retries: int = 2,
+        retry_backoff: float = 0.5,
+        hedge: Optional[dict] = None,
+        circuit_breaker: Optional[dict] = None,
+    ):
+        """
+        Initializes the resilient text generator.
+
+        Args:
+            primary (str | TextGenerator): The model, or its name in the model garden.
+            fallback (Optional[str | TextGenerator]): The model used while the primary
+                fails, or its name in the model garden.
+            max_concurrency (int): The maximum number of concurrent calls per model.
+            slot_timeout (Optional[float]): How long to wait for a free concurrency slot;
+                the connection to the model is bounded by the other deadlines.
+            first_token_timeout (Optional[float]): How long to wait for the first chunk of
+                a stream.
+            total_timeout (Optional[float]): How long a generation may take.
+            max_retries (int): The number of retries of a failed call.
+            retry_backoff (float): The base delay between retries.
+            hedge (Optional[dict]): The hedging settings: `enabled`, `delay` (used until
+                `min_samples` latencies were recorded) and `percentile`.
+            circuit_breaker (Optional[dict]): The circuit breaker settings:
+                `failure_threshold` and `reset_timeout`.
+        """
+        self._models: dict[str, str | TextGenerator] = {"primary": primary}
+        if fallback is not None:
+            self._models["fallback"] = fallback
+
+        self._max_concurrency = max_concurrency
+        self._slot_timeout = slot_timeout
+        self._first_token_timeout = first_token_timeout
+        self._total_timeout = total_timeout
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+
+        hedge = hedge or {}
+        self._hedge_enabled: bool = hedge.get("enabled", False)
+        self._hedge_delay: float = hedge.get("delay", 3.0)
+        self._hedge_percentile: float = hedge.get("percentile", 0.95)
+        self._hedge_min_samples: int = hedge.get("min_samples", 20)
+        self._latencies = {"generate": LatencyWindow(), "stream": LatencyWindow()}
+
+        circuit_breaker = circuit_breaker or {}
+        self._breaker = CircuitBreaker(
+            failure_threshold=circuit_breaker.get("failure_threshold", 5),
+            reset_timeout=circuit_breaker.get("reset_timeout", 30.0),
+        )
+        self._slots: dict[str, asyncio.Semaphore] = {}
+
+        self.retries = 0
+        self.hedges = 0
+        self.fallbacks = 0
+        self.timeouts = 0
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """
+        Get the circuit breaker of the primary model.
+
+        Returns:
+            CircuitBreaker: The circuit breaker.
+        """
+        return self._breaker
+
+    def _model(self, role: str) -> TextGenerator:
+        """
+        Get a wrapped model, loading it from the model garden on first use.
+
+        Args:
+            role (str): `primary` or `fallback`.
+
+        Returns:
+            TextGenerator: The model.
+        """
+        model = self._models[role]
+        if isinstance(model, str):
+            from chatbot.dependencies.ModelLoader import ModelLoader
+
+            model = ModelLoader.load_model(model)
+            self._models[role] = model
+        return model
+
+    def stats(self) -> dict:
+        """
+        Get the counters of the generator.
+
+        Returns:
+            dict: The counters and the state of the circuit breaker.
+        """
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "fallbacks": self.fallbacks,
+            "timeouts": self.timeouts,
+            "circuit": self._breaker.state,
+            "p95_latency": self._latencies["generate"].percentile(0.95),
+            "p95_first_token": self._latencies["stream"].percentile(0.95),
+        }
+
+    def _backoff(self, attempt: int) -> float:
+        """
+        Get the jittered delay before a retry.
+
+        Args:
+            attempt (int): The number of the retry, starting at 1.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        return self._retry_backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+
+    def _current_hedge_delay(self, kind: str) -> Optional[float]:
+        """
+        Get how long to wait before sending a hedged request.
+
+        Args:
+            kind (str): `generate`, or `stream` for the first chunk of a stream.
+
+        Returns:
+            Optional[float]: The delay in seconds, None when hedging is disabled.
+        """
+        if not self._hedge_enabled:
+            return None
+        latencies = self._latencies[kind]
+        if len(latencies) < self._hedge_min_samples:
+            return self._hedge_delay
+        return latencies.percentile(self._hedge_percentile)
+
+    def _semaphore(self, role: str) -> asyncio.Semaphore:
+        """
+        Get the concurrency slots of a model.
+
+        Args:
+            role (str): `primary` or `fallback`.
+
+        Returns:
+            asyncio.Semaphore: The slots.
+        """
+        if role not in self._slots:
+            self._slots[role] = asyncio.Semaphore(self._max_concurrency)
+        return self._slots[role]
+
+    async def _acquire(self, role: str) -> None:
+        """
+        Wait for a concurrency slot of a model.
+
+        Args:
+            role (str): `primary` or `fallback`.
+
+        Raises:
+            GeneratorOverloadedError: No slot became free within the slot timeout.
+        """
+        try:
+            await asyncio.wait_for(self._semaphore(role).acquire(), self._slot_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise GeneratorOverloadedError(f"No free slot for the {role} model.")
+
+    async def _run(self, call: Callable[[str], Awaitable[T]]) -> T:
+        """
+        Run a call on the primary model with retries, or on the fallback model.
+
+        Args:
+            call (Callable[[str], Awaitable[T]]): Runs the call on the model of a role.
+
+        Returns:
+            T: The result of the call.
+
+        Raises:
+            RuntimeError: The call failed on every model.
+        """
+        error: Exception = CircuitOpenError("The circuit breaker of the primary model is open.")
+
+        if self._breaker.allow():
+            for attempt in range(self._max_retries + 1):
+                if attempt:
+                    self.retries += 1
+                    await asyncio.sleep(self._backoff(attempt))
+                try:
+                    result = await call("primary")
+                except asyncio.CancelledError:
+                    self._breaker.abandon()
+                    raise
+                except Exception as e:
+                    logger.warning(f"Generation attempt {attempt + 1} failed: {e!r}")
+                    self._breaker.record_failure()
+                    error = e
+                    if not self._breaker.allow():
+                        break
+                    continue
+
+                self._breaker.record_success()
+                return result
+
+        if "fallback" not in self._models:
+            raise RuntimeError(f"[Generation failed] {error}") from error
+
+        logger.warning(f"Primary model unavailable ({error!r}), using the fallback model.")
+        self.fallbacks += 1
+        try:
+            return await call("fallback")
+        except Exception as e:
+            raise RuntimeError(f"[Generation failed] {e}") from e
+
+    async def _hedged(
+        self,
+        role: str,
+        kind: str,
+        start: Callable[[], Awaitable[T]],
+        timeout: Optional[float],
+        discard: Optional[Callable[[T], Awaitable[None]]] = None,
+    ) -> T:
+        """
+        Await a request, sending a hedged copy when it is slower than usual.
+
+        The caller holds a slot for the first request; the hedged copy only goes out when
+        another slot is free.
+
+        Args:
+            role (str): `primary` or `fallback`.
+            kind (str): `generate`, or `stream` for the first chunk of a stream.
+            start (Callable[[], Awaitable[T]]): Sends the request.
+            timeout (Optional[float]): The deadline of the request.
+            discard (Optional[Callable[[T], Awaitable[None]]]): Releases the result of a
+                request that lost the race.
+
+        Returns:
+            T: The result of the first request to succeed.
+        """
+        delay = self._current_hedge_delay(kind)
+        if delay is None or (timeout is not None and delay >= timeout):
+            return await asyncio.wait_for(start(), timeout)
+
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        tasks = [asyncio.ensure_future(start())]
+        winner: Optional[asyncio.Future] = None
+        hedge_slot = False
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and not self._semaphore(role).locked():
+                await self._semaphore(role).acquire()
+                hedge_slot = True
+                self.hedges += 1
+                tasks.append(asyncio.ensure_future(start()))
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                remaining = None if deadline is None else max(deadline - loop.time(), 0)
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif discard is not None and not task.cancelled() and task.exception() is None:
+                    await discard(task.result())
+            if hedge_slot:
+                self._semaphore(role).release()
+
+    async def generate_async(self, prompt: list[Message], config: Optional[dict] = None) -> str:
+        """
+        Generate a text based on the input.
+
+        Parameters:
+            prompt (list[Message]): The input messages.
+            config (dict, optional): The generation config.
+
+        Returns:
+            str: The generated text.
+        """
+
+        async def call(role: str) -> str:
+            model = self._model(role)
+            await self._acquire(role)
+            started = time.monotonic()
+            try:
+                result = await self._hedged(
+                    role,
+                    "generate",
+                    lambda: model.generate_async(prompt, config),
+                    self._total_timeout,
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            finally:
+                self._semaphore(role).release()
+            if role == "primary":
+                self._latencies["generate"].add(time.monotonic() - started)
+            return result
+
+        return await self._run(call)
+
+    @staticmethod
+    async def _first_chunk(stream: AsyncIterator[str]) -> tuple[AsyncIterator[str], Optional[str]]:
+        """
+        Wait for the first chunk of a stream.
+
+        Args:
+            stream (AsyncIterator[str]): The stream.
+
+        Returns:
+            tuple[AsyncIterator[str], Optional[str]]: The stream and its first chunk, None
+                when it is empty.
+        """
+        iterator = aiter(stream)
+        try:
+            return iterator, await anext(iterator)
+        except StopAsyncIteration:
+            return iterator, None
+
+    @staticmethod
+    async def _close_stream(opened: tuple[AsyncIterator[str], Optional[str]]) -> None:
+        """
+        Close a stream whose first chunk is not used.
+
+        Args:
+            opened (tuple[AsyncIterator[str], Optional[str]]): The stream and its first chunk.
+
+        Returns:
+            None
+        """
+        iterator, _ = opened
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+    async def stream_async(
+        self, prompt: list[Message], config: Optional[dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate a text stream based on the input.
+
+        Parameters:
+            prompt (list[Message]): The input messages.
+            config (dict, optional): The generation config.
+
+        Yields:
+            str: The generated text stream.
+        """
+
+        async def open_stream(role: str) -> tuple[str, float, AsyncIterator[str], Optional[str]]:
+            model = self._model(role)
+            await self._acquire(role)
+            started = time.monotonic()
+            try:
+                iterator, first = await self._hedged(
+                    role,
+                    "stream",
+                    lambda: self._first_chunk(model.stream_async(prompt, config)),
+                    self._first_token_timeout,
+                    discard=self._close_stream,
+                )
+            except BaseException as e:
+                self._semaphore(role).release()
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                raise
+            if role == "primary":
+                self._latencies["stream"].add(time.monotonic() - started)
+            return role, started, iterator, first
+
+        role, started, iterator, first = await self._run(open_stream)
+
+        try:
+            if first is None:
+                return
+            yield first
+
+            while True:
+                remaining = None
+                if self._total_timeout is not None:
+                    remaining = max(self._total_timeout - (time.monotonic() - started), 0)
+                try:
+                    chunk = await asyncio.wait_for(anext(iterator), remaining)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    raise RuntimeError("[Generation failed] The stream exceeded its deadline.")
+                yield chunk
+        finally:
+            self._semaphore(role).release()
+            await self._close_stream((iterator, None))
+
+    def generate(self, prompt: list[Message], config: Optional[dict] = None) -> str:
+        """
+        Generate a text based on the input, retrying and falling back without deadlines.
+
+        Parameters:
+            prompt (list[Message]): The input messages.
+            config (dict, optional): The generation config.
+
+        Returns:
+            str: The generated text.
+        """
+        if self._breaker.allow():
+            for attempt in range(self._max_retries + 1):
+                if attempt:
+                    self.retries += 1
+                    time.sleep(self._backoff(attempt))
+                try:
+                    result = self._model("primary").generate(prompt, config)
+                except Exception as e:
+                    logger.warning(f"Generation attempt {attempt + 1} failed: {e!r}")
+                    self._breaker.record_failure()
+                    if not self._breaker.allow():
+                        break
+                    continue
+
+                self._breaker.record_success()
+                return result
+
+        if "fallback" not in self._models:
+            raise RuntimeError("[Generation failed] The primary model is unavailable.")
+
+        self.fallbacks += 1
+        return self._model("fallback").generate(prompt, config)
+
+    def stream(
+        self, prompt: list[Message], config: Optional[dict] = None
+    ) -> Generator[str, None, None]:
+        """
+        Generate a text stream based on the input, on the fallback model while the circuit
+        breaker of the primary model is open.
+
+        Parameters:
+            prompt (list[Message]): The input messages.
+            config (dict, optional): The generation config.
+
+        Yields:
+            str: The generated text stream.
+        """
+        if self._breaker.state == CircuitBreaker.OPEN and "fallback" in self._models:
+            self.fallbacks += 1
+            yield from self._model("fallback").stream(prompt, config)
+            return
+
+        yield from self._model("primary").stream(prompt, config)
@@ -0,0 +1,395 @@
+import array
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+from langchain_core.embeddings import Embeddings
+
+from chatbot.logger import logger
+
+
+class EmbeddingCache:
+    """
+    Bounded cache of query embeddings.
+
+    Entries are keyed by the embedding model name plus the normalized text, evicted in
+    least-recently-used order once `max_size` is reached and expired after `ttl_seconds`.
+    When `persist_path` is set, entries are also written to a SQLite file, so a restart
+    (or another worker process) can reuse embeddings that were already paid for. The async
+    variants `aget` and `aput` access that file in a worker thread.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_size: int = 4096,
+        ttl_seconds: Optional[float] = None,
+        persist_path: Optional[str] = None,
+    ):
+        """
+        Initializes the embedding cache.
+
+        Args:
+            model_name (str): The name of the embedding model, part of every key.
+            max_size (int): The maximum number of entries kept in memory.
+            ttl_seconds (Optional[float]): How long an entry stays valid. None never expires.
+            persist_path (Optional[str]): The SQLite file of the persistent tier.
+        """
+        self._model_name = model_name
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.evictions = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if persist_path:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, created_at REAL NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """
+        Normalize a text so trivially different spellings share a cache entry.
+
+        Args:
+            text (str): The text to normalize.
+
+        Returns:
+            str: The normalized text.
+        """
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    def key(self, text: str) -> str:
+        """
+        Build the cache key of a text.
+
+        Args:
+            text (str): The text to be embedded.
+
+        Returns:
+            str: The cache key.
+        """
+        payload = f"{self._model_name}\x00{self.normalize(text)}".encode()
+        return hashlib.sha256(payload).hexdigest()
+
+    def _is_expired(self, created_at: float) -> bool:
+        """
+        Check whether an entry created at the given time has expired.
+
+        Args:
+            created_at (float): The creation time of the entry.
+
+        Returns:
+            bool: True if the entry has expired.
+        """
+        return self._ttl_seconds is not None and time.time() - created_at > self._ttl_seconds
+
+    def get(self, text: str) -> Optional[list[float]]:
+        """
+        Get the cached embedding of a text.
+
+        Args:
+            text (str): The text that was embedded.
+
+        Returns:
+            Optional[list[float]]: The embedding, or None on a miss.
+        """
+        key = self.key(text)
+        vector = self._get_memory(key)
+        if vector is not None:
+            return vector
+        return self._count_persistent(self._get_persistent(key))
+
+    async def aget(self, text: str) -> Optional[list[float]]:
+        """
+        Get the cached embedding of a text without blocking the event loop on the
+        persistent tier.
+
+        Args:
+            text (str): The text that was embedded.
+
+        Returns:
+            Optional[list[float]]: The embedding, or None on a miss.
+        """
+        key = self.key(text)
+        vector = self._get_memory(key)
+        if vector is not None:
+            return vector
+        if self._db is not None:
+            vector = await asyncio.to_thread(self._get_persistent, key)
+        return self._count_persistent(vector)
+
+    def put(self, text: str, vector: list[float]) -> None:
+        """
+        Store the embedding of a text.
+
+        Args:
+            text (str): The text that was embedded.
+            vector (list[float]): The embedding.
+
+        Returns:
+            None
+        """
+        key = self.key(text)
+        created_at = time.time()
+
+        with self._lock:
+            self._put_memory(key, created_at, vector)
+        self._put_persistent(key, created_at, vector)
+
+    async def aput(self, text: str, vector: list[float]) -> None:
+        """
+        Store the embedding of a text without blocking the event loop on the persistent
+        tier.
+
+        Args:
+            text (str): The text that was embedded.
+            vector (list[float]): The embedding.
+
+        Returns:
+            None
+        """
+        key = self.key(text)
+        created_at = time.time()
+
+        with self._lock:
+            self._put_memory(key, created_at, vector)
+        if self._db is not None:
+            await asyncio.to_thread(self._put_persistent, key, created_at, vector)
+
+    def _get_memory(self, key: str) -> Optional[list[float]]:
+        """
+        Get an entry from the in-memory tier, counting a hit when it is there.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[list[float]]: The embedding, or None if it is not cached or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._is_expired(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            return None
+
+    def _count_persistent(self, vector: Optional[list[float]]) -> Optional[list[float]]:
+        """
+        Count the outcome of a lookup that missed the in-memory tier.
+
+        Args:
+            vector (Optional[list[float]]): The embedding found in the persistent tier.
+
+        Returns:
+            Optional[list[float]]: The same embedding.
+        """
+        with self._lock:
+            if vector is not None:
+                self.hits += 1
+                self.persistent_hits += 1
+            else:
+                self.misses += 1
+        return vector
+
+    def _put_memory(self, key: str, created_at: float, vector: list[float]) -> None:
+        """
+        Store an entry in the in-memory tier, evicting the least recently used entries.
+        The caller holds the lock.
+
+        Args:
+            key (str): The cache key.
+            created_at (float): The creation time of the entry.
+            vector (list[float]): The embedding.
+
+        Returns:
+            None
+        """
+        self._entries[key] = (created_at, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _get_persistent(self, key: str) -> Optional[list[float]]:
+        """
+        Get an entry from the persistent tier and promote it to memory.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[list[float]]: The embedding, or None if it is not stored or expired.
+        """
+        if self._db is None:
+            return None
+
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT created_at, vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            created_at, blob = row
+            if self._is_expired(created_at):
+                self._db.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+
+        vector = array.array("d", blob).tolist()
+        with self._lock:
+            self._put_memory(key, created_at, vector)
+        return vector
+
+    def _put_persistent(self, key: str, created_at: float, vector: list[float]) -> None:
+        """
+        Store an entry in the persistent tier.
+
+        Args:
+            key (str): The cache key.
+            created_at (float): The creation time of the entry.
+            vector (list[float]): The embedding.
+
+        Returns:
+            None
+        """
+        if self._db is None:
+            return
+
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO embeddings (key, created_at, vector) VALUES (?, ?, ?)",
+                (key, created_at, array.array("d", vector).tobytes()),
+            )
+            self._db.commit()
+
+    def stats(self) -> dict:
+        """
+        Get the hit and miss counters of the cache.
+
+        Returns:
+            dict: The cache counters.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "persistent_hits": self.persistent_hits,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        """
+        Drop every entry of both tiers.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain embeddings wrapper that answers repeated queries from an `EmbeddingCache`.
+
+    Only query embeddings are cached; document embeddings are passed through untouched.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        """
+        Initializes the cached embeddings.
+
+        Args:
+            embeddings (Embeddings): The wrapped embeddings.
+            cache (EmbeddingCache): The cache of query embeddings.
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embed documents with the wrapped embeddings.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list[list[float]]: The embeddings.
+        """
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embed documents with the wrapped embeddings.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list[list[float]]: The embeddings.
+        """
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        """
+        Embed a query, reusing a cached embedding when there is one.
+
+        Args:
+            text (str): The query to embed.
+
+        Returns:
+            list[float]: The embedding.
+        """
+        vector = self.cache.get(text)
+        if vector is not None:
+            return vector
+
+        vector = self.embeddings.embed_query(text)
+        self.cache.put(text, vector)
+        logger.debug(f"Embedding cache miss, cache stats: {self.cache.stats()}")
+        return vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """
+        Embed a query, reusing a cached embedding when there is one.
+
+        Args:
+            text (str): The query to embed.
+
+        Returns:
+            list[float]: The embedding.
+        """
+        vector = await self.cache.aget(text)
+        if vector is not None:
+            return vector
+
+        vector = await self.embeddings.aembed_query(text)
+        await self.cache.aput(text, vector)
+        logger.debug(f"Embedding cache miss, cache stats: {self.cache.stats()}")
+        return vector
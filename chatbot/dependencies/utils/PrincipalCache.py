@@ -0,0 +1,186 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from chatbot.dependencies.utils.SessionManagement import SessionDataType
+
+if TYPE_CHECKING:
+    from chatbot.database.models.Staff import Staff
+    from chatbot.database.models.Student import Student
+
+
+class Principal(BaseModel, ABC):
+    """
+    Immutable snapshot of an authenticated user.
+
+    Returned by `protected_route` instead of an ORM instance: it is safe to share between
+    requests and holds no password hash, salt or database session.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    id: int
+    name: str
+    email: str
+    access_level: int
+
+    @property
+    @abstractmethod
+    def type(self) -> SessionDataType:
+        """
+        Get the session type of the user.
+
+        Returns:
+            SessionDataType: The session type.
+        """
+        pass
+
+
+class StudentPrincipal(Principal):
+    student_number: str
+
+    @property
+    def type(self) -> SessionDataType:
+        return SessionDataType.USER
+
+    @classmethod
+    def from_model(cls, student: "Student") -> "StudentPrincipal":
+        return cls(
+            id=student.id,
+            name=student.name,
+            email=student.email,
+            access_level=student.access_level,
+            student_number=student.student_number,
+        )
+
+
+class StaffPrincipal(Principal):
+    staff_number: str
+
+    @property
+    def type(self) -> SessionDataType:
+        return SessionDataType.STAFF
+
+    @classmethod
+    def from_model(cls, staff: "Staff") -> "StaffPrincipal":
+        return cls(
+            id=staff.id,
+            name=staff.name,
+            email=staff.email,
+            access_level=staff.access_level,
+            staff_number=staff.staff_number,
+        )
+
+
+class PrincipalCache:
+    """
+    Bounded cache of authenticated users, keyed by session type and user id.
+
+    Entries expire after `ttl_seconds` and are evicted in least-recently-used order once
+    `max_size` is reached. Routes changing or deleting a user invalidate its entry, so the
+    TTL only bounds how long another worker process may serve a stale user.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 30.0):
+        """
+        Initializes the principal cache.
+
+        Args:
+            max_size (int): The maximum number of cached users.
+            ttl_seconds (float): How long an entry stays valid.
+        """
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple[int, int], tuple[float, Principal]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "PrincipalCache":
+        """
+        Create a principal cache from the `auth.principal_cache` settings.
+
+        Args:
+            config (Optional[dict]): The cache settings.
+
+        Returns:
+            PrincipalCache: The principal cache.
+        """
+        config = config or {}
+        return cls(
+            max_size=config.get("max_size", 10000),
+            ttl_seconds=config.get("ttl_seconds", 30.0),
+        )
+
+    def get(self, session_type: SessionDataType, user_id: int) -> Optional[Principal]:
+        """
+        Get a cached user.
+
+        Args:
+            session_type (SessionDataType): The session type of the user.
+            user_id (int): The id of the user.
+
+        Returns:
+            Optional[Principal]: The user, or None on a miss.
+        """
+        key = (session_type.value, user_id)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self._ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def put(self, principal: Principal) -> None:
+        """
+        Cache a user.
+
+        Args:
+            principal (Principal): The user.
+
+        Returns:
+            None
+        """
+        key = (principal.type.value, principal.id)
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session_type: SessionDataType, user_id: int) -> None:
+        """
+        Drop a cached user, e.g. after it was updated or deleted.
+
+        Args:
+            session_type (SessionDataType): The session type of the user.
+            user_id (int): The id of the user.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.pop((session_type.value, user_id), None)
+
+    def clear(self) -> None:
+        """
+        Drop every cached user.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,682 @@
+import json
+import math
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Generator, Optional, TypeVar
+
+from chatbot.config import Configuration
+from chatbot.logger import logger
+
+T = TypeVar("T")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    A timed stage of a request.
+
+    Spans started while another span is current become its children and share its trace.
+    Attributes are free-form, but a few of them are also counted as metrics:
+    `cache_hit` (bool), `prompt_tokens` and `completion_tokens` (int).
+    """
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes: Any):
+        """
+        Initializes and starts the span.
+
+        Args:
+            name (str): The name of the stage, e.g. `retriever.search`.
+            parent (Optional[Span]): The enclosing span.
+            **attributes (Any): The initial attributes.
+        """
+        self.name = name
+        self.trace_id: str = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id: str = secrets.token_hex(8)
+        self.parent_id: Optional[str] = parent.span_id if parent is not None else None
+        self.start = time.perf_counter()
+        self.root_start: float = parent.root_start if parent is not None else self.start
+        self.start_unix_ns = time.time_ns()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+        self.attributes: dict[str, Any] = dict(attributes)
+
+    def set(self, **attributes: Any) -> None:
+        """
+        Set attributes of the span.
+
+        Args:
+            **attributes (Any): The attributes.
+
+        Returns:
+            None
+        """
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self) -> float:
+        """
+        Get the duration of the span, up to now while it is running.
+
+        Returns:
+            float: The duration in seconds.
+        """
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class _NoopSpan(Span):
+    """
+    The span handed out while tracing is disabled.
+    """
+
+    def __init__(self):
+        super().__init__("noop")
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+class Histogram:
+    """
+    A Prometheus histogram with one series per label set.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initializes the histogram.
+
+        Args:
+            buckets (tuple[float, ...]): The upper bounds of the buckets.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        """
+        Record a value.
+
+        Args:
+            labels (tuple): The sorted label pairs of the series.
+            value (float): The value.
+
+        Returns:
+            None
+        """
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+
+class OtlpJsonExporter:
+    """
+    Exports finished spans as OTLP/JSON trace requests.
+
+    Spans are batched and either POSTed to an OTLP/HTTP collector (`endpoint`, e.g.
+    `http://localhost:4318/v1/traces`) or appended as one request per line to `path`.
+    Batches are written by a background thread so request handling never waits on it.
+    """
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        path: Optional[str] = None,
+        batch_size: int = 64,
+        service_name: str = "chatbot",
+    ):
+        """
+        Initializes the exporter.
+
+        Args:
+            endpoint (Optional[str]): The OTLP/HTTP traces endpoint.
+            path (Optional[str]): The JSON lines file used when no endpoint is set.
+            batch_size (int): The number of spans per export.
+            service_name (str): The `service.name` resource attribute.
+        """
+        self._endpoint = endpoint
+        self._path = path
+        self._batch_size = batch_size
+        self._service_name = service_name
+        self._buffer: list[Span] = []
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="otlp-export")
+
+        self.exported = 0
+        self.failures = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> Optional["OtlpJsonExporter"]:
+        """
+        Create an exporter from the `tracing.otlp` configuration.
+
+        Args:
+            config (Optional[dict]): The exporter settings.
+
+        Returns:
+            Optional[OtlpJsonExporter]: The exporter, None when it is disabled.
+        """
+        if not config or not config.get("enabled", False):
+            return None
+
+        return cls(
+            endpoint=config.get("endpoint"),
+            path=config.get("path", "logs/traces.otlp.jsonl"),
+            batch_size=config.get("batch_size", 64),
+            service_name=config.get("service_name", "chatbot"),
+        )
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> dict:
+        """
+        Encode an attribute as an OTLP key value.
+
+        Args:
+            key (str): The key.
+            value (Any): The value.
+
+        Returns:
+            dict: The OTLP attribute.
+        """
+        if isinstance(value, bool):
+            encoded = {"boolValue": value}
+        elif isinstance(value, int):
+            encoded = {"intValue": str(value)}
+        elif isinstance(value, float):
+            encoded = {"doubleValue": value}
+        else:
+            encoded = {"stringValue": str(value)}
+        return {"key": key, "value": encoded}
+
+    def encode(self, spans: list[Span]) -> dict:
+        """
+        Encode spans as an OTLP/JSON `ExportTraceServiceRequest`.
+
+        Args:
+            spans (list[Span]): The finished spans.
+
+        Returns:
+            dict: The request body.
+        """
+        encoded = []
+        for span in spans:
+            item = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_unix_ns),
+                "endTimeUnixNano": str(span.start_unix_ns + int(span.duration * 1e9)),
+                "attributes": [self._attribute(k, v) for k, v in span.attributes.items()],
+                "status": (
+                    {"code": 2, "message": span.error} if span.error is not None else {"code": 1}
+                ),
+            }
+            if span.parent_id is not None:
+                item["parentSpanId"] = span.parent_id
+            encoded.append(item)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [self._attribute("service.name", self._service_name)]
+                    },
+                    "scopeSpans": [{"scope": {"name": "chatbot"}, "spans": encoded}],
+                }
+            ]
+        }
+
+    def export(self, span: Span) -> None:
+        """
+        Queue a finished span, writing the batch once it is full.
+
+        Args:
+            span (Span): The finished span.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._buffer.append(span)
+            if len(self._buffer) < self._batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._writer.submit(self._write, batch)
+
+    def flush(self) -> None:
+        """
+        Write the queued spans and wait until every batch was written.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._writer.submit(self._write, batch)
+        self._writer.submit(lambda: None).result()
+
+    def _write(self, batch: list[Span]) -> None:
+        """
+        Write a batch of spans to the collector or the file.
+
+        Args:
+            batch (list[Span]): The spans.
+
+        Returns:
+            None
+        """
+        body = self.encode(batch)
+        try:
+            if self._endpoint:
+                import httpx
+
+                httpx.post(self._endpoint, json=body, timeout=10).raise_for_status()
+            else:
+                directory = os.path.dirname(self._path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self._path, "a") as f:
+                    f.write(json.dumps(body) + "\n")
+            self.exported += len(batch)
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Could not export {len(batch)} spans: {e}")
+
+
+class Tracer:
+    """
+    Records the stages of the chat pipeline as spans and aggregates them as metrics.
+
+    Every finished span is observed in the `chatbot_span_duration_seconds` histogram;
+    streams traced with `stream` also observe `chatbot_time_to_first_token_seconds`,
+    measured from the start of the trace. Components can register their `stats()` as
+    collectors, which are exported as `chatbot_component_stat` gauges. `metrics` renders
+    everything in the Prometheus text format.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        exporter: Optional[OtlpJsonExporter] = None,
+    ):
+        """
+        Initializes the tracer.
+
+        Args:
+            enabled (bool): Whether spans are recorded.
+            buckets (tuple[float, ...]): The histogram buckets, in seconds.
+            exporter (Optional[OtlpJsonExporter]): Exports the finished spans.
+        """
+        self.enabled = enabled
+        self._buckets = tuple(buckets)
+        self._exporter = exporter
+        self._histograms: dict[str, Histogram] = {}
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._collectors: dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+        self._noop = _NoopSpan()
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "Tracer":
+        """
+        Create a tracer from the `tracing` configuration.
+
+        Args:
+            config (Optional[dict]): The tracing settings.
+
+        Returns:
+            Tracer: The tracer, disabled when the settings are missing.
+        """
+        config = config or {}
+        return cls(
+            enabled=config.get("enabled", False),
+            buckets=tuple(config.get("buckets") or DEFAULT_BUCKETS),
+            exporter=OtlpJsonExporter.from_config(config.get("otlp")),
+        )
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        """
+        Get the span of the running stage.
+
+        Returns:
+            Optional[Span]: The current span.
+        """
+        return _current_span.get()
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        """
+        Start a span without making it current.
+
+        Args:
+            name (str): The name of the stage.
+            parent (Optional[Span]): The enclosing span. Defaults to the current span.
+            **attributes (Any): The initial attributes.
+
+        Returns:
+            Span: The running span.
+        """
+        if not self.enabled:
+            return self._noop
+        return Span(name, parent if parent is not None else _current_span.get(), **attributes)
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None) -> None:
+        """
+        End a span, recording its metrics and exporting it.
+
+        Args:
+            span (Span): The span.
+            error (Optional[BaseException]): The error the stage failed with.
+
+        Returns:
+            None
+        """
+        if span is self._noop or span.end is not None:
+            return
+
+        span.end = time.perf_counter()
+        if error is not None:
+            span.error = repr(error)
+
+        labels = (("span", span.name),)
+        self.observe("chatbot_span_duration_seconds", span.duration, labels)
+        if error is not None:
+            self.increment("chatbot_span_errors_total", 1, labels)
+        if isinstance(span.attributes.get("cache_hit"), bool):
+            hit = "true" if span.attributes["cache_hit"] else "false"
+            self.increment("chatbot_cache_lookups_total", 1, labels + (("hit", hit),))
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if isinstance(span.attributes.get(kind), int):
+                self.increment(
+                    "chatbot_tokens_total", span.attributes[kind], labels + (("kind", kind),)
+                )
+
+        if self._exporter is not None:
+            self._exporter.export(span)
+
+    @contextmanager
+    def span(
+        self, name: str, parent: Optional[Span] = None, **attributes: Any
+    ) -> Generator[Span, None, None]:
+        """
+        Time a stage, making its span current for the stages it runs.
+
+        Must not enclose a `yield` of a generator; use `stream` for those.
+
+        Args:
+            name (str): The name of the stage.
+            parent (Optional[Span]): The enclosing span. Defaults to the current span.
+            **attributes (Any): The initial attributes.
+
+        Yields:
+            Span: The running span.
+        """
+        span = self.start_span(name, parent, **attributes)
+        token = _current_span.set(span) if span is not self._noop else None
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        finally:
+            if token is not None:
+                _current_span.reset(token)
+        self.end_span(span)
+
+    async def traced(self, name: str, awaitable: Awaitable[T], **attributes: Any) -> T:
+        """
+        Time an awaitable.
+
+        Args:
+            name (str): The name of the stage.
+            awaitable (Awaitable[T]): The awaitable.
+            **attributes (Any): The initial attributes.
+
+        Returns:
+            T: The result of the awaitable.
+        """
+        with self.span(name, **attributes):
+            return await awaitable
+
+    def stream(
+        self,
+        name: str,
+        iterator: AsyncIterator[str],
+        parent: Optional[Span] = None,
+        **attributes: Any,
+    ) -> AsyncIterator[str]:
+        """
+        Time a stream from its first read to its end.
+
+        The parent is taken when this method is called, so a stream consumed later (e.g. by
+        a `StreamingResponse`) stays in the trace of the request that created it. The
+        number of chunks and characters and the time to the first chunk are recorded.
+
+        Args:
+            name (str): The name of the stage.
+            iterator (AsyncIterator[str]): The stream.
+            parent (Optional[Span]): The enclosing span. Defaults to the current span.
+            **attributes (Any): The initial attributes.
+
+        Returns:
+            AsyncIterator[str]: The same stream.
+        """
+        if not self.enabled:
+            return iterator
+        return self._stream(
+            name, iterator, parent if parent is not None else _current_span.get(), attributes
+        )
+
+    async def _stream(
+        self,
+        name: str,
+        iterator: AsyncIterator[str],
+        parent: Optional[Span],
+        attributes: dict,
+    ) -> AsyncIterator[str]:
+        """
+        Helper method yielding a traced stream.
+
+        The span is only current while the next chunk is awaited, never across a `yield`.
+
+        Args:
+            name (str): The name of the stage.
+            iterator (AsyncIterator[str]): The stream.
+            parent (Optional[Span]): The enclosing span.
+            attributes (dict): The initial attributes.
+
+        Yields:
+            str: The chunks of the stream.
+        """
+        span = self.start_span(name, parent, **attributes)
+        iterator = aiter(iterator)
+        chunks = 0
+        characters = 0
+        error: Optional[BaseException] = None
+
+        try:
+            while True:
+                token = _current_span.set(span)
+                try:
+                    chunk = await anext(iterator)
+                except StopAsyncIteration:
+                    break
+                finally:
+                    _current_span.reset(token)
+
+                if chunks == 0:
+                    now = time.perf_counter()
+                    span.set(
+                        first_chunk_seconds=now - span.start,
+                        time_to_first_token_seconds=now - span.root_start,
+                    )
+                    self.observe(
+                        "chatbot_time_to_first_token_seconds",
+                        now - span.root_start,
+                        (("span", name),),
+                    )
+                chunks += 1
+                characters += len(chunk)
+                yield chunk
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            span.set(chunks=chunks, characters=characters)
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+            self.end_span(span, error if not isinstance(error, GeneratorExit) else None)
+
+    def observe(self, name: str, value: float, labels: tuple = ()) -> None:
+        """
+        Record a value in a histogram.
+
+        Args:
+            name (str): The name of the histogram.
+            value (float): The value.
+            labels (tuple): The label pairs of the series.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self._buckets)
+            histogram.observe(tuple(sorted(labels)), value)
+
+    def increment(self, name: str, value: float = 1, labels: tuple = ()) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            name (str): The name of the counter.
+            value (float): The increment.
+            labels (tuple): The label pairs of the series.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = tuple(sorted(labels))
+            series[key] = series.get(key, 0) + value
+
+    def register_collector(self, component: str, stats: Callable[[], dict]) -> None:
+        """
+        Export the `stats()` of a component as gauges.
+
+        Nested dictionaries are flattened with dots; values that are not numbers are skipped.
+
+        Args:
+            component (str): The name of the component.
+            stats (Callable[[], dict]): Returns the current stats.
+
+        Returns:
+            None
+        """
+        self._collectors[component] = stats
+
+    @staticmethod
+    def _labels(labels: tuple) -> str:
+        """
+        Render label pairs in the Prometheus text format.
+
+        Args:
+            labels (tuple): The label pairs.
+
+        Returns:
+            str: The rendered labels, empty without labels.
+        """
+        if not labels:
+            return ""
+        escaped = []
+        for key, value in labels:
+            value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            escaped.append(f'{key}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+
+    @staticmethod
+    def _flatten(stats: dict, prefix: str = "") -> Generator[tuple[str, float], None, None]:
+        """
+        Flatten the numeric values of nested stats.
+
+        Args:
+            stats (dict): The stats.
+            prefix (str): The key of the enclosing dictionary.
+
+        Yields:
+            tuple[str, float]: The dotted key and the value.
+        """
+        for key, value in stats.items():
+            key = f"{prefix}{key}"
+            if isinstance(value, dict):
+                yield from Tracer._flatten(value, f"{key}.")
+            elif isinstance(value, (bool, int, float)):
+                yield key, float(value)
+
+    def metrics(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics.
+        """
+        lines: list[str] = []
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, (counts, total, count) in sorted(histogram.series.items()):
+                    for bound, bucket_count in zip(histogram.buckets, counts):
+                        le = labels + (("le", repr(float(bound))),)
+                        lines.append(f"{name}_bucket{self._labels(le)} {bucket_count}")
+                    lines.append(f"{name}_bucket{self._labels(labels + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_sum{self._labels(labels)} {total}")
+                    lines.append(f"{name}_count{self._labels(labels)} {count}")
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+
+        gauges: list[str] = []
+        for component, stats in sorted(self._collectors.items()):
+            try:
+                values = list(self._flatten(stats() or {}))
+            except Exception as e:
+                logger.warning(f"Could not collect the stats of {component}: {e}")
+                continue
+            for key, value in values:
+                if math.isfinite(value):
+                    labels = (("component", component), ("stat", key))
+                    gauges.append(f"chatbot_component_stat{self._labels(labels)} {value}")
+        if gauges:
+            lines.append("# TYPE chatbot_component_stat gauge")
+            lines.extend(gauges)
+
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        """
+        Write the spans queued for export.
+
+        Returns:
+            None
+        """
+        if self._exporter is not None:
+            self._exporter.flush()
+
+
+tracer = Tracer.from_config(Configuration.get("tracing"))
@@ -2,12 +2,21 @@ from enum import Enum
 
 from fastapi import Depends, HTTPException, status, Request, Response
 
-from chatbot.database.models.Student import Student as UserModel, Student
-from chatbot.database.models.Staff import Staff as StaffModel, Staff
-from chatbot.database import SessionLocal
+from chatbot.config import Configuration
+from chatbot.database.models.Student import Student as UserModel
+from chatbot.database.models.Staff import Staff as StaffModel
+from chatbot.database import AsyncSessionLocal
+from chatbot.dependencies.utils.PrincipalCache import (
+    Principal,
+    PrincipalCache,
+    StaffPrincipal,
+    StudentPrincipal,
+)
 from chatbot.dependencies.utils.SessionManagement import SessionManagement
 from chatbot.dependencies.utils.SessionManagement import SessionDataType
 
+principal_cache = PrincipalCache.from_config(Configuration.get("auth.principal_cache"))
+
 
 def get_token_from_cookie(request: Request) -> str | None:
     """
@@ -35,14 +44,37 @@ class ACL(Enum):
     USER = 1
 
 
+async def load_principal(session_type: SessionDataType, user_id: int) -> Principal | None:
+    """
+    Reads a user from the database.
+
+    Args:
+        session_type (SessionDataType): The session type of the user.
+        user_id (int): The id of the user.
+
+    Returns:
+        Principal | None: The user, or None if it does not exist.
+    """
+    async with AsyncSessionLocal() as db:
+        if session_type == SessionDataType.STAFF:
+            staff = await db.get(StaffModel, user_id)
+            return StaffPrincipal.from_model(staff) if staff is not None else None
+
+        student = await db.get(UserModel, user_id)
+        return StudentPrincipal.from_model(student) if student is not None else None
+
+
 def protected_route(access_level: ACL = ACL.STAFF):
 
     async def protected(
         token: str = Depends(get_token_from_cookie), response: Response = None
-    ) -> None | Staff | Student:
+    ) -> None | StaffPrincipal | StudentPrincipal:
         """
         Authenticates a user based on the provided session token.
 
+        Users are served from the `principal_cache` and only read from the database on a
+        miss.
+
         Args:
             token (str, optional): The session token. Defaults to Depends(get_token_from_cookie).
             response (Response, optional): The response object. Defaults to None.
@@ -63,25 +95,30 @@ def protected_route(access_level: ACL = ACL.STAFF):
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
             )
 
-        with SessionLocal() as db:
-            if data["type"] == SessionDataType.STAFF.value:
-                user: StaffModel = db.query(StaffModel).get(data["id"])
-            elif data["type"] == SessionDataType.USER.value:
-                user: UserModel = db.query(UserModel).get(data["id"])
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
-                )
-
-            if user.access_level > access_level.value and access_level != ACL.ALL:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED, detail="Access denied"
-                )
-
-            if user is None and access_level != ACL.ALL:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
-                )
+        try:
+            session_type = SessionDataType(data["type"])
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
+            )
+
+        user = principal_cache.get(session_type, data["id"])
+        if user is None:
+            user = await load_principal(session_type, data["id"])
+            if user is not None:
+                principal_cache.put(user)
+
+        if user is None:
+            if access_level == ACL.ALL:
+                return None
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
+            )
+
+        if user.access_level > access_level.value and access_level != ACL.ALL:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Access denied"
+            )
 
         return user
 
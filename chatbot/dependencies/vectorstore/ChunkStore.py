@@ -0,0 +1,245 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+
+from chatbot.dependencies.utils.EmbeddingCache import EmbeddingCache
+from chatbot.dependencies.utils.path_utils import project_path
+
+
+class ChunkStore:
+    """
+    Content-addressed store of embedded chunks shared by every FAISS index.
+
+    A chunk is keyed by the hash of the embedding model name plus its normalized text, so
+    the same chunk uploaded twice, or pasted into several Q&A answers, is embedded and
+    stored once. The store also records which indexes contain each chunk; the chunk hash
+    is used as the docstore id of the chunk in those indexes, so writers can skip chunks an
+    index already holds. Every membership is reference counted, so a chunk shared by two
+    documents is only removed from an index once both are deleted.
+    """
+
+    def __init__(self, path: str, model_name: str):
+        """
+        Initializes the chunk store.
+
+        Args:
+            path (str): The SQLite file of the store.
+            model_name (str): The name of the embedding model, part of every chunk hash.
+        """
+        self._model_name = model_name
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks "
+            "(hash TEXT PRIMARY KEY, text TEXT NOT NULL, vector BLOB NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS memberships "
+            "(hash TEXT NOT NULL, index_name TEXT NOT NULL, refs INTEGER NOT NULL DEFAULT 1, "
+            "PRIMARY KEY (hash, index_name))"
+        )
+        self._db.commit()
+
+    @classmethod
+    def from_config(cls, config: Optional[dict], model_name: str) -> Optional["ChunkStore"]:
+        """
+        Open the chunk store described by the `document_embedder.chunk_store` settings.
+
+        Args:
+            config (Optional[dict]): The chunk store settings.
+            model_name (str): The name of the embedding model.
+
+        Returns:
+            Optional[ChunkStore]: The chunk store, None when it is disabled.
+        """
+        if not config or not config.get("enabled", True):
+            return None
+
+        path = project_path(config.get("path", "faiss/chunks.sqlite3"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return cls(str(path), model_name)
+
+    def chunk_hash(self, text: str) -> str:
+        """
+        Get the content hash of a chunk.
+
+        Args:
+            text (str): The text of the chunk.
+
+        Returns:
+            str: The chunk hash.
+        """
+        payload = f"{self._model_name}\x00{EmbeddingCache.normalize(text)}".encode()
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_vectors(self, hashes: Iterable[str]) -> dict[str, list[float]]:
+        """
+        Get the stored vectors of chunks.
+
+        Args:
+            hashes (Iterable[str]): The chunk hashes.
+
+        Returns:
+            dict[str, list[float]]: The vectors of the chunks that are stored.
+        """
+        vectors = {}
+        with self._lock:
+            for batch in self._chunked(list(hashes)):
+                rows = self._db.execute(
+                    f"SELECT hash, vector FROM chunks WHERE hash IN ({self._params(batch)})",
+                    batch,
+                ).fetchall()
+                for _hash, blob in rows:
+                    vectors[_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return vectors
+
+    def put_vectors(self, chunks: list[tuple[str, str, list[float]]]) -> None:
+        """
+        Store embedded chunks.
+
+        Args:
+            chunks (list[tuple[str, str, list[float]]]): The hash, text and vector of each chunk.
+
+        Returns:
+            None
+        """
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO chunks (hash, text, vector, created_at) VALUES (?, ?, ?, ?)",
+                [
+                    (_hash, text, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for _hash, text, vector in chunks
+                ],
+            )
+            self._db.commit()
+
+    def members(self, index_name: str, hashes: Iterable[str]) -> set[str]:
+        """
+        Get the chunks an index already contains.
+
+        Args:
+            index_name (str): The name of the index directory.
+            hashes (Iterable[str]): The chunk hashes to check.
+
+        Returns:
+            set[str]: The hashes contained in the index.
+        """
+        found = set()
+        with self._lock:
+            for batch in self._chunked(list(hashes)):
+                rows = self._db.execute(
+                    "SELECT hash FROM memberships "
+                    f"WHERE index_name = ? AND hash IN ({self._params(batch)})",
+                    [index_name, *batch],
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def add_members(self, index_name: str, hashes: Iterable[str]) -> None:
+        """
+        Record that a document added chunks to an index, taking one reference on each.
+
+        Args:
+            index_name (str): The name of the index directory.
+            hashes (Iterable[str]): The chunk hashes.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO memberships (hash, index_name, refs) VALUES (?, ?, 1) "
+                "ON CONFLICT (hash, index_name) DO UPDATE SET refs = refs + 1",
+                [(_hash, index_name) for _hash in hashes],
+            )
+            self._db.commit()
+
+    def remove_members(self, index_name: str, hashes: Iterable[str]) -> list[str]:
+        """
+        Drop one reference on chunks of an index.
+
+        Args:
+            index_name (str): The name of the index directory.
+            hashes (Iterable[str]): The chunk hashes.
+
+        Returns:
+            list[str]: The hashes no document references anymore, to be removed from the index.
+        """
+        hashes = list(hashes)
+        released = []
+        with self._lock:
+            self._db.executemany(
+                "UPDATE memberships SET refs = refs - 1 WHERE hash = ? AND index_name = ?",
+                [(_hash, index_name) for _hash in hashes],
+            )
+            for batch in self._chunked(hashes):
+                rows = self._db.execute(
+                    "SELECT hash FROM memberships "
+                    f"WHERE index_name = ? AND refs <= 0 AND hash IN ({self._params(batch)})",
+                    [index_name, *batch],
+                ).fetchall()
+                released.extend(row[0] for row in rows)
+            self._db.execute(
+                "DELETE FROM memberships WHERE index_name = ? AND refs <= 0", (index_name,)
+            )
+            self._db.commit()
+        return released
+
+    def clear_members(self, index_name: str) -> None:
+        """
+        Forget every chunk of an index, e.g. after the index was deleted.
+
+        Args:
+            index_name (str): The name of the index directory.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM memberships WHERE index_name = ?", (index_name,))
+            self._db.commit()
+
+    @staticmethod
+    def _chunked(items: list, size: int = 500) -> Iterable[list]:
+        """
+        Split a list to stay below the SQLite parameter limit.
+
+        Args:
+            items (list): The items.
+            size (int): The maximum size of a part.
+
+        Returns:
+            Iterable[list]: The parts.
+        """
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    @staticmethod
+    def _params(items: list) -> str:
+        """
+        Build the placeholders of an `IN` clause.
+
+        Args:
+            items (list): The parameters.
+
+        Returns:
+            str: The placeholders.
+        """
+        return ", ".join("?" * len(items))
+
+    def close(self) -> None:
+        """
+        Close the underlying database.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._db.close()
+
@@ -0,0 +1,381 @@
+import math
+import os
+import pathlib
+import uuid
+from typing import Optional
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from chatbot.config import Configuration
+from chatbot.dependencies.vectorstore.MappedDocstore import MappedDocstore
+from chatbot.logger import logger
+
+
+class FaissIndexFactory:
+    """
+    Builds the FAISS index type configured for an intent.
+
+    The type is a `faiss.index_factory` string, e.g. `Flat`, `HNSW32`, `SQfp16` (float16
+    storage), `SQ8` (int8 storage), `PCA256,SQ8` (reduced dimensions), `IVF{nlist},PQ64`
+    or `IVF{nlist},SQ8`; `{nlist}` is replaced by a list count sized to the corpus.
+    Indexes that need training are trained on (a sample of) the vectors they are built
+    from, and fall back to `Flat` while the corpus is too small to train them.
+
+    Only the main index of an intent uses the configured type. Its vectors are also kept
+    in full precision next to it (`vectors.npy`), so writers can rebuild and retrain it at
+    every compaction, readers can rebuild a flat copy when a tombstone has to be applied
+    to an index type that cannot remove vectors, and the hits of a quantized index can be
+    re-ranked exactly.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+
+    def __init__(
+        self,
+        index_type: str = "Flat",
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        ef_construction: Optional[int] = None,
+        train_size: int = 50000,
+    ):
+        """
+        Initializes the factory.
+
+        Args:
+            index_type (str): The `faiss.index_factory` string of the index.
+            nprobe (Optional[int]): The number of inverted lists visited by a search.
+            ef_search (Optional[int]): The size of the HNSW candidate list of a search.
+            ef_construction (Optional[int]): The size of the HNSW candidate list while
+                building.
+            train_size (int): The maximum number of vectors the index is trained on.
+        """
+        self.index_type = index_type
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.ef_construction = ef_construction
+        self.train_size = train_size
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "FaissIndexFactory":
+        """
+        Create a factory from index settings.
+
+        Args:
+            config (Optional[dict]): The index settings.
+
+        Returns:
+            FaissIndexFactory: The factory, building flat indexes without settings.
+        """
+        config = config or {}
+        return cls(
+            index_type=config.get("type", "Flat"),
+            nprobe=config.get("nprobe"),
+            ef_search=config.get("ef_search"),
+            ef_construction=config.get("ef_construction"),
+            train_size=config.get("train_size", 50000),
+        )
+
+    @classmethod
+    def for_dir(cls, faiss_dir: str | pathlib.Path) -> "FaissIndexFactory":
+        """
+        Create the factory of an index directory from the `document_embedder.index`
+        settings.
+
+        The settings of the intent, under `intents`, override the `default` ones; public
+        and internal indexes of an intent share them.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+
+        Returns:
+            FaissIndexFactory: The factory.
+        """
+        settings = Configuration.get("document_embedder.index") or {}
+        intent_value = pathlib.Path(faiss_dir).name.removesuffix("_public")
+        config = dict(settings.get("default") or {})
+        config.update((settings.get("intents") or {}).get(intent_value) or {})
+        return cls.from_config(config)
+
+    @property
+    def is_flat(self) -> bool:
+        """
+        Check whether the factory builds exact flat indexes.
+
+        Returns:
+            bool: True for `Flat`.
+        """
+        return self.index_type.strip().lower() in ("flat", "flatl2")
+
+    @staticmethod
+    def nlist(count: int) -> int:
+        """
+        Get the number of inverted lists for a corpus: about 4 * sqrt(n), with at least 39
+        training vectors per list.
+
+        Args:
+            count (int): The number of vectors.
+
+        Returns:
+            int: The number of lists.
+        """
+        return max(1, min(int(4 * math.sqrt(count)), count // 39))
+
+    def tune(self, index: faiss.Index) -> None:
+        """
+        Apply the search parameters to an index.
+
+        Args:
+            index (faiss.Index): The index.
+
+        Returns:
+            None
+        """
+        parameters = faiss.ParameterSpace()
+        for name, value in (("nprobe", self.nprobe), ("efSearch", self.ef_search)):
+            if value is None:
+                continue
+            try:
+                parameters.set_index_parameter(index, name, value)
+            except RuntimeError:
+                # The parameter does not apply to this index type, e.g. nprobe on HNSW.
+                pass
+
+    def build(self, vectors: np.ndarray) -> faiss.Index:
+        """
+        Build, train and fill an index.
+
+        Args:
+            vectors (np.ndarray): The float32 vectors, in docstore position order.
+
+        Returns:
+            faiss.Index: The index.
+        """
+        count, dimensions = vectors.shape
+        if self.is_flat:
+            index = faiss.IndexFlatL2(dimensions)
+            index.add(vectors)
+            return index
+
+        index_type = self.index_type.replace("{nlist}", str(self.nlist(count)))
+        try:
+            index = faiss.index_factory(dimensions, index_type, faiss.METRIC_L2)
+            if self.ef_construction is not None and hasattr(index, "hnsw"):
+                index.hnsw.efConstruction = self.ef_construction
+            if not index.is_trained:
+                sample = vectors
+                if count > self.train_size:
+                    rng = np.random.default_rng(0)
+                    sample = vectors[rng.choice(count, self.train_size, replace=False)]
+                index.train(sample)
+        except RuntimeError as e:
+            logger.warning(
+                f"Could not build a {index_type} index on {count} vectors, using Flat: {e}"
+            )
+            return FaissIndexFactory().build(vectors)
+
+        index.add(vectors)
+        self.tune(index)
+        return index
+
+    @staticmethod
+    def supports_removal(index: faiss.Index) -> bool:
+        """
+        Check whether vectors can be deleted from an index the way the docstore expects,
+        i.e. with the positions of the remaining vectors shifted down.
+
+        Args:
+            index (faiss.Index): The index.
+
+        Returns:
+            bool: True for flat, scalar quantized and PQ indexes; False for IVF and HNSW.
+        """
+        return isinstance(index, faiss.IndexFlatCodes)
+
+    @staticmethod
+    def vectors(index: faiss.Index) -> np.ndarray:
+        """
+        Read the vectors back out of an index.
+
+        Exact for flat and HNSW indexes; quantized indexes only return approximations,
+        which is why their full precision vectors are stored alongside them.
+
+        Args:
+            index (faiss.Index): The index.
+
+        Returns:
+            np.ndarray: The float32 vectors, in position order.
+        """
+        if index.ntotal == 0:
+            return np.zeros((0, index.d), dtype=np.float32)
+        try:
+            faiss.extract_index_ivf(index).make_direct_map()
+        except RuntimeError:
+            pass
+        return index.reconstruct_n(0, index.ntotal)
+
+    @staticmethod
+    def rerank(
+        index: faiss.Index,
+        full_vectors: np.ndarray,
+        query: np.ndarray,
+        k: int,
+        candidates: int,
+    ) -> tuple[list[int], list[float]]:
+        """
+        Search an approximate index for candidates and re-rank them by their exact
+        distance to the query.
+
+        Args:
+            index (faiss.Index): The approximate index.
+            full_vectors (np.ndarray): The full precision vectors of its first positions;
+                later positions, added by pending segments, are reconstructed.
+            query (np.ndarray): The query vector.
+            k (int): The number of hits to return.
+            candidates (int): The number of candidates fetched from the index.
+
+        Returns:
+            tuple[list[int], list[float]]: The positions of the hits and their squared L2
+                distances, closest first.
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(1, -1)
+        _, positions = index.search(query, max(k, candidates))
+        positions = [int(p) for p in positions[0] if p >= 0]
+        if not positions:
+            return [], []
+
+        exact = np.stack(
+            [
+                full_vectors[p] if p < len(full_vectors) else index.reconstruct(p)
+                for p in positions
+            ]
+        ).astype(np.float32)
+        distances = ((exact - query) ** 2).sum(axis=1)
+        order = np.argsort(distances, kind="stable")[:k]
+        return [positions[i] for i in order], [float(distances[i]) for i in order]
+
+    @classmethod
+    def search_reranked(
+        cls,
+        db: FAISS,
+        full_vectors: np.ndarray,
+        embedding: list[float],
+        k: int,
+        candidates: int,
+    ) -> list[tuple[Document, float]]:
+        """
+        Search a LangChain FAISS store backed by an approximate index, re-ranking the
+        candidates against full precision vectors.
+
+        Args:
+            db (FAISS): The store.
+            full_vectors (np.ndarray): The full precision vectors of its first positions.
+            embedding (list[float]): The embedded query.
+            k (int): The number of hits to return.
+            candidates (int): The number of candidates fetched from the index.
+
+        Returns:
+            list[tuple[Document, float]]: The hits and their squared L2 distances, like
+                `FAISS.similarity_search_with_score_by_vector`.
+        """
+        positions, distances = cls.rerank(
+            db.index, full_vectors, np.array(embedding), k, candidates
+        )
+        return [
+            (db.docstore.search(db.index_to_docstore_id[position]), distance)
+            for position, distance in zip(positions, distances)
+        ]
+
+    def convert(self, db: FAISS) -> tuple[FAISS, np.ndarray]:
+        """
+        Rebuild a LangChain FAISS store with the configured index type.
+
+        Args:
+            db (FAISS): The store, ideally backed by a flat index.
+
+        Returns:
+            tuple[FAISS, np.ndarray]: The store sharing the docstore of `db`, and the full
+                precision vectors it was built from.
+        """
+        vectors = np.ascontiguousarray(self.vectors(db.index), dtype=np.float32)
+        index = self.build(vectors) if len(vectors) else db.index
+        return (
+            FAISS(
+                db.embedding_function,
+                index,
+                db.docstore,
+                db.index_to_docstore_id,
+                distance_strategy=db.distance_strategy,
+            ),
+            vectors,
+        )
+
+    @classmethod
+    def write_vectors(cls, faiss_dir: pathlib.Path, vectors: Optional[np.ndarray]) -> None:
+        """
+        Atomically replace the full precision vectors of an index, or remove them.
+
+        Args:
+            faiss_dir (pathlib.Path): The directory of the FAISS index.
+            vectors (Optional[np.ndarray]): The vectors, None to remove them.
+
+        Returns:
+            None
+        """
+        path = faiss_dir / cls.VECTORS_FILE
+        if vectors is None:
+            path.unlink(missing_ok=True)
+            return
+
+        tmp_path = faiss_dir / f".{cls.VECTORS_FILE}.{uuid.uuid4().hex}"
+        with open(tmp_path, "wb") as f:
+            np.save(f, vectors)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read_vectors(cls, faiss_dir: str | pathlib.Path) -> Optional[np.ndarray]:
+        """
+        Memory-map the full precision vectors of an index.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+
+        Returns:
+            Optional[np.ndarray]: The read-only vectors, None when they are not stored.
+        """
+        path = pathlib.Path(faiss_dir) / cls.VECTORS_FILE
+        if not path.exists():
+            return None
+        return np.load(path, mmap_mode="r")
+
+    @classmethod
+    def load_flat(cls, faiss_dir: str | pathlib.Path, embeddings: Embeddings) -> FAISS:
+        """
+        Load the main index of a directory as an exact flat index, e.g. before writing to
+        it.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+            embeddings (Embeddings): The embedding function bound to the index.
+
+        Returns:
+            FAISS: The store, backed by a flat index.
+        """
+        db = MappedDocstore.load_local(faiss_dir, embeddings)
+        if isinstance(db.index, faiss.IndexFlat):
+            return db
+
+        vectors = cls.read_vectors(faiss_dir)
+        if vectors is None or len(vectors) != db.index.ntotal:
+            logger.warning(
+                f"No full precision vectors for {faiss_dir}, reconstructing them."
+            )
+            vectors = cls.vectors(db.index)
+
+        db.index = FaissIndexFactory().build(
+            np.ascontiguousarray(vectors, dtype=np.float32)
+        )
+        return db
@@ -0,0 +1,603 @@
+import os
+import pathlib
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from chatbot.config import Configuration
+from chatbot.dependencies.utils.path_utils import project_path
+from chatbot.dependencies.vectorstore.FaissIndexFactory import FaissIndexFactory
+from chatbot.dependencies.vectorstore.MappedDocstore import MappedDocstore
+from chatbot.dependencies.vectorstore.SegmentLog import SegmentLog
+from chatbot.logger import logger
+
+
+class ResidentIndex:
+    """
+    A FAISS index kept in memory together with the version stamp it was loaded from.
+    """
+
+    def __init__(
+        self,
+        db: FAISS,
+        version: Optional[str],
+        vectors: Optional[np.ndarray] = None,
+        base: Optional[tuple] = None,
+        applied_through: int = 0,
+    ):
+        """
+        Initializes the resident index.
+
+        Args:
+            db (FAISS): The loaded FAISS index.
+            version (Optional[str]): The version stamp of the index on disk.
+            vectors (Optional[np.ndarray]): The memory-mapped full precision vectors of an
+                approximate index, aligned with its first positions.
+            base (Optional[tuple]): The stamp of the main index it was loaded from, see
+                `FaissIndexRegistry._base`.
+            applied_through (int): The last segment replayed on top of it.
+        """
+        self.db = db
+        self.version = version
+        self.vectors = vectors
+        self.base = base
+        self.applied_through = applied_through
+        self.checked_at = time.monotonic()
+        self.replaying = False
+
+
+class FaissIndexRegistry:
+    """
+    Process-wide registry of loaded FAISS indexes.
+
+    Indexes are keyed by their directory, which encodes the intent and the visibility
+    (`faiss/<intent>` and `faiss/<intent>_public`). An index is loaded from disk once and
+    stays resident; it is reloaded only when the version stamp written next to it changes.
+
+    Writers go through `save()`, which writes the index files under a temporary name,
+    renames them into place and then bumps the stamp. While a write is in progress the
+    stamp is marked as pending, so readers in other processes keep serving the previous
+    resident copy instead of loading a half written index. Segments appended through the
+    `SegmentLog` are replayed on top of the main index when it is loaded. When only new
+    segments were appended since, readers replay just those onto their resident index
+    instead of loading it again: in place when no search holds it any more, onto a copy
+    otherwise. A compaction still triggers a full load.
+
+    The main index is saved with the index type configured for its intent (see
+    `FaissIndexFactory`). When pending segments delete vectors from an index type that
+    cannot remove them, the index is loaded as a flat copy instead.
+    """
+
+    VERSION_FILE = "VERSION"
+    PENDING_PREFIX = "pending-"
+
+    root: pathlib.Path = project_path("faiss")
+
+    _indexes: dict[str, ResidentIndex] = {}
+    _lock = threading.Lock()
+    _key_locks: dict[str, threading.Lock] = {}
+
+    @classmethod
+    def index_dir(cls, intent_value: str, public: bool = False) -> pathlib.Path:
+        """
+        Get the directory of the FAISS index for the intent.
+
+        Args:
+            intent_value (str): The value of the intent.
+            public (bool): Whether to get the public index.
+
+        Returns:
+            pathlib.Path: The directory of the FAISS index.
+        """
+        return cls.root / (intent_value + ("_public" if public else ""))
+
+    @classmethod
+    def _check_interval(cls) -> float:
+        """
+        Get the minimum number of seconds between two version checks of the same index.
+
+        Returns:
+            float: The check interval in seconds.
+        """
+        settings = Configuration.get("information_retriever.index_registry") or {}
+        return float(settings.get("check_interval", 0))
+
+    @classmethod
+    def _key_lock(cls, key: str) -> threading.Lock:
+        """
+        Get the lock that serializes loads of a single index.
+
+        Args:
+            key (str): The registry key of the index.
+
+        Returns:
+            threading.Lock: The lock for the key.
+        """
+        with cls._lock:
+            if key not in cls._key_locks:
+                cls._key_locks[key] = threading.Lock()
+            return cls._key_locks[key]
+
+    @staticmethod
+    def _key(faiss_dir: str | pathlib.Path) -> str:
+        """
+        Get the registry key of an index directory.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+
+        Returns:
+            str: The registry key.
+        """
+        return str(pathlib.Path(faiss_dir).resolve())
+
+    @classmethod
+    def read_version(cls, faiss_dir: str | pathlib.Path) -> Optional[str]:
+        """
+        Read the version stamp of an index on disk.
+
+        Indexes written before the stamp existed fall back to the modification time of
+        their files.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+
+        Returns:
+            Optional[str]: The version stamp, or None if the index does not exist.
+        """
+        faiss_dir = pathlib.Path(faiss_dir)
+        try:
+            return (faiss_dir / cls.VERSION_FILE).read_text().strip()
+        except FileNotFoundError:
+            pass
+
+        try:
+            stats = [
+                os.stat(faiss_dir / "index.faiss"),
+                os.stat(faiss_dir / "index.pkl"),
+            ]
+        except FileNotFoundError:
+            return None
+        return "mtime-" + "-".join(str(stat.st_mtime_ns) for stat in stats)
+
+    @classmethod
+    def _write_version(cls, faiss_dir: pathlib.Path, version: str) -> None:
+        """
+        Atomically replace the version stamp of an index.
+
+        Args:
+            faiss_dir (pathlib.Path): The directory of the FAISS index.
+            version (str): The new version stamp.
+
+        Returns:
+            None
+        """
+        tmp_path = faiss_dir / f".{cls.VERSION_FILE}.{uuid.uuid4().hex}"
+        tmp_path.write_text(version)
+        os.replace(tmp_path, faiss_dir / cls.VERSION_FILE)
+
+    @classmethod
+    def _is_pending(cls, version: Optional[str]) -> bool:
+        """
+        Check whether a version stamp marks a write in progress.
+
+        Args:
+            version (Optional[str]): The version stamp.
+
+        Returns:
+            bool: True if a write is in progress.
+        """
+        return version is not None and version.startswith(cls.PENDING_PREFIX)
+
+    @classmethod
+    def _load(cls, faiss_dir: pathlib.Path, embeddings: Embeddings) -> ResidentIndex:
+        """
+        Load an index from disk, retrying while a writer is replacing its files.
+
+        Args:
+            faiss_dir (pathlib.Path): The directory of the FAISS index.
+            embeddings (Embeddings): The embedding function bound to the index.
+
+        Returns:
+            ResidentIndex: The loaded index.
+
+        Raises:
+            FileNotFoundError: The index does not exist.
+            RuntimeError: The index kept changing while it was being loaded.
+        """
+        for _ in range(20):
+            version = cls.read_version(faiss_dir)
+            if version is None:
+                raise FileNotFoundError(f"FAISS index {faiss_dir} not found.")
+            if cls._is_pending(version):
+                time.sleep(0.05)
+                continue
+
+            base = cls._base(faiss_dir)
+            segment_log = SegmentLog(faiss_dir)
+            segments = segment_log.segments()
+            try:
+                records = segment_log.read(segments)
+            except FileNotFoundError:
+                # A compaction removed a segment while we were reading, start over.
+                continue
+
+            db = None
+            vectors = None
+            if (faiss_dir / "index.faiss").exists():
+                db = MappedDocstore.load_local(faiss_dir, embeddings)
+                deletes = any(record["op"] == "delete" for record in records)
+                if not FaissIndexFactory.supports_removal(db.index) and deletes:
+                    db = FaissIndexFactory.load_flat(faiss_dir, embeddings)
+                else:
+                    FaissIndexFactory.for_dir(faiss_dir).tune(db.index)
+                if not isinstance(db.index, faiss.IndexFlat) and not deletes:
+                    # Deletes shift positions, the stored vectors no longer line up.
+                    vectors = FaissIndexFactory.read_vectors(faiss_dir)
+                    if vectors is not None and len(vectors) != db.index.ntotal:
+                        vectors = None
+            db = SegmentLog.apply(db, records, embeddings)
+
+            if db is None:
+                raise FileNotFoundError(f"FAISS index {faiss_dir} not found.")
+
+            if cls.read_version(faiss_dir) == version:
+                logger.debug(f"Loaded FAISS index {faiss_dir} at version {version}.")
+                applied_through = segments[-1][0] if segments else base[0]
+                return ResidentIndex(db, version, vectors, base, applied_through)
+
+        raise RuntimeError(f"FAISS index {faiss_dir} changed while loading.")
+
+    @staticmethod
+    def _base(faiss_dir: pathlib.Path) -> tuple:
+        """
+        Stamp the main index of a directory, i.e. what segments are replayed on top of.
+
+        Args:
+            faiss_dir (pathlib.Path): The directory of the FAISS index.
+
+        Returns:
+            tuple: The last compacted segment and the identity of the main index file,
+                which changes whenever a compaction or a full save rewrites it.
+        """
+        try:
+            stat = os.stat(faiss_dir / "index.faiss")
+            main = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            main = None
+        return SegmentLog(faiss_dir).compacted_through(), main
+
+    @staticmethod
+    def _is_shared(resident: ResidentIndex) -> bool:
+        """
+        Check whether anything besides the resident entry still references its index, e.g.
+        a search running on it or a caller of `get_dir` that holds on to it.
+
+        Args:
+            resident (ResidentIndex): The resident index.
+
+        Returns:
+            bool: True if the index is referenced elsewhere.
+        """
+        # The attribute of the resident entry and the argument of `getrefcount`.
+        return sys.getrefcount(resident.db) > 2
+
+    @staticmethod
+    def _fork(db: FAISS) -> FAISS:
+        """
+        Copy an index, so segments can be replayed onto it while the original keeps
+        serving searches. The chunks of a mapped docstore are shared, not copied.
+
+        Args:
+            db (FAISS): The index.
+
+        Returns:
+            FAISS: The copy.
+        """
+        if isinstance(db.docstore, MappedDocstore):
+            docstore = db.docstore.copy()
+        else:
+            docstore = InMemoryDocstore(dict(db.docstore._dict))
+        return FAISS(
+            db.embedding_function,
+            faiss.clone_index(db.index),
+            docstore,
+            dict(db.index_to_docstore_id),
+            distance_strategy=db.distance_strategy,
+        )
+
+    @classmethod
+    def _catch_up(
+        cls, faiss_dir: pathlib.Path, resident: ResidentIndex, embeddings: Embeddings
+    ) -> Optional[ResidentIndex]:
+        """
+        Bring a resident index up to date by replaying only the segments appended since it
+        was loaded.
+
+        The segments are replayed in place when nothing else references the index, and onto
+        a copy otherwise, so searches still running on it are not affected. Readers stop
+        picking up the index from the registry before its references are counted, see
+        `get_dir`.
+
+        Args:
+            faiss_dir (pathlib.Path): The directory of the FAISS index.
+            resident (ResidentIndex): The stale resident index.
+            embeddings (Embeddings): The embedding function bound to the index.
+
+        Returns:
+            Optional[ResidentIndex]: The updated index, None when it has to be loaded again,
+                e.g. after a compaction rewrote the main index.
+        """
+        version = cls.read_version(faiss_dir)
+        if (
+            version is None
+            or cls._is_pending(version)
+            or cls._base(faiss_dir) != resident.base
+        ):
+            return None
+
+        segment_log = SegmentLog(faiss_dir)
+        segments = [
+            (seq, path)
+            for seq, path in segment_log.segments()
+            if seq > resident.applied_through
+        ]
+        try:
+            records = segment_log.read(segments)
+        except FileNotFoundError:
+            return None
+
+        deletes = any(record["op"] == "delete" for record in records)
+        if deletes and not FaissIndexFactory.supports_removal(resident.db.index):
+            return None
+
+        resident.replaying = True
+        try:
+            db = resident.db if not cls._is_shared(resident) else cls._fork(resident.db)
+            db = SegmentLog.apply(db, records, embeddings)
+        finally:
+            resident.replaying = False
+        if cls.read_version(faiss_dir) != version:
+            return None
+
+        logger.debug(
+            f"Applied {len(segments)} segments to FAISS index {faiss_dir} at version "
+            f"{version}."
+        )
+        return ResidentIndex(
+            db,
+            version,
+            # Deletes shift positions, the stored vectors no longer line up.
+            None if deletes else resident.vectors,
+            resident.base,
+            segments[-1][0] if segments else resident.applied_through,
+        )
+
+    @classmethod
+    def get(
+        cls, intent_value: str, embeddings: Embeddings, public: bool = False
+    ) -> FAISS:
+        """
+        Get the resident FAISS index for the intent, loading or reloading it when needed.
+
+        Args:
+            intent_value (str): The value of the intent.
+            embeddings (Embeddings): The embedding function bound to the index.
+            public (bool): Whether to get the public index.
+
+        Returns:
+            FAISS: The FAISS index.
+
+        Raises:
+            FileNotFoundError: The index does not exist.
+        """
+        return cls.get_dir(cls.index_dir(intent_value, public), embeddings)
+
+    @classmethod
+    def get_dir(cls, faiss_dir: str | pathlib.Path, embeddings: Embeddings) -> FAISS:
+        """
+        Get the resident FAISS index stored in a directory.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+            embeddings (Embeddings): The embedding function bound to the index.
+
+        Returns:
+            FAISS: The FAISS index.
+
+        Raises:
+            FileNotFoundError: The index does not exist.
+        """
+        faiss_dir = pathlib.Path(faiss_dir)
+        key = cls._key(faiss_dir)
+
+        resident = cls._indexes.get(key)
+        if resident is not None and cls._is_fresh(faiss_dir, resident):
+            # Take the reference before checking the flag: either the replay counts it and
+            # works on a copy, or it has already started and we wait for it below.
+            db = resident.db
+            if not resident.replaying:
+                return db
+
+        with cls._key_lock(key):
+            # Another thread may have reloaded the index while we were waiting.
+            resident = cls._indexes.get(key)
+            if resident is not None and cls._is_fresh(faiss_dir, resident, force=True):
+                return resident.db
+
+            if resident is not None and cls._is_pending(cls.read_version(faiss_dir)):
+                return resident.db
+
+            if resident is not None:
+                resident = cls._catch_up(faiss_dir, resident, embeddings)
+            if resident is None:
+                resident = cls._load(faiss_dir, embeddings)
+            cls._indexes[key] = resident
+            return resident.db
+
+    @classmethod
+    def _is_fresh(
+        cls, faiss_dir: pathlib.Path, resident: ResidentIndex, force: bool = False
+    ) -> bool:
+        """
+        Check whether a resident index still matches the version on disk.
+
+        Args:
+            faiss_dir (pathlib.Path): The directory of the FAISS index.
+            resident (ResidentIndex): The resident index.
+            force (bool): Whether to ignore the check interval.
+
+        Returns:
+            bool: True if the resident index is up to date.
+        """
+        now = time.monotonic()
+        if not force and now - resident.checked_at < cls._check_interval():
+            return True
+
+        version = cls.read_version(faiss_dir)
+        if version == resident.version:
+            resident.checked_at = now
+            return True
+        return False
+
+    @classmethod
+    def bump_version(cls, faiss_dir: str | pathlib.Path) -> str:
+        """
+        Give an index a new version stamp after its segments changed.
+
+        The resident copy of the index is checked again on its next access in this
+        process, which replays the new segments onto it; other processes see the change
+        after their check interval.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+
+        Returns:
+            str: The new version stamp.
+        """
+        version = uuid.uuid4().hex
+        cls._write_version(pathlib.Path(faiss_dir), version)
+        resident = cls._indexes.get(cls._key(faiss_dir))
+        if resident is not None:
+            resident.checked_at = float("-inf")
+        return version
+
+    @classmethod
+    def save(
+        cls,
+        db: FAISS,
+        faiss_dir: str | pathlib.Path,
+        on_replace: Optional[Callable[[], None]] = None,
+    ) -> str:
+        """
+        Write an index to disk and hot-swap it into the registry.
+
+        The files are written under a temporary name and renamed into place, so readers
+        never observe a partially written index file. The index is rebuilt with the index
+        type configured for the directory first, and its full precision vectors are kept
+        next to it unless that type is `Flat`.
+
+        Args:
+            db (FAISS): The FAISS index to save.
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+            on_replace (Optional[Callable[[], None]]): Called after the files are renamed into
+                place, before the new stamp becomes visible to readers.
+
+        Returns:
+            str: The new version stamp.
+        """
+        faiss_dir = pathlib.Path(faiss_dir)
+        faiss_dir.mkdir(parents=True, exist_ok=True)
+
+        factory = FaissIndexFactory.for_dir(faiss_dir)
+        vectors = None
+        if not factory.is_flat:
+            db, vectors = factory.convert(db)
+
+        version = uuid.uuid4().hex
+        tmp_name = f".tmp-{version}"
+
+        paths = MappedDocstore.save_local(db, faiss_dir, tmp_name)
+        cls._write_version(faiss_dir, cls.PENDING_PREFIX + version)
+        try:
+            FaissIndexFactory.write_vectors(faiss_dir, vectors)
+            for path in paths:
+                os.replace(path, faiss_dir / path.name.replace(tmp_name, "index", 1))
+            # Drop the pickled docstore of the previous format, it would take precedence.
+            (faiss_dir / "index.pkl").unlink(missing_ok=True)
+            if on_replace is not None:
+                on_replace()
+        finally:
+            cls._write_version(faiss_dir, version)
+
+        cls.publish(faiss_dir, db, version, vectors)
+        return version
+
+    @classmethod
+    def publish(
+        cls,
+        faiss_dir: str | pathlib.Path,
+        db: FAISS,
+        version: str,
+        vectors: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Atomically replace the resident copy of an index.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+            db (FAISS): The new FAISS index.
+            version (str): The version stamp of the new index.
+            vectors (Optional[np.ndarray]): The full precision vectors of an approximate
+                index.
+
+        Returns:
+            None
+        """
+        base = cls._base(pathlib.Path(faiss_dir))
+        cls._indexes[cls._key(faiss_dir)] = ResidentIndex(
+            db, version, vectors, base, base[0]
+        )
+
+    @classmethod
+    def full_precision(cls, db: FAISS) -> Optional[np.ndarray]:
+        """
+        Get the full precision vectors of a resident approximate index, to re-rank its
+        hits exactly.
+
+        Args:
+            db (FAISS): The resident FAISS index.
+
+        Returns:
+            Optional[np.ndarray]: The vectors of its first positions, None for flat indexes
+                and indexes without stored vectors.
+        """
+        for resident in list(cls._indexes.values()):
+            if resident.db is db:
+                return resident.vectors
+        return None
+
+    @classmethod
+    def invalidate(cls, faiss_dir: Optional[str | pathlib.Path] = None) -> None:
+        """
+        Drop resident indexes so they are reloaded on next access.
+
+        Args:
+            faiss_dir (Optional[str | pathlib.Path]): The directory of the index to drop.
+                Drops every index when None.
+
+        Returns:
+            None
+        """
+        if faiss_dir is None:
+            cls._indexes.clear()
+            return
+        cls._indexes.pop(cls._key(faiss_dir), None)
@@ -0,0 +1,206 @@
+import pathlib
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from chatbot.dependencies.vectorstore.FaissIndexFactory import FaissIndexFactory
+from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
+from chatbot.dependencies.vectorstore.SegmentLog import SegmentLog
+from chatbot.logger import logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class FaissIndexWriter:
+    """
+    Single writer of a FAISS index directory.
+
+    Writes are appended to the index's `SegmentLog` instead of rewriting the whole index,
+    so their cost no longer grows with the size of the corpus. Once `compact_after_segments`
+    segments have piled up they are folded into the main index in one rewrite.
+
+    Every write holds the writer lock of the index: a thread lock inside the process and
+    an exclusive `flock` on `<index dir>/.lock` across processes, so concurrent background
+    tasks can no longer overwrite each other's additions.
+    """
+
+    LOCK_FILE = ".lock"
+
+    _locks: dict[str, threading.Lock] = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(
+        self,
+        faiss_dir: str | pathlib.Path,
+        embeddings: Embeddings,
+        compact_after_segments: Optional[int] = 20,
+    ):
+        """
+        Initializes the writer of an index.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+            embeddings (Embeddings): The embedding function bound to the index.
+            compact_after_segments (Optional[int]): The number of pending segments that
+                triggers a compaction. None never compacts automatically.
+        """
+        self._faiss_dir = pathlib.Path(faiss_dir)
+        self._embeddings = embeddings
+        self._compact_after_segments = compact_after_segments
+        self._segment_log = SegmentLog(self._faiss_dir)
+
+    @classmethod
+    @contextmanager
+    def exclusive(cls, faiss_dir: str | pathlib.Path) -> Iterator[None]:
+        """
+        Hold the writer lock of an index directory.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+
+        Yields:
+            None
+        """
+        faiss_dir = pathlib.Path(faiss_dir)
+        faiss_dir.mkdir(parents=True, exist_ok=True)
+        key = str(faiss_dir.resolve())
+
+        with cls._locks_guard:
+            lock = cls._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            if fcntl is None:
+                yield
+                return
+
+            with open(faiss_dir / cls.LOCK_FILE, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(
+        self,
+        documents: list[Document],
+        vectors: list[list[float]],
+        ids: Optional[list[str]] = None,
+    ) -> list[str]:
+        """
+        Append embedded documents to the index.
+
+        Args:
+            documents (list[Document]): The documents to add.
+            vectors (list[list[float]]): The embeddings of the documents.
+            ids (Optional[list[str]]): The docstore ids of the documents. Random when None.
+
+        Returns:
+            list[str]: The docstore ids of the added documents.
+        """
+        if ids is None:
+            ids = [uuid.uuid4().hex for _ in documents]
+
+        records = [
+            {
+                "op": "add",
+                "id": _id,
+                "text": document.page_content,
+                "metadata": document.metadata,
+                "vector": SegmentLog.encode_vector(vector),
+            }
+            for _id, document, vector in zip(ids, documents, vectors)
+        ]
+
+        self._write(records)
+        return ids
+
+    def delete(self, ids: list[str]) -> None:
+        """
+        Remove documents from the index by appending tombstones.
+
+        The documents stop being served as soon as the tombstones are written; they are
+        physically dropped from the main index at the next compaction.
+
+        Args:
+            ids (list[str]): The docstore ids of the documents to remove.
+
+        Returns:
+            None
+        """
+        if not ids:
+            return
+        self._write([{"op": "delete", "id": _id} for _id in ids])
+
+    def _write(self, records: list[dict]) -> None:
+        """
+        Append records as a new segment and compact when enough segments piled up.
+
+        Args:
+            records (list[dict]): The records to write.
+
+        Returns:
+            None
+        """
+        with self.exclusive(self._faiss_dir):
+            seq = self._segment_log.append(records)
+            FaissIndexRegistry.bump_version(self._faiss_dir)
+            logger.debug(
+                f"Appended {len(records)} records to {self._faiss_dir} segment {seq}."
+            )
+
+            if (
+                self._compact_after_segments is not None
+                and len(self._segment_log.segments()) >= self._compact_after_segments
+            ):
+                self._compact()
+
+    def compact(self) -> None:
+        """
+        Fold every pending segment into the main index.
+
+        Returns:
+            None
+        """
+        with self.exclusive(self._faiss_dir):
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        Fold every pending segment into the main index. The caller holds the writer lock.
+
+        Returns:
+            None
+        """
+        segments = self._segment_log.segments()
+        if not segments:
+            return
+
+        db: Optional[FAISS] = None
+        if (self._faiss_dir / "index.faiss").exists():
+            db = FaissIndexFactory.load_flat(self._faiss_dir, self._embeddings)
+        db = SegmentLog.apply(db, self._segment_log.read(segments), self._embeddings)
+
+        last_seq = segments[-1][0]
+        if db is None:
+            self._segment_log.mark_compacted(last_seq)
+            self._segment_log.remove(through=last_seq)
+            return
+
+        FaissIndexRegistry.save(
+            db,
+            self._faiss_dir,
+            on_replace=lambda: self._segment_log.mark_compacted(last_seq),
+        )
+        self._segment_log.remove(through=last_seq)
+
+        logger.debug(
+            f"Compacted {len(segments)} segments into {self._faiss_dir} FAISS index."
+        )
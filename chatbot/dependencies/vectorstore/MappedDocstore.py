@@ -0,0 +1,316 @@
+import json
+import mmap
+import os
+import pathlib
+from typing import Iterator, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from chatbot.logger import logger
+
+
+class MappedDocstore(Docstore, AddableMixin):
+    """
+    Read-only, memory-mapped docstore of a saved FAISS index, replacing the pickled
+    `InMemoryDocstore` of `FAISS.save_local`.
+
+    A saved docstore is three files next to `<name>.faiss`:
+
+    - `<name>.chunks`: the UTF-8 text of every chunk, concatenated in index position order.
+    - `<name>.offsets.npy`: the int64 byte offset of every chunk in the blob, plus its end.
+    - `<name>.meta.json`: the docstore ids and the metadata of the chunks, one column per
+      metadata key; a key missing from some chunks lists the rows it is set on.
+
+    Opening it only reads the ids and metadata; chunk text stays on disk until a search
+    returns the chunk, so load time and memory no longer grow with the text of the corpus.
+    Chunks added or deleted afterwards (replayed segments) are kept in memory on top of it.
+    """
+
+    CHUNKS_SUFFIX = ".chunks"
+    OFFSETS_SUFFIX = ".offsets.npy"
+    META_SUFFIX = ".meta.json"
+
+    def __init__(
+        self,
+        blob: Union[mmap.mmap, bytes],
+        offsets: np.ndarray,
+        ids: list[str],
+        columns: dict[str, dict],
+    ):
+        """
+        Initializes the docstore.
+
+        Args:
+            blob (Union[mmap.mmap, bytes]): The concatenated chunk text.
+            offsets (np.ndarray): The offsets of the chunks in the blob, plus its end.
+            ids (list[str]): The docstore ids, in row order.
+            columns (dict[str, dict]): The metadata columns.
+        """
+        self._blob = memoryview(blob)
+        self._offsets = offsets
+        self._ids = ids
+        self._rows = {_id: row for row, _id in enumerate(ids)}
+        self._columns = columns
+        self._sparse_rows = {
+            key: {row: i for i, row in enumerate(column["rows"])}
+            for key, column in columns.items()
+            if "rows" in column
+        }
+        self._added: dict[str, Document] = {}
+        self._deleted: set[str] = set()
+
+    @property
+    def ids(self) -> list[str]:
+        """
+        Get the docstore ids saved on disk, in index position order.
+        """
+        return self._ids
+
+    def copy(self) -> "MappedDocstore":
+        """
+        Copy the docstore, sharing the mapped chunks and copying the in-memory changes.
+
+        Returns:
+            MappedDocstore: The copy.
+        """
+        docstore = MappedDocstore.__new__(MappedDocstore)
+        docstore.__dict__.update(self.__dict__)
+        docstore._added = dict(self._added)
+        docstore._deleted = set(self._deleted)
+        return docstore
+
+    def __contains__(self, _id: str) -> bool:
+        return _id in self._added or (_id in self._rows and _id not in self._deleted)
+
+    def _document(self, row: int) -> Document:
+        """
+        Read a saved chunk.
+
+        Args:
+            row (int): The row of the chunk.
+
+        Returns:
+            Document: The chunk.
+        """
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        metadata = {}
+        for key, column in self._columns.items():
+            if "rows" not in column:
+                metadata[key] = column["values"][row]
+            elif row in self._sparse_rows[key]:
+                metadata[key] = column["values"][self._sparse_rows[key][row]]
+        return Document(
+            id=self._ids[row],
+            page_content=str(self._blob[start:end], "utf-8"),
+            metadata=metadata,
+        )
+
+    def search(self, search: str) -> Union[str, Document]:
+        """
+        Get a chunk by its docstore id.
+
+        Args:
+            search (str): The docstore id.
+
+        Returns:
+            Union[str, Document]: The chunk, or an error message like `InMemoryDocstore`.
+        """
+        if search in self._added:
+            return self._added[search]
+        row = self._rows.get(search)
+        if row is None or search in self._deleted:
+            return f"ID {search} not found."
+        return self._document(row)
+
+    def add(self, texts: dict[str, Document]) -> None:
+        """
+        Add chunks in memory.
+
+        Args:
+            texts (dict[str, Document]): The chunks by docstore id.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: An id is already in the docstore.
+        """
+        overlapping = [_id for _id in texts if _id in self]
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        self._added.update(texts)
+
+    def delete(self, ids: list) -> None:
+        """
+        Delete chunks.
+
+        Args:
+            ids (list): The docstore ids.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: None of the ids is in the docstore.
+        """
+        if not any(_id in self for _id in ids):
+            raise ValueError(f"Tried to delete ids that does not  exist: {ids}")
+        for _id in ids:
+            if self._added.pop(_id, None) is None and _id in self._rows:
+                self._deleted.add(_id)
+
+    @classmethod
+    def _paths(cls, faiss_dir: pathlib.Path, name: str) -> tuple[pathlib.Path, ...]:
+        """
+        Get the files of a saved docstore.
+
+        Args:
+            faiss_dir (pathlib.Path): The directory of the FAISS index.
+            name (str): The name of the index files.
+
+        Returns:
+            tuple[pathlib.Path, ...]: The blob, offsets and metadata files.
+        """
+        return (
+            faiss_dir / f"{name}{cls.CHUNKS_SUFFIX}",
+            faiss_dir / f"{name}{cls.OFFSETS_SUFFIX}",
+            faiss_dir / f"{name}{cls.META_SUFFIX}",
+        )
+
+    @classmethod
+    def exists(cls, faiss_dir: str | pathlib.Path, name: str = "index") -> bool:
+        """
+        Check whether a docstore is saved in a directory.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+            name (str): The name of the index files.
+
+        Returns:
+            bool: True if every file of the docstore exists.
+        """
+        return all(path.exists() for path in cls._paths(pathlib.Path(faiss_dir), name))
+
+    @classmethod
+    def write(
+        cls, documents: Iterator[tuple[str, Document]], faiss_dir: pathlib.Path, name: str
+    ) -> list[pathlib.Path]:
+        """
+        Save chunks as a docstore.
+
+        Args:
+            documents (Iterator[tuple[str, Document]]): The docstore ids and chunks, in
+                index position order.
+            faiss_dir (pathlib.Path): The directory of the FAISS index.
+            name (str): The name of the index files.
+
+        Returns:
+            list[pathlib.Path]: The written files.
+        """
+        chunks_path, offsets_path, meta_path = cls._paths(faiss_dir, name)
+        ids: list[str] = []
+        offsets = [0]
+        columns: dict[str, dict] = {}
+
+        with open(chunks_path, "wb") as f:
+            for row, (_id, document) in enumerate(documents):
+                encoded = document.page_content.encode("utf-8")
+                f.write(encoded)
+                offsets.append(offsets[-1] + len(encoded))
+                ids.append(_id)
+                for key, value in document.metadata.items():
+                    column = columns.setdefault(key, {"rows": [], "values": []})
+                    column["rows"].append(row)
+                    column["values"].append(value)
+
+        for column in columns.values():
+            if len(column["rows"]) == len(ids):
+                del column["rows"]
+
+        with open(offsets_path, "wb") as f:
+            np.save(f, np.array(offsets, dtype=np.int64))
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "columns": columns}, f, ensure_ascii=False, default=str)
+        return [chunks_path, offsets_path, meta_path]
+
+    @classmethod
+    def open(cls, faiss_dir: str | pathlib.Path, name: str = "index") -> "MappedDocstore":
+        """
+        Memory-map a saved docstore.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+            name (str): The name of the index files.
+
+        Returns:
+            MappedDocstore: The docstore.
+        """
+        chunks_path, offsets_path, meta_path = cls._paths(pathlib.Path(faiss_dir), name)
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+
+        blob: Union[mmap.mmap, bytes] = b""
+        with open(chunks_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                # The mapping outlives the file object, and a writer replacing the file
+                # leaves it pointing at the old content.
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(blob, np.load(offsets_path, mmap_mode="r"), meta["ids"], meta["columns"])
+
+    @classmethod
+    def save_local(
+        cls, db: FAISS, faiss_dir: pathlib.Path, name: str
+    ) -> list[pathlib.Path]:
+        """
+        Save a LangChain FAISS store as `<name>.faiss` and a memory-mappable docstore.
+
+        Args:
+            db (FAISS): The store.
+            faiss_dir (pathlib.Path): The directory of the FAISS index.
+            name (str): The name of the index files.
+
+        Returns:
+            list[pathlib.Path]: The written files, the index first.
+        """
+        index_path = faiss_dir / f"{name}.faiss"
+        faiss.write_index(db.index, str(index_path))
+        ids = [db.index_to_docstore_id[position] for position in range(db.index.ntotal)]
+        documents = ((_id, db.docstore.search(_id)) for _id in ids)
+        return [index_path] + cls.write(documents, faiss_dir, name)
+
+    @classmethod
+    def load_local(
+        cls, faiss_dir: str | pathlib.Path, embeddings: Embeddings, name: str = "index"
+    ) -> FAISS:
+        """
+        Load a LangChain FAISS store saved by `save_local`.
+
+        Indexes last written in the pickled `FAISS.save_local` format, e.g. before this
+        format existed, are still loaded from their pickle until they are saved again.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+            embeddings (Embeddings): The embedding function bound to the index.
+            name (str): The name of the index files.
+
+        Returns:
+            FAISS: The store.
+        """
+        faiss_dir = pathlib.Path(faiss_dir)
+        if (faiss_dir / f"{name}.pkl").exists() or not cls.exists(faiss_dir, name):
+            logger.warning(f"Loading pickled docstore of {faiss_dir}.")
+            return FAISS.load_local(
+                f"{faiss_dir}",
+                embeddings,
+                index_name=name,
+                allow_dangerous_deserialization=True,
+            )
+
+        docstore = cls.open(faiss_dir, name)
+        index = faiss.read_index(str(faiss_dir / f"{name}.faiss"))
+        return FAISS(embeddings, index, docstore, dict(enumerate(docstore.ids)))
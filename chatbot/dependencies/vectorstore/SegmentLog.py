@@ -0,0 +1,255 @@
+import base64
+import json
+import os
+import pathlib
+import uuid
+from typing import Optional
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+
+class SegmentLog:
+    """
+    Append-only log of vectors written to a FAISS index since its last compaction.
+
+    Every write becomes one immutable segment file under `<index dir>/segments/`, written
+    to a temporary file, fsynced and renamed into place. The log acts as the write-ahead
+    log of the index: records are durable as soon as their segment exists, and readers
+    replay them on top of the main index until a compaction folds them in. The manifest
+    remembers the last compacted segment, so a crash between rewriting the main index
+    and deleting old segments never replays a record twice.
+
+    A record is one JSON line, either an addition or a tombstone:
+    `{"op": "add", "id": ..., "text": ..., "metadata": {...}, "vector": <base64 float32>}`
+    `{"op": "delete", "id": ...}`
+    """
+
+    SEGMENTS_DIR = "segments"
+    MANIFEST_FILE = "MANIFEST"
+
+    def __init__(self, faiss_dir: str | pathlib.Path):
+        """
+        Initializes the segment log of an index.
+
+        Args:
+            faiss_dir (str | pathlib.Path): The directory of the FAISS index.
+        """
+        self._dir = pathlib.Path(faiss_dir) / self.SEGMENTS_DIR
+
+    @staticmethod
+    def encode_vector(vector: list[float]) -> str:
+        """
+        Encode a vector for a segment record.
+
+        Args:
+            vector (list[float]): The vector.
+
+        Returns:
+            str: The base64 encoded float32 vector.
+        """
+        return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode()
+
+    @staticmethod
+    def decode_vector(data: str) -> list[float]:
+        """
+        Decode a vector of a segment record.
+
+        Args:
+            data (str): The base64 encoded float32 vector.
+
+        Returns:
+            list[float]: The vector.
+        """
+        return np.frombuffer(base64.b64decode(data), dtype=np.float32).tolist()
+
+    def compacted_through(self) -> int:
+        """
+        Get the sequence number of the last segment folded into the main index.
+
+        Returns:
+            int: The sequence number, 0 if nothing was compacted yet.
+        """
+        try:
+            manifest = json.loads((self._dir / self.MANIFEST_FILE).read_text())
+        except FileNotFoundError:
+            return 0
+        return int(manifest.get("compacted_through", 0))
+
+    def mark_compacted(self, seq: int) -> None:
+        """
+        Atomically record that every segment up to `seq` is part of the main index.
+
+        Args:
+            seq (int): The sequence number of the last compacted segment.
+
+        Returns:
+            None
+        """
+        self._write_atomic(
+            self._dir / self.MANIFEST_FILE, json.dumps({"compacted_through": seq})
+        )
+
+    def segments(self) -> list[tuple[int, pathlib.Path]]:
+        """
+        List the segments that are not compacted yet, oldest first.
+
+        Returns:
+            list[tuple[int, pathlib.Path]]: The sequence numbers and paths of the segments.
+        """
+        if not self._dir.exists():
+            return []
+
+        compacted_through = self.compacted_through()
+        segments = []
+        for path in self._dir.glob("*.jsonl"):
+            seq = int(path.stem)
+            if seq > compacted_through:
+                segments.append((seq, path))
+        return sorted(segments)
+
+    def append(self, records: list[dict]) -> int:
+        """
+        Write records as a new segment.
+
+        The caller must hold the writer lock of the index.
+
+        Args:
+            records (list[dict]): The records to write.
+
+        Returns:
+            int: The sequence number of the new segment.
+        """
+        self._dir.mkdir(parents=True, exist_ok=True)
+        existing = [seq for seq, _ in self.segments()]
+        seq = max(existing + [self.compacted_through()]) + 1
+
+        payload = "".join(json.dumps(record) + "\n" for record in records)
+        self._write_atomic(self._dir / f"{seq:08d}.jsonl", payload)
+        return seq
+
+    def read(self, segments: Optional[list[tuple[int, pathlib.Path]]] = None) -> list[dict]:
+        """
+        Read the records of the given segments, or of every pending segment.
+
+        Args:
+            segments (Optional[list[tuple[int, pathlib.Path]]]): The segments to read.
+
+        Returns:
+            list[dict]: The records, in write order.
+        """
+        if segments is None:
+            segments = self.segments()
+
+        records = []
+        for _, path in segments:
+            with open(path, "r") as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+        return records
+
+    def remove(self, through: int) -> None:
+        """
+        Delete compacted segment files.
+
+        Args:
+            through (int): The sequence number of the last segment to delete.
+
+        Returns:
+            None
+        """
+        if not self._dir.exists():
+            return
+
+        for path in self._dir.glob("*.jsonl"):
+            if int(path.stem) <= through:
+                path.unlink(missing_ok=True)
+
+    @staticmethod
+    def apply(db: Optional[FAISS], records: list[dict], embeddings: Embeddings) -> Optional[FAISS]:
+        """
+        Replay records on top of an index, in write order.
+
+        Additions whose id is already in the index are skipped, tombstones of ids that are
+        not in the index are ignored.
+
+        Args:
+            db (Optional[FAISS]): The index to replay onto, None to start a new one.
+            records (list[dict]): The records to replay.
+            embeddings (Embeddings): The embedding function bound to the index.
+
+        Returns:
+            Optional[FAISS]: The index with the records applied, None if there was nothing.
+        """
+        # Chunk ids are content hashes, so an id the index already holds is the same chunk
+        # written twice by racing writers; replaying it again would fail in the docstore.
+        present = set(db.index_to_docstore_id.values()) if db is not None else set()
+        adds: list[dict] = []
+        deletes: list[str] = []
+
+        for record in records:
+            if record["op"] == "add" and record["id"] not in present:
+                if deletes:
+                    db.delete(deletes)
+                    deletes = []
+                present.add(record["id"])
+                adds.append(record)
+            elif record["op"] == "delete" and record["id"] in present:
+                if adds:
+                    db = SegmentLog._add(db, adds, embeddings)
+                    adds = []
+                present.discard(record["id"])
+                deletes.append(record["id"])
+
+        if deletes:
+            db.delete(deletes)
+        return SegmentLog._add(db, adds, embeddings)
+
+    @staticmethod
+    def _add(db: Optional[FAISS], adds: list[dict], embeddings: Embeddings) -> Optional[FAISS]:
+        """
+        Add the records of a run of additions to an index.
+
+        Args:
+            db (Optional[FAISS]): The index to add to, None to start a new one.
+            adds (list[dict]): The addition records.
+            embeddings (Embeddings): The embedding function bound to the index.
+
+        Returns:
+            Optional[FAISS]: The index with the records added.
+        """
+        if not adds:
+            return db
+
+        text_embeddings = [
+            (record["text"], SegmentLog.decode_vector(record["vector"])) for record in adds
+        ]
+        metadatas = [record.get("metadata") or {} for record in adds]
+        ids = [record["id"] for record in adds]
+
+        if db is None:
+            return FAISS.from_embeddings(
+                text_embeddings, embeddings, metadatas=metadatas, ids=ids
+            )
+
+        db.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        return db
+
+    @staticmethod
+    def _write_atomic(path: pathlib.Path, payload: str) -> None:
+        """
+        Write a file durably: temporary file, fsync, rename.
+
+        Args:
+            path (pathlib.Path): The destination path.
+            payload (str): The content of the file.
+
+        Returns:
+            None
+        """
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
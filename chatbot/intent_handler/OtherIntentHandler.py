@@ -1,7 +1,6 @@
-from typing import AsyncIterator
+from typing import AsyncIterator, Optional
 
 from chatbot.dependencies.IntentClassifier import Intent
-from chatbot.dependencies.ResponseGenerator import ResponseGenerator
 from chatbot.dependencies.contracts.BaseIntentHandler import BaseIntentHandler
 from chatbot.logger import logger
 
@@ -16,7 +15,13 @@ class OtherIntentHandler(BaseIntentHandler):
         self._intent: Intent = Intent.OTHER
         self.with_prompt_template(self._intent)
 
-    async def handle(self, message: str, history: list[dict] | None = None) -> AsyncIterator[str]:
+    async def handle(
+        self,
+        message: str,
+        history: list[dict] | None = None,
+        summary: Optional[str] = None,
+        information: Optional[str] = None,
+    ) -> AsyncIterator[str]:
         """
         Handles the intent of the message.
 
@@ -25,20 +30,24 @@ class OtherIntentHandler(BaseIntentHandler):
         Parameters:
             message (str): The message to be handled.
             history (list[dict]): The history list.
+            summary (Optional[str]): The summary of the earlier conversation.
+            information (Optional[str]): Unused, the other intent does not retrieve.
 
         Returns:
             str: The response to the message.
         """
-        prompt_template = self.build_prompt()
-        response_generator = ResponseGenerator.with_prompt_template(prompt_template)
-
         logger.debug(f"History: {history}")
 
-        response = response_generator.response_async(message, history)
+        response = self.response_generator.response_async(message, history, summary)
 
         return response
 
-    async def handle_public(self, message: str, history: list[dict] | None = None) -> AsyncIterator[str]:
+    async def handle_public(
+        self,
+        message: str,
+        history: list[dict] | None = None,
+        information: Optional[str] = None,
+    ) -> AsyncIterator[str]:
         """
         Handles the intent of the message.
 
@@ -50,9 +59,6 @@ class OtherIntentHandler(BaseIntentHandler):
         Returns:
             str: The response to the message.
         """
-        prompt_template = self.build_prompt()
-        response_generator = ResponseGenerator.with_prompt_template(prompt_template)
-
-        response = response_generator.response_async(message, history)
+        response = self.response_generator.response_async(message, history)
 
         return response
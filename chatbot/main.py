@@ -23,18 +23,25 @@ def setup_server() -> FastAPI:
     from chatbot.dependencies.DocumentEmbedder import DocumentEmbedder
     from chatbot.dependencies.InformationRetriever import InformationRetriever
     from chatbot.dependencies.IntentClassifier import IntentClassifier
+    from chatbot.dependencies.ModelLoader import ModelLoader
+    from chatbot.dependencies.utils.Tracer import tracer
     from fastapi.middleware.cors import CORSMiddleware
     from starlette.middleware.sessions import SessionMiddleware
 
     configure_logging()  # Configure logging
 
-    set_application(
-        Application(
-            intent_classifier=IntentClassifier(),
-            document_embedder=DocumentEmbedder(),
-            information_retriever=InformationRetriever(),
-        )
+    application = Application(
+        intent_classifier=IntentClassifier(),
+        document_embedder=DocumentEmbedder(),
+        information_retriever=InformationRetriever(),
     )
+    set_application(application)
+
+    # Export the stats of the components on `/metrics`.
+    tracer.register_collector("intent_classifier", application.intent_classifier.stats)
+    for name, model in ModelLoader.loaded_models().items():
+        if callable(getattr(model, "stats", None)):
+            tracer.register_collector(f"model.{name}", model.stats)
     server = FastAPI()
 
     origins = ["http://localhost:3000", "http://localhost:3001"]
@@ -7,6 +7,8 @@ from .conversation import router as conversation_router
 from .document import router as document_router
 from .question import router as question_router
 from .logs import router as logs_router
+from .job import router as job_router
+from .metrics import router as metrics_router
 
 router = APIRouter(prefix="/api/v1")
 router.include_router(chat_router)
@@ -17,6 +19,9 @@ router.include_router(conversation_router)
 router.include_router(document_router)
 router.include_router(question_router)
 router.include_router(logs_router)
+router.include_router(job_router)
+# Unauthenticated, only expose it on the internal network.
+router.include_router(metrics_router)
 
 
 @router.get("/")
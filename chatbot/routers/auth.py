@@ -5,7 +5,9 @@ from fastapi import APIRouter, Request, Response, HTTPException, status, Depends
 from starlette.requests import Request as StarletteRequest
 from pydantic import BaseModel
 
-from chatbot.database import SessionLocal
+from sqlalchemy import select
+
+from chatbot.database import AsyncSessionLocal
 from chatbot.database.models.Staff import Staff as StaffModel
 from chatbot.database.models.Student import Student as UserModel
 from chatbot.dependencies.utils.SessionManagement import (
@@ -13,7 +15,8 @@ from chatbot.dependencies.utils.SessionManagement import (
     SessionData,
     SessionDataType,
 )
-from chatbot.dependencies.utils.auth import protected_route, ACL
+from chatbot.dependencies.utils.auth import principal_cache, protected_route, ACL
+from chatbot.dependencies.utils.PrincipalCache import StaffPrincipal, StudentPrincipal
 from chatbot.http.Response import Response as ResponseTemplate
 from authlib.integrations.starlette_client import OAuth
 from fastapi.security import OAuth2AuthorizationCodeBearer
@@ -45,7 +48,7 @@ oauth.register(
 
 
 @router.get("/", status_code=status.HTTP_200_OK)
-async def get_auth(auth: StaffModel | UserModel = Depends(protected_route(ACL.USER))):
+async def get_auth(auth: StaffPrincipal | StudentPrincipal = Depends(protected_route(ACL.USER))):
     """
     Retrieves authentication information based on the provided auth token.
 
@@ -55,10 +58,10 @@ async def get_auth(auth: StaffModel | UserModel = Depends(protected_route(ACL.US
     Returns:
     - bool: True if the authentication is successful, False otherwise.
     """
-    if isinstance(auth, UserModel):
+    if isinstance(auth, StudentPrincipal):
         return {"access_level": ACL.USER.value, "user": auth}
 
-    if isinstance(auth, StaffModel):
+    if isinstance(auth, StaffPrincipal):
         return {"access_level": ACL.STAFF.value, "user": auth}
 
     return None
@@ -75,14 +78,14 @@ async def get_user(auth_user=Depends(protected_route(ACL.USER))):
     Returns:
     - User: The authenticated user.
     """
-    if isinstance(auth_user, UserModel):
+    if isinstance(auth_user, StudentPrincipal):
         return {
             "number": auth_user.student_number,
             "name": auth_user.name,
             "email": auth_user.email,
         }
 
-    if isinstance(auth_user, StaffModel):
+    if isinstance(auth_user, StaffPrincipal):
         return {
             "number": auth_user.staff_number,
             "name": auth_user.name,
@@ -137,8 +140,8 @@ async def login(credential: StudentCredential, response: Response):
     student_number = credential.student_number
     password = credential.password
 
-    with SessionLocal() as db:
-        user = UserModel.get_user_by_student_number(db, student_number)
+    async with AsyncSessionLocal() as db:
+        user = await UserModel.get_user_by_student_number_async(db, student_number)
 
         if user is None:
             raise HTTPException(
@@ -181,9 +184,8 @@ async def staff_login(credential: StaffCredential, response: Response):
     staff_number = credential.staff_number
     password = credential.password
 
-    db = SessionLocal()
-    with db:
-        user = StaffModel.get_user_by_staff_number(db, staff_number)
+    async with AsyncSessionLocal() as db:
+        user = await StaffModel.get_user_by_staff_number_async(db, staff_number)
 
         if user is None:
             raise HTTPException(
@@ -239,9 +241,9 @@ async def auth_callback(request: StarletteRequest, res: Response):
         # TODO: Change this to be a proper redirect
         return RedirectResponse(f"http://localhost:3000/redirect/none?error_msg=Unauthorized email domain&desc=Please use your Unesa email", status_code=status.HTTP_302_FOUND)
 
-    with SessionLocal() as db:
+    async with AsyncSessionLocal() as db:
         # Check if user already exists in the database
-        existing_user = db.query(UserModel).filter(UserModel.email == email).first()
+        existing_user = await db.scalar(select(UserModel).filter(UserModel.email == email))
 
         if existing_user is None:
             # Save new user to the database
@@ -253,7 +255,7 @@ async def auth_callback(request: StarletteRequest, res: Response):
             new_user.salt = secrets.token_hex(16)
 
             db.add(new_user)
-            db.commit()
+            await db.commit()
 
         session_token = SessionManagement.create_session_token(
             SessionData(
@@ -280,4 +282,5 @@ async def logout(response: Response, auth_user=Depends(protected_route(ACL.USER)
         ResponseTemplate: A response indicating the success of the logout.
     """
     response.delete_cookie(key="session_token")
+    principal_cache.invalidate(auth_user.type, auth_user.id)
     return {"message": "Logout successful"}
@@ -1,19 +1,18 @@
-import hashlib
 import json
-from datetime import datetime
-from typing import AsyncGenerator, AsyncIterator
+from typing import AsyncIterator, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import StreamingResponse
 
-from chatbot.database import SessionLocal
-from chatbot.database.models.Message import Message
-from chatbot.database.models.Student import Student
+from chatbot.config import Configuration
+from chatbot.dependencies.ConversationHistory import ConversationHistory
+from chatbot.dependencies.HistoryCompactor import HistoryCompactor
+from chatbot.dependencies.ResponseCache import ResponseCache
+from chatbot.dependencies.contracts.BaseIntentHandler import BaseIntentHandler
 from chatbot.dependencies.utils.auth import protected_route, ACL
-from chatbot.database.models.Conversation import Conversation
+from chatbot.dependencies.utils.PrincipalCache import StaffPrincipal, StudentPrincipal
+from chatbot.dependencies.utils.Tracer import tracer
 from chatbot.http.Response import Response as ResponseTemplate
-from chatbot.dependencies.TitleGenerator import TitleGenerator
-from chatbot.database.models.Staff import Staff
 from ..Application import Application
 from ..app import get_application
 from ..dependencies.IntentClassifier import Intent
@@ -23,6 +22,16 @@ from pydantic import BaseModel
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+conversation_history = ConversationHistory.from_config(
+    Configuration.get("conversation_history"), HistoryCompactor()
+)
+
+response_cache = ResponseCache.from_config(
+    Configuration.get("information_retriever.response_cache")
+)
+if response_cache is not None:
+    tracer.register_collector("response_cache", response_cache.stats)
+
 
 class ChatMessage(BaseModel):
     """
@@ -40,10 +49,88 @@ class ChatMessageWithHistory(ChatMessage):
     history: str = ""
 
 
+async def lookup_cached_answer(
+        app: Application,
+        message: str,
+        history: list[dict],
+        summary: str | None = None,
+        public: bool = False,
+) -> tuple[Optional[list[float]], Optional[AsyncIterator[str]]]:
+    """
+    Looks a standalone question up in the `response_cache`.
+
+    Args:
+        app (Application): The application.
+        message (str): The message.
+        history (list[dict]): The history list.
+        summary (str | None): The summary of the earlier conversation.
+        public (bool): Whether the question was asked by a non-authenticated user.
+
+    Returns:
+        tuple[Optional[list[float]], Optional[AsyncIterator[str]]]: The embedding of the
+            message, None when the message is not cacheable, and the replayed cached answer,
+            None on a miss.
+    """
+    if response_cache is None or history or summary:
+        return None, None
+
+    with tracer.span("response_cache.lookup") as span:
+        embedding = await app.information_retriever.embed_query_async(message)
+        cached = response_cache.lookup(embedding, list(Intent), public=public)
+        span.set(cache_hit=cached is not None)
+    if cached is None:
+        logger.debug(f"Response cache miss, cache stats: {response_cache.stats()}")
+        return embedding, None
+
+    intent, answer = cached
+    logger.info(f"get cached answer for intent: {intent.value}")
+    return embedding, response_cache.replay(answer)
+
+
+async def classify_and_retrieve(
+        app: Application,
+        message: str,
+        history: list[dict],
+        summary: str | None = None,
+        public: bool = False,
+) -> tuple[Intent, Optional[str]]:
+    """
+    Classifies the intent of a message and, in speculative mode, retrieves its information.
+
+    With `information_retriever.speculative` enabled, every intent index is searched while
+    the classification runs and only the information of the winning intent is kept.
+
+    Args:
+        app (Application): The application.
+        message (str): The message.
+        history (list[dict]): The history list.
+        summary (str | None): The summary of the earlier conversation.
+        public (bool): Whether to search the public intent indexes.
+
+    Returns:
+        tuple[Intent, Optional[str]]: The intent and the retrieved information, None when
+            the intent handler has to retrieve it itself.
+    """
+    if not app.information_retriever.speculative:
+        intent = await app.intent_classifier.classify_with_history(message, history, summary)
+        return intent, None
+
+    speculation = app.information_retriever.speculate(
+        BaseIntentHandler.build_retrieval_query(message, history), public=public
+    )
+    try:
+        intent = await app.intent_classifier.classify_with_history(message, history, summary)
+    except BaseException:
+        speculation.cancel()
+        raise
+
+    return intent, await speculation.result(intent)
+
+
 async def handle_chat_for_authenticated_user(
         chat_message: ChatMessage,
         app: Application,
-        user: Student | Staff,
+        user: StudentPrincipal | StaffPrincipal,
 ) -> AsyncIterator[str]:
     """
     Handles the chat for an authenticated user.
@@ -51,50 +138,43 @@ async def handle_chat_for_authenticated_user(
     Args:
         chat_message (ChatMessage): The chat message.
         app (Application): The application.
-        user (Student): The authenticated user.
+        user (StudentPrincipal | StaffPrincipal): The authenticated user.
         history (list[dict]): The history list.
 
     Returns:
         dict: The response message.
     """
-    _conv_id = None
     history: list[dict] = []
+    summary: str | None = None
 
     if chat_message.conversation_uuid != "":
-        with SessionLocal() as db:
-            conversation = (
-                db.query(Conversation)
-                .filter(Conversation.uuid == chat_message.conversation_uuid and user.id == user.id)
-                .first()
-            )
+        with tracer.span("conversation_history.recent"):
+            recent = await conversation_history.recent(chat_message.conversation_uuid, user)
 
-            if not conversation:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Conversation not found",
-                )
-
-            _conv_id = conversation.id
-
-            if _conv_id is not None:
-                messages = (
-                    db.query(Message)
-                    .filter_by(conversation_id=_conv_id)
-                    .order_by(Message.created_at.asc())
-                    .limit(2)
-                    .all()
-                )
+        if recent is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Conversation not found",
+            )
 
-                for msg in messages:
-                    history.append(json.loads(msg.text))
+        summary, history = recent
 
     message: str = chat_message.message
-    intent: Intent = await app.intent_classifier.classify_with_history(message, history)
+    embedding, cached_answer = await lookup_cached_answer(app, message, history, summary)
+    if cached_answer is not None:
+        return cached_answer
+
+    intent, information = await classify_and_retrieve(app, message, history, summary)
 
     logger.info(f"get intent: {intent.value}")
 
     handler = IntentHandlerFactory.get_handler(intent)
-    response = await handler.with_app(app).handle(message, history=history)
+    response = await handler.with_app(app).handle(
+        message, history=history, summary=summary, information=information
+    )
+
+    if embedding is not None:
+        response = response_cache.record(response, embedding, intent)
 
     return response
 
@@ -118,12 +198,21 @@ async def handle_chat_for_non_user(
     logger.info(f"get history: {history}")
 
     message: str = chat_message.message
-    intent: Intent = await app.intent_classifier.classify_with_history(message, history)
+    embedding, cached_answer = await lookup_cached_answer(app, message, history, public=True)
+    if cached_answer is not None:
+        return cached_answer
+
+    intent, information = await classify_and_retrieve(app, message, history, public=True)
 
     logger.info(f"get non user intent: {intent.value}")
 
     handler = IntentHandlerFactory.get_handler(intent)
-    response = await handler.with_app(app).handle_public(message, history=history)
+    response = await handler.with_app(app).handle_public(
+        message, history=history, information=information
+    )
+
+    if embedding is not None:
+        response = response_cache.record(response, embedding, intent, public=True)
 
     return response
 
@@ -132,7 +221,7 @@ async def handle_chat_for_non_user(
 async def chat_prompt(
         chat_message: ChatMessageWithHistory,
         app: Application = Depends(get_application),
-        user: Student | Staff | None = Depends(protected_route(ACL.ALL)),
+        user: StudentPrincipal | StaffPrincipal | None = Depends(protected_route(ACL.ALL)),
 ):
     """
     Receives a prompt and returns the response.
@@ -140,17 +229,20 @@ async def chat_prompt(
     Args:
         chat_message (ChatMessage): The prompt message.
         app (Application, optional): The application. Defaults to Depends(get_application).
-        user (Student | Staff | None, optional): The authenticated user. Defaults to Depends(protected_route(ACL.USER)).
+        user (StudentPrincipal | StaffPrincipal | None, optional): The authenticated user. Defaults to Depends(protected_route(ACL.USER)).
 
     Returns:
         dict: The response message.
     """
     logger.debug(f"Received message: {chat_message.message}, conversation_uuid: {chat_message.conversation_uuid}")
 
-    if user is None:
-        response = await handle_chat_for_non_user(chat_message, app)
-    else:
-        response = await handle_chat_for_authenticated_user(chat_message, app, user)
+    with tracer.span("chat.prompt", public=user is None):
+        if user is None:
+            response = await handle_chat_for_non_user(chat_message, app)
+        else:
+            response = await handle_chat_for_authenticated_user(chat_message, app, user)
+
+        response = tracer.stream("chat.stream", response)
 
     return StreamingResponse(response, media_type="text/plain")
 
@@ -168,7 +260,7 @@ class StoreChatRequest(BaseModel):
 @router.post("/store", status_code=status.HTTP_201_CREATED)
 async def store_chat(
         store_chat_request: StoreChatRequest,
-        auth_user: Student = Depends(protected_route(ACL.USER)),
+        auth_user: StudentPrincipal = Depends(protected_route(ACL.USER)),
 ):
     """
     Stores the chat history for the authenticated user.
@@ -180,30 +272,18 @@ async def store_chat(
     Returns:
         dict: A dictionary containing the conversation ID.
     """
-    with SessionLocal() as db:
-        conversation = (
-            db.query(Conversation)
-            .filter_by(uuid=store_chat_request.conversation_uuid, user_id=auth_user.id)
-            .first()
-        )
-
-        if not conversation:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Conversation not found",
-            )
-
-        message = Message()
-        text_json = {
-            "U": store_chat_request.user_message,
-            "A": store_chat_request.assistant_message,
-        }
-
-        message.conversation_id = conversation.id
-        message.text = json.dumps(text_json)
+    stored = await conversation_history.append(
+        store_chat_request.conversation_uuid,
+        auth_user,
+        store_chat_request.user_message,
+        store_chat_request.assistant_message,
+    )
 
-        db.add(message)
-        db.commit()
+    if not stored:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found",
+        )
 
     return ResponseTemplate(
         data={
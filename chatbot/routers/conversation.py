@@ -4,14 +4,15 @@ from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, status
 
-from chatbot.database import SessionLocal
+from sqlalchemy import select
+
+from chatbot.database import AsyncSessionLocal
 from chatbot.database.models.Message import Message
-from chatbot.database.models.Student import Student
 from chatbot.dependencies.utils.auth import protected_route, ACL
+from chatbot.dependencies.utils.PrincipalCache import StaffPrincipal, StudentPrincipal
 from chatbot.database.models.Conversation import Conversation
 from chatbot.http.Response import Response as ResponseTemplate
 from chatbot.dependencies.TitleGenerator import TitleGenerator
-from chatbot.database.models.Staff import Staff
 from ..Application import Application
 from ..logger import logger
 from pydantic import BaseModel
@@ -30,7 +31,7 @@ class CreateConversationRequest(BaseModel):
 @router.post("/new", status_code=status.HTTP_201_CREATED)
 async def create_conversation(
     conv_req: CreateConversationRequest,
-    auth_user: Student | Staff = Depends(protected_route(ACL.USER)),
+    auth_user: StudentPrincipal | StaffPrincipal = Depends(protected_route(ACL.USER)),
 ):
     """
     Creates a new conversation for the authenticated user.
@@ -42,21 +43,22 @@ async def create_conversation(
     Returns:
         dict: A dictionary containing the conversation ID.
     """
-    with SessionLocal() as db:
+    # Generated before opening the session, so no connection is held during the LLM call.
+    name = await TitleGenerator().generate_title(conv_req.assistant_message)
+
+    async with AsyncSessionLocal() as db:
         conversation = Conversation()
         conversation.user_id = auth_user.id
         conversation.start_time = datetime.now()
         conversation.uuid = str(
             hashlib.sha256(str(datetime.now()).encode()).hexdigest()
         )
-        conversation.user_type = 1 if isinstance(auth_user, Student) else 0
-        conversation.name = await TitleGenerator().generate_title(
-            conv_req.assistant_message
-        )
+        conversation.user_type = 1 if isinstance(auth_user, StudentPrincipal) else 0
+        conversation.name = name
 
         db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
+        await db.commit()
+        await db.refresh(conversation)
 
     return ResponseTemplate(
         data={
@@ -70,7 +72,7 @@ async def create_conversation(
 
 @router.get("/all")
 async def get_conversations(
-    auth_user: Student | Staff = Depends(protected_route(ACL.USER)),
+    auth_user: StudentPrincipal | StaffPrincipal = Depends(protected_route(ACL.USER)),
 ):
     """
     Retrieves all conversations for the authenticated user.
@@ -81,14 +83,15 @@ async def get_conversations(
     Returns:
         dict: A dictionary containing the conversation ID.
     """
-    with SessionLocal() as db:
-        user_type = 1 if isinstance(auth_user, Student) else 0
+    async with AsyncSessionLocal() as db:
+        user_type = 1 if isinstance(auth_user, StudentPrincipal) else 0
         conversations = (
-            db.query(Conversation)
-            .filter_by(user_id=auth_user.id, user_type=user_type)
-            .order_by(Conversation.start_time.desc())
-            .all()
-        )
+            await db.scalars(
+                select(Conversation)
+                .filter_by(user_id=auth_user.id, user_type=user_type)
+                .order_by(Conversation.start_time.desc())
+            )
+        ).all()
 
     return ResponseTemplate(
         data={
@@ -108,7 +111,7 @@ async def get_conversations(
 @router.get("/messages/{conversation_uid}")
 async def get_conversation_by_id(
     conversation_uid: str,
-    auth_user: Student | Staff = Depends(protected_route(ACL.USER)),
+    auth_user: StudentPrincipal | StaffPrincipal = Depends(protected_route(ACL.USER)),
 ):
     """
     Retrieves a conversation by ID for the authenticated user.
@@ -120,12 +123,12 @@ async def get_conversation_by_id(
     Returns:
         dict: A dictionary containing the conversation ID.
     """
-    with SessionLocal() as db:
-        user_type = 1 if isinstance(auth_user, Student) else 0
-        conversation = (
-            db.query(Conversation)
-            .filter_by(uuid=conversation_uid, user_id=auth_user.id, user_type=user_type)
-            .first()
+    async with AsyncSessionLocal() as db:
+        user_type = 1 if isinstance(auth_user, StudentPrincipal) else 0
+        conversation = await db.scalar(
+            select(Conversation).filter_by(
+                uuid=conversation_uid, user_id=auth_user.id, user_type=user_type
+            )
         )
 
         if not conversation:
@@ -135,11 +138,12 @@ async def get_conversation_by_id(
             )
 
         messages = (
-            db.query(Message)
-            .filter_by(conversation_id=conversation.id)
-            .order_by(Message.created_at)
-            .all()
-        )
+            await db.scalars(
+                select(Message)
+                .filter_by(conversation_id=conversation.id)
+                .order_by(Message.created_at)
+            )
+        ).all()
 
         for message in messages:
             message.text = json.loads(message.text)
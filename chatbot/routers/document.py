@@ -1,32 +1,77 @@
 import hashlib
 import os
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Awaitable, Callable
 
+import aiofiles
+import aiofiles.os
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
     status,
     UploadFile,
-    BackgroundTasks,
     Form,
+    Request,
     Response,
 )
 from fastapi.responses import FileResponse
+from fastapi.routing import APIRoute
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 
-from chatbot.database import SessionLocal
+from chatbot.config import Configuration
+from chatbot.database import AsyncSessionLocal
 from chatbot.database.models.Document import Document
 from chatbot.dependencies.DocumentEmbedder import DocumentEmbedder
+from chatbot.dependencies.IngestionWorker import IngestionWorker
 from chatbot.dependencies.IntentClassifier import Intent
+from chatbot.dependencies.JobQueue import JobQueue
 from chatbot.dependencies.utils.auth import protected_route, ACL
 from chatbot.dependencies.utils.path_utils import project_path
 from chatbot.http.Response import Response as ResponseTemplate
 from chatbot.logger import logger
 
-router = APIRouter(prefix="/document", tags=["Document"])
+
+class UploadSizeLimitRoute(APIRoute):
+    """
+    Route that rejects a request whose `Content-Length` exceeds `document_upload.max_size`
+    before its body is read.
+
+    FastAPI parses the multipart form, spooling the whole file to a temporary file, before
+    the endpoint or any of its dependencies run, so a limit checked there comes too late.
+    `FORM_OVERHEAD` bytes are allowed on top of the limit for the other form fields and the
+    multipart boundaries.
+    """
+
+    FORM_OVERHEAD = 64 * 1024
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        route_handler = super().get_route_handler()
+
+        async def size_limited_route_handler(request: Request) -> Response:
+            max_size = (Configuration.get("document_upload") or {}).get("max_size")
+            content_length = request.headers.get("content-length", "")
+            if (
+                max_size is not None
+                and content_length.isdigit()
+                and int(content_length) > max_size + self.FORM_OVERHEAD
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File is larger than {max_size} bytes.",
+                )
+            return await route_handler(request)
+
+        return size_limited_route_handler
+
+
+router = APIRouter(
+    prefix="/document", tags=["Document"], route_class=UploadSizeLimitRoute
+)
 
 
 class DocumentUpload(BaseModel):
@@ -38,49 +83,172 @@ class DocumentUpload(BaseModel):
 
 DOCUMENT_DIRECTORY = str(project_path("resources", "documents"))
 
+job_queue = JobQueue.from_config(Configuration.get("ingestion_queue"))
 
-def embed_document(
-    document_path: str, metadata: DocumentUpload, document_id: int
-) -> None:
+
+def document_index_keys(intent: str, public: bool) -> list[str]:
     """
-    Embeds a document in the database.
+    Gets the names of the FAISS indexes a document is written to.
+
+    Parameters:
+        intent (str): The comma separated intents of the document.
+        public (bool): Whether the document is public.
+
+    Returns:
+        list[str]: The names of the index directories.
+    """
+    intents = [Intent(value.strip()) for value in intent.split(",")]
+    return DocumentEmbedder.index_names(intents, public)
+
+
+async def enqueue_embed_document(
+    document_path: str,
+    metadata: DocumentUpload,
+    document_id: int,
+    previous_vector_ids: dict[str, list[str]] | None = None,
+    previous_path: str | None = None,
+) -> int:
+    """
+    Queues the embedding of a document for the ingestion worker.
 
     Parameters:
         document_path (str): The path to the document.
         metadata (DocumentUpload): The metadata of the document.
         document_id (int): The ID of the document.
+        previous_vector_ids (dict[str, list[str]] | None): The chunk ids of the previous version.
+        previous_path (str | None): The path to the previous version of the document.
 
     Returns:
-        None
+        int: The ID of the ingestion job.
     """
-    document_embedder = DocumentEmbedder()
+    logger.debug(f"Queueing embedding of document: {document_path}")
+    return await job_queue.enqueue_async(
+        IngestionWorker.EMBED_DOCUMENT,
+        {
+            "document_id": document_id,
+            "document_path": document_path,
+            "intent": metadata.intent,
+            "public": metadata.public,
+            "previous_vector_ids": previous_vector_ids,
+            "previous_path": previous_path,
+        },
+        document_index_keys(metadata.intent, metadata.public)
+        + list(previous_vector_ids or {}),
+    )
 
-    logger.debug(f"Embedding document: {document_path}")
 
-    # Split the intents from the metadata by comma
-    metadata.intent = metadata.intent.split(",")
+async def save_document_file(
+    document_file: UploadFile, intent: str
+) -> tuple[str, str, str]:
+    """
+    Streams an uploaded document to disk.
 
-    for intent in metadata.intent:
-        logger.debug(f"[embedding]: {document_path} with intent: {intent}")
-        if metadata.public:
-            document_embedder.save_public_document_to_vectorstore(
-                document_path, Intent(intent.strip())
-            )
-            document_embedder.save_document_to_vectorstore(
-                document_path, Intent(intent.strip())
-            )
-        else:
-            document_embedder.save_document_to_vectorstore(
-                document_path, Intent(intent.strip())
-            )
+    The file is read in chunks of `document_upload.chunk_size` bytes and written with async
+    file I/O, so memory use stays constant and the event loop is never blocked, whatever the
+    size of the file. The SHA-256 of the content is computed on the fly. The content goes to
+    a temporary file that is renamed into place once complete.
+
+    Oversized uploads are normally rejected from their `Content-Length` by
+    `UploadSizeLimitRoute` before the body is read. The size check here is only a backstop
+    for requests without, or with a wrong, `Content-Length`: it fires after Starlette has
+    already spooled the whole body.
+
+    Parameters:
+        document_file (UploadFile): The uploaded file.
+        intent (str): The intent of the document.
+
+    Raises:
+        HTTPException: If the file type is not supported or the file is too large.
 
-    with SessionLocal() as db:
-        db.query(Document).filter(Document.id == document_id).update(
-            {
-                Document.embedded: True,
-            }
+    Returns:
+        tuple[str, str, str]: The path of the stored file, its hashed name and the SHA-256
+            of its content.
+    """
+    file_extension = document_file.filename.split(".")[-1]
+
+    if file_extension not in DocumentEmbedder.supported_document_types.keys():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File type not supported.",
+        )
+
+    upload_config = Configuration.get("document_upload") or {}
+    chunk_size = upload_config.get("chunk_size", 1024 * 1024)
+    max_size = upload_config.get("max_size")
+
+    uuid_string = str("doc324iyi" + str(datetime.now())).encode()
+    uuid_hashed = str(hashlib.sha256(uuid_string).hexdigest())
+
+    save_folder = f"{DOCUMENT_DIRECTORY}/{intent}"
+    save_filename = (
+        f"{save_folder}/{document_file.filename}-{uuid_hashed}.{file_extension}"
+    )
+    temp_filename = f"{save_folder}/.{uuid_hashed}.part"
+
+    await aiofiles.os.makedirs(save_folder, exist_ok=True)
+
+    content_hash = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_filename, "wb") as buffer:
+            while chunk := await document_file.read(chunk_size):
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File is larger than {max_size} bytes.",
+                    )
+                content_hash.update(chunk)
+                await buffer.write(chunk)
+        await aiofiles.os.replace(temp_filename, save_filename)
+    except BaseException:
+        if await aiofiles.os.path.exists(temp_filename):
+            await aiofiles.os.remove(temp_filename)
+        raise
+
+    return save_filename, uuid_hashed, content_hash.hexdigest()
+
+
+async def find_duplicate(
+    content_hash: str, intent: str, public: bool
+) -> Document | None:
+    """
+    Finds a document with the same content, intent and visibility.
+
+    Parameters:
+        content_hash (str): The SHA-256 of the content.
+        intent (str): The intent of the document.
+        public (bool): Whether the document is public.
+
+    Returns:
+        Document | None: The existing document, None if there is none.
+    """
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(
+            select(Document).filter(
+                Document.content_hash == content_hash,
+                Document.intent == intent,
+                Document.public == public,
+            )
         )
-        db.commit()
+
+
+async def already_uploaded(save_filename: str, duplicate: Document) -> ResponseTemplate:
+    """
+    Discards an uploaded file whose content is already stored as a document.
+
+    Parameters:
+        save_filename (str): The path of the uploaded file.
+        duplicate (Document): The document with the same content.
+
+    Returns:
+        ResponseTemplate: The response pointing to the existing document.
+    """
+    await aiofiles.os.remove(save_filename)
+    return ResponseTemplate(
+        message="Document already uploaded",
+        data={"document_id": duplicate.id, "duplicate": True},
+    )
 
 
 @router.post("/upload", status_code=status.HTTP_200_OK)
@@ -89,21 +257,19 @@ async def upload_document(
     name: Annotated[str, Form()],
     intent: Annotated[str, Form()],
     public: Annotated[bool, Form()],
-    background_tasks: BackgroundTasks,
     auth_user=Depends(protected_route(ACL.STAFF)),
 ):
     """
-    Uploads a document to the server.
+    Uploads a document to the server and queues its embedding.
 
     Parameters:
         document_file (UploadFile): The file to be uploaded.
         name (str): The name of the document.
         intent (str): The intent of the document.
         public (bool): Whether the document is public.
-        background_tasks (BackgroundTasks): The background tasks object.
 
     Raises:
-        HTTPException: If the file type is not supported.
+        HTTPException: If the file type is not supported or the file is too large.
 
     Returns:
         None
@@ -111,33 +277,17 @@ async def upload_document(
     document_metadata = DocumentUpload(
         name=name, uploader_id=auth_user.id, intent=intent, public=public
     )
-    file_extension = document_file.filename.split(".")[-1]
-
-    if file_extension not in DocumentEmbedder.supported_document_types.keys():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File type not supported.",
-        )
-
-    uuid_string = str("doc324iyi" + str(datetime.now())).encode()
-    uuid_hashed = str(hashlib.sha256(uuid_string).hexdigest())
-
-    save_folder = f"{DOCUMENT_DIRECTORY}/{document_metadata.intent}"
-    save_filename = (
-        f"{save_folder}/{document_file.filename}-{uuid_hashed}.{file_extension}"
+    save_filename, uuid_hashed, content_hash = await save_document_file(
+        document_file, document_metadata.intent
     )
 
-    if not os.path.exists(save_folder):
-        os.makedirs(save_folder)
-
-    with open(
-        save_filename,
-        "wb",
-    ) as buffer:
-        contents = await document_file.read()
-        buffer.write(contents)
+    duplicate = await find_duplicate(
+        content_hash, document_metadata.intent, document_metadata.public
+    )
+    if duplicate is not None:
+        return await already_uploaded(save_filename, duplicate)
 
-    with SessionLocal() as db:
+    async with AsyncSessionLocal() as db:
         document = Document()
         document.name = document_metadata.name
         document.uploader_id = document_metadata.uploader_id
@@ -145,18 +295,27 @@ async def upload_document(
         document.public = document_metadata.public
         document.file_path = save_filename
         document.uuid = uuid_hashed
+        document.content_hash = content_hash
 
         db.add(document)
-        db.commit()
-        db.refresh(document)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # The same content was uploaded concurrently and committed first.
+            await db.rollback()
+            duplicate = await find_duplicate(
+                content_hash, document_metadata.intent, document_metadata.public
+            )
+            if duplicate is None:
+                await aiofiles.os.remove(save_filename)
+                raise
+            return await already_uploaded(save_filename, duplicate)
 
-    background_tasks.add_task(
-        embed_document, save_filename, document_metadata, document.id
-    )
+    job_id = await enqueue_embed_document(save_filename, document_metadata, document.id)
 
     return ResponseTemplate(
         message="Document uploaded successfully",
-        data={"document_id": document.id},
+        data={"document_id": document.id, "job_id": job_id},
     )
 
 
@@ -167,6 +326,7 @@ class DocumentEach(BaseModel):
     public: bool
     embedded: bool
     document_uuid: str
+    ingestion_timings: dict[str, float] | None = None
     created_at: str
     updated_at: str
 
@@ -185,8 +345,14 @@ async def get_all_documents(auth_user=Depends(protected_route(ACL.STAFF))):
     Returns:
         None
     """
-    with SessionLocal() as db:
-        documents = db.query(Document).order_by(Document.id.desc()).all()
+    async with AsyncSessionLocal() as db:
+        documents = (
+            await db.scalars(
+                select(Document)
+                .options(selectinload(Document.uploader))
+                .order_by(Document.id.desc())
+            )
+        ).all()
 
         documents_response = [
             DocumentEach(
@@ -196,6 +362,7 @@ async def get_all_documents(auth_user=Depends(protected_route(ACL.STAFF))):
                 public=document.public,
                 embedded=document.embedded,
                 document_uuid=document.uuid,
+                ingestion_timings=document.ingestion_timings,
                 created_at=str(document.created_at),
                 updated_at=str(document.updated_at),
             )
@@ -210,10 +377,11 @@ async def get_all_documents(auth_user=Depends(protected_route(ACL.STAFF))):
 
 @router.delete("/{document_uuid}", status_code=status.HTTP_200_OK)
 async def delete_document(
-    document_uuid: str, auth_user=Depends(protected_route(ACL.STAFF))
+    document_uuid: str,
+    auth_user=Depends(protected_route(ACL.STAFF)),
 ):
     """
-    Deletes a document from the database.
+    Deletes a document from the database and queues the removal of its chunks.
 
     Args:
         document_id (int): The ID of the document to be deleted.
@@ -221,12 +389,116 @@ async def delete_document(
     Returns:
         None
     """
-    with SessionLocal() as db:
-        db.query(Document).filter(Document.uuid == document_uuid).delete()
-        db.commit()
+    async with AsyncSessionLocal() as db:
+        document = await db.scalar(
+            select(Document).filter(Document.uuid == document_uuid)
+        )
+        if document is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        # While an ingestion job of the document is pending, that job removes the chunks
+        # it wrote once it notices the document is gone.
+        vector_ids = document.vector_ids if document.embedded else None
+        document_path = document.file_path
+        index_keys = document_index_keys(document.intent, document.public)
+
+        await db.delete(document)
+        await db.commit()
+
+    job_id = await job_queue.enqueue_async(
+        IngestionWorker.REMOVE_DOCUMENT,
+        {"vector_ids": vector_ids, "document_path": document_path},
+        index_keys + list(vector_ids or {}),
+    )
 
     return ResponseTemplate(
-        message="Document deleted successfully", data={"document_id": document_uuid}
+        message="Document deleted successfully",
+        data={"document_id": document_uuid, "job_id": job_id},
+    )
+
+
+@router.put("/{document_uuid}", status_code=status.HTTP_200_OK)
+async def update_document(
+    document_uuid: str,
+    document_file: UploadFile,
+    name: Annotated[str | None, Form()] = None,
+    intent: Annotated[str | None, Form()] = None,
+    public: Annotated[bool | None, Form()] = None,
+    auth_user=Depends(protected_route(ACL.STAFF)),
+):
+    """
+    Replaces a document by a new version of it.
+
+    Only the chunks that changed are embedded again; chunks the new version no longer
+    contains are removed from the indexes.
+
+    Parameters:
+        document_uuid (str): The UUID of the document to be updated.
+        document_file (UploadFile): The new version of the document.
+        name (str | None): The new name of the document.
+        intent (str | None): The new intent of the document.
+        public (bool | None): Whether the document is public.
+
+    Raises:
+        HTTPException: If the document does not exist, is still being embedded, the file
+            type is not supported or another document of the intent has the same content.
+
+    Returns:
+        None
+    """
+    async with AsyncSessionLocal() as db:
+        document = await db.scalar(
+            select(Document).filter(Document.uuid == document_uuid)
+        )
+        if document is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+        if not document.embedded:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Document is still being embedded.",
+            )
+
+        document_metadata = DocumentUpload(
+            name=name if name is not None else document.name,
+            uploader_id=document.uploader_id,
+            intent=intent if intent is not None else document.intent,
+            public=public if public is not None else document.public,
+        )
+        save_filename, _, content_hash = await save_document_file(
+            document_file, document_metadata.intent
+        )
+
+        previous_vector_ids = document.vector_ids
+        previous_path = document.file_path
+
+        document.name = document_metadata.name
+        document.intent = document_metadata.intent
+        document.public = document_metadata.public
+        document.file_path = save_filename
+        document.content_hash = content_hash
+        document.embedded = False
+        try:
+            await db.commit()
+        except IntegrityError:
+            await aiofiles.os.remove(save_filename)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Another document already has the same content.",
+            )
+
+        document_id = document.id
+
+    job_id = await enqueue_embed_document(
+        save_filename,
+        document_metadata,
+        document_id,
+        previous_vector_ids,
+        previous_path,
+    )
+
+    return ResponseTemplate(
+        message="Document updated successfully",
+        data={"document_id": document_uuid, "job_id": job_id},
     )
 
 
@@ -241,8 +513,10 @@ async def get_document(document_uuid: str):
     Returns:
         dict: A message indicating successful document retrieval and the retrieved document details.
     """
-    with SessionLocal() as db:
-        document = db.query(Document).filter(Document.uuid == document_uuid).first()
+    async with AsyncSessionLocal() as db:
+        document = await db.scalar(
+            select(Document).filter(Document.uuid == document_uuid)
+        )
 
     if document:
         document_path = document.file_path
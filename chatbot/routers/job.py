@@ -0,0 +1,110 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from chatbot.database import AsyncSessionLocal
+from chatbot.database.models.Job import Job
+from chatbot.dependencies.utils.auth import protected_route, ACL
+from chatbot.http.Response import Response as ResponseTemplate
+
+router = APIRouter(prefix="/job", tags=["Ingestion Job"])
+
+
+class JobEach(BaseModel):
+    id: int
+    kind: str
+    status: str
+    stage: Optional[str]
+    progress: float
+    attempts: int
+    max_attempts: int
+    error: Optional[str]
+    result: Optional[dict]
+    created_at: str
+    updated_at: str
+
+
+def to_response(job: Job) -> JobEach:
+    """
+    Converts a job to its response model.
+
+    Args:
+        job (Job): The job.
+
+    Returns:
+        JobEach: The response model of the job.
+    """
+    return JobEach(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        stage=job.stage,
+        progress=job.progress,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        error=job.error,
+        result=job.result,
+        created_at=str(job.created_at),
+        updated_at=str(job.updated_at),
+    )
+
+
+@router.get("/", status_code=status.HTTP_200_OK)
+async def get_jobs(
+    job_status: Optional[str] = None,
+    limit: int = 50,
+    auth_user=Depends(protected_route(ACL.STAFF)),
+):
+    """
+    Returns the most recent ingestion jobs.
+
+    Args:
+        job_status (Optional[str]): Only return jobs with this status.
+        limit (int): The maximum number of jobs to return.
+
+    Returns:
+        list[JobEach]: The jobs, newest first.
+    """
+    async with AsyncSessionLocal() as db:
+        query = select(Job)
+        if job_status is not None:
+            query = query.filter(Job.status == job_status)
+        jobs = (
+            await db.scalars(query.order_by(Job.id.desc()).limit(min(limit, 500)))
+        ).all()
+
+        jobs_response = [to_response(job) for job in jobs]
+
+    return ResponseTemplate(
+        message="Jobs retrieved successfully",
+        data=jobs_response,
+    )
+
+
+@router.get("/{job_id}", status_code=status.HTTP_200_OK)
+async def get_job(job_id: int, auth_user=Depends(protected_route(ACL.STAFF))):
+    """
+    Returns the status and progress of an ingestion job.
+
+    Args:
+        job_id (int): The ID of the job.
+
+    Raises:
+        HTTPException: If the job does not exist.
+
+    Returns:
+        JobEach: The job.
+    """
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Job, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        job_response = to_response(job)
+
+    return ResponseTemplate(
+        message="Job retrieved successfully",
+        data=job_response,
+    )
@@ -0,0 +1,21 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from chatbot.dependencies.utils.Tracer import tracer
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Exposes the span histograms, counters and component stats for Prometheus.
+
+    The endpoint is not authenticated, so the scraper does not need a session: it must only
+    be reachable from the internal network, e.g. by not routing `/api/v1/metrics` through
+    the public reverse proxy.
+
+    Returns:
+        PlainTextResponse: The metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(tracer.metrics(), media_type="text/plain; version=0.0.4")
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, status, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException
 from pydantic import BaseModel
+from sqlalchemy import select
 
-from chatbot.database import SessionLocal
+from chatbot.config import Configuration
+from chatbot.database import AsyncSessionLocal
 from chatbot.database.models.Questions import Question
-from chatbot.dependencies.DocumentEmbedder import DocumentEmbedder
 from chatbot.dependencies.EmailHandler import EmailHandler, EmailSchema
+from chatbot.dependencies.IngestionWorker import IngestionWorker
 from chatbot.dependencies.IntentClassifier import Intent
+from chatbot.dependencies.JobQueue import JobQueue
 from chatbot.dependencies.utils.auth import protected_route, ACL
+from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
 from chatbot.http.Response import Response as ResponseTemplate
 from chatbot.logger import logger
 
@@ -14,6 +18,8 @@ router = APIRouter(prefix="/question", tags=["Question Answering"])
 
 email_sender = EmailHandler()
 
+job_queue = JobQueue.from_config(Configuration.get("ingestion_queue"))
+
 
 class CreateQuestionRequest(BaseModel):
     """
@@ -41,7 +47,7 @@ async def create_question(
         dict: A dictionary containing the question ID.
     """
 
-    with SessionLocal() as db:
+    async with AsyncSessionLocal() as db:
         question = Question()
         question.prompt = question_req.prompt
         question.bot_answer = question_req.bot_answer
@@ -51,8 +57,7 @@ async def create_question(
         question.questioner_name = auth_user.name
 
         db.add(question)
-        db.commit()
-        db.refresh(question)
+        await db.commit()
 
     return ResponseTemplate(
         message="Question created successfully",
@@ -82,7 +87,7 @@ async def create_public_question(
     Returns:
         dict: A dictionary containing the question ID.
     """
-    with SessionLocal() as db:
+    async with AsyncSessionLocal() as db:
         question = Question()
         question.prompt = question_req.prompt
         question.bot_answer = question_req.bot_answer
@@ -92,7 +97,7 @@ async def create_public_question(
         question.questioner_name = question_req.questioner_name
 
         db.add(question)
-        db.commit()
+        await db.commit()
 
         question_id = question.id
 
@@ -113,39 +118,11 @@ async def get_all_questions(auth_user=Depends(protected_route(ACL.STAFF))):
     Returns:
         list[Question]: A list of questions.
     """
-    with SessionLocal() as db:
-        questions = db.query(Question).all()
+    async with AsyncSessionLocal() as db:
+        questions = (await db.scalars(select(Question))).all()
         return questions
 
 
-async def embed_save_question(
-    question: str, answer: str, category: Intent, public: bool
-):
-    """
-    Saves a question and answer to the vectorstorage.
-
-    Args:
-        question (str): The question to be saved.
-        answer (str): The answer to be saved.
-        category (str): The type of the question and answer.
-        public (bool): Whether the question and answer are public or not.
-
-    Returns:
-        None
-    """
-    logger.debug(
-        f"Embedding question: {question}, answer: {answer}, category: {category}, public: {public}"
-    )
-    doc = DocumentEmbedder()
-
-    if public:
-        doc.save_public_question_answer_to_vectorstore(question, answer, category)
-    else:
-        doc.save_question_answer_to_vectorstore(question, answer, category)
-
-    logger.debug(f"Finished embedding {question}")
-
-
 class AnswerQuestionRequest(BaseModel):
     """
     AnswerQuestionRequest model.
@@ -160,7 +137,6 @@ class AnswerQuestionRequest(BaseModel):
 async def answer_question(
     question_id: int,
     answer: AnswerQuestionRequest,
-    background_tasks: BackgroundTasks,
     auth_user=Depends(protected_route(ACL.STAFF)),
 ):
     """
@@ -169,7 +145,6 @@ async def answer_question(
     Args:
         question_id(int): Id of the question.
         answer: Answer of the question.
-        background_tasks: Background tasks.
         auth_user: Authenticated user.
 
     Returns:
@@ -187,8 +162,8 @@ async def answer_question(
 
     _email = ""
 
-    with SessionLocal() as db:
-        question = db.query(Question).filter_by(id=question_id).first()
+    async with AsyncSessionLocal() as db:
+        question = await db.get(Question, question_id)
         question.answered_by = auth_user.id
         question.staff_answer = answer.answer
         question.intent = answer.intent
@@ -196,16 +171,17 @@ async def answer_question(
 
         _email = question.questioner_email
 
-        db.commit()
-        db.refresh(question)
-
-    # TODO: Use background task to save question and answer to vectorstore
-    background_tasks.add_task(
-        embed_save_question,
-        question.prompt,
-        question.bot_answer,
-        _intent,
-        answer.public,
+        await db.commit()
+
+    job_id = await job_queue.enqueue_async(
+        IngestionWorker.EMBED_QUESTION,
+        {
+            "question": question.prompt,
+            "answer": question.bot_answer,
+            "intent": _intent.value,
+            "public": answer.public,
+        },
+        [FaissIndexRegistry.index_dir(_intent.value, answer.public).name],
     )
 
     # Send answered question to the email
@@ -219,7 +195,7 @@ async def answer_question(
 
     return ResponseTemplate(
         message="Answered successfully",
-        data={"question_id": question_id, "email": _email},
+        data={"question_id": question_id, "email": _email, "job_id": job_id},
     )
 
 
@@ -238,10 +214,10 @@ async def delete_question(
     Returns:
         None
     """
-    with SessionLocal() as db:
-        question = db.query(Question).filter_by(id=question_id).first()
-        db.delete(question)
-        db.commit()
+    async with AsyncSessionLocal() as db:
+        question = await db.get(Question, question_id)
+        await db.delete(question)
+        await db.commit()
 
     return ResponseTemplate(
         message="Question deleted successfully",
@@ -1,14 +1,15 @@
 import os
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from chatbot.database import SessionLocal
+from chatbot.database import AsyncSessionLocal
 from pydantic import BaseModel
 from chatbot.database.models.Staff import Staff as StaffModel
 import hashlib
 import secrets
 
 from chatbot.http.Response import Response as ResponseTemplate
-from chatbot.dependencies.utils.auth import protected_route, ACL
+from chatbot.dependencies.utils.auth import principal_cache, protected_route, ACL
+from chatbot.dependencies.utils.SessionManagement import SessionDataType
 from chatbot.logger import logger
 
 router = APIRouter(prefix="/staff", tags=["Staff"])
@@ -48,7 +49,7 @@ async def admin_access(request: Request):
 async def create_staff(
     staff: CreateStaffRequest, admin_access=Depends(admin_access)
 ) -> ResponseTemplate:
-    with SessionLocal() as db:
+    async with AsyncSessionLocal() as db:
         new_staff = StaffModel()
 
         # Generate a random salt
@@ -63,8 +64,8 @@ async def create_staff(
         new_staff.salt = salt
 
         db.add(new_staff)
-        db.commit()
-        db.refresh(new_staff)
+        await db.commit()
+        await db.refresh(new_staff)
 
         staff = Staff(
             id=new_staff.id,
@@ -80,16 +81,18 @@ async def create_staff(
 
 @router.delete("/delete", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_staff(staff_id: int, admin_access=Depends(admin_access)) -> None:
-    with SessionLocal() as db:
-        staff = db.query(StaffModel).filter_by(id=staff_id).first()
+    async with AsyncSessionLocal() as db:
+        staff = await db.get(StaffModel, staff_id)
         if not staff:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Staff not found",
             )
 
-        db.delete(staff)
-        db.commit()
+        await db.delete(staff)
+        await db.commit()
+
+    principal_cache.invalidate(SessionDataType.STAFF, staff_id)
 
     logger.debug(f"Deleted staff: {staff}")
 
@@ -1,14 +1,17 @@
 import os
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from chatbot.database import SessionLocal
+from sqlalchemy import select
+
+from chatbot.database import AsyncSessionLocal
 from pydantic import BaseModel
 from chatbot.database.models.Student import Student as UserModel
 import hashlib
 import secrets
 
 from chatbot.http.Response import Response
-from chatbot.dependencies.utils.auth import protected_route, ACL
+from chatbot.dependencies.utils.auth import principal_cache, protected_route, ACL
+from chatbot.dependencies.utils.SessionManagement import SessionDataType
 
 router = APIRouter(prefix="/student", tags=["Student"])
 
@@ -50,7 +53,7 @@ async def create_user(
     Returns:
         UserResponse: A message indicating successful user creation and the created user details.
     """
-    with SessionLocal() as db:
+    async with AsyncSessionLocal() as db:
         new_user = UserModel()
 
         # Generate a random salt
@@ -65,8 +68,8 @@ async def create_user(
         new_user.salt = salt
 
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
 
     return Response(
         data=Student(
@@ -105,8 +108,8 @@ async def update_user(
     Returns:
         dict: A message indicating successful user update and the updated user details.
     """
-    with SessionLocal() as db:
-        user_to_update = db.query(UserModel).filter(UserModel.id == user_id).first()
+    async with AsyncSessionLocal() as db:
+        user_to_update = await db.get(UserModel, user_id)
 
         if user_to_update:
             user_to_update.student_number = (
@@ -117,8 +120,9 @@ async def update_user(
             user_to_update.name = user.name if user.name else user_to_update.name
             user_to_update.email = user.email if user.email else user_to_update.email
 
-            db.commit()
-            db.refresh(user_to_update)
+            await db.commit()
+            await db.refresh(user_to_update)
+            principal_cache.invalidate(SessionDataType.USER, user_id)
 
         return Response(
             data=Student(
@@ -144,12 +148,13 @@ async def delete_user(user_id: int, auth_user=Depends(protected_route())) -> Res
     Returns:
         dict: A message indicating successful user deletion.
     """
-    with SessionLocal() as db:
-        user_to_delete = db.query(UserModel).filter(UserModel.id == user_id).first()
+    async with AsyncSessionLocal() as db:
+        user_to_delete = await db.get(UserModel, user_id)
 
         if user_to_delete:
-            db.delete(user_to_delete)
-            db.commit()
+            await db.delete(user_to_delete)
+            await db.commit()
+            principal_cache.invalidate(SessionDataType.USER, user_id)
 
             return Response(
                 data={},
@@ -170,8 +175,8 @@ async def get_user(user_id: int, auth_user=Depends(protected_route())) -> Respon
     Returns:
         dict: A message indicating successful user retrieval and the retrieved user details.
     """
-    with SessionLocal() as db:
-        user = db.query(UserModel).filter(UserModel.id == user_id).first()
+    async with AsyncSessionLocal() as db:
+        user = await db.get(UserModel, user_id)
 
     if user:
         return Response(
@@ -195,8 +200,10 @@ async def get_all_users(auth_user=Depends(protected_route())) -> Response:
     Returns:
         dict: A message indicating successful user retrieval and the retrieved user details.
     """
-    with SessionLocal() as db:
-        users = db.query(UserModel).order_by(UserModel.id.desc()).all()
+    async with AsyncSessionLocal() as db:
+        users = (
+            await db.scalars(select(UserModel).order_by(UserModel.id.desc()))
+        ).all()
 
         _users = [
             Student(
@@ -227,16 +234,16 @@ async def search_user(
     """
     query = request.query_params.get("query")
 
-    with SessionLocal() as db:
+    async with AsyncSessionLocal() as db:
         users = (
-            db.query(UserModel)
-            .filter(
-                UserModel.name.contains(query)
-                | UserModel.email.contains(query)
-                | UserModel.student_number.contains(query)
+            await db.scalars(
+                select(UserModel).filter(
+                    UserModel.name.contains(query)
+                    | UserModel.email.contains(query)
+                    | UserModel.student_number.contains(query)
+                )
             )
-            .all()
-        )
+        ).all()
 
         _users = [
             Student(
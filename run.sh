@@ -1,4 +1,12 @@
 #!/bin/bash
 
-# Run the chatbot
-python3 chatbot/main.py
+# Run the chatbot server and the ingestion worker side by side. Uploads, deletes and
+# Q&A changes are only queued by the server; the worker embeds them into the indexes.
+chatbot worker &
+chatbot start &
+
+# Stop as soon as either process exits, so the container is restarted as a whole.
+wait -n
+status=$?
+kill $(jobs -p) 2>/dev/null
+exit $status
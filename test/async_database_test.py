@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from chatbot.database import async_database_url
+from chatbot.database.models.Student import Student
+
+
+def test_async_database_url_swaps_the_driver():
+    assert (
+        async_database_url("mysql+mysqlconnector://user:secret@db:3306/chatbot")
+        == "mysql+aiomysql://user:secret@db:3306/chatbot"
+    )
+    assert async_database_url("sqlite:///chatbot.db") == "sqlite+aiosqlite:///chatbot.db"
+    assert async_database_url("mysql+asyncmy://db/chatbot") == "mysql+asyncmy://db/chatbot"
+
+
+@pytest.mark.asyncio
+async def test_get_user_by_student_number_async():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Student.__table__.create)
+
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as db:
+        student = Student()
+        student.student_number = "21051204001"
+        student.name = "Test Student"
+        student.email = "student@mhs.unesa.ac.id"
+        student.password = "hashed"
+        student.salt = "salt"
+        db.add(student)
+        await db.commit()
+
+        found = await Student.get_user_by_student_number_async(db, "21051204001")
+        missing = await Student.get_user_by_student_number_async(db, "0")
+
+    assert found.id == student.id
+    assert missing is None
+
+    await engine.dispose()
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from chatbot.benchmark.ChatLoadTest import ChatLoadTest
+from chatbot.benchmark.SyntheticCorpus import SyntheticCorpus
+from chatbot.dependencies.contracts.message import UserMessage
+from chatbot.dependencies.language_models.FakeEmbeddings import FakeEmbeddings
+from chatbot.dependencies.language_models.FakeTextGenerator import FakeTextGenerator
+from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
+
+
+def streaming_app(first_token_latency: float) -> FastAPI:
+    app = FastAPI()
+    generator = FakeTextGenerator(
+        reply="abcdef", first_token_latency=first_token_latency, chunk_interval=0.0, chunks=3
+    )
+
+    @app.post(ChatLoadTest.PATH)
+    async def prompt():
+        return StreamingResponse(generator.stream_async([UserMessage("hi")]))
+
+    return app
+
+
+async def test_fake_generator_streams_with_cadence():
+    generator = FakeTextGenerator(
+        reply="abcdef", first_token_latency=0.05, chunk_interval=0.01, chunks=3
+    )
+
+    started = time.perf_counter()
+    chunks = [chunk async for chunk in generator.stream_async([UserMessage("hi")])]
+
+    assert chunks == ["ab", "cd", "ef"]
+    assert time.perf_counter() - started >= 0.07
+    assert await FakeTextGenerator(reply="other", latency=0).generate_async([]) == "other"
+
+
+def test_fake_embeddings_are_deterministic_and_normalized():
+    model = FakeEmbeddings(dimensions=64, latency=0).model
+
+    first, same, other = model.embed_documents(["jadwal krs", "jadwal krs", "wisuda"])
+
+    assert first == same
+    assert len(first) == 64
+    assert abs(sum(x * x for x in first) - 1.0) < 1e-5
+    assert first != other
+
+
+def test_synthetic_corpus_is_searchable(tmp_path):
+    embeddings = FakeEmbeddings(dimensions=64, latency=0).model
+    corpus = SyntheticCorpus(chunks_per_intent=50, words_per_chunk=20, seed=1)
+
+    sizes = corpus.build(embeddings, tmp_path, ["faq"], private=False)
+
+    assert sizes == {"faq_public": 50}
+    assert corpus.chunks("faq") == SyntheticCorpus(50, 20, seed=1).chunks("faq")
+    db = FaissIndexRegistry.get_dir(tmp_path / "faq_public", embeddings)
+    chunk = corpus.chunks("faq")[7]
+    assert db.similarity_search(chunk, k=1)[0].page_content == chunk
+
+
+async def test_load_test_measures_time_to_first_token():
+    load_test = ChatLoadTest(
+        ["q1", "q2"], app=streaming_app(0.05), concurrency=4, requests=8, warmup=1
+    )
+
+    report = await load_test.run()
+
+    assert report["requests"] == 8
+    assert report["errors"] == 0
+    assert 0.05 <= report["ttft"]["p50"] < 0.5
+    assert report["throughput_chars_per_second"] > 0
+    assert report["memory"]["peak_rss_mb"] > 0
+
+
+async def test_failed_requests_are_counted():
+    app = FastAPI()
+
+    @app.post(ChatLoadTest.PATH)
+    async def prompt():
+        raise RuntimeError("boom")
+
+    report = await ChatLoadTest(["q"], app=app, requests=3, warmup=0).run()
+
+    assert report["errors"] == 3
+    assert report["ttft"]["p95"] is None
+
+
+def test_regressions_against_baseline():
+    baseline = {"ttft": {"p95": 1.0}, "throughput_rps": 10.0, "memory": {"peak_rss_mb": 100}}
+    report = {
+        "errors": 0,
+        "ttft": {"p95": 1.5},
+        "throughput_rps": 9.5,
+        "memory": {"peak_rss_mb": 110},
+    }
+
+    regressions = ChatLoadTest.compare(report, baseline, tolerance=0.2)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("ttft.p95")
+    assert ChatLoadTest.compare(baseline | {"errors": 0}, baseline) == []
+
+
+def test_percentile_interpolates():
+    assert ChatLoadTest.percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.5
+    assert ChatLoadTest.percentile([], 0.5) is None
@@ -0,0 +1,77 @@
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.documents import Document
+
+from chatbot.dependencies.InformationRetriever import InformationRetriever
+from chatbot.dependencies.vectorstore.ChunkStore import ChunkStore
+from chatbot.dependencies.vectorstore.SegmentLog import SegmentLog
+
+_embeddings = DeterministicFakeEmbedding(size=8)
+
+
+def _store(tmp_path, model_name: str = "text-embedding-3-large") -> ChunkStore:
+    return ChunkStore(str(tmp_path / "chunks.sqlite3"), model_name)
+
+
+def test_chunk_hash_ignores_whitespace_and_depends_on_model(tmp_path):
+    store = _store(tmp_path)
+    other_model = ChunkStore(str(tmp_path / "other.sqlite3"), "text-embedding-3-small")
+
+    assert store.chunk_hash("Jam  buka\nperpustakaan") == store.chunk_hash("Jam buka perpustakaan ")
+    assert store.chunk_hash("jam buka") != other_model.chunk_hash("jam buka")
+
+
+def test_vectors_are_stored_once(tmp_path):
+    store = _store(tmp_path)
+    _hash = store.chunk_hash("jam buka")
+
+    store.put_vectors([(_hash, "jam buka", [0.5, 0.25])])
+    store.put_vectors([(_hash, "jam buka", [1.0, 1.0])])
+
+    assert store.get_vectors([_hash, "missing"]) == {_hash: [0.5, 0.25]}
+
+
+def test_memberships_are_tracked_per_index(tmp_path):
+    store = _store(tmp_path)
+
+    store.add_members("resource_service_info", ["a", "b"])
+    store.add_members("resource_service_info_public", ["a"])
+
+    assert store.members("resource_service_info", ["a", "b", "c"]) == {"a", "b"}
+    assert store.members("resource_service_info_public", ["a", "b"]) == {"a"}
+
+    store.clear_members("resource_service_info")
+    assert store.members("resource_service_info", ["a", "b"]) == set()
+
+
+def test_replay_skips_ids_already_in_index():
+    record = {
+        "op": "add",
+        "id": "chunk-hash",
+        "text": "jam buka",
+        "metadata": {},
+        "vector": SegmentLog.encode_vector(_embeddings.embed_query("jam buka")),
+    }
+
+    db = SegmentLog.apply(None, [record, record], _embeddings)
+    db = SegmentLog.apply(db, [record], _embeddings)
+
+    assert db.index.ntotal == 1
+
+
+def test_retriever_collapses_duplicate_hits():
+    documents = [Document("jam buka"), Document("jam  buka"), Document("wifi"), Document("lab")]
+
+    unique = InformationRetriever._collapse_duplicates(documents, k=2)
+
+    assert [document.page_content for document in unique] == ["jam buka", "wifi"]
+
+
+def test_shared_chunks_are_released_with_their_last_reference(tmp_path):
+    store = _store(tmp_path)
+
+    store.add_members("resource_service_info", ["a", "b"])
+    store.add_members("resource_service_info", ["b", "c"])
+
+    assert store.remove_members("resource_service_info", ["a", "b"]) == ["a"]
+    assert store.members("resource_service_info", ["a", "b", "c"]) == {"b", "c"}
+    assert sorted(store.remove_members("resource_service_info", ["b", "c"])) == ["b", "c"]
@@ -0,0 +1,116 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from chatbot.database.models.Conversation import Conversation
+from chatbot.database.models.Message import Message
+from chatbot.dependencies.ConversationHistory import ConversationHistory
+from chatbot.dependencies.utils.PrincipalCache import StudentPrincipal
+
+OWNER = StudentPrincipal(
+    id=7, name="Student", email="student@mhs.unesa.ac.id", access_level=1, student_number="7"
+)
+STRANGER = StudentPrincipal(
+    id=8, name="Other", email="other@mhs.unesa.ac.id", access_level=1, student_number="8"
+)
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Conversation.__table__.create)
+        await connection.run_sync(Message.__table__.create)
+
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as db:
+        conversation = Conversation()
+        conversation.uuid = "conversation"
+        conversation.name = "Conversation"
+        conversation.user_id = OWNER.id
+        conversation.user_type = OWNER.type.value
+        conversation.start_time = datetime.now()
+        db.add(conversation)
+        await db.flush()
+
+        start = datetime.now()
+        for i in range(5):
+            message = Message()
+            message.conversation_id = conversation.id
+            message.text = json.dumps({"U": f"question {i}", "A": f"answer {i}"})
+            message.created_at = start - timedelta(seconds=5 - i)
+            db.add(message)
+        await db.commit()
+
+    yield factory
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_returns_the_latest_turns(session_factory):
+    history = ConversationHistory(max_turns=2, session_factory=session_factory)
+
+    summary, turns = await history.recent("conversation", OWNER)
+
+    assert summary is None
+    assert [turn["U"] for turn in turns] == ["question 3", "question 4"]
+    assert await history.recent("conversation", STRANGER) is None
+    assert await history.recent("missing", OWNER) is None
+
+
+@pytest.mark.asyncio
+async def test_stored_turns_are_served_from_the_cache(session_factory):
+    history = ConversationHistory(max_turns=3, session_factory=session_factory)
+    await history.recent("conversation", OWNER)
+
+    assert await history.append("conversation", OWNER, "question 5", "answer 5")
+    assert not await history.append("conversation", STRANGER, "question 6", "answer 6")
+
+    misses = history.misses
+    _, turns = await history.recent("conversation", OWNER)
+
+    assert history.misses == misses
+    assert [turn["U"] for turn in turns] == ["question 3", "question 4", "question 5"]
+
+
+@pytest.mark.asyncio
+async def test_token_budget_keeps_the_most_recent_turns(session_factory):
+    history = ConversationHistory(max_turns=5, token_budget=8, session_factory=session_factory)
+
+    _, turns = await history.recent("conversation", OWNER)
+
+    assert [turn["U"] for turn in turns] == ["question 4"]
+
+
+class FakeCompactor:
+    def __init__(self):
+        self.folded = []
+
+    async def summarize(self, summary, turns):
+        self.folded.extend(turn["U"] for turn in turns)
+        return f"{summary or ''}+{len(turns)}"
+
+
+@pytest.mark.asyncio
+async def test_old_turns_are_folded_into_the_summary(session_factory):
+    compactor = FakeCompactor()
+    history = ConversationHistory(
+        max_turns=8, keep_turns=2, session_factory=session_factory, compactor=compactor
+    )
+    await history.recent("conversation", OWNER)
+
+    await history.append("conversation", OWNER, "question 5", "answer 5")
+    await asyncio.gather(*history._tasks)
+
+    summary, turns = await history.recent("conversation", OWNER)
+    assert compactor.folded == ["question 0", "question 1", "question 2", "question 3"]
+    assert summary == "+4"
+    assert [turn["U"] for turn in turns] == ["question 4", "question 5"]
+
+    reloaded = ConversationHistory(session_factory=session_factory)
+    summary, turns = await reloaded.recent("conversation", OWNER)
+    assert summary == "+4"
+    assert [turn["U"] for turn in turns] == ["question 4", "question 5"]
@@ -0,0 +1,123 @@
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# Importing the routers registers the OAuth client and the mailer.
+for _name, _value in (
+    ("GOOGLE_CLIENT_ID", "test"),
+    ("GOOGLE_CLIENT_SECRET", "test"),
+    ("MAIL_USERNAME", "test"),
+    ("MAIL_PASSWORD", "test"),
+    ("MAIL_FROM", "chatbot@example.com"),
+):
+    os.environ.setdefault(_name, _value)
+
+from chatbot.config import Configuration
+from chatbot.database.models.Document import Document
+from chatbot.routers import document
+
+Configuration(path="configuration.yaml")
+
+INTENT = "academic_administration_info"
+
+
+@pytest.fixture
+def upload_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(document, "DOCUMENT_DIRECTORY", str(tmp_path))
+    monkeypatch.setitem(
+        Configuration.get_all(), "document_upload", {"chunk_size": 16, "max_size": 64}
+    )
+    return tmp_path
+
+
+@pytest.fixture
+async def session_factory(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Document.__table__.create)
+
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(document, "AsyncSessionLocal", factory)
+
+    async def enqueue_async(*args, **kwargs):
+        return 1
+
+    monkeypatch.setattr(document.job_queue, "enqueue_async", enqueue_async)
+    yield factory
+    await engine.dispose()
+
+
+def _part_files(directory) -> list:
+    return list(directory.rglob("*.part"))
+
+
+async def _upload(content: bytes):
+    return await document.upload_document(
+        UploadFile(io.BytesIO(content), filename="krs.txt"),
+        name="krs",
+        intent=INTENT,
+        public=False,
+        auth_user=SimpleNamespace(id=1),
+    )
+
+
+def test_oversized_upload_rejected_from_content_length(upload_config):
+    app = FastAPI()
+    app.include_router(document.router)
+    client = TestClient(app)
+    overhead = document.UploadSizeLimitRoute.FORM_OVERHEAD
+
+    response = client.post(
+        "/document/upload",
+        files={"document_file": ("big.txt", b"x" * (overhead + 65))},
+        data={"name": "big", "intent": INTENT, "public": "false"},
+    )
+
+    assert response.status_code == 413
+    assert _part_files(upload_config) == []
+
+
+async def test_oversized_stream_leaves_no_part_file(upload_config):
+    upload = UploadFile(io.BytesIO(b"x" * 100), filename="big.txt")
+
+    with pytest.raises(HTTPException) as error:
+        await document.save_document_file(upload, INTENT)
+
+    assert error.value.status_code == 413
+    assert _part_files(upload_config) == []
+    assert list((upload_config / INTENT).iterdir()) == []
+
+
+async def test_same_content_uploaded_twice_is_a_duplicate(upload_config, session_factory):
+    first = await _upload(b"jadwal krs")
+    second = await _upload(b"jadwal krs")
+
+    assert "duplicate" not in first.data
+    assert second.data == {"document_id": first.data["document_id"], "duplicate": True}
+    assert len(list((upload_config / INTENT).iterdir())) == 1
+
+
+async def test_concurrent_duplicate_hits_the_unique_constraint(
+    upload_config, session_factory, monkeypatch
+):
+    first = await _upload(b"jadwal krs")
+
+    find_duplicate = document.find_duplicate
+    calls = []
+
+    async def racing_find_duplicate(*args):
+        # The first lookup runs before the other upload has committed.
+        calls.append(args)
+        return None if len(calls) == 1 else await find_duplicate(*args)
+
+    monkeypatch.setattr(document, "find_duplicate", racing_find_duplicate)
+    second = await _upload(b"jadwal krs")
+
+    assert len(calls) == 2
+    assert second.data == {"document_id": first.data["document_id"], "duplicate": True}
+    assert len(list((upload_config / INTENT).iterdir())) == 1
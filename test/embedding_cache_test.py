@@ -0,0 +1,86 @@
+import threading
+import time
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from chatbot.dependencies.utils.EmbeddingCache import EmbeddingCache, CachedEmbeddings
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_query(self, text: str) -> list[float]:
+        self.calls += 1
+        return super().embed_query(text)
+
+
+def test_repeated_query_is_embedded_once():
+    embeddings = CountingEmbeddings(size=8)
+    cached = CachedEmbeddings(embeddings, EmbeddingCache("fake"))
+
+    first = cached.embed_query("How do I reset my portal password?")
+    second = cached.embed_query("  How do I reset   my portal password? ")
+
+    assert first == second
+    assert embeddings.calls == 1
+    assert cached.cache.stats()["hits"] == 1
+    assert cached.cache.stats()["misses"] == 1
+
+
+def test_key_depends_on_model_name():
+    assert EmbeddingCache("model-a").key("hello") != EmbeddingCache("model-b").key("hello")
+
+
+def test_lru_eviction():
+    cache = EmbeddingCache("fake", max_size=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")
+    cache.put("c", [3.0])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+    assert cache.evictions == 1
+
+
+def test_ttl_expiry():
+    cache = EmbeddingCache("fake", ttl_seconds=0.01)
+    cache.put("a", [1.0])
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+
+
+def test_persistent_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    EmbeddingCache("fake", persist_path=path).put("a", [0.1, 0.2])
+
+    cache = EmbeddingCache("fake", persist_path=path)
+
+    assert cache.get("a") == [0.1, 0.2]
+    assert cache.persistent_hits == 1
+
+
+async def test_async_lookups_use_the_persistent_tier_off_the_event_loop(tmp_path, monkeypatch):
+    cache = EmbeddingCache("fake", persist_path=str(tmp_path / "embeddings.sqlite"))
+    threads = []
+
+    def recording(method):
+        def wrapper(*args):
+            threads.append(threading.get_ident())
+            return method(*args)
+
+        return wrapper
+
+    monkeypatch.setattr(cache, "_get_persistent", recording(cache._get_persistent))
+    monkeypatch.setattr(cache, "_put_persistent", recording(cache._put_persistent))
+    cached = CachedEmbeddings(DeterministicFakeEmbedding(size=8), cache)
+
+    first = await cached.aembed_query("jadwal krs")
+    cache._entries.clear()
+    second = await cached.aembed_query("jadwal krs")
+
+    assert first == second
+    assert cache.persistent_hits == 1
+    assert len(threads) == 3
+    assert threading.get_ident() not in threads
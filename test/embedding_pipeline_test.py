@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from chatbot.dependencies.EmbeddingPipeline import EmbeddingPipeline
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeEmbeddings:
+    def __init__(self, rate_limited_calls: int = 0):
+        self.calls = []
+        self._rate_limited_calls = rate_limited_calls
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls.append(list(texts))
+            if self._rate_limited_calls > 0:
+                self._rate_limited_calls -= 1
+                raise RateLimitError("rate limited")
+        return [[float(len(text)), float(text.count("a"))] for text in texts]
+
+
+def test_batches_respect_count_and_token_limits():
+    pipeline = EmbeddingPipeline(FakeEmbeddings(), batch_size=3, max_batch_tokens=10)
+    texts = ["a" * 8] * 7 + ["a" * 40]
+
+    batches = pipeline._batches(texts)
+
+    assert [start for start, _ in batches] == [0, 3, 6, 7]
+    assert [len(batch) for _, batch in batches] == [3, 3, 1, 1]
+
+
+def test_embed_preserves_order():
+    embeddings = FakeEmbeddings()
+    pipeline = EmbeddingPipeline(embeddings, batch_size=2, max_concurrency=3)
+    texts = ["a" * i for i in range(1, 10)]
+
+    vectors = pipeline.embed(texts)
+
+    assert vectors == [[float(i), float(i)] for i in range(1, 10)]
+    assert len(embeddings.calls) == 5
+
+
+def test_rate_limited_batch_is_retried():
+    embeddings = FakeEmbeddings(rate_limited_calls=2)
+    pipeline = EmbeddingPipeline(embeddings, initial_backoff=0.01, max_backoff=0.02)
+
+    assert pipeline.embed(["ab", "abc"]) == [[2.0, 1.0], [3.0, 1.0]]
+    assert len(embeddings.calls) == 3
+
+
+def test_rate_limit_gives_up_after_max_retries():
+    embeddings = FakeEmbeddings(rate_limited_calls=10)
+    pipeline = EmbeddingPipeline(embeddings, max_retries=1, initial_backoff=0.01)
+
+    with pytest.raises(RateLimitError):
+        pipeline.embed(["abc"])
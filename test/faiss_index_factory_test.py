@@ -0,0 +1,162 @@
+import faiss
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from chatbot.benchmark.IndexTuningReport import IndexTuningReport
+from chatbot.benchmark.SyntheticCorpus import SyntheticCorpus
+from chatbot.config import Configuration
+from chatbot.dependencies.InformationRetriever import InformationRetriever
+from chatbot.dependencies.language_models.FakeEmbeddings import HashedEmbeddings
+from chatbot.dependencies.vectorstore.FaissIndexFactory import FaissIndexFactory
+from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
+from chatbot.dependencies.vectorstore.FaissIndexWriter import FaissIndexWriter
+
+Configuration(path="configuration.yaml")
+
+_embeddings = HashedEmbeddings(dimensions=32)
+_chunks = SyntheticCorpus(chunks_per_intent=400, words_per_chunk=12, seed=3).chunks("faq")
+
+
+@pytest.fixture
+def faiss_dir(tmp_path, monkeypatch):
+    intents = Configuration.get_all()["document_embedder"]["index"]["intents"]
+    monkeypatch.setitem(intents, "faq", {"type": "IVF{nlist},Flat", "nprobe": 4})
+    FaissIndexRegistry.invalidate()
+    yield tmp_path / "faq_public"
+    FaissIndexRegistry.invalidate()
+
+
+def _save(faiss_dir) -> FAISS:
+    ids = [f"id-{i}" for i in range(len(_chunks))]
+    db = FAISS.from_texts(_chunks, _embeddings, ids=ids)
+    FaissIndexRegistry.save(db, faiss_dir)
+    return db
+
+
+def test_factory_settings_per_intent(faiss_dir):
+    factory = FaissIndexFactory.for_dir(faiss_dir)
+
+    assert factory.index_type == "IVF{nlist},Flat"
+    assert factory.nprobe == 4
+    assert factory.train_size == 50000
+    assert FaissIndexFactory.for_dir(faiss_dir.parent / "other").is_flat
+
+
+def test_build_trains_and_tunes():
+    vectors = np.array(_embeddings.embed_documents(_chunks), dtype=np.float32)
+
+    index = FaissIndexFactory("IVF{nlist},Flat", nprobe=3).build(vectors)
+
+    assert index.ntotal == len(_chunks)
+    assert faiss.extract_index_ivf(index).nlist == FaissIndexFactory.nlist(len(_chunks))
+    assert faiss.extract_index_ivf(index).nprobe == 3
+    assert not FaissIndexFactory.supports_removal(index)
+
+
+def test_untrainable_index_falls_back_to_flat():
+    vectors = np.array(_embeddings.embed_documents(_chunks[:10]), dtype=np.float32)
+
+    index = FaissIndexFactory("IVF1024,PQ8").build(vectors)
+
+    assert isinstance(index, faiss.IndexFlatL2)
+    assert index.ntotal == 10
+
+
+def test_save_writes_configured_index_with_full_precision_vectors(faiss_dir):
+    flat = _save(faiss_dir)
+    FaissIndexRegistry.invalidate()
+
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    assert faiss.extract_index_ivf(db.index).nprobe == 4
+    assert np.array_equal(
+        FaissIndexFactory.read_vectors(faiss_dir), flat.index.reconstruct_n(0, len(_chunks))
+    )
+    assert db.similarity_search(_chunks[5], k=1)[0].page_content == _chunks[5]
+
+
+def test_deletes_on_ann_index_load_a_flat_copy(faiss_dir):
+    _save(faiss_dir)
+    writer = FaissIndexWriter(faiss_dir, _embeddings, compact_after_segments=None)
+    writer.delete(["id-5"])
+    text = "jadwal wisuda baru"
+    writer.append([Document(text)], _embeddings.embed_documents([text]))
+
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    assert isinstance(db.index, faiss.IndexFlatL2)
+    assert db.index.ntotal == len(_chunks)
+    assert "id-5" not in db.index_to_docstore_id.values()
+    assert db.similarity_search(text, k=1)[0].page_content == text
+
+    writer.compact()
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+    assert not FaissIndexFactory.supports_removal(db.index)
+    assert len(FaissIndexFactory.read_vectors(faiss_dir)) == len(_chunks)
+
+
+def test_flat_save_removes_stale_vectors(faiss_dir, monkeypatch):
+    _save(faiss_dir)
+    intents = Configuration.get_all()["document_embedder"]["index"]["intents"]
+    monkeypatch.setitem(intents, "faq", {})
+
+    _save(faiss_dir)
+
+    assert FaissIndexFactory.read_vectors(faiss_dir) is None
+
+
+def test_tuning_report_against_flat_baseline():
+    vectors = np.array(_embeddings.embed_documents(_chunks), dtype=np.float32)
+    queries = np.array(_embeddings.embed_documents(_chunks[:20]), dtype=np.float32)
+
+    rows = IndexTuningReport(
+        vectors,
+        queries,
+        k=2,
+        index_types=["Flat", "IVF{nlist},Flat", "HNSW16"],
+        nprobe=[1, 1000],
+        ef_search=[8, 64],
+    ).run()
+
+    assert [(row["type"], row["params"]) for row in rows] == [
+        ("Flat", {}),
+        ("IVF{nlist},Flat", {"nprobe": 1}),
+        ("HNSW16", {"efSearch": 8}),
+        ("HNSW16", {"efSearch": 64}),
+    ]
+    assert rows[0]["recall@2"] == 1.0
+    assert all(0 < row["recall@2"] <= 1 and row["memory_mb"] > 0 for row in rows)
+
+
+def test_rerank_restores_recall_of_quantized_index():
+    vectors = np.array(_embeddings.embed_documents(_chunks), dtype=np.float32)
+    queries = np.array(_embeddings.embed_documents(_chunks[:20]), dtype=np.float32)
+
+    rows = IndexTuningReport(
+        vectors, queries, k=2, index_types=["PQ4x4"], dimensions=[None, 16], rerank_factor=8
+    ).run()
+
+    assert [row["dimensions"] for row in rows] == [32, 16]
+    assert rows[0]["reranked_recall@2"] > rows[0]["recall@2"]
+    assert rows[1]["memory_mb"] < rows[0]["memory_mb"]
+
+
+def test_retriever_reranks_against_stored_vectors(faiss_dir, monkeypatch):
+    intents = Configuration.get_all()["document_embedder"]["index"]["intents"]
+    monkeypatch.setitem(intents, "faq", {"type": "PQ4x4"})
+    _save(faiss_dir)
+    FaissIndexRegistry.invalidate()
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+    query = _embeddings.embed_query(_chunks[9])
+
+    assert len(FaissIndexRegistry.full_precision(db)) == len(_chunks)
+    hits = FaissIndexFactory.search_reranked(
+        db, FaissIndexRegistry.full_precision(db), query, 1, 50
+    )
+    assert hits[0][0].page_content == _chunks[9]
+    assert hits[0][1] < 1e-6
+    assert InformationRetriever._similarity_search_by_vector(
+        query, db, k=1, fetch_k=1, rerank_factor=50
+    ) == _chunks[9]
@@ -0,0 +1,60 @@
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+from chatbot.config import Configuration
+from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
+
+Configuration(path="configuration.yaml")
+
+_embeddings = DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def faiss_dir(tmp_path):
+    FaissIndexRegistry.invalidate()
+    yield tmp_path / "academic_administration_info"
+    FaissIndexRegistry.invalidate()
+
+
+def test_missing_index_raises_file_not_found(faiss_dir):
+    with pytest.raises(FileNotFoundError):
+        FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+
+def test_get_keeps_index_resident(faiss_dir):
+    db = FAISS.from_texts(["first chunk"], _embeddings)
+    FaissIndexRegistry.save(db, faiss_dir)
+    FaissIndexRegistry.invalidate(faiss_dir)
+
+    loaded = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    assert loaded is FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+    assert loaded.index.ntotal == 1
+
+
+def test_save_hot_swaps_resident_index(faiss_dir):
+    FaissIndexRegistry.save(FAISS.from_texts(["first chunk"], _embeddings), faiss_dir)
+    old = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    new = FAISS.from_texts(["first chunk", "second chunk"], _embeddings)
+    FaissIndexRegistry.save(new, faiss_dir)
+
+    assert FaissIndexRegistry.get_dir(faiss_dir, _embeddings) is new
+    assert old.index.ntotal == 1
+
+
+def test_reloads_when_version_changes_on_disk(faiss_dir):
+    FaissIndexRegistry.save(FAISS.from_texts(["first chunk"], _embeddings), faiss_dir)
+    resident = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    # Simulate a write from another process: files and stamp change on disk only.
+    FAISS.from_texts(["first chunk", "second chunk"], _embeddings).save_local(str(faiss_dir))
+    FaissIndexRegistry._write_version(faiss_dir, "external-write")
+    resident_entry = FaissIndexRegistry._indexes[FaissIndexRegistry._key(faiss_dir)]
+    resident_entry.checked_at = 0
+
+    reloaded = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    assert reloaded is not resident
+    assert reloaded.index.ntotal == 2
@@ -0,0 +1,138 @@
+import threading
+
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.documents import Document
+
+from chatbot.config import Configuration
+from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
+from chatbot.dependencies.vectorstore.FaissIndexWriter import FaissIndexWriter
+from chatbot.dependencies.vectorstore.SegmentLog import SegmentLog
+
+Configuration(path="configuration.yaml")
+
+_embeddings = DeterministicFakeEmbedding(size=16)
+
+
+def _append(writer: FaissIndexWriter, *texts: str) -> list[str]:
+    documents = [Document(text) for text in texts]
+    vectors = _embeddings.embed_documents(list(texts))
+    return writer.append(documents, vectors)
+
+
+@pytest.fixture
+def faiss_dir(tmp_path):
+    FaissIndexRegistry.invalidate()
+    yield tmp_path / "resource_service_info"
+    FaissIndexRegistry.invalidate()
+
+
+def test_append_writes_segments_readable_by_registry(faiss_dir):
+    writer = FaissIndexWriter(faiss_dir, _embeddings, compact_after_segments=None)
+    _append(writer, "library opening hours")
+    _append(writer, "printer on the second floor", "wifi password")
+
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    assert db.index.ntotal == 3
+    assert not (faiss_dir / "index.faiss").exists()
+    assert len(SegmentLog(faiss_dir).segments()) == 2
+
+
+def test_compaction_folds_segments_into_main_index(faiss_dir):
+    writer = FaissIndexWriter(faiss_dir, _embeddings, compact_after_segments=3)
+    ids = _append(writer, "a") + _append(writer, "b") + _append(writer, "c")
+    FaissIndexRegistry.invalidate()
+
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    assert (faiss_dir / "index.faiss").exists()
+    assert SegmentLog(faiss_dir).segments() == []
+    assert db.index.ntotal == 3
+    assert sorted(db.index_to_docstore_id.values()) == sorted(ids)
+
+
+def test_concurrent_appends_do_not_lose_updates(faiss_dir):
+    writer = FaissIndexWriter(faiss_dir, _embeddings, compact_after_segments=4)
+    threads = [
+        threading.Thread(target=_append, args=(writer, f"chunk {i}")) for i in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    FaissIndexRegistry.invalidate()
+
+    assert FaissIndexRegistry.get_dir(faiss_dir, _embeddings).index.ntotal == 10
+
+
+def test_tombstones_hide_documents_until_compaction_drops_them(faiss_dir):
+    writer = FaissIndexWriter(faiss_dir, _embeddings, compact_after_segments=None)
+    ids = _append(writer, "library opening hours", "wifi password")
+    writer.compact()
+
+    writer.delete([ids[0]])
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+    assert list(db.index_to_docstore_id.values()) == [ids[1]]
+
+    writer.compact()
+    FaissIndexRegistry.invalidate()
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+    assert db.index.ntotal == 1
+    assert SegmentLog(faiss_dir).segments() == []
+
+
+def test_deleted_id_can_be_added_again(faiss_dir):
+    writer = FaissIndexWriter(faiss_dir, _embeddings, compact_after_segments=None)
+    documents = [Document("library opening hours")]
+    vectors = _embeddings.embed_documents(["library opening hours"])
+
+    writer.append(documents, vectors, ids=["chunk"])
+    writer.delete(["chunk"])
+    writer.append(documents, vectors, ids=["chunk"])
+
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+    assert list(db.index_to_docstore_id.values()) == ["chunk"]
+
+
+def test_readers_apply_only_new_segments(faiss_dir, monkeypatch):
+    writer = FaissIndexWriter(faiss_dir, _embeddings, compact_after_segments=None)
+    _append(writer, "library opening hours")
+    before = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    def load(*args):
+        raise AssertionError("The index was loaded again.")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(FaissIndexRegistry, "_load", load)
+        _append(writer, "printer on the second floor")
+        writer.delete(_append(writer, "wifi password"))
+        after = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    # Searches still running on the previous copy are not affected.
+    assert before.index.ntotal == 1
+    assert after.index.ntotal == 2
+    assert after.similarity_search("printer on the second floor", k=1)[0].page_content == (
+        "printer on the second floor"
+    )
+
+    writer.compact()
+    FaissIndexRegistry.invalidate()
+    assert FaissIndexRegistry.get_dir(faiss_dir, _embeddings).index.ntotal == 2
+
+
+def test_readers_replay_in_place_when_no_search_holds_the_index(faiss_dir, monkeypatch):
+    writer = FaissIndexWriter(faiss_dir, _embeddings, compact_after_segments=None)
+    _append(writer, "library opening hours")
+    resident = id(FaissIndexRegistry.get_dir(faiss_dir, _embeddings))
+
+    def fork(*args):
+        raise AssertionError("The index was copied.")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(FaissIndexRegistry, "_fork", fork)
+        _append(writer, "printer on the second floor")
+        after = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    assert id(after) == resident
+    assert after.index.ntotal == 2
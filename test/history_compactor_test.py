@@ -0,0 +1,31 @@
+from chatbot.dependencies.HistoryCompactor import HistoryCompactor
+
+HISTORY = [{"U": f"question {i}", "A": f"answer {i}"} for i in range(5)]
+
+
+def test_fit_keeps_the_most_recent_turns():
+    assert HistoryCompactor.fit(HISTORY, None) == HISTORY
+    assert HistoryCompactor.fit(HISTORY, 12) == HISTORY[-2:]
+    assert HistoryCompactor.fit(HISTORY, 5) == []
+
+
+def test_each_consumer_gets_its_own_budget(monkeypatch):
+    budgets = {HistoryCompactor.CLASSIFIER: 6, HistoryCompactor.GENERATOR: 40}
+    monkeypatch.setattr(HistoryCompactor, "budget", staticmethod(budgets.get))
+
+    summary, history = HistoryCompactor.compact(
+        HISTORY, "short summary", HistoryCompactor.CLASSIFIER
+    )
+    assert summary is None
+    assert history == HISTORY[-1:]
+
+    summary, history = HistoryCompactor.compact(
+        HISTORY, "short summary", HistoryCompactor.GENERATOR
+    )
+    assert summary == "short summary"
+    assert history == HISTORY
+
+    summary, history = HistoryCompactor.compact(
+        HISTORY, "short summary", HistoryCompactor.RETRIEVER
+    )
+    assert (summary, history) == ("short summary", HISTORY)
@@ -0,0 +1,61 @@
+import pathlib
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.documents import Document
+
+from chatbot.dependencies.IngestionJob import IngestionJob
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.calls = {"load": 0, "split": 0, "embed": 0}
+        self.writes = []
+        self.deleted = None
+        self._embeddings = DeterministicFakeEmbedding(size=8)
+
+    def _load_document(self, doc_path):
+        self.calls["load"] += 1
+        return [Document("jam buka perpustakaan"), Document("password wifi")]
+
+    def _split_raw_document(self, raw_doc):
+        self.calls["split"] += 1
+        return raw_doc
+
+    def _embed_documents(self, documents):
+        self.calls["embed"] += 1
+        texts = [doc.page_content for doc in documents]
+        return documents, self._embeddings.embed_documents(texts), texts
+
+    def _write_to_faiss_index(self, documents, vectors, ids, faiss_dir):
+        self.writes.append(faiss_dir.name)
+
+    def delete_from_vectorstores(self, vector_ids):
+        self.deleted = vector_ids
+
+
+def test_job_parses_and_embeds_once_for_every_index():
+    embedder = FakeEmbedder()
+    faiss_dirs = [
+        pathlib.Path("faiss", name)
+        for name in ["resource_service_info_public", "resource_service_info", "support_info"]
+    ]
+
+    job = IngestionJob(embedder, "handbook.pdf", faiss_dirs).run()
+
+    assert embedder.calls == {"load": 1, "split": 1, "embed": 1}
+    assert embedder.writes == [faiss_dir.name for faiss_dir in faiss_dirs]
+    assert set(job.vector_ids) == set(embedder.writes)
+    assert job.chunks == 2
+    assert set(job.timings) == {"parse", "split", "embed", "write", "total"}
+
+
+def test_job_removes_previous_version_after_writing():
+    embedder = FakeEmbedder()
+    previous = {"support_info": ["old chunk"]}
+
+    job = IngestionJob(
+        embedder, "handbook.pdf", [pathlib.Path("faiss", "support_info")], previous
+    ).run()
+
+    assert embedder.deleted == previous
+    assert "cleanup" in job.timings
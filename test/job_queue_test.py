@@ -0,0 +1,118 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from chatbot.database.models.Job import Job
+from chatbot.database.models.Staff import Staff  # noqa: F401, maps Document.uploader
+from chatbot.dependencies.IngestionWorker import IngestionWorker
+from chatbot.dependencies.JobQueue import JobQueue, JobStatus, LeaseLostError
+
+
+@pytest.fixture
+def queue():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Job.__table__.create(engine)
+    yield JobQueue(sessionmaker(bind=engine), max_attempts=2, retry_backoff=60)
+
+
+def test_jobs_sharing_an_index_run_in_order(queue):
+    first = queue.enqueue("embed_document", {}, ["support_info"])
+    second = queue.enqueue("embed_document", {}, ["support_info", "support_info_public"])
+    other = queue.enqueue("embed_document", {}, ["resource_service_info"])
+
+    assert queue.claim("worker-1").id == first
+    assert queue.claim("worker-2").id == other
+    assert queue.claim("worker-3") is None
+
+    queue.complete(first, "worker-1", {"chunks": 3})
+    assert queue.claim("worker-1").id == second
+
+
+def test_failed_job_is_retried_then_fails(queue):
+    job_id = queue.enqueue("embed_question", {}, ["support_info"])
+
+    queue.claim("worker-1")
+    queue.fail(job_id, "worker-1", "rate limited")
+    job = queue.get(job_id)
+    assert job.status == JobStatus.QUEUED.value
+    assert job.run_after > datetime.now() + timedelta(seconds=30)
+    assert queue.claim("worker-1") is None
+
+    with queue._session_factory() as db:
+        db.query(Job).update({Job.run_after: datetime.now()})
+        db.commit()
+
+    queue.claim("worker-1")
+    queue.fail(job_id, "worker-1", "rate limited")
+    assert queue.get(job_id).status == JobStatus.FAILED.value
+
+
+def test_jobs_of_dead_workers_are_requeued(queue):
+    job_id = queue.enqueue("embed_document", {}, ["support_info"])
+    queue.claim("worker-1")
+
+    with queue._session_factory() as db:
+        db.query(Job).update({Job.locked_at: datetime.now() - timedelta(hours=1)})
+        db.commit()
+
+    assert queue.requeue_stale() == 1
+    assert queue.claim("worker-2").id == job_id
+
+
+def test_worker_that_lost_its_lease_records_nothing(queue):
+    job_id = queue.enqueue("embed_document", {}, ["support_info"])
+    queue.claim("worker-1")
+
+    with queue._session_factory() as db:
+        db.query(Job).update({Job.locked_at: datetime.now() - timedelta(hours=1)})
+        db.commit()
+    queue.requeue_stale()
+    queue.claim("worker-2")
+
+    assert not queue.heartbeat(job_id, "worker-1")
+    with pytest.raises(LeaseLostError):
+        queue.set_progress(job_id, "worker-1", "embed", 0.2)
+    assert not queue.complete(job_id, "worker-1", {"chunks": 3})
+    assert not queue.fail(job_id, "worker-1", "stale")
+
+    job = queue.get(job_id)
+    assert job.status == JobStatus.RUNNING.value
+    assert job.locked_by == "worker-2"
+    assert job.result is None and job.error is None
+
+    assert queue.heartbeat(job_id, "worker-2")
+    assert queue.complete(job_id, "worker-2", {"chunks": 3})
+    assert queue.get(job_id).status == JobStatus.SUCCEEDED.value
+
+
+def test_heartbeat_keeps_a_long_job_leased(queue):
+    queue = JobQueue(queue._session_factory, lease_seconds=0.3)
+    job_id = queue.enqueue("embed_document", {}, ["support_info"])
+    worker = IngestionWorker(queue)
+    worker._worker_id = "worker-1"
+
+    def slow_job(job):
+        time.sleep(0.6)
+        queue.set_progress(job.id, "worker-1", "write", 0.8)
+        return {"chunks": 1}
+
+    def reap(done: threading.Event):
+        while not done.wait(0.05):
+            queue.requeue_stale()
+
+    worker._handlers["embed_document"] = slow_job
+    done = threading.Event()
+    reaper = threading.Thread(target=reap, args=(done,))
+    reaper.start()
+
+    assert worker.run_once()
+    done.set()
+    reaper.join()
+    assert queue.get(job_id).status == JobStatus.SUCCEEDED.value
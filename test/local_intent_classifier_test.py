@@ -0,0 +1,100 @@
+from chatbot.config import Configuration
+from chatbot.dependencies.IntentClassifier import Intent, IntentClassifier
+from chatbot.dependencies.LocalIntentClassifier import LocalIntentClassifier
+from chatbot.dependencies.language_models.FakeTextGenerator import FakeTextGenerator
+
+Configuration(path="configuration.yaml")
+
+EXAMPLES = [
+    ("Bagaimana cara mengajukan beasiswa?", Intent.ACADEMIC_ADMINISTRATION),
+    ("Kapan jadwal ujian semester ini?", Intent.ACADEMIC_ADMINISTRATION),
+    ("Saya lupa password portal akademik", Intent.ACADEMIC_ADMINISTRATION),
+    ("Di mana lokasi perpustakaan?", Intent.RESOURCE_SERVICE),
+    ("Printer di laboratorium tidak berfungsi", Intent.RESOURCE_SERVICE),
+    ("Jam buka pusat karir", Intent.RESOURCE_SERVICE),
+    ("Ada kebakaran di asrama", Intent.SUPPORT),
+    ("Saya ingin melaporkan AC yang rusak", Intent.SUPPORT),
+]
+
+
+def test_confident_messages_are_classified_locally():
+    classifier = LocalIntentClassifier(min_score=0.2, min_margin=0.05).fit(EXAMPLES)
+
+    assert classifier.predict("cara mengajukan beasiswa") == Intent.ACADEMIC_ADMINISTRATION
+    assert classifier.predict("lokasi perpustakaan kampus") == Intent.RESOURCE_SERVICE
+    assert classifier.predict("kebakaran di gedung asrama") == Intent.SUPPORT
+
+
+def test_unknown_or_ambiguous_messages_fall_back():
+    classifier = LocalIntentClassifier(min_score=0.2, min_margin=0.05).fit(EXAMPLES)
+
+    assert classifier.predict("halo") is None
+    assert classifier.predict("") is None
+    assert classifier.predict("beasiswa perpustakaan") is None
+
+
+def test_off_topic_messages_are_not_routed_to_knowledge_intents():
+    examples = LocalIntentClassifier.description_examples()
+    classifier = LocalIntentClassifier(min_score=0.25, min_margin=0.1).fit(examples)
+    knowledge_intents = {
+        Intent.ACADEMIC_ADMINISTRATION,
+        Intent.RESOURCE_SERVICE,
+        Intent.SUPPORT,
+    }
+
+    for message in [
+        "bagaimana cara saya memasak nasi goreng?",
+        "apakah ada toko roti yang buka di dekat kampus?",
+        "siapa penyanyi favoritmu?",
+        "berapa harga sepatu lari di mall?",
+        "apa kabar kamu hari ini?",
+    ]:
+        assert classifier.predict(message) not in knowledge_intents, message
+
+
+def test_description_examples_train_other_on_off_topic_sentences():
+    examples = LocalIntentClassifier.description_examples()
+    other = [text for text, intent in examples if intent == Intent.OTHER]
+
+    assert other == LocalIntentClassifier.OTHER_EXAMPLES
+    assert Intent.SUPPORT in {intent for _, intent in examples}
+
+
+def test_calibrated_thresholds_reach_the_precision():
+    examples = EXAMPLES + [
+        ("Cara daftar ulang mahasiswa baru", Intent.ACADEMIC_ADMINISTRATION),
+        ("Syarat pengajuan cuti akademik", Intent.ACADEMIC_ADMINISTRATION),
+        ("Wifi kampus tidak bisa tersambung", Intent.RESOURCE_SERVICE),
+        ("Peminjaman buku di perpustakaan", Intent.RESOURCE_SERVICE),
+        ("Ada orang pingsan di kelas", Intent.SUPPORT),
+        ("Lampu di toilet gedung rusak", Intent.SUPPORT),
+    ] + [(text, Intent.OTHER) for text in LocalIntentClassifier.OTHER_EXAMPLES]
+    classifier = LocalIntentClassifier(min_score=0.0, min_margin=0.0).fit(examples)
+
+    calibration = classifier.calibrate(examples, min_precision=0.9)
+
+    assert calibration is not None
+    assert calibration["precision"] >= 0.9
+    assert classifier._min_score == calibration["min_score"] > 0
+    assert classifier.calibrate(examples, min_precision=1.01) is None
+
+
+async def test_follow_ups_with_history_skip_the_local_tier(monkeypatch):
+    monkeypatch.setitem(
+        Configuration.get_all(),
+        "intent_classifier",
+        {"model": "fake_classifier", "local": {"enabled": False}},
+    )
+    classifier = IntentClassifier()
+    classifier._local = LocalIntentClassifier(min_score=0.2, min_margin=0.05)
+    classifier._local.fit(EXAMPLES)
+    classifier._model = FakeTextGenerator(reply=Intent.SUPPORT.value, latency=0)
+    follow_up = "kalau untuk beasiswa?"
+    history = [{"U": "Ada kebakaran di asrama", "A": "Segera hubungi petugas keamanan."}]
+    summary = "Mahasiswa melaporkan kebakaran di asrama."
+
+    assert await classifier.classify(follow_up) == Intent.ACADEMIC_ADMINISTRATION
+    assert await classifier.classify_with_history(follow_up, history) == Intent.SUPPORT
+    assert await classifier.classify_with_history(follow_up, [], summary) == Intent.SUPPORT
+    assert classifier.stats()["local"] == 1
+    assert classifier.stats()["llm"] == 2
@@ -0,0 +1,93 @@
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from chatbot.config import Configuration
+from chatbot.dependencies.vectorstore.FaissIndexRegistry import FaissIndexRegistry
+from chatbot.dependencies.vectorstore.FaissIndexWriter import FaissIndexWriter
+from chatbot.dependencies.vectorstore.MappedDocstore import MappedDocstore
+
+Configuration(path="configuration.yaml")
+
+_embeddings = DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def faiss_dir(tmp_path):
+    FaissIndexRegistry.invalidate()
+    yield tmp_path / "academic_info"
+    FaissIndexRegistry.invalidate()
+
+
+def _db() -> FAISS:
+    return FAISS.from_texts(
+        ["jadwal krs", "beasiswa ukt ✓", "wisuda"],
+        _embeddings,
+        metadatas=[
+            {"source": "a.pdf", "page": 1},
+            {"source": "b.pdf"},
+            {"source": "c.pdf"},
+        ],
+        ids=["a", "b", "c"],
+    )
+
+
+def test_round_trip_without_pickle(faiss_dir):
+    FaissIndexRegistry.save(_db(), faiss_dir)
+    FaissIndexRegistry.invalidate()
+
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    assert not (faiss_dir / "index.pkl").exists()
+    assert isinstance(db.docstore, MappedDocstore)
+    assert db.index_to_docstore_id == {0: "a", 1: "b", 2: "c"}
+    assert db.docstore.search("b").page_content == "beasiswa ukt ✓"
+    assert db.docstore.search("a").metadata == {"source": "a.pdf", "page": 1}
+    assert db.docstore.search("b").metadata == {"source": "b.pdf"}
+    assert db.similarity_search("wisuda", k=1)[0].page_content == "wisuda"
+
+
+def test_replayed_segments_add_and_delete_on_top(faiss_dir):
+    FaissIndexRegistry.save(_db(), faiss_dir)
+    writer = FaissIndexWriter(faiss_dir, _embeddings, compact_after_segments=None)
+    [added] = writer.append(
+        [Document("cuti akademik")], _embeddings.embed_documents(["cuti akademik"])
+    )
+    writer.delete(["b"])
+
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    assert list(db.index_to_docstore_id.values()) == ["a", "c", added]
+    assert db.docstore.search("b") == "ID b not found."
+    assert db.similarity_search("cuti akademik", k=1)[0].page_content == "cuti akademik"
+
+    writer.compact()
+    FaissIndexRegistry.invalidate()
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+    ids = db.index_to_docstore_id.values()
+    texts = [db.docstore.search(_id).page_content for _id in ids]
+    assert texts == ["jadwal krs", "wisuda", "cuti akademik"]
+
+
+def test_pickled_index_still_loads(faiss_dir):
+    FaissIndexRegistry.save(_db(), faiss_dir)
+    FAISS.from_texts(["legacy chunk"], _embeddings).save_local(str(faiss_dir))
+    FaissIndexRegistry.invalidate()
+
+    db = FaissIndexRegistry.get_dir(faiss_dir, _embeddings)
+
+    assert db.similarity_search("legacy chunk", k=1)[0].page_content == "legacy chunk"
+
+    FaissIndexRegistry.save(db, faiss_dir)
+    assert not (faiss_dir / "index.pkl").exists()
+
+
+def test_empty_chunks(tmp_path):
+    MappedDocstore.write(iter([("x", Document(""))]), tmp_path, "index")
+
+    docstore = MappedDocstore.open(tmp_path)
+
+    assert docstore.search("x").page_content == ""
+    with pytest.raises(ValueError):
+        docstore.add({"x": Document("again")})
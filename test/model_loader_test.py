@@ -21,3 +21,11 @@ class TestModelLoader(unittest.TestCase):
         model_loader = ModelLoader()
         with self.assertRaises(ValueError):
             model_loader.load_model("nonexistent_model")
+
+    def test_loaded_models_returns_a_copy(self):
+        model = ModelLoader.load_model("gemini")
+        loaded_models = ModelLoader.loaded_models()
+        self.assertIs(loaded_models["gemini"], model)
+
+        loaded_models.clear()
+        self.assertIs(ModelLoader.load_model("gemini"), model)
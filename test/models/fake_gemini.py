@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+from typing import Optional
+
+import google.generativeai as genai
+
+from chatbot.dependencies.language_models import GeminiContextCache as context_cache_module
+
+
+class FakeResponse:
+    def __init__(self, chunks: list[str]):
+        self._chunks = chunks
+        self.text = "".join(chunks)
+
+    def resolve(self):
+        return None
+
+    def __iter__(self):
+        return iter([SimpleNamespace(text=chunk) for chunk in self._chunks])
+
+
+class FakeAsyncResponse(FakeResponse):
+    async def resolve(self):
+        return None
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            yield SimpleNamespace(text=chunk)
+
+
+class FakeGeminiServer:
+    """
+    In-process stand-in for the Gemini API, installed in place of the client classes.
+
+    Records every generation request and cached content, and answers with scripted chunks.
+    """
+
+    def __init__(self):
+        self.requests: list[dict] = []
+        self.caches: dict[str, "object"] = {}
+        self.chunks: list[str] = ["ok"]
+        self.expired_caches = False
+        self.created_models = 0
+
+    def reply(self, *chunks: str) -> None:
+        self.chunks = list(chunks)
+
+    def install(self, monkeypatch) -> "FakeGeminiServer":
+        server = self
+
+        class FakeCachedContent:
+            def __init__(self, name: str, model: str, system_instruction: str, ttl):
+                self.name = name
+                self.model = model
+                self.system_instruction = system_instruction
+                self.ttl = ttl
+                self.updates = 0
+
+            @classmethod
+            def create(cls, model: str, display_name: str, system_instruction: str, ttl):
+                cached = cls(f"cachedContents/{len(server.caches)}", model, system_instruction, ttl)
+                server.caches[cached.name] = cached
+                return cached
+
+            def update(self, ttl=None):
+                self.ttl = ttl
+                self.updates += 1
+
+        class FakeGenerativeModel:
+            def __init__(
+                self,
+                model_name: str = "gemini-pro",
+                safety_settings=None,
+                system_instruction: Optional[str] = None,
+                cached_content: Optional[FakeCachedContent] = None,
+            ):
+                server.created_models += 1
+                self.model_name = model_name
+                self.system_instruction = system_instruction
+                self.cached_content = cached_content
+
+            @classmethod
+            def from_cached_content(cls, cached_content, safety_settings=None):
+                return cls(
+                    cached_content.model,
+                    safety_settings,
+                    cached_content.system_instruction,
+                    cached_content,
+                )
+
+            def _record(self, contents, stream: bool) -> None:
+                if self.cached_content is not None and server.expired_caches:
+                    raise RuntimeError("404 CachedContent not found")
+                server.requests.append(
+                    {
+                        "model": self.model_name,
+                        "system_instruction": self.system_instruction,
+                        "cached_content": getattr(self.cached_content, "name", None),
+                        "contents": contents,
+                        "stream": stream,
+                    }
+                )
+
+            def generate_content(self, contents, generation_config=None, stream=False):
+                self._record(contents, stream)
+                return FakeResponse(server.chunks)
+
+            async def generate_content_async(self, contents, generation_config=None, stream=False):
+                self._record(contents, stream)
+                return FakeAsyncResponse(server.chunks)
+
+        monkeypatch.setattr(genai, "GenerativeModel", FakeGenerativeModel)
+        monkeypatch.setattr(
+            context_cache_module, "caching", SimpleNamespace(CachedContent=FakeCachedContent)
+        )
+        return self
@@ -0,0 +1,108 @@
+import pytest
+
+from chatbot.dependencies.contracts.message import AssistantMessage, SystemMessage, UserMessage
+from chatbot.dependencies.language_models.Gemini import Gemini
+from chatbot.dependencies.language_models.GeminiContextCache import GeminiContextCache
+from test.models.fake_gemini import FakeGeminiServer
+
+STATIC_PROMPT = "Kamu adalah Campus Assistant. " * 50
+
+
+@pytest.fixture
+def server(monkeypatch) -> FakeGeminiServer:
+    return FakeGeminiServer().install(monkeypatch)
+
+
+def conversation(information: str) -> list:
+    return [
+        SystemMessage(STATIC_PROMPT),
+        SystemMessage(information),
+        UserMessage("Kapan KRS dibuka?"),
+        AssistantMessage("Minggu depan."),
+        UserMessage("Jam berapa?"),
+    ]
+
+
+def test_messages_become_system_instruction_and_turns():
+    system_instruction, contents = Gemini._to_contents(conversation("Jadwal KRS"))
+
+    assert system_instruction == STATIC_PROMPT
+    assert contents == [
+        {"role": "user", "parts": ["Jadwal KRS", "Kapan KRS dibuka?"]},
+        {"role": "model", "parts": ["Minggu depan."]},
+        {"role": "user", "parts": ["Jam berapa?"]},
+    ]
+
+
+def test_lone_system_message_is_sent_as_user_turn():
+    assert Gemini._to_contents([SystemMessage("Halo")]) == (
+        None,
+        [{"role": "user", "parts": ["Halo"]}],
+    )
+
+
+async def test_static_prompt_is_sent_as_system_instruction(server):
+    server.reply("Jam ", "08.00")
+    gemini = Gemini("gemini-1.5-flash-001")
+
+    chunks = [chunk async for chunk in gemini.stream_async(conversation("info 1"))]
+    await gemini.generate_async(conversation("info 2"))
+
+    assert "".join(chunks) == "Jam 08.00"
+    assert [request["system_instruction"] for request in server.requests] == [STATIC_PROMPT] * 2
+    assert server.requests[0]["stream"] is True
+    assert server.requests[1]["contents"][0]["parts"][0] == "info 2"
+    # the model object of the static prompt is reused
+    assert server.created_models == 2
+
+
+async def test_large_static_prompt_uses_cached_content(server):
+    gemini = Gemini(
+        "gemini-1.5-flash-001", context_cache={"enabled": True, "min_tokens": 100}
+    )
+
+    await gemini.generate_async(conversation("info 1"))
+    await gemini.generate_async(conversation("info 2"))
+
+    assert len(server.caches) == 1
+    cached = next(iter(server.caches.values()))
+    assert cached.model == "models/gemini-1.5-flash-001"
+    assert [request["cached_content"] for request in server.requests] == [cached.name] * 2
+
+
+async def test_small_prompt_is_sent_inline(server):
+    gemini = Gemini("gemini-1.5-flash-001", context_cache={"enabled": True})
+
+    await gemini.generate_async(conversation("info"))
+
+    assert server.caches == {}
+    assert server.requests[0]["cached_content"] is None
+
+
+async def test_expired_cached_content_falls_back_inline(server):
+    gemini = Gemini(
+        "gemini-1.5-flash-001", context_cache={"enabled": True, "min_tokens": 100}
+    )
+    await gemini.generate_async(conversation("info"))
+
+    server.expired_caches = True
+    assert await gemini.generate_async(conversation("info")) == "ok"
+
+    assert server.requests[-1]["cached_content"] is None
+    assert server.requests[-1]["system_instruction"] == STATIC_PROMPT
+
+
+def test_handle_is_refreshed_before_it_expires(server):
+    cache = GeminiContextCache("gemini-1.5-flash-001", ttl_seconds=60, refresh_margin=120, min_tokens=1)
+
+    first = cache.get(STATIC_PROMPT)
+    second = cache.get(STATIC_PROMPT)
+
+    assert first is second
+    assert cache.stats() == {"size": 1, "created": 1, "refreshed": 1, "failures": 0}
+    assert first.updates == 1
+
+
+def test_disabled_context_cache():
+    assert GeminiContextCache.from_config("gemini-1.5-flash-001", None) is None
+    assert GeminiContextCache.from_config("gemini-1.5-flash-001", {"enabled": False}) is None
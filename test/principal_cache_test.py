@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from chatbot.dependencies.utils.PrincipalCache import (
+    Principal,
+    PrincipalCache,
+    StaffPrincipal,
+    StudentPrincipal,
+)
+from chatbot.dependencies.utils.SessionManagement import SessionDataType
+
+
+def student(user_id: int = 1) -> StudentPrincipal:
+    return StudentPrincipal(
+        id=user_id,
+        name="Student",
+        email="student@mhs.unesa.ac.id",
+        access_level=1,
+        student_number=f"2105120400{user_id}",
+    )
+
+
+def test_principals_are_immutable():
+    principal = student()
+
+    with pytest.raises(Exception):
+        principal.access_level = 0
+
+
+def test_principal_requires_a_session_type():
+    with pytest.raises(TypeError):
+        Principal(id=1, name="Nobody", email="nobody@unesa.ac.id", access_level=1)
+
+    assert student().type == SessionDataType.USER
+
+
+def test_students_and_staff_do_not_share_entries():
+    cache = PrincipalCache()
+    cache.put(student(1))
+
+    assert cache.get(SessionDataType.USER, 1) == student(1)
+    assert cache.get(SessionDataType.STAFF, 1) is None
+
+    staff = StaffPrincipal(
+        id=1, name="Staff", email="staff@unesa.ac.id", access_level=0, staff_number="1"
+    )
+    cache.put(staff)
+    assert cache.get(SessionDataType.STAFF, 1) == staff
+
+
+def test_invalidate_and_ttl(monkeypatch):
+    cache = PrincipalCache(ttl_seconds=30)
+    cache.put(student(1))
+    cache.put(student(2))
+
+    cache.invalidate(SessionDataType.USER, 1)
+    assert cache.get(SessionDataType.USER, 1) is None
+
+    now = time.monotonic()
+    monkeypatch.setattr("time.monotonic", lambda: now + 31)
+    assert cache.get(SessionDataType.USER, 2) is None
+
+
+def test_least_recently_used_user_is_evicted():
+    cache = PrincipalCache(max_size=2)
+    cache.put(student(1))
+    cache.put(student(2))
+    cache.get(SessionDataType.USER, 1)
+    cache.put(student(3))
+
+    assert cache.get(SessionDataType.USER, 2) is None
+    assert cache.get(SessionDataType.USER, 1) == student(1)
+    assert cache.get(SessionDataType.USER, 3) == student(3)
@@ -1,7 +1,9 @@
 import unittest
 
+from jinja2 import Template
+
 from chatbot.config import Configuration
-from chatbot.dependencies.PromptManager import PromptManager
+from chatbot.dependencies.PromptManager import CompiledPrompt, PromptManager
 
 
 class TestPromptManager(unittest.TestCase):
@@ -14,3 +16,25 @@ class TestPromptManager(unittest.TestCase):
     def test_get_prompt_returns_string(self):
         prompt = PromptManager.get_prompt("intent_classification", "main_prompt", {"intent_list": "greeting,shouting"})
         self.assertIsInstance(prompt, str)
+
+    def test_prompt_file_is_parsed_once(self):
+        PromptManager.clear_cache()
+        first = PromptManager.get_prompt_template("response_generator", "SUPPORT")
+        second = PromptManager.get_prompt_template("response_generator", "SUPPORT")
+        self.assertIs(first, second)
+
+    def test_compiled_prompt_renders_like_jinja(self):
+        template = PromptManager.get_prompt_template("response_generator", "SUPPORT")
+        compiled = PromptManager.get_compiled_prompt("response_generator", "SUPPORT")
+
+        self.assertTrue(compiled.is_split)
+        self.assertEqual(compiled.render("Jam buka 08.00"), template.render(information="Jam buka 08.00"))
+        self.assertEqual(compiled.render(None), template.render())
+
+    def test_conditional_template_falls_back_to_jinja(self):
+        template = Template("A{% if information %} [{{ information }}]{% endif %} B {{ information }}")
+        compiled = CompiledPrompt(template)
+
+        self.assertFalse(compiled.is_split)
+        self.assertEqual(compiled.render("x"), "A [x] B x")
+        self.assertEqual(compiled.render(""), "A B ")
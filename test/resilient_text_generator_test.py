@@ -0,0 +1,188 @@
+import asyncio
+from typing import AsyncIterator, Generator, Optional
+
+import pytest
+
+from chatbot.dependencies.contracts.TextGenerator import TextGenerator
+from chatbot.dependencies.contracts.message import UserMessage
+from chatbot.dependencies.language_models.ResilientTextGenerator import (
+    GeneratorOverloadedError,
+    ResilientTextGenerator,
+)
+
+PROMPT = [UserMessage("Kapan KRS dibuka?")]
+
+
+class StubGenerator(TextGenerator):
+    """
+    Local stand-in for a model, answering after `delays` and failing `failures` times.
+    """
+
+    def __init__(
+        self,
+        answer: str = "ok",
+        failures: int = 0,
+        delays: Optional[list[float]] = None,
+        chunk_delay: float = 0.0,
+    ):
+        self.answer = answer
+        self.failures = failures
+        self.delays = delays or []
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+
+    async def _start(self) -> None:
+        self.calls += 1
+        delay = self.delays.pop(0) if self.delays else 0
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.running -= 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("503 Service Unavailable")
+
+    def generate(self, prompt, config=None) -> str:
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("503 Service Unavailable")
+        return self.answer
+
+    async def generate_async(self, prompt, config=None) -> str:
+        await self._start()
+        return self.answer
+
+    def stream(self, prompt, config=None) -> Generator[str, None, None]:
+        yield from self.answer.split(" ")
+
+    async def stream_async(self, prompt, config=None) -> AsyncIterator[str]:
+        await self._start()
+        for chunk in self.answer.split(" "):
+            await asyncio.sleep(self.chunk_delay)
+            yield chunk
+
+
+def resilient(primary, fallback=None, **kwargs) -> ResilientTextGenerator:
+    kwargs.setdefault("retry_backoff", 0)
+    return ResilientTextGenerator(primary, fallback, **kwargs)
+
+
+async def test_failed_call_is_retried():
+    primary = StubGenerator(failures=2)
+    generator = resilient(primary, max_retries=2)
+
+    assert await generator.generate_async(PROMPT) == "ok"
+    assert primary.calls == 3
+    assert generator.stats()["retries"] == 2
+
+
+async def test_open_breaker_falls_back():
+    primary = StubGenerator(failures=10)
+    fallback = StubGenerator(answer="fallback")
+    generator = resilient(
+        primary, fallback, max_retries=5, circuit_breaker={"failure_threshold": 2}
+    )
+
+    assert await generator.generate_async(PROMPT) == "fallback"
+    assert await generator.generate_async(PROMPT) == "fallback"
+
+    # the breaker opened after two failures and the primary is no longer called
+    assert primary.calls == 2
+    assert generator.stats()["circuit"] == "open"
+    assert generator.stats()["fallbacks"] == 2
+
+
+async def test_half_open_breaker_closes_after_success():
+    primary = StubGenerator(failures=1)
+    generator = resilient(
+        primary,
+        StubGenerator(answer="fallback"),
+        max_retries=0,
+        circuit_breaker={"failure_threshold": 1, "reset_timeout": 0.01},
+    )
+
+    assert await generator.generate_async(PROMPT) == "fallback"
+    await asyncio.sleep(0.02)
+    assert await generator.generate_async(PROMPT) == "ok"
+    assert generator.breaker.state == "closed"
+
+
+async def test_failure_without_fallback_raises():
+    generator = resilient(StubGenerator(failures=10), max_retries=1)
+
+    with pytest.raises(RuntimeError, match="Generation failed"):
+        await generator.generate_async(PROMPT)
+
+
+async def test_slow_first_token_times_out_and_retries():
+    primary = StubGenerator(answer="Jam 08.00", delays=[1.0])
+    generator = resilient(primary, first_token_timeout=0.05, max_retries=1)
+
+    chunks = [chunk async for chunk in generator.stream_async(PROMPT)]
+
+    assert chunks == ["Jam", "08.00"]
+    assert primary.calls == 2
+    assert generator.stats()["timeouts"] == 1
+
+
+async def test_stream_exceeding_total_deadline_fails():
+    generator = resilient(
+        StubGenerator(answer="a b c d", chunk_delay=0.05), total_timeout=0.08
+    )
+
+    with pytest.raises(RuntimeError, match="deadline"):
+        async for _ in generator.stream_async(PROMPT):
+            pass
+
+
+async def test_hedged_request_wins_over_slow_one():
+    primary = StubGenerator(delays=[1.0, 0.0])
+    generator = resilient(primary, hedge={"enabled": True, "delay": 0.02})
+
+    assert await asyncio.wait_for(generator.generate_async(PROMPT), 0.5) == "ok"
+    assert primary.calls == 2
+    assert generator.stats()["hedges"] == 1
+
+    # the slow request was cancelled and its slot released
+    await asyncio.sleep(0)
+    assert primary.running == 0
+
+
+async def test_concurrency_is_capped_per_model():
+    primary = StubGenerator(delays=[0.05] * 4)
+    generator = resilient(primary, max_concurrency=2, slot_timeout=1)
+
+    results = await asyncio.gather(*(generator.generate_async(PROMPT) for _ in range(4)))
+
+    assert results == ["ok"] * 4
+    assert primary.max_running == 2
+
+
+async def test_no_free_slot_within_slot_timeout():
+    generator = resilient(
+        StubGenerator(delays=[0.2]), max_concurrency=1, slot_timeout=0.01, max_retries=0
+    )
+
+    running = asyncio.ensure_future(generator.generate_async(PROMPT))
+    await asyncio.sleep(0)
+    with pytest.raises(RuntimeError) as error:
+        await generator.generate_async(PROMPT)
+    assert isinstance(error.value.__cause__, GeneratorOverloadedError)
+    assert await running == "ok"
+
+
+def test_sync_generate_falls_back():
+    generator = resilient(
+        StubGenerator(failures=10),
+        StubGenerator(answer="fallback"),
+        max_retries=1,
+        circuit_breaker={"failure_threshold": 1},
+    )
+
+    assert generator.generate(PROMPT) == "fallback"
+    assert list(generator.stream(PROMPT)) == ["fallback"]
@@ -0,0 +1,103 @@
+import pytest
+
+from chatbot.dependencies.IntentClassifier import Intent
+from chatbot.dependencies.ResponseCache import ResponseCache
+
+INTENTS = list(Intent)
+
+
+class Versions:
+    def __init__(self):
+        self.versions: dict[tuple[str, bool], str] = {}
+
+    def __call__(self, intent_value: str, public: bool) -> str:
+        return self.versions.get((intent_value, public), "v1")
+
+
+def make_cache(**kwargs) -> tuple[ResponseCache, Versions]:
+    versions = Versions()
+    return ResponseCache(index_version=versions, **kwargs), versions
+
+
+def test_similar_question_hits_across_intents():
+    cache, _ = make_cache(threshold=0.9)
+    intent = INTENTS[0]
+    cache.store([1.0, 0.0, 0.0], intent, "Reset it on the portal.")
+
+    assert cache.lookup([0.99, 0.05, 0.0], INTENTS) == (intent, "Reset it on the portal.")
+    assert cache.lookup([0.0, 1.0, 0.0], INTENTS) is None
+
+    stats = cache.stats()
+    assert stats["hits_per_intent"] == {intent.value: 1}
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_visibility_is_part_of_the_key():
+    cache, _ = make_cache()
+    cache.store([1.0, 0.0], INTENTS[0], "internal answer")
+
+    assert cache.lookup([1.0, 0.0], INTENTS, public=True) is None
+    assert cache.lookup([1.0, 0.0], INTENTS, public=False) is not None
+
+
+def test_index_version_change_drops_answers():
+    cache, versions = make_cache()
+    intent = INTENTS[0]
+    cache.store([1.0, 0.0], intent, "old answer")
+
+    versions.versions[(intent.value, False)] = "v2"
+
+    assert cache.lookup([1.0, 0.0], INTENTS) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_disabled_intent_is_never_cached():
+    intent = INTENTS[0]
+    cache, _ = make_cache(disabled_intents=[intent.value])
+    cache.store([1.0, 0.0], intent, "answer")
+
+    assert not cache.enabled_for(intent)
+    assert cache.lookup([1.0, 0.0], INTENTS) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_answer_is_evicted():
+    cache, _ = make_cache(max_entries=1)
+    cache.store([1.0, 0.0], INTENTS[0], "first")
+    cache.store([0.0, 1.0], INTENTS[0], "second")
+
+    assert cache.lookup([1.0, 0.0], INTENTS) is None
+    assert cache.lookup([0.0, 1.0], INTENTS) == (INTENTS[0], "second")
+
+
+@pytest.mark.asyncio
+async def test_recorded_stream_is_replayed():
+    cache, _ = make_cache(chunk_size=4)
+
+    async def generated():
+        for chunk in ["Reset ", "it on ", "the portal."]:
+            yield chunk
+
+    streamed = [chunk async for chunk in cache.record(generated(), [1.0, 0.0], INTENTS[0])]
+    assert "".join(streamed) == "Reset it on the portal."
+
+    _, answer = cache.lookup([1.0, 0.0], INTENTS)
+    replayed = [chunk async for chunk in cache.replay(answer)]
+    assert replayed[0] == "Rese"
+    assert "".join(replayed) == "Reset it on the portal."
+
+
+@pytest.mark.asyncio
+async def test_interrupted_stream_is_not_cached():
+    cache, _ = make_cache()
+
+    async def failing():
+        yield "partial"
+        raise RuntimeError("generation failed")
+
+    with pytest.raises(RuntimeError):
+        async for _ in cache.record(failing(), [1.0, 0.0], INTENTS[0]):
+            pass
+
+    assert cache.lookup([1.0, 0.0], INTENTS) is None
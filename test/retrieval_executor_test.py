@@ -0,0 +1,45 @@
+import asyncio
+import time
+
+import pytest
+
+from chatbot.dependencies.RetrievalExecutor import RetrievalExecutor, RetrievalOverloadedError
+
+
+@pytest.mark.asyncio
+async def test_run_returns_function_result():
+    executor = RetrievalExecutor(max_workers=1)
+
+    assert await executor.run(sum, [1, 2, 3]) == 6
+    assert executor.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_blocking_work_does_not_stall_event_loop():
+    executor = RetrievalExecutor(max_workers=2)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker_task = asyncio.create_task(ticker())
+    await executor.run(time.sleep, 0.2)
+    ticker_task.cancel()
+
+    assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_rejects_calls():
+    executor = RetrievalExecutor(max_workers=1, max_pending=1, acquire_timeout=0.05)
+
+    running = asyncio.create_task(executor.run(time.sleep, 0.3))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(RetrievalOverloadedError):
+        await executor.run(time.sleep, 0)
+
+    await running
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from chatbot.dependencies.SpeculativeRetrieval import SpeculativeRetrieval
+
+
+class FakeIndexes:
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.embedded = 0
+        self.searched: list[str] = []
+        self.cancelled: list[str] = []
+
+    async def embed(self) -> list[float]:
+        self.embedded += 1
+        await asyncio.sleep(self.delay)
+        return [1.0, 0.0]
+
+    async def search(self, intent: str, embedding) -> str:
+        try:
+            vector = await embedding
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(intent)
+            raise
+        self.searched.append(intent)
+        return f"{intent}:{vector}"
+
+
+@pytest.mark.asyncio
+async def test_embeds_once_and_keeps_winning_intent():
+    indexes = FakeIndexes()
+    speculation = SpeculativeRetrieval(indexes.embed, indexes.search, ["a", "b", "c"])
+
+    await asyncio.sleep(0.01)
+    assert await speculation.result("b") == "b:[1.0, 0.0]"
+
+    await asyncio.sleep(0)
+    assert indexes.embedded == 1
+    assert indexes.searched == ["b"]
+    assert sorted(indexes.cancelled) == ["a", "c"]
+
+
+@pytest.mark.asyncio
+async def test_overlaps_with_classification():
+    indexes = FakeIndexes(delay=0.1)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    speculation = SpeculativeRetrieval(indexes.embed, indexes.search, ["a", "b"])
+    await asyncio.sleep(0.2)  # the classification
+    await speculation.result("a")
+
+    assert loop.time() - started < 0.3
+
+
+@pytest.mark.asyncio
+async def test_unsearched_intent_returns_none_and_cancels_everything():
+    indexes = FakeIndexes()
+    speculation = SpeculativeRetrieval(indexes.embed, indexes.search, ["a", "b"])
+
+    assert await speculation.result("other") is None
+
+    await asyncio.sleep(0.2)
+    assert indexes.searched == []
+    assert indexes.embedded == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_search_returns_none():
+    async def failing(intent, embedding):
+        await embedding
+        raise ValueError("index is broken")
+
+    indexes = FakeIndexes(delay=0)
+    speculation = SpeculativeRetrieval(indexes.embed, failing, ["a"])
+
+    assert await speculation.result("a") is None
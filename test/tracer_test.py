@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import pytest
+
+from chatbot.dependencies.utils.Tracer import OtlpJsonExporter, Tracer
+
+
+async def chunks(*values: str):
+    for value in values:
+        await asyncio.sleep(0)
+        yield value
+
+
+def span_names(exporter: OtlpJsonExporter, path) -> dict[str, dict]:
+    exporter.flush()
+    spans = {}
+    for line in path.read_text().splitlines():
+        for resource in json.loads(line)["resourceSpans"]:
+            for scope in resource["scopeSpans"]:
+                for span in scope["spans"]:
+                    spans[span["name"]] = span
+    return spans
+
+
+@pytest.fixture
+def exported(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = OtlpJsonExporter(path=str(path), batch_size=100)
+    return Tracer(exporter=exporter), exporter, path
+
+
+async def test_nested_spans_share_the_trace(exported):
+    tracer, exporter, path = exported
+
+    with tracer.span("chat.prompt"):
+        await tracer.traced("retriever.embed", asyncio.sleep(0))
+        with tracer.span("retriever.search", intent="faq") as span:
+            span.set(cache_hit=True)
+
+    spans = span_names(exporter, path)
+    root = spans["chat.prompt"]
+    assert "parentSpanId" not in root
+    assert spans["retriever.embed"]["parentSpanId"] == root["spanId"]
+    assert spans["retriever.search"]["traceId"] == root["traceId"]
+    assert {"key": "intent", "value": {"stringValue": "faq"}} in spans["retriever.search"][
+        "attributes"
+    ]
+    assert tracer.current() is None
+
+
+async def test_stream_keeps_the_trace_of_its_request(exported):
+    tracer, exporter, path = exported
+
+    with tracer.span("chat.prompt"):
+        response = tracer.stream("chat.stream", chunks("Jam ", "08.00"))
+
+    # consumed after the request span ended, like a StreamingResponse does
+    assert [chunk async for chunk in response] == ["Jam ", "08.00"]
+
+    spans = span_names(exporter, path)
+    stream = spans["chat.stream"]
+    assert stream["parentSpanId"] == spans["chat.prompt"]["spanId"]
+    attributes = {a["key"]: a["value"] for a in stream["attributes"]}
+    assert attributes["chunks"] == {"intValue": "2"}
+    assert attributes["characters"] == {"intValue": "9"}
+    assert "time_to_first_token_seconds" in attributes
+
+
+async def test_stream_children_are_nested():
+    tracer = Tracer()
+
+    async def model_stream():
+        with tracer.span("gemini.request"):
+            pass
+        yield "ok"
+
+    parents = []
+
+    async def recording():
+        async for chunk in tracer.stream("gemini.stream", model_stream()):
+            parents.append(tracer.current())
+            yield chunk
+
+    assert [chunk async for chunk in tracer.stream("chat.stream", recording())] == ["ok"]
+    assert parents[0].name == "chat.stream"
+
+
+def test_prometheus_metrics():
+    tracer = Tracer(buckets=(0.1, 1.0))
+    tracer.register_collector(
+        "response_cache", lambda: {"hits": 3, "hits_per_intent": {"faq": 2}, "state": "ok"}
+    )
+
+    with tracer.span("gemini.generate") as span:
+        span.set(prompt_tokens=12, completion_tokens=3, cache_hit=False)
+    with pytest.raises(ValueError):
+        with tracer.span("gemini.generate"):
+            raise ValueError("blocked")
+
+    metrics = tracer.metrics()
+
+    assert "# TYPE chatbot_span_duration_seconds histogram" in metrics
+    assert 'chatbot_span_duration_seconds_bucket{span="gemini.generate",le="+Inf"} 2' in metrics
+    assert 'chatbot_span_duration_seconds_count{span="gemini.generate"} 2' in metrics
+    assert 'chatbot_tokens_total{kind="prompt_tokens",span="gemini.generate"} 12' in metrics
+    assert 'chatbot_cache_lookups_total{hit="false",span="gemini.generate"} 1' in metrics
+    assert 'chatbot_span_errors_total{span="gemini.generate"} 1' in metrics
+    assert 'chatbot_component_stat{component="response_cache",stat="hits"} 3.0' in metrics
+    assert 'stat="hits_per_intent.faq"} 2.0' in metrics
+    assert "state" not in metrics
+
+
+async def test_disabled_tracer_records_nothing():
+    tracer = Tracer(enabled=False)
+
+    with tracer.span("chat.prompt") as span:
+        span.set(cache_hit=True)
+        iterator = chunks("a")
+        assert tracer.stream("chat.stream", iterator) is iterator
+
+    assert tracer.current() is None
+    assert tracer.metrics() == "\n"